@@ -2,13 +2,19 @@
 AI modules for LandPPT
 """
 
-from .providers import AIProviderFactory, get_ai_provider, get_role_provider
+from .providers import (
+    AIProviderFactory, get_ai_provider, get_role_provider, get_llm_response_cache, get_ai_request_limiter
+)
+from .resilience import CircuitOpenError
 from .base import AIProvider, AIMessage, AIResponse, MessageRole
 
 __all__ = [
     "AIProviderFactory",
     "get_ai_provider",
     "get_role_provider",
+    "get_llm_response_cache",
+    "get_ai_request_limiter",
+    "CircuitOpenError",
     "AIProvider",
     "AIMessage",
     "AIResponse",
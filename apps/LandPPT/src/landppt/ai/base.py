@@ -3,10 +3,24 @@ Base classes for AI providers
 """
 
 from abc import ABC, abstractmethod
+from contextvars import ContextVar
 from typing import List, Dict, Any, Optional, AsyncGenerator, Union
 from pydantic import BaseModel
 from enum import Enum
 
+# Finish reason of the last stream run in the current context. Streams only yield
+# text, so providers record how the stream ended here for wrappers such as the
+# response cache; None means the provider did not report it.
+stream_finish_reason: ContextVar[Optional[str]] = ContextVar("stream_finish_reason", default=None)
+
+
+def _response_finish_reason(response: "AIResponse") -> Optional[str]:
+    # Placeholder text (e.g. a blocked or empty Gemini answer) is not a real completion
+    if (response.metadata or {}).get("placeholder"):
+        return None
+    return response.finish_reason
+
+
 class MessageRole(str, Enum):
     """Message roles for AI conversations"""
     SYSTEM = "system"
@@ -75,6 +89,7 @@ class AIProvider(ABC):
         """Stream chat completion (optional)"""
         # Default implementation: return full response at once
         response = await self.chat_completion(messages, **kwargs)
+        stream_finish_reason.set(_response_finish_reason(response))
         yield response.content
     
     async def stream_text_completion(
@@ -85,6 +100,7 @@ class AIProvider(ABC):
         """Stream text completion (optional)"""
         # Default implementation: return full response at once
         response = await self.text_completion(prompt, **kwargs)
+        stream_finish_reason.set(_response_finish_reason(response))
         yield response.content
     
     def get_model_info(self) -> Dict[str, Any]:
@@ -8,7 +8,12 @@ import logging
 import re
 from typing import List, Dict, Any, Optional, AsyncGenerator, Union, Tuple
 
-from .base import AIProvider, AIMessage, AIResponse, MessageRole, TextContent, ImageContent, MessageContentType
+from .base import (
+    AIProvider, AIMessage, AIResponse, MessageRole, TextContent, ImageContent, MessageContentType,
+    stream_finish_reason
+)
+from .resilience import AIRequestLimiter, ResilientAIProvider, rate_limit_headers
+from .response_cache import CachedAIProvider, LLMResponseCache
 from ..core.config import ai_config
 
 logger = logging.getLogger(__name__)
@@ -109,13 +114,15 @@ class OpenAIProvider(AIProvider):
         ]
         
         try:
-            response = await self.client.chat.completions.create(
+            # Raw response keeps the rate-limit headers for the request limiter
+            raw_response = await self.client.chat.completions.with_raw_response.create(
                 model=config.get("model", self.model),
                 messages=openai_messages,
                 # max_tokens=config.get("max_tokens", 2000),
                 temperature=config.get("temperature", 0.7),
                 top_p=config.get("top_p", 1.0)
             )
+            response = raw_response.parse()
             
             choice = response.choices[0]
             # Filter out think content from the response
@@ -130,7 +137,10 @@ class OpenAIProvider(AIProvider):
                     "total_tokens": response.usage.total_tokens
                 },
                 finish_reason=choice.finish_reason,
-                metadata={"provider": "openai"}
+                metadata={
+                    "provider": "openai",
+                    "rate_limit_headers": rate_limit_headers(raw_response.headers)
+                }
             )
             
         except Exception as e:
@@ -178,6 +188,8 @@ class OpenAIProvider(AIProvider):
             in_think_tag = False
 
             async for chunk in stream:
+                if chunk.choices and chunk.choices[0].finish_reason:
+                    stream_finish_reason.set(chunk.choices[0].finish_reason)
                 if chunk.choices and chunk.choices[0].delta.content:
                     chunk_content = chunk.choices[0].delta.content
                     buffer += chunk_content
@@ -328,6 +340,7 @@ class AnthropicProvider(AIProvider):
         # 收集所有流式块后返回完整响应
         try:
             full_content = ""
+            stream_finish_reason.set(None)
             async for chunk in self.stream_chat_completion(messages, **kwargs):
                 full_content += chunk
             
@@ -339,7 +352,7 @@ class AnthropicProvider(AIProvider):
                     "completion_tokens": 0,
                     "total_tokens": 0
                 },
-                finish_reason="stop",
+                finish_reason=stream_finish_reason.get() or "stop",
                 metadata={"provider": "anthropic"}
             )
             
@@ -444,7 +457,11 @@ class AnthropicProvider(AIProvider):
                                     try:
                                         import json
                                         event_data = json.loads(data)
-                                        if event_data.get('type') == 'content_block_delta':
+                                        if event_data.get('type') == 'message_delta':
+                                            stop_reason = event_data.get('delta', {}).get('stop_reason')
+                                            if stop_reason:
+                                                stream_finish_reason.set(stop_reason)
+                                        elif event_data.get('type') == 'content_block_delta':
                                             delta = event_data.get('delta', {})
                                             if delta.get('type') == 'text_delta':
                                                 text = delta.get('text', '')
@@ -715,7 +732,9 @@ class GoogleProvider(AIProvider):
                 )
 
                 candidates = response_data.get("candidates") or []
+                placeholder = False
                 if not candidates:
+                    placeholder = True
                     content = "[å“åº”ä¸­æ²¡æœ‰å€™é€‰å†…å®¹]"
                     finish_reason = "stop"
                 else:
@@ -731,6 +750,7 @@ class GoogleProvider(AIProvider):
                     content = "\n".join(text_parts).strip()
 
                     if not content:
+                        placeholder = True
                         if finish_reason == "SAFETY":
                             content = "[å†…å®¹è¢«å®‰å…¨è¿‡æ»¤å™¨é˜»æ­¢]"
                         elif finish_reason == "RECITATION":
@@ -752,7 +772,7 @@ class GoogleProvider(AIProvider):
                     model=config.get("model", self.model),
                     usage=usage,
                     finish_reason=finish_reason,
-                    metadata={"provider": "google", "base_url": normalized_base_url}
+                    metadata={"provider": "google", "base_url": normalized_base_url, "placeholder": placeholder}
                 )
 
 
@@ -762,6 +782,8 @@ class GoogleProvider(AIProvider):
             # 检查响应状态和安全过滤
             finish_reason = "stop"
             content = ""
+            # 占位文本（被拦截、截断或取不到内容）不是真正的回答
+            placeholder = True
 
             if response.candidates:
                 candidate = response.candidates[0]
@@ -796,6 +818,7 @@ class GoogleProvider(AIProvider):
                         else:
                             # 回退到response.text
                             content = response.text if hasattr(response, 'text') and response.text else ""
+                        placeholder = False
                     except Exception as text_error:
                         logger.warning(f"Failed to get response text: {text_error}")
                         content = "[无法获取响应内容]"
@@ -812,7 +835,7 @@ class GoogleProvider(AIProvider):
                     "total_tokens": response.usage_metadata.total_token_count if hasattr(response, 'usage_metadata') else 0
                 },
                 finish_reason=finish_reason,
-                metadata={"provider": "google"}
+                metadata={"provider": "google", "placeholder": placeholder}
             )
 
         except Exception as e:
@@ -1033,6 +1056,56 @@ class AIProviderManager:
     def __init__(self):
         self._provider_cache = {}
         self._config_cache = {}
+        self._response_cache: Optional[LLMResponseCache] = None
+        self._response_cache_signature = None
+        self._request_limiter: Optional[AIRequestLimiter] = None
+        self._request_limiter_signature = None
+
+    def get_request_limiter(self) -> AIRequestLimiter:
+        """Get the per provider/model request limiter, rebuilt when its configuration changes"""
+        config = {
+            "max_concurrent": ai_config.ai_max_concurrent_requests,
+            "requests_per_minute": ai_config.ai_requests_per_minute,
+            "tokens_per_minute": ai_config.ai_tokens_per_minute,
+            "overrides": ai_config.ai_rate_limit_overrides,
+            "max_retries": ai_config.ai_max_retries,
+            "failure_threshold": ai_config.ai_circuit_failure_threshold,
+            "reset_seconds": ai_config.ai_circuit_reset_seconds,
+            "fallback_provider": ai_config.ai_fallback_provider,
+            "fallback_model": ai_config.ai_fallback_model,
+            "hedge_enabled": ai_config.ai_hedge_enabled,
+            "hedge_delay_ms": ai_config.ai_hedge_delay_ms,
+        }
+        signature = tuple(sorted(config.items()))
+        if self._request_limiter is None or signature != self._request_limiter_signature:
+            self._request_limiter = AIRequestLimiter(config)
+            self._request_limiter_signature = signature
+        return self._request_limiter
+
+    def _get_resilient_provider(self, provider_name: str) -> ResilientAIProvider:
+        """Fallback target: the limited provider without the response cache layer"""
+        provider = self.get_provider(provider_name)
+        if isinstance(provider, CachedAIProvider):
+            provider = provider.provider
+        return provider
+
+    def get_response_cache(self) -> LLMResponseCache:
+        """Get the LLM response cache, rebuilt when its configuration changes"""
+        signature = (
+            ai_config.llm_cache_enabled,
+            ai_config.llm_cache_ttl_seconds,
+            ai_config.llm_cache_max_mb,
+            ai_config.llm_cache_path,
+        )
+        if self._response_cache is None or signature != self._response_cache_signature:
+            self._response_cache = LLMResponseCache({
+                "enabled": ai_config.llm_cache_enabled,
+                "ttl_seconds": ai_config.llm_cache_ttl_seconds,
+                "max_mb": ai_config.llm_cache_max_mb,
+                "path": ai_config.llm_cache_path,
+            })
+            self._response_cache_signature = signature
+        return self._response_cache
 
     def get_provider(self, provider_name: Optional[str] = None) -> AIProvider:
         """Get AI provider instance with caching"""
@@ -1047,20 +1120,37 @@ class AIProviderManager:
 
         # Check if we have a cached provider and if config has changed
         cache_key = provider_name
+        response_cache = self.get_response_cache()
+        request_limiter = self.get_request_limiter()
         if (cache_key in self._provider_cache and
             cache_key in self._config_cache and
-            self._config_cache[cache_key] == current_config):
+            self._config_cache[cache_key] == current_config and
+            isinstance(self._provider_cache[cache_key], CachedAIProvider) == response_cache.enabled and
+            self._limiter_of(self._provider_cache[cache_key]) is request_limiter):
             return self._provider_cache[cache_key]
 
         # Create new provider instance
         provider = AIProviderFactory.create_provider(provider_name, current_config)
 
+        # Rate limiting, retries, circuit breaking and hedging per provider/model
+        provider = ResilientAIProvider(provider, provider_name, request_limiter, self._get_resilient_provider)
+
+        # Serve identical requests from the opt-in response cache
+        if response_cache.enabled:
+            provider = CachedAIProvider(provider, provider_name, response_cache)
+
         # Cache the provider and config
         self._provider_cache[cache_key] = provider
         self._config_cache[cache_key] = current_config
 
         return provider
 
+    @staticmethod
+    def _limiter_of(provider: AIProvider) -> Optional[AIRequestLimiter]:
+        if isinstance(provider, CachedAIProvider):
+            provider = provider.provider
+        return provider.limiter if isinstance(provider, ResilientAIProvider) else None
+
     def clear_cache(self):
         """Clear provider cache to force reload"""
         self._provider_cache.clear()
@@ -1088,6 +1178,16 @@ def get_role_provider(role: str, provider_override: Optional[str] = None) -> Tup
     provider = get_ai_provider(settings["provider"])
     return provider, settings
 
+def get_llm_response_cache() -> LLMResponseCache:
+    """Get the shared LLM response cache"""
+    return _provider_manager.get_response_cache()
+
+
+def get_ai_request_limiter() -> AIRequestLimiter:
+    """Get the shared per provider/model request limiter"""
+    return _provider_manager.get_request_limiter()
+
+
 def reload_ai_providers():
     """Reload all AI providers (clear cache)"""
     _provider_manager.clear_cache()
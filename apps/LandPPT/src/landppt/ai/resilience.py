@@ -0,0 +1,762 @@
+"""
+Provider-aware request limiting for AI calls
+
+Every provider/model pair gets its own limiter: an adaptive concurrency cap
+(halved on a 429, grown back one slot at a time on success), token buckets for
+requests/min and tokens/min, and a pause that every caller honours when the API
+answers with Retry-After. Rate-limit headers (OpenAI ``x-ratelimit-*``,
+Anthropic ``anthropic-ratelimit-*``) tighten the buckets to the limits the API
+actually reports.
+
+A circuit breaker per provider/model stops sending traffic after repeated
+transient failures and routes calls to the configured fallback model until a
+probe succeeds. Non-streaming calls can optionally be hedged: when the first
+attempt is slower than the hedge delay (fixed, or the observed p95 latency) and
+the limiter has spare capacity, a second attempt is raced against it.
+"""
+
+import asyncio
+import logging
+import random
+import re
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .base import AIMessage, AIProvider, AIResponse
+
+logger = logging.getLogger(__name__)
+
+TRANSIENT_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+# Latency samples needed before the adaptive (p95) hedge delay kicks in
+MIN_HEDGE_SAMPLES = 20
+
+# Rough prompt size estimate used until the provider reports real usage
+CHARS_PER_TOKEN = 4
+DEFAULT_COMPLETION_TOKENS = 1024
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a provider/model circuit is open and no fallback is configured"""
+
+
+def error_status(exc: BaseException) -> Optional[int]:
+    """HTTP status of a provider error (SDK exceptions, aiohttp errors or the message text)"""
+    for source in (exc, getattr(exc, "response", None)):
+        for attr in ("status_code", "status"):
+            value = getattr(source, attr, None)
+            if isinstance(value, int):
+                return value
+    match = re.search(r"\b(?:error|status)\D{0,12}([45]\d\d)\b", str(exc), re.IGNORECASE)
+    return int(match.group(1)) if match else None
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    return error_status(exc) == 429 or "rate limit" in str(exc).lower()
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Errors worth retrying and counting against the circuit breaker"""
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    name = type(exc).__name__
+    if "Timeout" in name or "Connection" in name:
+        return True
+    return error_status(exc) in TRANSIENT_STATUS_CODES or is_rate_limited(exc)
+
+
+def parse_reset(value: Any) -> Optional[float]:
+    """Seconds until a limit resets
+
+    Accepts plain seconds (``Retry-After``), Go-style durations used by OpenAI
+    (``20ms``, ``6m0s``), RFC 3339 timestamps used by Anthropic and HTTP dates.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    parts = _DURATION_RE.findall(value)
+    if parts and "".join(number + unit for number, unit in parts) == value:
+        return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+    for parse in (lambda v: datetime.fromisoformat(v.replace("Z", "+00:00")), parsedate_to_datetime):
+        try:
+            return max(0.0, parse(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def rate_limit_headers(headers: Any) -> Dict[str, str]:
+    """Pick the rate-limit related entries out of an HTTP header mapping"""
+    if not headers:
+        return {}
+    try:
+        items = list(headers.items())
+    except AttributeError:
+        return {}
+    picked = {}
+    for name, value in items:
+        lower = str(name).lower()
+        if lower.startswith(("x-ratelimit-", "anthropic-ratelimit-")) or lower in ("retry-after", "retry-after-ms"):
+            picked[lower] = value
+    return picked
+
+
+def _exception_headers(exc: BaseException) -> Dict[str, str]:
+    response = getattr(exc, "response", None)
+    return rate_limit_headers(getattr(response, "headers", None) or getattr(exc, "headers", None))
+
+
+def _first_number(headers: Dict[str, str], *names: str) -> Optional[float]:
+    for name in names:
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def _retry_after(headers: Dict[str, str]) -> Optional[float]:
+    if "retry-after-ms" in headers:
+        delay = parse_reset(headers["retry-after-ms"])
+        if delay is not None:
+            return delay / 1000.0
+    return parse_reset(headers.get("retry-after"))
+
+
+def _messages_text(messages: List[AIMessage]) -> str:
+    return " ".join(m.content if isinstance(m.content, str) else str(m.content) for m in messages)
+
+
+def parse_limit_overrides(raw: Optional[str]) -> Dict[str, Tuple[int, int]]:
+    """Parse ``provider[:model]=rpm/tpm`` entries separated by commas
+
+    Example: ``openai:gpt-4o=500/200000,anthropic=50/40000``. A missing tpm
+    means no token limit.
+    """
+    overrides: Dict[str, Tuple[int, int]] = {}
+    for entry in (raw or "").split(","):
+        entry = entry.strip()
+        if not entry or "=" not in entry:
+            continue
+        target, limits = entry.split("=", 1)
+        rpm, _, tpm = limits.partition("/")
+        try:
+            overrides[target.strip()] = (int(float(rpm or 0)), int(float(tpm or 0)))
+        except ValueError:
+            logger.warning(f"Ignoring malformed AI rate limit override: {entry}")
+    return overrides
+
+
+class _TokenBucket:
+    """Continuously refilled bucket; a rate of 0 disables it
+
+    The balance may go negative when the real cost of a request turns out to be
+    larger than the reservation, which delays the following callers instead.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.configured_rate = max(float(rate_per_minute or 0), 0.0)
+        self.rate_per_minute = self.configured_rate
+        self.capacity = self._capacity_for(self.rate_per_minute)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+
+    @staticmethod
+    def _capacity_for(rate_per_minute: float) -> float:
+        # Providers enforce limits over sub-minute windows, so only allow bursts
+        # of about one second worth of budget
+        return max(1.0, rate_per_minute / 60.0)
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate_per_minute > 0
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        if self.enabled:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate_per_minute / 60.0)
+
+    def set_rate(self, rate_per_minute: float):
+        was_enabled = self.enabled
+        self._refill(time.monotonic())
+        self.rate_per_minute = max(float(rate_per_minute), 0.0)
+        self.capacity = self._capacity_for(self.rate_per_minute)
+        self._tokens = min(self._tokens, self.capacity) if was_enabled else self.capacity
+
+    def wait_time(self, amount: float, now: float) -> float:
+        if not self.enabled:
+            return 0.0
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        if self._tokens >= needed:
+            return 0.0
+        return (needed - self._tokens) * 60.0 / self.rate_per_minute
+
+    def take(self, amount: float):
+        if self.enabled:
+            self._tokens -= amount
+
+    def refund(self, amount: float):
+        """Return (or, with a negative amount, charge) tokens after the real cost is known"""
+        if self.enabled:
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    @property
+    def available(self) -> float:
+        if not self.enabled:
+            return float("inf")
+        self._refill(time.monotonic())
+        return self._tokens
+
+
+class ModelLimiter:
+    """Adaptive concurrency cap plus request/token buckets for one provider/model"""
+
+    def __init__(self, key: str, max_concurrent: int, requests_per_minute: int, tokens_per_minute: int):
+        self.key = key
+        self.max_concurrent = max(1, int(max_concurrent))
+        self._limit = float(self.max_concurrent)
+        self._in_flight = 0
+        self._condition = asyncio.Condition()
+        self._admission = asyncio.Lock()
+        self._requests = _TokenBucket(requests_per_minute)
+        self._tokens = _TokenBucket(tokens_per_minute)
+        self._blocked_until = 0.0
+        self._latencies: deque = deque(maxlen=200)
+        self._stats = {
+            "requests": 0,
+            "throttled": 0,
+            "wait_seconds": 0.0,
+            "rate_limited": 0,
+            "retries": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+        }
+
+    # ---- admission ----
+
+    async def _acquire_concurrency(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < int(self._limit))
+            self._in_flight += 1
+
+    async def _release_concurrency(self):
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    async def _take_budget(self, estimated_tokens: float) -> float:
+        waited = 0.0
+        async with self._admission:
+            while True:
+                now = time.monotonic()
+                delay = max(
+                    self._blocked_until - now,
+                    self._requests.wait_time(1, now),
+                    self._tokens.wait_time(estimated_tokens, now),
+                )
+                if delay <= 0:
+                    self._requests.take(1)
+                    self._tokens.take(estimated_tokens)
+                    return waited
+                waited += delay
+                await asyncio.sleep(delay)
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: float):
+        """Hold one in-flight slot after paying for the request and its estimated tokens"""
+        await self._acquire_concurrency()
+        try:
+            waited = await self._take_budget(estimated_tokens)
+            self._stats["requests"] += 1
+            if waited > 0:
+                self._stats["throttled"] += 1
+                self._stats["wait_seconds"] += waited
+            yield
+        finally:
+            await self._release_concurrency()
+
+    def has_spare_capacity(self) -> bool:
+        """Whether an extra (hedged) request would go out without waiting"""
+        return (
+            self._in_flight < int(self._limit)
+            and time.monotonic() >= self._blocked_until
+            and self._requests.available >= 1
+        )
+
+    # ---- feedback ----
+
+    def record_success(self, latency: float, estimated_tokens: float, actual_tokens: int,
+                       headers: Optional[Dict[str, str]] = None):
+        self._latencies.append(latency)
+        # Additive increase back towards the configured concurrency
+        self._limit = min(float(self.max_concurrent), self._limit + 1.0 / self._limit)
+        if self._requests.enabled and self._requests.rate_per_minute < self._requests.configured_rate:
+            self._requests.set_rate(min(
+                self._requests.configured_rate,
+                self._requests.rate_per_minute + self._requests.configured_rate * 0.05
+            ))
+        if actual_tokens > 0:
+            self._tokens.refund(estimated_tokens - actual_tokens)
+        if headers:
+            self.apply_headers(headers)
+
+    def record_failure(self, exc: BaseException, attempt: int) -> Optional[float]:
+        """Register a failed attempt; returns the delay before retrying, or None if not retryable"""
+        if not is_transient(exc):
+            return None
+
+        headers = _exception_headers(exc)
+        if headers:
+            self.apply_headers(headers)
+
+        backoff = min(30.0, 2.0 ** attempt) * random.uniform(0.5, 1.0)
+        if not is_rate_limited(exc):
+            return backoff
+
+        self._stats["rate_limited"] += 1
+        # Multiplicative decrease of the concurrency cap and request rate
+        self._limit = max(1.0, self._limit / 2.0)
+        if self._requests.enabled:
+            floor = self._requests.configured_rate * 0.1 if self._requests.configured_rate else 1.0
+            self._requests.set_rate(max(floor, self._requests.rate_per_minute / 2.0))
+
+        delay = _retry_after(headers)
+        if delay is None:
+            delay = backoff
+        # Every caller of this model waits, not only the one that got the 429
+        self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+        return delay
+
+    def apply_headers(self, headers: Dict[str, str]):
+        """Tighten the buckets to the limits reported by the API"""
+        limit_requests = _first_number(headers, "x-ratelimit-limit-requests", "anthropic-ratelimit-requests-limit")
+        if limit_requests:
+            self._adopt_limit(self._requests, limit_requests)
+
+        limit_tokens = _first_number(
+            headers, "x-ratelimit-limit-tokens", "anthropic-ratelimit-tokens-limit",
+            "anthropic-ratelimit-input-tokens-limit"
+        )
+        if limit_tokens:
+            self._adopt_limit(self._tokens, limit_tokens)
+
+        remaining = _first_number(
+            headers, "x-ratelimit-remaining-requests", "anthropic-ratelimit-requests-remaining"
+        )
+        if remaining is not None and remaining <= 0:
+            reset = parse_reset(
+                headers.get("x-ratelimit-reset-requests") or headers.get("anthropic-ratelimit-requests-reset")
+            )
+            if reset:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + reset)
+
+    @staticmethod
+    def _adopt_limit(bucket: _TokenBucket, reported: float):
+        # Never plan for more than the API allows, even if configured higher (or unlimited)
+        if bucket.configured_rate and bucket.configured_rate <= reported:
+            return
+        bucket.configured_rate = reported
+        if not bucket.enabled or bucket.rate_per_minute > reported:
+            bucket.set_rate(reported)
+
+    def hedge_delay(self, fixed_ms: int) -> Optional[float]:
+        if fixed_ms > 0:
+            return fixed_ms / 1000.0
+        if len(self._latencies) < MIN_HEDGE_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def record_hedge(self, won: bool):
+        self._stats["hedges"] += 1
+        if won:
+            self._stats["hedge_wins"] += 1
+
+    def record_retry(self):
+        self._stats["retries"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency_limit": int(self._limit),
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self._in_flight,
+            "requests_per_minute": self._requests.rate_per_minute,
+            "tokens_per_minute": self._tokens.rate_per_minute,
+            "blocked_for_seconds": max(0.0, self._blocked_until - time.monotonic()),
+            **self._stats,
+        }
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive transient failures -> half-open probe after a cooldown"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_seconds = float(reset_seconds)
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN and not self._probing:
+            # Let exactly one request through to probe the provider
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"AI circuit opened after {self._failures} consecutive failures")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release_probe(self):
+        """Probe ended without a verdict (e.g. a non-transient error or cancellation)"""
+        self._probing = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self._failures}
+
+
+class AIRequestLimiter:
+    """Registry of per provider/model limiters and circuit breakers"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.max_concurrent = int(config.get("max_concurrent", 8))
+        self.requests_per_minute = int(config.get("requests_per_minute", 0))
+        self.tokens_per_minute = int(config.get("tokens_per_minute", 0))
+        self.overrides = parse_limit_overrides(config.get("overrides"))
+        self.max_retries = max(0, int(config.get("max_retries", 3)))
+        self.failure_threshold = int(config.get("failure_threshold", 5))
+        self.reset_seconds = float(config.get("reset_seconds", 30))
+        self.fallback_provider = config.get("fallback_provider") or None
+        self.fallback_model = config.get("fallback_model") or None
+        self.hedge_enabled = bool(config.get("hedge_enabled", False))
+        self.hedge_delay_ms = int(config.get("hedge_delay_ms", 0))
+
+        self._limiters: Dict[str, ModelLimiter] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    @staticmethod
+    def _key(provider_name: str, model: Optional[str]) -> str:
+        return f"{provider_name}:{model or 'default'}"
+
+    def limiter(self, provider_name: str, model: Optional[str]) -> ModelLimiter:
+        key = self._key(provider_name, model)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            rpm, tpm = self.overrides.get(key) or self.overrides.get(provider_name) or (
+                self.requests_per_minute, self.tokens_per_minute
+            )
+            limiter = ModelLimiter(key, self.max_concurrent, rpm, tpm)
+            self._limiters[key] = limiter
+        return limiter
+
+    def breaker(self, provider_name: str, model: Optional[str]) -> CircuitBreaker:
+        key = self._key(provider_name, model)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(self.failure_threshold, self.reset_seconds)
+            self._breakers[key] = breaker
+        return breaker
+
+    def get_stats(self) -> Dict[str, Any]:
+        keys = sorted(set(self._limiters) | set(self._breakers))
+        return {
+            key: {
+                **(self._limiters[key].get_stats() if key in self._limiters else {}),
+                "circuit": self._breakers[key].get_stats() if key in self._breakers else None,
+            }
+            for key in keys
+        }
+
+
+# (provider, kwargs) -> awaitable response; lets one code path serve chat and text completion
+_Operation = Callable[[AIProvider, Dict[str, Any]], Awaitable[AIResponse]]
+_StreamOperation = Callable[[AIProvider, Dict[str, Any]], AsyncGenerator[str, None]]
+
+
+class ResilientAIProvider(AIProvider):
+    """Wraps a provider with rate limiting, retries, circuit breaking and hedging
+
+    ``fallback_resolver`` maps a provider name to its (wrapped) provider and is
+    used when the circuit for the requested model is open. Any other attribute
+    is delegated to the wrapped provider.
+
+    Retries are owned by this wrapper, so the built-in retries of SDK clients
+    (``max_retries`` of the OpenAI/Anthropic clients) are turned off: they would
+    multiply the attempts and hide 429s from the limiter.
+    """
+
+    def __init__(self, provider: AIProvider, provider_name: str, limiter: AIRequestLimiter,
+                 fallback_resolver: Optional[Callable[[str], "ResilientAIProvider"]] = None):
+        super().__init__(provider.config)
+        client = getattr(provider, "client", None)
+        if client is not None and hasattr(client, "with_options"):
+            provider.client = client.with_options(max_retries=0)
+        self.model = provider.model
+        self.provider = provider
+        self.provider_name = provider_name
+        self.limiter = limiter
+        self.fallback_resolver = fallback_resolver
+
+    def __getattr__(self, name: str):
+        return getattr(self.provider, name)
+
+    def _estimate_tokens(self, prompt_text: str, kwargs: Dict[str, Any]) -> int:
+        completion = kwargs.get("max_tokens") or self.config.get("max_tokens") or DEFAULT_COMPLETION_TOKENS
+        return len(prompt_text) // CHARS_PER_TOKEN + min(int(completion), DEFAULT_COMPLETION_TOKENS)
+
+    def _fallback_target(self, model: Optional[str]) -> Optional[Tuple["ResilientAIProvider", Optional[str]]]:
+        provider_name = self.limiter.fallback_provider or self.provider_name
+        fallback_model = self.limiter.fallback_model
+        if provider_name == self.provider_name:
+            if not fallback_model or fallback_model == model:
+                return None
+            return self, fallback_model
+        if self.fallback_resolver is None:
+            return None
+        return self.fallback_resolver(provider_name), fallback_model
+
+    # ---- non-streaming ----
+
+    async def _attempt(self, limiter: ModelLimiter, operation: _Operation, kwargs: Dict[str, Any],
+                       estimated_tokens: int) -> AIResponse:
+        attempt = 0
+        while True:
+            delay = None
+            async with limiter.slot(estimated_tokens):
+                started = time.monotonic()
+                try:
+                    response = await operation(self.provider, kwargs)
+                except Exception as e:
+                    delay = limiter.record_failure(e, attempt)
+                    if delay is None or attempt >= self.limiter.max_retries:
+                        raise
+                    logger.warning(
+                        f"AI request to {limiter.key} failed ({e}); retrying in {delay:.1f}s "
+                        f"(attempt {attempt + 1}/{self.limiter.max_retries})"
+                    )
+                else:
+                    metadata = response.metadata or {}
+                    limiter.record_success(
+                        time.monotonic() - started, estimated_tokens,
+                        (response.usage or {}).get("total_tokens", 0),
+                        metadata.get("rate_limit_headers")
+                    )
+                    return response
+            attempt += 1
+            limiter.record_retry()
+            await asyncio.sleep(delay)
+
+    async def _hedged(self, limiter: ModelLimiter, operation: _Operation, kwargs: Dict[str, Any],
+                      estimated_tokens: int) -> AIResponse:
+        hedge_after = limiter.hedge_delay(self.limiter.hedge_delay_ms) if self.limiter.hedge_enabled else None
+        if hedge_after is None:
+            return await self._attempt(limiter, operation, kwargs, estimated_tokens)
+
+        primary = asyncio.ensure_future(self._attempt(limiter, operation, kwargs, estimated_tokens))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=hedge_after)
+            if done or not limiter.has_spare_capacity():
+                return await primary
+
+            hedge = asyncio.ensure_future(self._attempt(limiter, operation, kwargs, estimated_tokens))
+            pending.add(hedge)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        limiter.record_hedge(won=task is hedge)
+                        return task.result()
+                    error = task.exception()
+            limiter.record_hedge(won=False)
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _complete(self, operation: _Operation, prompt_text: str, kwargs: Dict[str, Any]) -> AIResponse:
+        allow_fallback = kwargs.pop("_fallback", True)
+        model = kwargs.get("model") or self.model
+        breaker = self.limiter.breaker(self.provider_name, model)
+
+        if not breaker.allow():
+            target = self._fallback_target(model) if allow_fallback else None
+            if target is None:
+                raise CircuitOpenError(f"AI provider {self.provider_name}:{model} is temporarily unavailable")
+            return await self._run_fallback(target, operation, prompt_text, kwargs, model)
+
+        limiter = self.limiter.limiter(self.provider_name, model)
+        try:
+            response = await self._hedged(limiter, operation, kwargs, self._estimate_tokens(prompt_text, kwargs))
+        except Exception as e:
+            if not is_transient(e):
+                breaker.release_probe()
+                raise
+            breaker.record_failure()
+            target = self._fallback_target(model) if allow_fallback else None
+            if target is None:
+                raise
+            logger.warning(f"AI request to {self.provider_name}:{model} failed ({e}), using fallback model")
+            return await self._run_fallback(target, operation, prompt_text, kwargs, model)
+        except BaseException:
+            breaker.release_probe()
+            raise
+
+        breaker.record_success()
+        return response
+
+    async def _run_fallback(self, target: Tuple["ResilientAIProvider", Optional[str]], operation: _Operation,
+                            prompt_text: str, kwargs: Dict[str, Any], original_model: str) -> AIResponse:
+        provider, fallback_model = target
+        fallback_kwargs = {**kwargs, "_fallback": False}
+        fallback_kwargs.pop("model", None)
+        if fallback_model:
+            fallback_kwargs["model"] = fallback_model
+        response = await provider._complete(operation, prompt_text, fallback_kwargs)
+        response.metadata = {**(response.metadata or {}), "fallback_from": f"{self.provider_name}:{original_model}"}
+        return response
+
+    async def chat_completion(self, messages: List[AIMessage], **kwargs) -> AIResponse:
+        return await self._complete(
+            lambda provider, kw: provider.chat_completion(messages, **kw), _messages_text(messages), kwargs
+        )
+
+    async def text_completion(self, prompt: str, **kwargs) -> AIResponse:
+        return await self._complete(lambda provider, kw: provider.text_completion(prompt, **kw), prompt, kwargs)
+
+    # ---- streaming ----
+
+    async def _stream(self, operation: _StreamOperation, prompt_text: str,
+                      kwargs: Dict[str, Any]) -> AsyncGenerator[str, None]:
+        """Stream through the limiter; retries and fallback only happen before the first chunk"""
+        allow_fallback = kwargs.pop("_fallback", True)
+        model = kwargs.get("model") or self.model
+        breaker = self.limiter.breaker(self.provider_name, model)
+
+        if not breaker.allow():
+            target = self._fallback_target(model) if allow_fallback else None
+            if target is None:
+                raise CircuitOpenError(f"AI provider {self.provider_name}:{model} is temporarily unavailable")
+            async for chunk in self._stream_fallback(target, operation, prompt_text, kwargs):
+                yield chunk
+            return
+
+        limiter = self.limiter.limiter(self.provider_name, model)
+        estimated_tokens = self._estimate_tokens(prompt_text, kwargs)
+        attempt = 0
+        while True:
+            delay = None
+            started_output = False
+            streamed_chars = 0
+            try:
+                async with limiter.slot(estimated_tokens):
+                    started = time.monotonic()
+                    try:
+                        async for chunk in operation(self.provider, kwargs):
+                            started_output = True
+                            streamed_chars += len(chunk)
+                            yield chunk
+                    except Exception as e:
+                        if started_output:
+                            raise
+                        delay = limiter.record_failure(e, attempt)
+                        if delay is None or attempt >= self.limiter.max_retries:
+                            raise
+                        logger.warning(
+                            f"AI stream to {limiter.key} failed ({e}); retrying in {delay:.1f}s "
+                            f"(attempt {attempt + 1}/{self.limiter.max_retries})"
+                        )
+                    else:
+                        actual_tokens = (len(prompt_text) + streamed_chars) // CHARS_PER_TOKEN
+                        limiter.record_success(time.monotonic() - started, estimated_tokens, actual_tokens)
+                        breaker.record_success()
+                        return
+            except Exception as e:
+                if not is_transient(e):
+                    breaker.release_probe()
+                    raise
+                breaker.record_failure()
+                if started_output:
+                    raise
+                # Resolved only on failure: the resolver may build a provider
+                target = self._fallback_target(model) if allow_fallback else None
+                if target is None:
+                    raise
+                logger.warning(f"AI stream to {self.provider_name}:{model} failed ({e}), using fallback model")
+                async for chunk in self._stream_fallback(target, operation, prompt_text, kwargs):
+                    yield chunk
+                return
+            except BaseException:
+                breaker.release_probe()
+                raise
+
+            attempt += 1
+            limiter.record_retry()
+            await asyncio.sleep(delay)
+
+    async def _stream_fallback(self, target: Tuple["ResilientAIProvider", Optional[str]],
+                               operation: _StreamOperation, prompt_text: str,
+                               kwargs: Dict[str, Any]) -> AsyncGenerator[str, None]:
+        provider, fallback_model = target
+        fallback_kwargs = {**kwargs, "_fallback": False}
+        fallback_kwargs.pop("model", None)
+        if fallback_model:
+            fallback_kwargs["model"] = fallback_model
+        async for chunk in provider._stream(operation, prompt_text, fallback_kwargs):
+            yield chunk
+
+    async def stream_chat_completion(self, messages: List[AIMessage], **kwargs) -> AsyncGenerator[str, None]:
+        async for chunk in self._stream(
+            lambda provider, kw: provider.stream_chat_completion(messages, **kw), _messages_text(messages), kwargs
+        ):
+            yield chunk
+
+    async def stream_text_completion(self, prompt: str, **kwargs) -> AsyncGenerator[str, None]:
+        async for chunk in self._stream(
+            lambda provider, kw: provider.stream_text_completion(prompt, **kw), prompt, kwargs
+        ):
+            yield chunk
+
+    def get_model_info(self) -> Dict[str, Any]:
+        return self.provider.get_model_info()
@@ -0,0 +1,414 @@
+"""
+Content-addressed LLM response cache
+
+Responses are keyed by a canonical hash of the provider, endpoint, model,
+messages and sampling parameters, stored in SQLite with a TTL and a total size
+cap (least recently used entries are evicted first). Concurrent identical
+non-streaming calls share one upstream request, and streamed responses are
+stored chunk by chunk so they can be replayed. Only complete answers are stored:
+truncated (``length``/``MAX_TOKENS``), blocked, placeholder and empty responses
+are passed through but never cached.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional
+
+from .base import AIMessage, AIProvider, AIResponse, MessageRole, stream_finish_reason
+
+logger = logging.getLogger(__name__)
+
+# Sampling parameters that are part of the key even when the caller relies on
+# the provider defaults
+SAMPLING_DEFAULT_KEYS = ("temperature", "top_p", "max_tokens")
+
+# Finish reasons of a complete answer (OpenAI/Ollama, Anthropic, Gemini), compared lower-case
+NORMAL_FINISH_REASONS = {"stop", "end_turn", "stop_sequence"}
+
+
+def is_cacheable(response: AIResponse) -> bool:
+    """Whether a response is a complete answer worth serving to later callers"""
+    if not response.content or not response.content.strip():
+        return False
+    if (response.metadata or {}).get("placeholder"):
+        return False
+    return str(response.finish_reason or "").lower() in NORMAL_FINISH_REASONS
+
+
+def _message_to_dict(message: AIMessage) -> Dict[str, Any]:
+    if isinstance(message.content, str):
+        content: Any = message.content
+    else:
+        content = [part.model_dump(mode="json") for part in message.content]
+    return {"role": message.role.value, "content": content, "name": message.name}
+
+
+class LLMResponseCache:
+    """SQLite-backed response cache with TTL, size cap and single-flight"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.enabled = config.get("enabled", False)
+        self.ttl_seconds = float(config.get("ttl_seconds", 86400))
+        self.max_bytes = int(float(config.get("max_mb", 256)) * 1024 * 1024)
+        self.path = config.get("path") or "temp/llm_response_cache.db"
+
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._total_bytes = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "stream_replays": 0,
+            "stores": 0,
+            "not_stored": 0,
+            "evictions": 0,
+            "expired": 0,
+            "tokens_saved": 0,
+        }
+
+        if self.enabled:
+            self._init_db()
+
+    def _init_db(self):
+        try:
+            db_path = Path(self.path)
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_response_cache ("
+                " cache_key TEXT PRIMARY KEY,"
+                " provider TEXT NOT NULL,"
+                " model TEXT,"
+                " response TEXT NOT NULL,"
+                " chunks TEXT,"
+                " size_bytes INTEGER NOT NULL,"
+                " total_tokens INTEGER NOT NULL DEFAULT 0,"
+                " hits INTEGER NOT NULL DEFAULT 0,"
+                " created_at REAL NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_llm_response_cache_access"
+                " ON llm_response_cache (last_access)"
+            )
+            self._db.execute("DELETE FROM llm_response_cache WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+            self._total_bytes = self._db.execute(
+                "SELECT COALESCE(SUM(size_bytes), 0) FROM llm_response_cache"
+            ).fetchone()[0]
+            logger.info(f"LLM response cache enabled: {db_path}")
+        except Exception as e:
+            logger.warning(f"Failed to initialize LLM response cache, caching disabled: {e}")
+            self._db = None
+            self.enabled = False
+
+    # ---- keys ----
+
+    @staticmethod
+    def build_key(provider_name: str, provider: AIProvider, messages: List[AIMessage],
+                  kwargs: Dict[str, Any]) -> str:
+        """Canonical hash of everything that can change the response"""
+        params = {key: provider.config.get(key) for key in SAMPLING_DEFAULT_KEYS}
+        params.update(kwargs)
+        model = params.pop("model", None) or provider.model
+        canonical = {
+            "provider": provider_name,
+            "base_url": provider.config.get("base_url"),
+            "model": model,
+            "messages": [_message_to_dict(message) for message in messages],
+            "params": params,
+        }
+        raw = json.dumps(canonical, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # ---- storage ----
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response, chunks, expires_at, size_bytes FROM llm_response_cache WHERE cache_key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            response, chunks, expires_at, size_bytes = row
+            if expires_at <= now:
+                self._db.execute("DELETE FROM llm_response_cache WHERE cache_key = ?", (key,))
+                self._db.commit()
+                self._total_bytes -= size_bytes
+                self._stats["expired"] += 1
+                return None
+
+            self._db.execute(
+                "UPDATE llm_response_cache SET hits = hits + 1, last_access = ? WHERE cache_key = ?",
+                (now, key)
+            )
+            self._db.commit()
+        return {"response": json.loads(response), "chunks": json.loads(chunks) if chunks else None}
+
+    def _write(self, key: str, provider_name: str, response: AIResponse, chunks: Optional[List[str]]):
+        now = time.time()
+        raw_response = response.model_dump_json()
+        raw_chunks = json.dumps(chunks, ensure_ascii=False) if chunks is not None else None
+        size = len(raw_response.encode("utf-8")) + (len(raw_chunks.encode("utf-8")) if raw_chunks else 0)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._db.execute(
+                "SELECT size_bytes FROM llm_response_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_response_cache (cache_key, provider, model, response, chunks,"
+                " size_bytes, total_tokens, hits, created_at, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)",
+                (key, provider_name, response.model, raw_response, raw_chunks, size,
+                 int(response.usage.get("total_tokens", 0) or 0), now, now + self.ttl_seconds, now)
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            self._stats["stores"] += 1
+            if self._total_bytes > self.max_bytes:
+                self._evict_locked()
+            self._db.commit()
+
+    def _evict_locked(self):
+        """Drop least recently used entries until 90% of the size cap"""
+        target = int(self.max_bytes * 0.9)
+        self._db.execute("DELETE FROM llm_response_cache WHERE expires_at <= ?", (time.time(),))
+        rows = self._db.execute(
+            "SELECT cache_key, size_bytes FROM llm_response_cache ORDER BY last_access"
+        ).fetchall()
+        total = sum(size for _, size in rows)
+        evicted = []
+        for cache_key, size in rows:
+            if total <= target:
+                break
+            evicted.append((cache_key,))
+            total -= size
+        self._db.executemany("DELETE FROM llm_response_cache WHERE cache_key = ?", evicted)
+        self._total_bytes = total
+        self._stats["evictions"] += len(evicted)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self._db is None:
+            return None
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, self._read, key)
+        except Exception as e:
+            logger.warning(f"Failed to read LLM response cache: {e}")
+            return None
+
+    async def put(self, key: str, provider_name: str, response: AIResponse, chunks: Optional[List[str]] = None):
+        if self._db is None:
+            return
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._write, key, provider_name, response, chunks
+            )
+        except Exception as e:
+            logger.warning(f"Failed to store LLM response: {e}")
+
+    # ---- cached calls ----
+
+    def _hit_response(self, key: str, payload: Dict[str, Any]) -> AIResponse:
+        response = AIResponse(**payload["response"])
+        tokens = int(response.usage.get("total_tokens", 0) or 0)
+        self._stats["hits"] += 1
+        self._stats["tokens_saved"] += tokens
+        response.metadata = {**response.metadata, "cache_hit": True, "cache_key": key}
+        return response
+
+    async def get_or_compute(self, key: str, provider_name: str,
+                             compute: Callable[[], Awaitable[AIResponse]]) -> AIResponse:
+        """Return the cached response, or run ``compute`` once for all concurrent callers"""
+        cached = await self.get(key)
+        if cached is not None:
+            return self._hit_response(key, cached)
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._stats["coalesced"] += 1
+            try:
+                response = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The leading call was cancelled; run the request ourselves
+                return await self.get_or_compute(key, provider_name, compute)
+            return response.model_copy(update={"metadata": {**response.metadata, "coalesced": True}})
+
+        self._stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await compute()
+            if is_cacheable(response):
+                await self.put(key, provider_name, response)
+            else:
+                self._stats["not_stored"] += 1
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def stream(self, key: str, provider_name: str, model: str, prompt_text: str,
+                     provider: AIProvider,
+                     stream_factory: Callable[[], AsyncGenerator[str, None]],
+                     cache_info: Optional[Dict[str, Any]] = None) -> AsyncGenerator[str, None]:
+        """Replay a cached stream, or pass the upstream stream through and store it once complete
+
+        ``cache_info`` is filled with ``cache_hit`` (and the cached usage on a
+        replay) so callers can log replays as cache hits.
+        """
+        cached = await self.get(key)
+        if cached is not None:
+            response = self._hit_response(key, cached)
+            self._stats["stream_replays"] += 1
+            if cache_info is not None:
+                cache_info.update(cache_hit=True, cache_key=key, usage=response.usage)
+            for chunk in cached["chunks"] or [response.content]:
+                yield chunk
+            return
+
+        self._stats["misses"] += 1
+        if cache_info is not None:
+            cache_info["cache_hit"] = False
+        chunks: List[str] = []
+        stream_finish_reason.set(None)
+        async for chunk in stream_factory():
+            chunks.append(chunk)
+            yield chunk
+
+        # Only reached when the consumer read the whole stream
+        content = "".join(chunks)
+        response = AIResponse(
+            content=content,
+            model=model,
+            usage=provider._calculate_usage(prompt_text, content),
+            finish_reason=stream_finish_reason.get(),
+            metadata={"provider": provider_name, "streamed": True}
+        )
+        if is_cacheable(response):
+            await self.put(key, provider_name, response, chunks)
+        else:
+            self._stats["not_stored"] += 1
+
+    def clear(self) -> int:
+        if self._db is None:
+            return 0
+        with self._lock:
+            cleared = self._db.execute("DELETE FROM llm_response_cache").rowcount
+            self._db.commit()
+            self._total_bytes = 0
+        return cleared
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = (stats["hits"] + stats["coalesced"]) / lookups if lookups else 0.0
+        stats["enabled"] = self.enabled
+        stats["size_bytes"] = self._total_bytes
+        stats["max_bytes"] = self.max_bytes
+        stats["inflight"] = len(self._inflight)
+        if self._db is not None:
+            with self._lock:
+                stats["entries"] = self._db.execute("SELECT COUNT(*) FROM llm_response_cache").fetchone()[0]
+        return stats
+
+
+class CachedAIProvider(AIProvider):
+    """Wraps a provider and serves identical requests from the response cache
+
+    Pass ``_cache=False`` to a call to bypass the cache for that request. Streaming
+    calls accept ``_cache_info``, a dict that is filled with ``cache_hit``.
+    Any other attribute is delegated to the wrapped provider.
+    """
+
+    def __init__(self, provider: AIProvider, provider_name: str, cache: LLMResponseCache):
+        super().__init__(provider.config)
+        self.model = provider.model
+        self.provider = provider
+        self.provider_name = provider_name
+        self.cache = cache
+
+    def __getattr__(self, name: str):
+        return getattr(self.provider, name)
+
+    @staticmethod
+    def _prompt_messages(prompt: str) -> List[AIMessage]:
+        # Providers implement text completion as a single user message, so both
+        # entry points share cache entries
+        return [AIMessage(role=MessageRole.USER, content=prompt)]
+
+    def _key(self, messages: List[AIMessage], kwargs: Dict[str, Any]) -> str:
+        return self.cache.build_key(self.provider_name, self.provider, messages, kwargs)
+
+    async def chat_completion(self, messages: List[AIMessage], **kwargs) -> AIResponse:
+        if not kwargs.pop("_cache", True):
+            return await self.provider.chat_completion(messages, **kwargs)
+        key = self._key(messages, kwargs)
+        return await self.cache.get_or_compute(
+            key, self.provider_name, lambda: self.provider.chat_completion(messages, **kwargs)
+        )
+
+    async def text_completion(self, prompt: str, **kwargs) -> AIResponse:
+        if not kwargs.pop("_cache", True):
+            return await self.provider.text_completion(prompt, **kwargs)
+        key = self._key(self._prompt_messages(prompt), kwargs)
+        return await self.cache.get_or_compute(
+            key, self.provider_name, lambda: self.provider.text_completion(prompt, **kwargs)
+        )
+
+    async def stream_chat_completion(self, messages: List[AIMessage], **kwargs) -> AsyncGenerator[str, None]:
+        cache_info = kwargs.pop("_cache_info", None)
+        if not kwargs.pop("_cache", True):
+            async for chunk in self.provider.stream_chat_completion(messages, **kwargs):
+                yield chunk
+            return
+
+        key = self._key(messages, kwargs)
+        prompt_text = " ".join(m.content if isinstance(m.content, str) else str(m.content) for m in messages)
+        async for chunk in self.cache.stream(
+            key, self.provider_name, kwargs.get("model") or self.model, prompt_text, self.provider,
+            lambda: self.provider.stream_chat_completion(messages, **kwargs), cache_info
+        ):
+            yield chunk
+
+    async def stream_text_completion(self, prompt: str, **kwargs) -> AsyncGenerator[str, None]:
+        cache_info = kwargs.pop("_cache_info", None)
+        if not kwargs.pop("_cache", True):
+            async for chunk in self.provider.stream_text_completion(prompt, **kwargs):
+                yield chunk
+            return
+
+        key = self._key(self._prompt_messages(prompt), kwargs)
+        async for chunk in self.cache.stream(
+            key, self.provider_name, kwargs.get("model") or self.model, prompt, self.provider,
+            lambda: self.provider.stream_text_completion(prompt, **kwargs), cache_info
+        ):
+            yield chunk
+
+    def get_model_info(self) -> Dict[str, Any]:
+        return self.provider.get_model_info()
@@ -4,8 +4,8 @@ Global Master Template API endpoints
 
 import logging
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Depends, Query
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import JSONResponse, FileResponse, RedirectResponse, Response
 
 from .models import (
     GlobalMasterTemplateCreate, GlobalMasterTemplateUpdate, GlobalMasterTemplateResponse,
@@ -13,6 +13,7 @@ from .models import (
     TemplateSelectionRequest, TemplateSelectionResponse
 )
 from ..services.global_master_template_service import GlobalMasterTemplateService
+from ..services.template_preview_service import PREVIEW_URL_PREFIX, get_template_preview_service
 
 logger = logging.getLogger(__name__)
 
@@ -137,6 +138,66 @@ async def get_default_template():
         raise HTTPException(status_code=500, detail="Failed to get default template")
 
 
+@router.get("/previews/{file_name}")
+async def get_preview_thumbnail(file_name: str, request: Request):
+    """Serve a rendered preview thumbnail; URLs are content-addressed, so they never change
+
+    A thumbnail that is not on disk (an older width, or a wiped cache) is rendered
+    at the current width and the request is redirected to its new URL.
+    """
+    preview_service = get_template_preview_service()
+    parsed = preview_service.parse_file_name(file_name)
+    if parsed is None:
+        raise HTTPException(status_code=404, detail="Preview not found")
+    key, width = parsed
+
+    headers = {"Cache-Control": "public, max-age=31536000, immutable", "ETag": f'"{file_name[:-len(".webp")]}"'}
+    path = preview_service.get_cached_path(key, width) if width else None
+    if path is not None:
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+        return FileResponse(path, media_type="image/webp", headers=headers)
+
+    try:
+        url = await template_service.render_missing_preview(file_name)
+    except Exception as e:
+        logger.error(f"Failed to re-render preview {file_name}: {e}")
+        raise HTTPException(status_code=503, detail="Template preview is not available")
+    if url is None:
+        raise HTTPException(status_code=404, detail="Preview not found")
+    if url == f"{PREVIEW_URL_PREFIX}/{file_name}":
+        return FileResponse(preview_service.thumbnail_path(key), media_type="image/webp", headers=headers)
+    return RedirectResponse(url)
+
+
+@router.post("/previews/rebuild", response_model=dict)
+async def rebuild_template_previews():
+    """Queue preview renders for all templates without a cached thumbnail"""
+    try:
+        scheduled = await template_service.rebuild_previews()
+        return {"success": True, "scheduled": scheduled}
+    except Exception as e:
+        logger.error(f"Failed to rebuild template previews: {e}")
+        raise HTTPException(status_code=500, detail="Failed to rebuild template previews")
+
+
+@router.get("/{template_id}/thumbnail")
+async def get_template_thumbnail(template_id: int):
+    """Render a template's thumbnail on demand and redirect to its immutable URL"""
+    template = await template_service.get_template_by_id(template_id)
+    if not template:
+        raise HTTPException(status_code=404, detail="Template not found")
+
+    preview_service = get_template_preview_service()
+    try:
+        await preview_service.render(template['html_template'])
+    except Exception as e:
+        logger.error(f"Failed to render preview for template {template_id}: {e}")
+        raise HTTPException(status_code=503, detail="Template preview is not available")
+
+    return RedirectResponse(preview_service.preview_url(preview_service.preview_key(template['html_template'])))
+
+
 @router.get("/{template_id}", response_model=GlobalMasterTemplateDetailResponse)
 async def get_template_by_id(template_id: int):
     """Get a global master template by ID"""
@@ -521,10 +521,10 @@ async def unlock_slide(project_id: str, slide_index: int):
         raise HTTPException(status_code=500, detail=f"Error unlocking slide: {str(e)}")
 
 @router.get("/projects/{project_id}/versions")
-async def get_project_versions(project_id: str):
-    """Get all versions of a project"""
+async def get_project_versions(project_id: str, limit: Optional[int] = None, offset: int = 0):
+    """Get versions of a project, newest first (one page at a time)"""
     try:
-        versions = await ppt_service.project_manager.get_project_versions(project_id)
+        versions = await ppt_service.project_manager.get_project_versions(project_id, limit=limit, offset=offset)
         return {"versions": versions, "status": "success"}
 
     except Exception as e:
@@ -32,6 +32,8 @@ class AIUsageLogRequest(BaseModel):
     success: bool = True
     error_message: Optional[str] = None
     duration_ms: Optional[int] = None
+    cache_hit: bool = False
+    tokens_saved: int = 0
 
 
 @router.post("/api/usage/log")
@@ -53,6 +55,8 @@ async def log_ai_usage(
             success=req.success,
             error_message=req.error_message,
             duration_ms=req.duration_ms,
+            cache_hit=req.cache_hit,
+            tokens_saved=req.tokens_saved,
             created_at=time.time()
         )
         db.add(log_entry)
@@ -86,6 +90,11 @@ async def get_usage_stats(
                 (AIUsageLog.success == False, 1),
                 else_=0
             )).label("failure_count"),
+            func.sum(case(
+                (AIUsageLog.cache_hit == True, 1),
+                else_=0
+            )).label("cache_hits"),
+            func.sum(AIUsageLog.tokens_saved).label("tokens_saved"),
         )
 
         filters = [AIUsageLog.user_id == user.id]
@@ -106,6 +115,9 @@ async def get_usage_stats(
                 "total_tokens": result.total_tokens or 0,
                 "success_count": result.success_count or 0,
                 "failure_count": result.failure_count or 0,
+                "cache_hits": result.cache_hits or 0,
+                "cache_hit_rate": (result.cache_hits or 0) / result.total_calls if result.total_calls else 0.0,
+                "tokens_saved": result.tokens_saved or 0,
             }
         }
     except Exception as e:
@@ -154,6 +166,8 @@ async def get_usage_details(
                     "success": log.success,
                     "error_message": log.error_message,
                     "duration_ms": log.duration_ms,
+                    "cache_hit": log.cache_hit,
+                    "tokens_saved": log.tokens_saved,
                     "created_at": log.created_at,
                 }
                 for log in logs
@@ -246,3 +260,25 @@ async def get_usage_by_action(
     except Exception as e:
         logger.error(f"Failed to get usage by action: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/api/usage/llm-cache")
+async def get_llm_cache_stats(user: User = Depends(get_current_user_required)):
+    """Get in-process LLM response cache statistics (hit rate, tokens saved, size)"""
+    try:
+        from ..ai import get_llm_response_cache
+        return {"success": True, "cache": get_llm_response_cache().get_stats()}
+    except Exception as e:
+        logger.error(f"Failed to get LLM cache stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/api/usage/ai-limits")
+async def get_ai_limit_stats(user: User = Depends(get_current_user_required)):
+    """Get per provider/model rate limiter and circuit breaker state"""
+    try:
+        from ..ai import get_ai_request_limiter
+        return {"success": True, "limits": get_ai_request_limiter().get_stats()}
+    except Exception as e:
+        logger.error(f"Failed to get AI limiter stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
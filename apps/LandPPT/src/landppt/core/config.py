@@ -92,6 +92,16 @@ class AIConfig(BaseSettings):
     research_enable_content_extraction: bool = Field(default=True, env="RESEARCH_ENABLE_CONTENT_EXTRACTION")
     research_max_content_length: int = Field(default=5000, env="RESEARCH_MAX_CONTENT_LENGTH")
     research_extraction_timeout: int = Field(default=30, env="RESEARCH_EXTRACTION_TIMEOUT")
+    research_max_concurrent_steps: int = Field(default=3, env="RESEARCH_MAX_CONCURRENT_STEPS")
+    research_search_concurrency: int = Field(default=2, env="RESEARCH_SEARCH_CONCURRENCY")  # per search provider
+    research_search_requests_per_minute: int = Field(default=30, env="RESEARCH_SEARCH_REQUESTS_PER_MINUTE")
+    research_llm_concurrency: int = Field(default=3, env="RESEARCH_LLM_CONCURRENCY")
+    research_llm_requests_per_minute: int = Field(default=60, env="RESEARCH_LLM_REQUESTS_PER_MINUTE")
+    research_max_response_mb: float = Field(default=5.0, env="RESEARCH_MAX_RESPONSE_MB")  # body download cap per page
+    research_connections_per_host: int = Field(default=4, env="RESEARCH_CONNECTIONS_PER_HOST")
+    research_page_cache_enabled: bool = Field(default=True, env="RESEARCH_PAGE_CACHE_ENABLED")
+    research_page_cache_path: str = Field(default="temp/research_page_cache.db", env="RESEARCH_PAGE_CACHE_PATH")
+    research_page_cache_ttl: int = Field(default=3600, env="RESEARCH_PAGE_CACHE_TTL")  # seconds before revalidating
 
     # MinerU API Configuration (for high-quality PDF parsing)
     mineru_api_key: Optional[str] = Field(default=None, env="MINERU_API_KEY")
@@ -131,6 +141,10 @@ class AIConfig(BaseSettings):
     # Parallel Generation Configuration
     enable_parallel_generation: bool = Field(default=False, env="ENABLE_PARALLEL_GENERATION")
     parallel_slides_count: int = Field(default=3, env="PARALLEL_SLIDES_COUNT")
+
+    # Speech Script Generation: concurrent slides, and slides packed into one call (0/1 = one call per slide)
+    speech_script_concurrency: int = Field(default=4, env="SPEECH_SCRIPT_CONCURRENCY")
+    speech_script_batch_size: int = Field(default=0, env="SPEECH_SCRIPT_BATCH_SIZE")
     
     # Feature Flags
     enable_network_mode: bool = Field(default=True, env="ENABLE_NETWORK_MODE")
@@ -138,6 +152,28 @@ class AIConfig(BaseSettings):
     enable_streaming: bool = Field(default=True, env="ENABLE_STREAMING")
     enable_auto_layout_repair: bool = Field(default=False, env="ENABLE_AUTO_LAYOUT_REPAIR")
     
+    # Files at least this large (MB) are converted and outlined as a stream of chunks; 0 disables streaming
+    outline_streaming_min_mb: int = Field(default=8, env="OUTLINE_STREAMING_MIN_MB")
+
+    # LLM Response Cache (opt-in): identical requests are served from a local SQLite cache
+    llm_cache_enabled: bool = Field(default=False, env="LLM_CACHE_ENABLED")
+    llm_cache_ttl_seconds: int = Field(default=86400, env="LLM_CACHE_TTL_SECONDS")
+    llm_cache_max_mb: int = Field(default=256, env="LLM_CACHE_MAX_MB")
+    llm_cache_path: str = Field(default="temp/llm_response_cache.db", env="LLM_CACHE_PATH")
+
+    # AI request limiting per provider/model (0 = no fixed limit; limits reported by the API still apply)
+    ai_max_concurrent_requests: int = Field(default=8, env="AI_MAX_CONCURRENT_REQUESTS")
+    ai_requests_per_minute: int = Field(default=0, env="AI_REQUESTS_PER_MINUTE")
+    ai_tokens_per_minute: int = Field(default=0, env="AI_TOKENS_PER_MINUTE")
+    ai_rate_limit_overrides: Optional[str] = Field(default=None, env="AI_RATE_LIMIT_OVERRIDES")  # provider[:model]=rpm/tpm,...
+    ai_max_retries: int = Field(default=3, env="AI_MAX_RETRIES")
+    ai_circuit_failure_threshold: int = Field(default=5, env="AI_CIRCUIT_FAILURE_THRESHOLD")
+    ai_circuit_reset_seconds: int = Field(default=30, env="AI_CIRCUIT_RESET_SECONDS")
+    ai_fallback_provider: Optional[str] = Field(default=None, env="AI_FALLBACK_PROVIDER")
+    ai_fallback_model: Optional[str] = Field(default=None, env="AI_FALLBACK_MODEL")
+    ai_hedge_enabled: bool = Field(default=False, env="AI_HEDGE_ENABLED")
+    ai_hedge_delay_ms: int = Field(default=0, env="AI_HEDGE_DELAY_MS")  # 0 = observed p95 latency
+
     # Logging
     log_level: str = Field(default="INFO", env="LOG_LEVEL")
     log_ai_requests: bool = Field(default=False, env="LOG_AI_REQUESTS")
@@ -484,8 +520,31 @@ def reload_ai_config():
     # Update parallel generation configuration
     ai_config.enable_parallel_generation = os.environ.get('ENABLE_PARALLEL_GENERATION', str(ai_config.enable_parallel_generation)).lower() == 'true'
     ai_config.parallel_slides_count = int(os.environ.get('PARALLEL_SLIDES_COUNT', str(ai_config.parallel_slides_count)))
+    ai_config.speech_script_concurrency = int(os.environ.get('SPEECH_SCRIPT_CONCURRENCY', str(ai_config.speech_script_concurrency)))
+    ai_config.speech_script_batch_size = int(os.environ.get('SPEECH_SCRIPT_BATCH_SIZE', str(ai_config.speech_script_batch_size)))
     ai_config.enable_auto_layout_repair = os.environ.get('ENABLE_AUTO_LAYOUT_REPAIR', str(ai_config.enable_auto_layout_repair)).lower() == 'true'
 
+    ai_config.outline_streaming_min_mb = int(os.environ.get('OUTLINE_STREAMING_MIN_MB', str(ai_config.outline_streaming_min_mb)))
+
+    # Update LLM response cache configuration
+    ai_config.llm_cache_enabled = os.environ.get('LLM_CACHE_ENABLED', str(ai_config.llm_cache_enabled)).lower() == 'true'
+    ai_config.llm_cache_ttl_seconds = int(os.environ.get('LLM_CACHE_TTL_SECONDS', str(ai_config.llm_cache_ttl_seconds)))
+    ai_config.llm_cache_max_mb = int(os.environ.get('LLM_CACHE_MAX_MB', str(ai_config.llm_cache_max_mb)))
+    ai_config.llm_cache_path = os.environ.get('LLM_CACHE_PATH', ai_config.llm_cache_path)
+
+    # Update AI request limiting configuration
+    ai_config.ai_max_concurrent_requests = int(os.environ.get('AI_MAX_CONCURRENT_REQUESTS', str(ai_config.ai_max_concurrent_requests)))
+    ai_config.ai_requests_per_minute = int(os.environ.get('AI_REQUESTS_PER_MINUTE', str(ai_config.ai_requests_per_minute)))
+    ai_config.ai_tokens_per_minute = int(os.environ.get('AI_TOKENS_PER_MINUTE', str(ai_config.ai_tokens_per_minute)))
+    ai_config.ai_rate_limit_overrides = os.environ.get('AI_RATE_LIMIT_OVERRIDES', ai_config.ai_rate_limit_overrides)
+    ai_config.ai_max_retries = int(os.environ.get('AI_MAX_RETRIES', str(ai_config.ai_max_retries)))
+    ai_config.ai_circuit_failure_threshold = int(os.environ.get('AI_CIRCUIT_FAILURE_THRESHOLD', str(ai_config.ai_circuit_failure_threshold)))
+    ai_config.ai_circuit_reset_seconds = int(os.environ.get('AI_CIRCUIT_RESET_SECONDS', str(ai_config.ai_circuit_reset_seconds)))
+    ai_config.ai_fallback_provider = os.environ.get('AI_FALLBACK_PROVIDER', ai_config.ai_fallback_provider)
+    ai_config.ai_fallback_model = os.environ.get('AI_FALLBACK_MODEL', ai_config.ai_fallback_model)
+    ai_config.ai_hedge_enabled = os.environ.get('AI_HEDGE_ENABLED', str(ai_config.ai_hedge_enabled)).lower() == 'true'
+    ai_config.ai_hedge_delay_ms = int(os.environ.get('AI_HEDGE_DELAY_MS', str(ai_config.ai_hedge_delay_ms)))
+
     # Update Tavily configuration
     ai_config.tavily_api_key = os.environ.get('TAVILY_API_KEY', ai_config.tavily_api_key)
     ai_config.tavily_max_results = int(os.environ.get('TAVILY_MAX_RESULTS', str(ai_config.tavily_max_results)))
@@ -504,6 +563,16 @@ def reload_ai_config():
     ai_config.research_enable_content_extraction = os.environ.get('RESEARCH_ENABLE_CONTENT_EXTRACTION', str(ai_config.research_enable_content_extraction)).lower() == 'true'
     ai_config.research_max_content_length = int(os.environ.get('RESEARCH_MAX_CONTENT_LENGTH', str(ai_config.research_max_content_length)))
     ai_config.research_extraction_timeout = int(os.environ.get('RESEARCH_EXTRACTION_TIMEOUT', str(ai_config.research_extraction_timeout)))
+    ai_config.research_max_concurrent_steps = int(os.environ.get('RESEARCH_MAX_CONCURRENT_STEPS', str(ai_config.research_max_concurrent_steps)))
+    ai_config.research_search_concurrency = int(os.environ.get('RESEARCH_SEARCH_CONCURRENCY', str(ai_config.research_search_concurrency)))
+    ai_config.research_search_requests_per_minute = int(os.environ.get('RESEARCH_SEARCH_REQUESTS_PER_MINUTE', str(ai_config.research_search_requests_per_minute)))
+    ai_config.research_llm_concurrency = int(os.environ.get('RESEARCH_LLM_CONCURRENCY', str(ai_config.research_llm_concurrency)))
+    ai_config.research_llm_requests_per_minute = int(os.environ.get('RESEARCH_LLM_REQUESTS_PER_MINUTE', str(ai_config.research_llm_requests_per_minute)))
+    ai_config.research_max_response_mb = float(os.environ.get('RESEARCH_MAX_RESPONSE_MB', str(ai_config.research_max_response_mb)))
+    ai_config.research_connections_per_host = int(os.environ.get('RESEARCH_CONNECTIONS_PER_HOST', str(ai_config.research_connections_per_host)))
+    ai_config.research_page_cache_enabled = os.environ.get('RESEARCH_PAGE_CACHE_ENABLED', str(ai_config.research_page_cache_enabled)).lower() == 'true'
+    ai_config.research_page_cache_path = os.environ.get('RESEARCH_PAGE_CACHE_PATH', ai_config.research_page_cache_path)
+    ai_config.research_page_cache_ttl = int(os.environ.get('RESEARCH_PAGE_CACHE_TTL', str(ai_config.research_page_cache_ttl)))
 
     ai_config.apryse_license_key = os.environ.get('APRYSE_LICENSE_KEY', ai_config.apryse_license_key)
 
@@ -529,6 +598,20 @@ class AppConfig(BaseSettings):
     
     # Cache Configuration
     cache_ttl: int = Field(default=3600, env="CACHE_TTL")  # 1 hour
+
+    # Background Task Configuration
+    background_task_db: str = Field(default="temp/background_tasks.db", env="BACKGROUND_TASK_DB")
+    background_task_max_concurrent: int = Field(default=3, env="BACKGROUND_TASK_MAX_CONCURRENT")
+    background_task_process_workers: int = Field(default=2, env="BACKGROUND_TASK_PROCESS_WORKERS")  # 0 = run CPU-bound work in threads
+    background_task_lease_seconds: int = Field(default=60, env="BACKGROUND_TASK_LEASE_SECONDS")
+    background_task_max_attempts: int = Field(default=3, env="BACKGROUND_TASK_MAX_ATTEMPTS")
+
+    # Screenshot / Template Preview Configuration
+    screenshot_page_pool_size: int = Field(default=4, env="SCREENSHOT_PAGE_POOL_SIZE")  # warm browser pages shared by screenshots
+    template_preview_cache_dir: str = Field(default="temp/template_previews", env="TEMPLATE_PREVIEW_CACHE_DIR")
+    template_preview_width: int = Field(default=480, env="TEMPLATE_PREVIEW_WIDTH")
+    share_cache_max_entries: int = Field(default=256, env="SHARE_CACHE_MAX_ENTRIES")  # rendered public share pages kept in memory
+    share_cache_revalidate_seconds: float = Field(default=5.0, env="SHARE_CACHE_REVALIDATE_SECONDS")
     
     model_config = {
         "case_sensitive": False,
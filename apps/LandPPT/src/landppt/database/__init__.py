@@ -5,6 +5,7 @@ Database package for LandPPT
 from .database import engine, SessionLocal, get_db, init_db, get_async_db
 from .models import Project, TodoBoard, TodoStage, ProjectVersion, SlideData, PPTTemplate
 from .migrations import migration_manager
+from .writer import database_writer
 from .health_check import health_checker
 from .service import DatabaseService
 from .repositories import (
@@ -25,6 +26,7 @@ __all__ = [
     'SlideData',
     'PPTTemplate',
     'migration_manager',
+    'database_writer',
     'health_checker',
     'DatabaseService',
     'ProjectRepository',
@@ -3,7 +3,7 @@ Database configuration and session management
 """
 
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
@@ -19,12 +19,37 @@ if DATABASE_URL.startswith("sqlite:///"):
 else:
     ASYNC_DATABASE_URL = DATABASE_URL
 
+IS_SQLITE = "sqlite" in DATABASE_URL
+IS_SQLITE_FILE = IS_SQLITE and ":memory:" not in DATABASE_URL
+
 # Create engines
 # SQLite-specific configuration for better concurrency
 sqlite_connect_args = {
     "check_same_thread": False,
     "timeout": 30,  # Wait up to 30 seconds for lock
-} if "sqlite" in DATABASE_URL else {}
+} if IS_SQLITE else {}
+
+# WAL lets readers proceed while the single writer commits; NORMAL sync is
+# durable across application crashes in WAL mode and avoids an fsync per commit
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=30000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply SQLite pragmas on every new connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            if pragma.startswith("PRAGMA journal_mode") and not IS_SQLITE_FILE:
+                continue
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
 
 engine = create_engine(
     DATABASE_URL,
@@ -42,6 +67,22 @@ async_engine = create_async_engine(
     connect_args={"timeout": 30} if "sqlite" in ASYNC_DATABASE_URL else {}
 )
 
+# Dedicated engine owning the only write connection (see writer.DatabaseWriter);
+# readers keep using async_engine's pool
+writer_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=False,
+    pool_size=1,
+    max_overflow=0,
+    connect_args={"timeout": 30}
+) if IS_SQLITE_FILE else None
+
+if IS_SQLITE:
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    if writer_engine is not None:
+        event.listen(writer_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
 # Create session makers
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -90,5 +131,9 @@ async def init_db():
 
 async def close_db():
     """Close database connections"""
+    from .writer import database_writer
+    await database_writer.stop()
+    if writer_engine is not None:
+        await writer_engine.dispose()
     await async_engine.dispose()
 
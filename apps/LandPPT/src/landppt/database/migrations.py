@@ -3,6 +3,7 @@ Database migration utilities for LandPPT
 """
 
 import os
+import json
 import time
 import logging
 from typing import List, Dict, Any
@@ -11,6 +12,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from .database import AsyncSessionLocal, async_engine
 from .models import Base
+from . import version_store
+from .repositories import GlobalMasterTemplateRepository
 
 logger = logging.getLogger(__name__)
 
@@ -87,6 +90,42 @@ class DatabaseMigration:
             "down": self._migration_007_down
         })
 
+        # Migration 008: Unique (project_id, slide_index) index for batched slide upserts
+        self.migrations.append({
+            "version": "008",
+            "name": "add_slide_data_unique_index",
+            "description": "Add unique index on slide_data(project_id, slide_index) used by INSERT ... ON CONFLICT upserts",
+            "up": self._migration_008_up,
+            "down": self._migration_008_down
+        })
+
+        # Migration 009: Template catalogue tag table and FTS5 search index
+        self.migrations.append({
+            "version": "009",
+            "name": "add_global_template_search_index",
+            "description": "Add template-tag join table, listing index and FTS5 index kept in sync by triggers",
+            "up": self._migration_009_up,
+            "down": self._migration_009_down
+        })
+
+        # Migration 010: Content-addressed, delta-encoded project versions
+        self.migrations.append({
+            "version": "010",
+            "name": "delta_encode_project_versions",
+            "description": "Store project versions as compressed content-addressed blobs plus keyframe/delta manifests",
+            "up": self._migration_010_up,
+            "down": self._migration_010_down
+        })
+
+        # Migration 011: LLM response cache accounting on AI usage logs
+        self.migrations.append({
+            "version": "011",
+            "name": "add_ai_usage_cache_columns",
+            "description": "Record LLM response cache hits and tokens saved alongside AI usage logs",
+            "up": self._migration_011_up,
+            "down": self._migration_011_down
+        })
+
     async def _migration_001_up(self, session: AsyncSession):
         """Create initial schema"""
         logger.info("Running migration 001: Creating initial schema")
@@ -622,6 +661,348 @@ class DatabaseMigration:
             logger.error(f"Migration 007 rollback failed: {e}")
             raise
 
+    async def _migration_008_up(self, session: AsyncSession):
+        """Migration 008: Add unique index on slide_data(project_id, slide_index)"""
+        try:
+            logger.info("Running migration 008: Adding unique slide index to slide_data table")
+
+            # The unique index needs duplicates removed first. Keep the most recently
+            # updated row of each (project_id, slide_index) and log what is dropped.
+            duplicates = (await session.execute(text("""
+                SELECT s.id, s.project_id, s.slide_index, s.updated_at, s.is_user_edited
+                FROM slide_data s
+                JOIN (
+                    SELECT project_id, slide_index FROM slide_data
+                    GROUP BY project_id, slide_index HAVING COUNT(*) > 1
+                ) d ON d.project_id = s.project_id AND d.slide_index = s.slide_index
+                ORDER BY s.project_id, s.slide_index, s.updated_at DESC, s.id DESC
+            """))).fetchall()
+
+            groups: Dict[tuple, list] = {}
+            for row in duplicates:
+                groups.setdefault((row.project_id, row.slide_index), []).append(row)
+
+            removed_ids = []
+            for (project_id, slide_index), rows in groups.items():
+                kept, dropped = rows[0], rows[1:]
+                removed_ids.extend(row.id for row in dropped)
+                logger.warning(
+                    f"Duplicate slide rows for project {project_id} slide {slide_index}: "
+                    f"keeping id={kept.id} (updated_at={kept.updated_at}), "
+                    f"removing ids={[row.id for row in dropped]}"
+                )
+                if any(row.is_user_edited for row in dropped) and not kept.is_user_edited:
+                    logger.warning(
+                        f"Removed duplicates of project {project_id} slide {slide_index} "
+                        f"include user-edited content older than the kept row"
+                    )
+
+            for start in range(0, len(removed_ids), 500):
+                chunk = removed_ids[start:start + 500]
+                params = {f"id{i}": slide_id for i, slide_id in enumerate(chunk)}
+                placeholders = ", ".join(f":{name}" for name in params)
+                await session.execute(text(f"DELETE FROM slide_data WHERE id IN ({placeholders})"), params)
+            if removed_ids:
+                logger.info(f"Removed {len(removed_ids)} duplicate slide rows from {len(groups)} slides")
+
+            await session.execute(text("""
+                CREATE UNIQUE INDEX IF NOT EXISTS uq_slide_data_project_slide
+                ON slide_data(project_id, slide_index)
+            """))
+
+            await session.commit()
+            logger.info("Migration 008 completed successfully")
+
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Migration 008 failed: {e}")
+            raise
+
+    async def _migration_008_down(self, session: AsyncSession):
+        """Migration 008 rollback: Drop unique slide index"""
+        try:
+            logger.info("Rolling back migration 008: Dropping unique slide index")
+            await session.execute(text("DROP INDEX IF EXISTS uq_slide_data_project_slide"))
+            await session.commit()
+            logger.info("Migration 008 rollback completed")
+
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Migration 008 rollback failed: {e}")
+            raise
+
+    async def _migration_009_up(self, session: AsyncSession):
+        """Migration 009: Add template-tag join table and FTS5 search index for global master templates"""
+        tags_expr = "COALESCE((SELECT group_concat(value, ' ') FROM json_each(COALESCE({row}.tags, '[]'))), '')"
+        try:
+            logger.info("Running migration 009: Adding global master template search index")
+
+            await session.execute(text("""
+                CREATE TABLE IF NOT EXISTS global_master_template_tags (
+                    template_id INTEGER NOT NULL REFERENCES global_master_templates(id) ON DELETE CASCADE,
+                    tag VARCHAR(100) NOT NULL,
+                    PRIMARY KEY (template_id, tag)
+                )
+            """))
+            await session.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_global_master_template_tags_tag
+                ON global_master_template_tags(tag)
+            """))
+            await session.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_global_master_templates_listing
+                ON global_master_templates(is_active, is_default, usage_count)
+            """))
+
+            # Trigram tokenizer gives substring matching (also for CJK text); fall back to unicode61
+            fts_exists = (await session.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE name = 'global_master_templates_fts'"
+            ))).first() is not None
+            if not fts_exists:
+                try:
+                    await session.execute(text("""
+                        CREATE VIRTUAL TABLE global_master_templates_fts
+                        USING fts5(template_name, description, tags, tokenize='trigram')
+                    """))
+                except Exception as e:
+                    logger.info(f"FTS5 trigram tokenizer unavailable ({e}), using unicode61")
+                    await session.execute(text("""
+                        CREATE VIRTUAL TABLE global_master_templates_fts
+                        USING fts5(template_name, description, tags)
+                    """))
+
+            # Triggers keep the tag table and FTS index in sync with every template write
+            await session.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS global_master_templates_search_ai
+                AFTER INSERT ON global_master_templates
+                BEGIN
+                    INSERT OR IGNORE INTO global_master_template_tags(template_id, tag)
+                    SELECT NEW.id, value FROM json_each(COALESCE(NEW.tags, '[]')) WHERE type = 'text';
+                    INSERT INTO global_master_templates_fts(rowid, template_name, description, tags)
+                    VALUES (NEW.id, NEW.template_name, COALESCE(NEW.description, ''), {tags_expr.format(row='NEW')});
+                END
+            """))
+            await session.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS global_master_templates_search_au
+                AFTER UPDATE OF template_name, description, tags ON global_master_templates
+                BEGIN
+                    DELETE FROM global_master_template_tags WHERE template_id = OLD.id;
+                    INSERT OR IGNORE INTO global_master_template_tags(template_id, tag)
+                    SELECT NEW.id, value FROM json_each(COALESCE(NEW.tags, '[]')) WHERE type = 'text';
+                    DELETE FROM global_master_templates_fts WHERE rowid = OLD.id;
+                    INSERT INTO global_master_templates_fts(rowid, template_name, description, tags)
+                    VALUES (NEW.id, NEW.template_name, COALESCE(NEW.description, ''), {tags_expr.format(row='NEW')});
+                END
+            """))
+            await session.execute(text("""
+                CREATE TRIGGER IF NOT EXISTS global_master_templates_search_ad
+                AFTER DELETE ON global_master_templates
+                BEGIN
+                    DELETE FROM global_master_template_tags WHERE template_id = OLD.id;
+                    DELETE FROM global_master_templates_fts WHERE rowid = OLD.id;
+                END
+            """))
+
+            # Backfill existing templates
+            await session.execute(text("DELETE FROM global_master_template_tags"))
+            await session.execute(text("""
+                INSERT OR IGNORE INTO global_master_template_tags(template_id, tag)
+                SELECT t.id, j.value
+                FROM global_master_templates t, json_each(COALESCE(t.tags, '[]')) j
+                WHERE j.type = 'text'
+            """))
+            await session.execute(text("DELETE FROM global_master_templates_fts"))
+            await session.execute(text(f"""
+                INSERT INTO global_master_templates_fts(rowid, template_name, description, tags)
+                SELECT t.id, t.template_name, COALESCE(t.description, ''), {tags_expr.format(row='t')}
+                FROM global_master_templates t
+            """))
+
+            await session.commit()
+            GlobalMasterTemplateRepository.reset_fts_tokenizer()
+            logger.info("Migration 009 completed successfully")
+
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Migration 009 failed: {e}")
+            raise
+
+    async def _migration_009_down(self, session: AsyncSession):
+        """Migration 009 rollback: Drop template search index, triggers and tag table"""
+        try:
+            logger.info("Rolling back migration 009: Dropping global master template search index")
+            for trigger in ("global_master_templates_search_ai", "global_master_templates_search_au",
+                            "global_master_templates_search_ad"):
+                await session.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+            await session.execute(text("DROP TABLE IF EXISTS global_master_templates_fts"))
+            await session.execute(text("DROP TABLE IF EXISTS global_master_template_tags"))
+            await session.execute(text("DROP INDEX IF EXISTS idx_global_master_templates_listing"))
+            await session.commit()
+            GlobalMasterTemplateRepository.reset_fts_tokenizer()
+            logger.info("Migration 009 rollback completed")
+
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Migration 009 rollback failed: {e}")
+            raise
+
+    async def _migration_010_up(self, session: AsyncSession):
+        """Migration 010: Convert project_versions to manifest + content-addressed blob storage"""
+        try:
+            logger.info("Running migration 010: Delta-encoding project versions")
+
+            result = await session.execute(text("PRAGMA table_info(project_versions)"))
+            column_names = [col[1] for col in result.fetchall()]
+            if 'storage_format' not in column_names:
+                await session.execute(text(
+                    "ALTER TABLE project_versions ADD COLUMN storage_format INTEGER DEFAULT 1 NOT NULL"
+                ))
+            if 'is_keyframe' not in column_names:
+                await session.execute(text(
+                    "ALTER TABLE project_versions ADD COLUMN is_keyframe BOOLEAN DEFAULT 1 NOT NULL"
+                ))
+            if 'manifest' not in column_names:
+                await session.execute(text("ALTER TABLE project_versions ADD COLUMN manifest JSON"))
+
+            await session.execute(text("""
+                CREATE TABLE IF NOT EXISTS project_version_blobs (
+                    hash VARCHAR(64) PRIMARY KEY,
+                    codec VARCHAR(10) NOT NULL,
+                    raw_size INTEGER NOT NULL,
+                    data BLOB NOT NULL,
+                    created_at FLOAT
+                )
+            """))
+            await session.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_project_versions_project_version
+                ON project_versions(project_id, version)
+            """))
+            await session.commit()
+
+            # Convert legacy rows project by project; each row is loaded individually to bound memory
+            project_ids = (await session.execute(text(
+                "SELECT DISTINCT project_id FROM project_versions WHERE storage_format = :legacy"
+            ), {"legacy": version_store.LEGACY_FORMAT})).scalars().all()
+
+            converted = 0
+            for project_id in project_ids:
+                version_ids = (await session.execute(text("""
+                    SELECT id FROM project_versions
+                    WHERE project_id = :project_id AND storage_format = :legacy
+                    ORDER BY version, id
+                """), {"project_id": project_id, "legacy": version_store.LEGACY_FORMAT})).scalars().all()
+
+                previous_manifest = None
+                since_keyframe = 0
+                for version_id in version_ids:
+                    raw_data = (await session.execute(
+                        text("SELECT data FROM project_versions WHERE id = :id"), {"id": version_id}
+                    )).scalar()
+                    snapshot = json.loads(raw_data) if isinstance(raw_data, str) else (raw_data or {})
+                    manifest, blobs = version_store.build_manifest(snapshot if isinstance(snapshot, dict) else {})
+
+                    for digest, (codec, raw_size, compressed) in blobs.items():
+                        await session.execute(text("""
+                            INSERT OR IGNORE INTO project_version_blobs (hash, codec, raw_size, data, created_at)
+                            VALUES (:hash, :codec, :raw_size, :data, :created_at)
+                        """), {"hash": digest, "codec": codec, "raw_size": raw_size,
+                               "data": compressed, "created_at": time.time()})
+
+                    is_keyframe = previous_manifest is None or since_keyframe + 1 >= version_store.KEYFRAME_INTERVAL
+                    stored = manifest if is_keyframe else version_store.diff_manifest(previous_manifest, manifest)
+                    since_keyframe = 0 if is_keyframe else since_keyframe + 1
+                    previous_manifest = manifest
+
+                    await session.execute(text("""
+                        UPDATE project_versions
+                        SET data = '{}', storage_format = :format, is_keyframe = :is_keyframe, manifest = :manifest
+                        WHERE id = :id
+                    """), {"format": version_store.MANIFEST_FORMAT, "is_keyframe": is_keyframe,
+                           "manifest": json.dumps(stored, ensure_ascii=False), "id": version_id})
+                    converted += 1
+
+                await session.commit()
+
+            logger.info(f"Migration 010 completed successfully ({converted} versions converted)")
+
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Migration 010 failed: {e}")
+            raise
+
+    async def _migration_010_down(self, session: AsyncSession):
+        """Migration 010 rollback: Expand manifests back into full JSON snapshots"""
+        try:
+            logger.info("Rolling back migration 010: Restoring full project version snapshots")
+
+            from .repositories import ProjectVersionRepository
+            repo = ProjectVersionRepository(session)
+
+            rows = (await session.execute(text("""
+                SELECT id, project_id, version FROM project_versions
+                WHERE storage_format = :format ORDER BY project_id, version, id
+            """), {"format": version_store.MANIFEST_FORMAT})).all()
+            snapshots = []
+            for row in rows:
+                snapshots.append((row.id, await repo.get_version_data(row.project_id, row.version)))
+
+            for version_id, snapshot in snapshots:
+                await session.execute(text("""
+                    UPDATE project_versions
+                    SET data = :data, storage_format = :legacy, is_keyframe = 1, manifest = NULL
+                    WHERE id = :id
+                """), {"data": json.dumps(snapshot or {}, ensure_ascii=False),
+                       "legacy": version_store.LEGACY_FORMAT, "id": version_id})
+
+            await session.execute(text("DROP TABLE IF EXISTS project_version_blobs"))
+            await session.commit()
+            logger.info("Migration 010 rollback completed")
+
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Migration 010 rollback failed: {e}")
+            raise
+
+    async def _migration_011_up(self, session: AsyncSession):
+        """Migration 011: Add cache_hit and tokens_saved columns to ai_usage_logs"""
+        try:
+            logger.info("Running migration 011: Adding cache columns to ai_usage_logs")
+
+            result = await session.execute(text("PRAGMA table_info(ai_usage_logs)"))
+            column_names = [col[1] for col in result.fetchall()]
+
+            if 'cache_hit' not in column_names:
+                await session.execute(text("""
+                    ALTER TABLE ai_usage_logs
+                    ADD COLUMN cache_hit BOOLEAN DEFAULT 0
+                """))
+            if 'tokens_saved' not in column_names:
+                await session.execute(text("""
+                    ALTER TABLE ai_usage_logs
+                    ADD COLUMN tokens_saved INTEGER DEFAULT 0
+                """))
+
+            await session.commit()
+            logger.info("Migration 011 completed successfully")
+
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Migration 011 failed: {e}")
+            raise
+
+    async def _migration_011_down(self, session: AsyncSession):
+        """Migration 011 rollback: Drop cache columns from ai_usage_logs (requires SQLite 3.35+)"""
+        try:
+            logger.info("Rolling back migration 011: Dropping cache columns from ai_usage_logs")
+            await session.execute(text("ALTER TABLE ai_usage_logs DROP COLUMN cache_hit"))
+            await session.execute(text("ALTER TABLE ai_usage_logs DROP COLUMN tokens_saved"))
+            await session.commit()
+            logger.info("Migration 011 rollback completed")
+
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Migration 011 rollback failed: {e}")
+            raise
+
     async def _create_migration_table(self, session: AsyncSession):
         """Create migration tracking table"""
         create_table_sql = """
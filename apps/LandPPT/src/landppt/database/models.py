@@ -5,7 +5,7 @@ SQLAlchemy database models for LandPPT
 import time
 import hashlib
 from typing import Dict, Any, List, Optional
-from sqlalchemy import Column, Integer, String, Text, Float, Boolean, ForeignKey, JSON, DateTime
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, ForeignKey, JSON, DateTime, Index, LargeBinary
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -96,7 +96,8 @@ class Project(Base):
     # Relationships
     owner: Mapped[Optional["User"]] = relationship("User", foreign_keys=[user_id])
     todo_board: Mapped[Optional["TodoBoard"]] = relationship("TodoBoard", back_populates="project", uselist=False)
-    versions: Mapped[List["ProjectVersion"]] = relationship("ProjectVersion", back_populates="project")
+    # 版本历史不随项目加载（访问即报错，避免隐式全量查询），通过 ProjectVersionRepository 按需分页读取
+    versions: Mapped[List["ProjectVersion"]] = relationship("ProjectVersion", back_populates="project", lazy="raise")
     slides: Mapped[List["SlideData"]] = relationship("SlideData", back_populates="project")
     speech_scripts: Mapped[List["SpeechScript"]] = relationship("SpeechScript", back_populates="project")
 
@@ -147,16 +148,38 @@ class ProjectVersion(Base):
     project_id: Mapped[str] = mapped_column(String(36), ForeignKey("projects.project_id"))
     version: Mapped[int] = mapped_column(Integer, nullable=False)
     timestamp: Mapped[float] = mapped_column(Float, default=time.time)
-    data: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False)
+    data: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False)  # 旧格式的完整快照，新格式为空
     description: Mapped[str] = mapped_column(String(500), nullable=False)
-    
+    storage_format: Mapped[int] = mapped_column(Integer, default=1, nullable=False)  # 1=完整JSON, 2=manifest
+    is_keyframe: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    manifest: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)  # 完整manifest或相对上一版本的差异
+
+    __table_args__ = (
+        Index("idx_project_versions_project_version", "project_id", "version"),
+    )
+
     # Relationships
     project: Mapped["Project"] = relationship("Project", back_populates="versions")
 
 
+class ProjectVersionBlob(Base):
+    """项目版本内容寻址存储：压缩后的字段/幻灯片内容，按 sha256 在各版本间去重"""
+    __tablename__ = "project_version_blobs"
+
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    codec: Mapped[str] = mapped_column(String(10), nullable=False)  # zlib / zstd
+    raw_size: Mapped[int] = mapped_column(Integer, nullable=False)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    created_at: Mapped[float] = mapped_column(Float, default=time.time)
+
+
 class SlideData(Base):
     """Slide data model for individual PPT slides"""
     __tablename__ = "slide_data"
+    __table_args__ = (
+        # 单写者批量 upsert 依赖的冲突键
+        Index("uq_slide_data_project_slide", "project_id", "slide_index", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     project_id: Mapped[str] = mapped_column(String(36), ForeignKey("projects.project_id"))
@@ -215,6 +238,21 @@ class GlobalMasterTemplate(Base):
     created_at: Mapped[float] = mapped_column(Float, default=time.time)
     updated_at: Mapped[float] = mapped_column(Float, default=time.time, onupdate=time.time)
 
+    __table_args__ = (
+        # 列表页排序/计数走覆盖索引，避免读取含 html_template 的整行
+        Index("idx_global_master_templates_listing", "is_active", "is_default", "usage_count"),
+    )
+
+
+class GlobalMasterTemplateTag(Base):
+    """模板-标签关联表（由 global_master_templates 上的触发器维护，见迁移 009）"""
+    __tablename__ = "global_master_template_tags"
+
+    template_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("global_master_templates.id", ondelete="CASCADE"), primary_key=True
+    )
+    tag: Mapped[str] = mapped_column(String(100), primary_key=True, index=True)
+
 
 class SpeechScript(Base):
     """演讲稿存储表"""
@@ -266,6 +304,8 @@ class AIUsageLog(Base):
     success: Mapped[bool] = mapped_column(Boolean, default=True)
     error_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     duration_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # 调用耗时(毫秒)
+    cache_hit: Mapped[bool] = mapped_column(Boolean, default=False)  # 是否由LLM响应缓存返回
+    tokens_saved: Mapped[int] = mapped_column(Integer, default=0)  # 缓存命中节省的token数
     created_at: Mapped[float] = mapped_column(Float, default=time.time, index=True)
 
     # Relationship
@@ -6,10 +6,15 @@ import time
 import logging
 from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete, and_
+from sqlalchemy import select, update, delete, and_, or_, func, text, table, literal_column
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import selectinload
 
-from .models import Project, TodoBoard, TodoStage, ProjectVersion, SlideData, PPTTemplate, GlobalMasterTemplate
+from .models import (
+    Project, TodoBoard, TodoStage, ProjectVersion, ProjectVersionBlob, SlideData, PPTTemplate,
+    GlobalMasterTemplate, GlobalMasterTemplateTag
+)
+from . import version_store
 from ..api.models import PPTProject, TodoBoard as TodoBoardModel, TodoStage as TodoStageModel
 
 logger = logging.getLogger(__name__)
@@ -33,7 +38,6 @@ class ProjectRepository:
         """Get project by ID with all relationships"""
         stmt = select(Project).where(Project.project_id == project_id).options(
             selectinload(Project.todo_board).selectinload(TodoBoard.stages),
-            selectinload(Project.versions),
             selectinload(Project.slides)
         )
         result = await self.session.execute(stmt)
@@ -43,7 +47,6 @@ class ProjectRepository:
         """List projects with pagination, optionally filtered by user_id"""
         stmt = select(Project).options(
             selectinload(Project.todo_board).selectinload(TodoBoard.stages),
-            selectinload(Project.versions),
             selectinload(Project.slides)
         )
 
@@ -181,25 +184,193 @@ class TodoStageRepository:
 
 
 class ProjectVersionRepository:
-    """Repository for ProjectVersion operations"""
-    
+    """Repository for ProjectVersion operations
+
+    新版本以 manifest + 内容寻址 blob 存储（见 version_store），旧的完整 JSON 快照仍可读取。
+    """
+
+    # 未指定 limit 时列表只返回最新的一页，避免读取完整历史
+    DEFAULT_PAGE_SIZE = 50
+    # 回收 blob 时每条 DELETE 语句携带的哈希数量（SQLite 的绑定参数上限）
+    GC_BATCH_SIZE = 500
+
     def __init__(self, session: AsyncSession):
         self.session = session
-    
+
+    async def _load_manifest_chain(self, project_id: str, version: Optional[int] = None) -> Optional[Tuple[ProjectVersion, Dict[str, Any]]]:
+        """读取目标版本（默认最新）并从最近的关键帧回放出完整 manifest"""
+        target_stmt = select(ProjectVersion).where(ProjectVersion.project_id == project_id)
+        if version is not None:
+            target_stmt = target_stmt.where(ProjectVersion.version == version)
+        target_stmt = target_stmt.order_by(ProjectVersion.version.desc(), ProjectVersion.id.desc()).limit(1)
+        target = (await self.session.execute(target_stmt)).scalar_one_or_none()
+        if target is None:
+            return None
+        if target.storage_format != version_store.MANIFEST_FORMAT:
+            return target, None
+        if target.is_keyframe:
+            return target, target.manifest
+
+        keyframe_version = (await self.session.execute(
+            select(func.max(ProjectVersion.version)).where(
+                ProjectVersion.project_id == project_id,
+                ProjectVersion.storage_format == version_store.MANIFEST_FORMAT,
+                ProjectVersion.is_keyframe == True,
+                ProjectVersion.version <= target.version
+            )
+        )).scalar()
+
+        chain_stmt = select(ProjectVersion.is_keyframe, ProjectVersion.manifest).where(
+            ProjectVersion.project_id == project_id,
+            ProjectVersion.storage_format == version_store.MANIFEST_FORMAT,
+            ProjectVersion.version <= target.version,
+            ProjectVersion.id <= target.id
+        )
+        if keyframe_version is not None:
+            chain_stmt = chain_stmt.where(ProjectVersion.version >= keyframe_version)
+        chain_stmt = chain_stmt.order_by(ProjectVersion.version, ProjectVersion.id)
+        chain = (await self.session.execute(chain_stmt)).all()
+        return target, version_store.rebuild_manifest([(row.is_keyframe, row.manifest) for row in chain])
+
     async def create(self, version_data: Dict[str, Any]) -> ProjectVersion:
-        """Create a new project version"""
-        version = ProjectVersion(**version_data)
+        """Create a new project version
+
+        version_data 中的 ``data`` 快照被拆分为压缩 blob（已存在的 blob 不重复写入）；
+        每 KEYFRAME_INTERVAL 个版本写一次完整 manifest，其余只写差异。
+        """
+        version_data = dict(version_data)
+        snapshot = version_data.pop("data", None) or {}
+        manifest, blobs = version_store.build_manifest(snapshot)
+
+        project_id = version_data["project_id"]
+        previous = await self._load_manifest_chain(project_id)
+        previous_manifest = previous[1] if previous else None
+
+        is_keyframe = True
+        stored_manifest = manifest
+        if previous_manifest is not None:
+            since_keyframe = (await self.session.execute(
+                select(func.count(ProjectVersion.id)).where(
+                    ProjectVersion.project_id == project_id,
+                    ProjectVersion.storage_format == version_store.MANIFEST_FORMAT,
+                    ProjectVersion.is_keyframe == False,
+                    ProjectVersion.id > select(func.coalesce(func.max(ProjectVersion.id), 0)).where(
+                        ProjectVersion.project_id == project_id,
+                        ProjectVersion.storage_format == version_store.MANIFEST_FORMAT,
+                        ProjectVersion.is_keyframe == True
+                    ).scalar_subquery()
+                )
+            )).scalar()
+            if since_keyframe + 1 < version_store.KEYFRAME_INTERVAL:
+                is_keyframe = False
+                stored_manifest = version_store.diff_manifest(previous_manifest, manifest)
+
+        if blobs:
+            now = time.time()
+            rows = [
+                {"hash": digest, "codec": codec, "raw_size": raw_size, "data": compressed, "created_at": now}
+                for digest, (codec, raw_size, compressed) in blobs.items()
+            ]
+            if self.session.bind.dialect.name == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+                await self.session.execute(
+                    sqlite_insert(ProjectVersionBlob).values(rows).on_conflict_do_nothing(index_elements=["hash"])
+                )
+            else:
+                existing = set((await self.session.execute(
+                    select(ProjectVersionBlob.hash).where(ProjectVersionBlob.hash.in_(list(blobs.keys())))
+                )).scalars().all())
+                self.session.add_all([ProjectVersionBlob(**row) for row in rows if row["hash"] not in existing])
+
+        version = ProjectVersion(
+            **version_data,
+            data={},
+            storage_format=version_store.MANIFEST_FORMAT,
+            is_keyframe=is_keyframe,
+            manifest=stored_manifest
+        )
         self.session.add(version)
         await self.session.commit()
         await self.session.refresh(version)
         return version
-    
+
+    async def list_versions(self, project_id: str, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """列出版本元数据（不读取快照内容），按版本号倒序，每次最多 DEFAULT_PAGE_SIZE 条"""
+        stmt = select(
+            ProjectVersion.version, ProjectVersion.timestamp, ProjectVersion.description
+        ).where(ProjectVersion.project_id == project_id).order_by(
+            ProjectVersion.version.desc(), ProjectVersion.id.desc()
+        ).offset(max(offset, 0)).limit(limit if limit is not None else self.DEFAULT_PAGE_SIZE)
+        result = await self.session.execute(stmt)
+        return [
+            {"version": row.version, "timestamp": row.timestamp, "description": row.description}
+            for row in result.all()
+        ]
+
+    async def get_version_data(self, project_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """重建指定版本的完整快照；读取量只与该版本内容和关键帧间隔有关"""
+        loaded = await self._load_manifest_chain(project_id, version)
+        if loaded is None:
+            return None
+        target, manifest = loaded
+        if target.storage_format != version_store.MANIFEST_FORMAT:
+            return target.data
+
+        hashes = version_store.manifest_blob_hashes(manifest)
+        blob_rows = []
+        if hashes:
+            result = await self.session.execute(
+                select(ProjectVersionBlob.hash, ProjectVersionBlob.codec, ProjectVersionBlob.data)
+                .where(ProjectVersionBlob.hash.in_(hashes))
+            )
+            blob_rows = [(row.hash, row.codec, row.data) for row in result.all()]
+        return version_store.materialize(manifest, blob_rows)
+
     async def get_versions_by_project_id(self, project_id: str) -> List[ProjectVersion]:
         """Get all versions for a project"""
         stmt = select(ProjectVersion).where(ProjectVersion.project_id == project_id).order_by(ProjectVersion.version.desc())
         result = await self.session.execute(stmt)
         return result.scalars().all()
 
+    async def delete_by_project_id(self, project_id: str) -> int:
+        """删除项目的全部版本，并回收不再被任何版本引用的 blob"""
+        result = await self.session.execute(delete(ProjectVersion).where(ProjectVersion.project_id == project_id))
+        await self.session.commit()
+        if result.rowcount:
+            await self.delete_unreferenced_blobs()
+        return result.rowcount
+
+    async def delete_unreferenced_blobs(self) -> int:
+        """删除没有任何版本引用的 blob，返回删除数量
+
+        引用集合的读取与删除在同一事务中完成；SQLite 下并发写入新版本的事务会使本事务
+        提交失败而不是留下悬空引用。
+        """
+        try:
+            referenced = set()
+            result = await self.session.stream(
+                select(ProjectVersion.manifest).where(ProjectVersion.storage_format == version_store.MANIFEST_FORMAT)
+            )
+            async for stored in result.scalars():
+                referenced.update(version_store.stored_blob_hashes(stored))
+
+            stored_hashes = (await self.session.execute(select(ProjectVersionBlob.hash))).scalars().all()
+            garbage = [digest for digest in stored_hashes if digest not in referenced]
+            for start in range(0, len(garbage), self.GC_BATCH_SIZE):
+                await self.session.execute(
+                    delete(ProjectVersionBlob).where(
+                        ProjectVersionBlob.hash.in_(garbage[start:start + self.GC_BATCH_SIZE])
+                    )
+                )
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+
+        if garbage:
+            logger.info(f"Removed {len(garbage)} unreferenced project version blobs")
+        return len(garbage)
+
 
 class SlideDataRepository:
     """Repository for SlideData operations"""
@@ -224,9 +395,32 @@ class SlideDataRepository:
         await self.session.refresh(slide)
         return slide
 
-    async def upsert_slide(self, project_id: str, slide_index: int, slide_data: Dict[str, Any], skip_if_user_edited: bool = False) -> SlideData:
+    # 冲突时更新的列（project_id/slide_index 为冲突键，created_at 保留首次写入时间）
+    UPSERT_IMMUTABLE_COLUMNS = ('id', 'project_id', 'slide_index', 'created_at')
+
+    @classmethod
+    def build_upsert_statement(cls, rows: List[Dict[str, Any]], skip_if_user_edited: bool = False):
+        """构建 INSERT ... ON CONFLICT(project_id, slide_index) DO UPDATE 语句
+
+        所有行必须包含相同的列；skip_if_user_edited=True 时，已被用户编辑的幻灯片保持不变。
+        """
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+        stmt = sqlite_insert(SlideData).values(rows)
+        update_columns = {
+            key: stmt.excluded[key]
+            for key in rows[0].keys()
+            if key not in cls.UPSERT_IMMUTABLE_COLUMNS
+        }
+        return stmt.on_conflict_do_update(
+            index_elements=[SlideData.project_id, SlideData.slide_index],
+            set_=update_columns,
+            where=(SlideData.is_user_edited == False) if skip_if_user_edited else None  # noqa: E712
+        )
+
+    async def upsert_slide(self, project_id: str, slide_index: int, slide_data: Dict[str, Any], skip_if_user_edited: bool = False) -> bool:
         """Insert or update a single slide
-        
+
         Args:
             project_id: Project ID
             slide_index: Slide index (0-based)
@@ -234,50 +428,40 @@ class SlideDataRepository:
             skip_if_user_edited: If True, skip updating slides that have is_user_edited=True.
                                  This allows generator to not overwrite user edits.
         """
-        import logging
-        logger = logging.getLogger(__name__)
-
-        logger.info(f"🔄 数据库仓库开始upsert幻灯片: 项目ID={project_id}, 索引={slide_index}, 跳过用户编辑={skip_if_user_edited}")
-
-        # Check if slide already exists
-        stmt = select(SlideData).where(
-            SlideData.project_id == project_id,
-            SlideData.slide_index == slide_index
-        )
-        result = await self.session.execute(stmt)
-        existing_slide = result.scalar_one_or_none()
+        logger.debug(f"🔄 数据库仓库开始upsert幻灯片: 项目ID={project_id}, 索引={slide_index}, 跳过用户编辑={skip_if_user_edited}")
+
+        current_time = time.time()
+        row = {
+            key: value for key, value in slide_data.items()
+            if key in SlideData.__table__.columns
+        }
+        row.update({
+            'project_id': project_id,
+            'slide_index': slide_index,
+            'created_at': current_time,
+            'updated_at': current_time
+        })
+
+        if self.session.bind.dialect.name == "sqlite":
+            # 单条语句完成插入或更新，无需先查询再提交、刷新
+            await self.session.execute(self.build_upsert_statement([row], skip_if_user_edited))
+            await self.session.commit()
+            return True
 
+        # 其他数据库：查询后更新或插入
+        existing_slide = await self.get_slide_by_index(project_id, slide_index)
         if existing_slide:
-            # 如果skip_if_user_edited=True且现有幻灯片已被用户编辑，跳过更新
             if skip_if_user_edited and existing_slide.is_user_edited:
                 logger.info(f"⏭️ 跳过更新用户编辑的幻灯片: 项目ID={project_id}, 索引={slide_index}")
-                return existing_slide
-            
-            # Update existing slide
-            logger.info(f"📝 更新现有幻灯片: 数据库ID={existing_slide.id}, 项目ID={project_id}, 索引={slide_index}")
-            slide_data['updated_at'] = time.time()
-
-            updated_fields = []
-            for key, value in slide_data.items():
-                if hasattr(existing_slide, key):
-                    old_value = getattr(existing_slide, key)
-                    if old_value != value:
-                        setattr(existing_slide, key, value)
-                        updated_fields.append(key)
-
-            logger.info(f"📊 更新的字段: {updated_fields}")
+                return True
+            for key, value in row.items():
+                if key not in self.UPSERT_IMMUTABLE_COLUMNS:
+                    setattr(existing_slide, key, value)
             await self.session.commit()
-            await self.session.refresh(existing_slide)
-            logger.info(f"✅ 幻灯片更新成功: 数据库ID={existing_slide.id}")
-            return existing_slide
         else:
-            # Create new slide
-            logger.info(f"➕ 创建新幻灯片: 项目ID={project_id}, 索引={slide_index}")
-            slide_data['created_at'] = time.time()
-            slide_data['updated_at'] = time.time()
-            new_slide = await self.create_single_slide(slide_data)
-            logger.info(f"✅ 新幻灯片创建成功: 数据库ID={new_slide.id}")
-            return new_slide
+            self.session.add(SlideData(**row))
+            await self.session.commit()
+        return True
     
     async def get_slides_by_project_id(self, project_id: str) -> List[SlideData]:
         """Get all slides for a project"""
@@ -484,71 +668,169 @@ class GlobalMasterTemplateRepository:
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
-    async def get_all_templates(self, active_only: bool = True) -> List[GlobalMasterTemplate]:
-        """Get all global master templates"""
-        stmt = select(GlobalMasterTemplate)
-        if active_only:
-            stmt = stmt.where(GlobalMasterTemplate.is_active == True)
-        stmt = stmt.order_by(GlobalMasterTemplate.is_default.desc(), GlobalMasterTemplate.usage_count.desc())
-        result = await self.session.execute(stmt)
-        return result.scalars().all()
-
-    async def get_templates_by_tags(self, tags: List[str], active_only: bool = True) -> List[GlobalMasterTemplate]:
-        """Get templates by tags"""
-        stmt = select(GlobalMasterTemplate)
-        if active_only:
-            stmt = stmt.where(GlobalMasterTemplate.is_active == True)
+    async def get_template_by_preview_image(self, preview_image: str) -> Optional[GlobalMasterTemplate]:
+        """Get a template currently pointing at the given preview image"""
+        stmt = select(GlobalMasterTemplate).where(GlobalMasterTemplate.preview_image == preview_image).limit(1)
+        result = await self.session.execute(stmt)
+        return result.scalars().first()
+
+    # 列表视图投影：不加载 html_template
+    LIST_COLUMNS = (
+        GlobalMasterTemplate.id,
+        GlobalMasterTemplate.template_name,
+        GlobalMasterTemplate.description,
+        GlobalMasterTemplate.preview_image,
+        GlobalMasterTemplate.tags,
+        GlobalMasterTemplate.is_default,
+        GlobalMasterTemplate.is_active,
+        GlobalMasterTemplate.usage_count,
+        GlobalMasterTemplate.created_by,
+        GlobalMasterTemplate.created_at,
+        GlobalMasterTemplate.updated_at,
+    )
+
+    FTS_TABLE = "global_master_templates_fts"
+
+    # FTS5 分词器：None 表示尚未检测，"" 表示不可用（非 SQLite 数据库）。
+    # 只缓存确定的结果：索引由迁移 009 创建，进程启动时可能尚不存在
+    _fts_tokenizer: Optional[str] = None
+
+    @classmethod
+    def reset_fts_tokenizer(cls):
+        """迁移创建或删除搜索索引后重新检测"""
+        cls._fts_tokenizer = None
+
+    async def _get_fts_tokenizer(self) -> str:
+        """检测 FTS5 搜索索引（迁移 009 创建）是否可用及其分词器"""
+        cls = type(self)
+        if cls._fts_tokenizer is not None:
+            return cls._fts_tokenizer
+
+        if self.session.bind.dialect.name != "sqlite":
+            cls._fts_tokenizer = ""
+            return ""
 
-        # Filter by tags (any tag matches)
-        for tag in tags:
-            stmt = stmt.where(GlobalMasterTemplate.tags.contains([tag]))
+        try:
+            result = await self.session.execute(
+                text("SELECT sql FROM sqlite_master WHERE name = :name"),
+                {"name": self.FTS_TABLE}
+            )
+            row = result.first()
+        except Exception as e:
+            logger.warning(f"Failed to detect template search index: {e}")
+            return ""
+
+        if row is None:
+            # 索引尚未创建：本次回退到 LIKE，下次搜索再检测
+            return ""
+        cls._fts_tokenizer = "trigram" if "trigram" in (row[0] or "").lower() else "unicode61"
+        return cls._fts_tokenizer
+
+    async def _search_filter(self, search: str):
+        """名称/描述/标签搜索条件：优先使用 FTS5 索引，不可用时回退到 LIKE"""
+        term = search.strip()
+        tokenizer = await self._get_fts_tokenizer()
+
+        match_query = None
+        if tokenizer == "trigram" and len(term) >= 3:
+            # trigram 分词下短语即子串匹配
+            match_query = '"' + term.replace('"', '""') + '"'
+        elif tokenizer == "unicode61":
+            tokens = [token.replace('"', '""') for token in term.split() if token]
+            match_query = " ".join(f'"{token}"*' for token in tokens) or None
+
+        if match_query is None:
+            return or_(
+                GlobalMasterTemplate.template_name.ilike(f"%{term}%"),
+                GlobalMasterTemplate.description.ilike(f"%{term}%")
+            )
 
-        stmt = stmt.order_by(GlobalMasterTemplate.usage_count.desc())
-        result = await self.session.execute(stmt)
-        return result.scalars().all()
+        fts_ids = select(literal_column("rowid")).select_from(table(self.FTS_TABLE)).where(
+            text(f"{self.FTS_TABLE} MATCH :fts_query").bindparams(fts_query=match_query)
+        )
+        return GlobalMasterTemplate.id.in_(fts_ids)
+
+    @staticmethod
+    def _tags_filter(tags: List[str]):
+        """标签过滤（须包含全部标签），走关联表索引而非扫描 JSON 列"""
+        unique_tags = list(dict.fromkeys(tag for tag in tags if tag))
+        matching_ids = (
+            select(GlobalMasterTemplateTag.template_id)
+            .where(GlobalMasterTemplateTag.tag.in_(unique_tags))
+            .group_by(GlobalMasterTemplateTag.template_id)
+            .having(func.count(func.distinct(GlobalMasterTemplateTag.tag)) == len(unique_tags))
+        )
+        return GlobalMasterTemplate.id.in_(matching_ids)
 
-    async def get_templates_paginated(
+    async def _list_templates(
         self,
-        active_only: bool = True,
-        offset: int = 0,
-        limit: int = 6,
-        search: Optional[str] = None
-    ) -> Tuple[List[GlobalMasterTemplate], int]:
-        """Get templates with pagination"""
-        from sqlalchemy import func, or_
-
-        # Base query
-        stmt = select(GlobalMasterTemplate)
-        count_stmt = select(func.count(GlobalMasterTemplate.id))
-
+        active_only: bool,
+        order_by: Tuple,
+        tags: Optional[List[str]] = None,
+        search: Optional[str] = None,
+        offset: Optional[int] = None,
+        limit: Optional[int] = None,
+        with_count: bool = False
+    ) -> Tuple[List[Row], int]:
+        """执行列表投影查询，返回 (行列表, 总数)"""
+        filters = []
         if active_only:
-            stmt = stmt.where(GlobalMasterTemplate.is_active == True)
-            count_stmt = count_stmt.where(GlobalMasterTemplate.is_active == True)
-
-        # Add search filter
+            filters.append(GlobalMasterTemplate.is_active == True)
+        if tags and any(tags):
+            filters.append(self._tags_filter(tags))
         if search and search.strip():
-            search_filter = or_(
-                GlobalMasterTemplate.template_name.ilike(f"%{search}%"),
-                GlobalMasterTemplate.description.ilike(f"%{search}%")
-            )
-            stmt = stmt.where(search_filter)
-            count_stmt = count_stmt.where(search_filter)
+            filters.append(await self._search_filter(search))
 
-        # Order and paginate
-        stmt = stmt.order_by(
-            GlobalMasterTemplate.is_default.desc(),
-            GlobalMasterTemplate.usage_count.desc()
-        ).offset(offset).limit(limit)
+        stmt = select(*self.LIST_COLUMNS).where(*filters).order_by(*order_by)
+        if offset is not None:
+            stmt = stmt.offset(offset)
+        if limit is not None:
+            stmt = stmt.limit(limit)
 
-        # Execute queries
         result = await self.session.execute(stmt)
-        count_result = await self.session.execute(count_stmt)
+        templates = result.all()
 
-        templates = result.scalars().all()
-        total_count = count_result.scalar()
+        total_count = len(templates)
+        if with_count:
+            count_stmt = select(func.count(GlobalMasterTemplate.id)).where(*filters)
+            total_count = (await self.session.execute(count_stmt)).scalar()
 
         return templates, total_count
 
+    async def get_all_templates(self, active_only: bool = True) -> List[Row]:
+        """Get all global master templates (list projection, without html_template)"""
+        templates, _ = await self._list_templates(
+            active_only,
+            order_by=(GlobalMasterTemplate.is_default.desc(), GlobalMasterTemplate.usage_count.desc())
+        )
+        return templates
+
+    async def get_templates_by_tags(self, tags: List[str], active_only: bool = True) -> List[Row]:
+        """Get templates by tags (list projection, without html_template)"""
+        templates, _ = await self._list_templates(
+            active_only,
+            order_by=(GlobalMasterTemplate.usage_count.desc(),),
+            tags=tags
+        )
+        return templates
+
+    async def get_templates_paginated(
+        self,
+        active_only: bool = True,
+        offset: int = 0,
+        limit: int = 6,
+        search: Optional[str] = None
+    ) -> Tuple[List[Row], int]:
+        """Get templates with pagination (list projection, without html_template)"""
+        return await self._list_templates(
+            active_only,
+            order_by=(GlobalMasterTemplate.is_default.desc(), GlobalMasterTemplate.usage_count.desc()),
+            search=search,
+            offset=offset,
+            limit=limit,
+            with_count=True
+        )
+
     async def get_templates_by_tags_paginated(
         self,
         tags: List[str],
@@ -556,44 +838,17 @@ class GlobalMasterTemplateRepository:
         offset: int = 0,
         limit: int = 6,
         search: Optional[str] = None
-    ) -> Tuple[List[GlobalMasterTemplate], int]:
-        """Get templates by tags with pagination"""
-        from sqlalchemy import func, or_
-
-        # Base query
-        stmt = select(GlobalMasterTemplate)
-        count_stmt = select(func.count(GlobalMasterTemplate.id))
-
-        if active_only:
-            stmt = stmt.where(GlobalMasterTemplate.is_active == True)
-            count_stmt = count_stmt.where(GlobalMasterTemplate.is_active == True)
-
-        # Filter by tags (any tag matches)
-        for tag in tags:
-            tag_filter = GlobalMasterTemplate.tags.contains([tag])
-            stmt = stmt.where(tag_filter)
-            count_stmt = count_stmt.where(tag_filter)
-
-        # Add search filter
-        if search and search.strip():
-            search_filter = or_(
-                GlobalMasterTemplate.template_name.ilike(f"%{search}%"),
-                GlobalMasterTemplate.description.ilike(f"%{search}%")
-            )
-            stmt = stmt.where(search_filter)
-            count_stmt = count_stmt.where(search_filter)
-
-        # Order and paginate
-        stmt = stmt.order_by(GlobalMasterTemplate.usage_count.desc()).offset(offset).limit(limit)
-
-        # Execute queries
-        result = await self.session.execute(stmt)
-        count_result = await self.session.execute(count_stmt)
-
-        templates = result.scalars().all()
-        total_count = count_result.scalar()
-
-        return templates, total_count
+    ) -> Tuple[List[Row], int]:
+        """Get templates by tags with pagination (list projection, without html_template)"""
+        return await self._list_templates(
+            active_only,
+            order_by=(GlobalMasterTemplate.usage_count.desc(),),
+            tags=tags,
+            search=search,
+            offset=offset,
+            limit=limit,
+            with_count=True
+        )
 
     async def update_template(self, template_id: int, update_data: Dict[str, Any]) -> bool:
         """Update a global master template"""
@@ -619,6 +874,24 @@ class GlobalMasterTemplateRepository:
             await self.session.rollback()
             raise
 
+    async def set_preview_image(self, template_id: int, preview_image: str) -> bool:
+        """Set the rendered preview image without touching updated_at (not a content change)"""
+        stmt = update(GlobalMasterTemplate).where(GlobalMasterTemplate.id == template_id).values(
+            preview_image=preview_image
+        )
+        result = await self.session.execute(stmt)
+        await self.session.commit()
+        return result.rowcount > 0
+
+    async def replace_preview_image(self, old_preview_image: str, new_preview_image: str) -> int:
+        """Point every template using ``old_preview_image`` at ``new_preview_image``"""
+        stmt = update(GlobalMasterTemplate).where(GlobalMasterTemplate.preview_image == old_preview_image).values(
+            preview_image=new_preview_image
+        )
+        result = await self.session.execute(stmt)
+        await self.session.commit()
+        return result.rowcount
+
     async def increment_usage_count(self, template_id: int) -> bool:
         """Increment template usage count"""
         stmt = update(GlobalMasterTemplate).where(GlobalMasterTemplate.id == template_id).values(
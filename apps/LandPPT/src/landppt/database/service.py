@@ -4,17 +4,25 @@ Database service layer for converting between database models and API models
 
 import time
 import uuid
+import asyncio
 import logging
 from typing import List, Optional, Dict, Any, Tuple
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
 
+# 写入遇到 "database is locked" 时的重试次数和初始退避（秒）
+LOCK_RETRY_ATTEMPTS = 5
+LOCK_RETRY_BASE_DELAY = 0.1
+
 from .repositories import (
     ProjectRepository, TodoBoardRepository, TodoStageRepository,
     ProjectVersionRepository, SlideDataRepository, PPTTemplateRepository, GlobalMasterTemplateRepository
 )
 from .models import Project as DBProject, TodoBoard as DBTodoBoard, TodoStage as DBTodoStage, PPTTemplate as DBPPTTemplate, GlobalMasterTemplate as DBGlobalMasterTemplate
+from .models import SlideData as DBSlideData
+from .writer import database_writer
 from ..api.models import (
     PPTProject, TodoBoard, TodoStage, ProjectListResponse,
     PPTGenerationRequest
@@ -369,76 +377,110 @@ class DatabaseService:
         result = await self.project_repo.update(project_id, update_data)
         return result is not None
 
+    async def _refresh_loaded(self, model, **match):
+        """写入由独立的写连接提交：刷新本会话中已加载的对应对象
+
+        不提交也不回滚调用方的会话，以免提交或丢弃调用方尚未完成的修改；
+        有未刷新修改的对象保持原样。
+        """
+        for obj in list(self.session.identity_map.values()):
+            if obj in self.session.dirty:
+                continue
+            if isinstance(obj, model) and all(getattr(obj, key, None) == value for key, value in match.items()):
+                await self.session.refresh(obj)
+
+    async def _retry_on_locked(self, operation, description: str, uses_session: bool = False):
+        """执行写操作，遇到 "database is locked" 时指数退避重试
+
+        单写者队列只覆盖部分写入，其他写入仍经由普通会话提交，两者之间仍可能互相锁住。
+        """
+        for attempt in range(LOCK_RETRY_ATTEMPTS):
+            try:
+                return await operation()
+            except Exception as e:
+                if "database is locked" not in str(e).lower() or attempt == LOCK_RETRY_ATTEMPTS - 1:
+                    raise
+                if uses_session:
+                    # 失败的语句使会话处于待回滚状态，重试前需回滚
+                    await self.session.rollback()
+                delay = LOCK_RETRY_BASE_DELAY * (2 ** attempt)
+                logger.warning(f"⏳ 数据库锁定（{description}），{delay:.2f}秒后重试... (尝试 {attempt + 1}/{LOCK_RETRY_ATTEMPTS})")
+                await asyncio.sleep(delay)
+
     async def save_single_slide(self, project_id: str, slide_index: int, slide_data: Dict[str, Any], skip_if_user_edited: bool = False) -> bool:
-        """Save a single slide to database immediately with retry logic for SQLite locks
-        
+        """Save a single slide to database immediately
+
+        SQLite 下写入交给单写者队列，与同时到达的其他幻灯片合并到一个事务提交；
+        与其他连接的写入冲突时仍按 "database is locked" 退避重试。
+
         Args:
             skip_if_user_edited: If True, skip updating slides that have is_user_edited=True.
                                  Generator should pass True, editor should pass False.
         """
-        import asyncio
-        
-        max_retries = 5
-        base_delay = 0.1  # 100ms
-        
-        for attempt in range(max_retries):
-            try:
-                logger.debug(f"🔄 数据库服务开始保存幻灯片: 项目ID={project_id}, 索引={slide_index}, 尝试={attempt + 1}")
-
-                # 验证输入参数
-                if not project_id:
-                    raise ValueError("项目ID不能为空")
-                if slide_index < 0:
-                    raise ValueError(f"幻灯片索引不能为负数: {slide_index}")
-                if not slide_data:
-                    raise ValueError("幻灯片数据不能为空")
+        try:
+            logger.debug(f"🔄 数据库服务开始保存幻灯片: 项目ID={project_id}, 索引={slide_index}")
+
+            # 验证输入参数
+            if not project_id:
+                raise ValueError("项目ID不能为空")
+            if slide_index < 0:
+                raise ValueError(f"幻灯片索引不能为负数: {slide_index}")
+            if not slide_data:
+                raise ValueError("幻灯片数据不能为空")
+
+            # Prepare slide record for database
+            slide_record = {
+                "project_id": project_id,
+                "slide_index": slide_index,
+                "slide_id": slide_data.get("slide_id", f"slide_{slide_index}"),
+                "title": slide_data.get("title", f"Slide {slide_index + 1}"),
+                "content_type": slide_data.get("content_type", "content"),
+                "html_content": slide_data.get("html_content", ""),
+                "slide_metadata": slide_data.get("metadata", {}),
+                "is_user_edited": slide_data.get("is_user_edited", False)
+            }
 
-                # Prepare slide record for database
-                slide_record = {
-                    "project_id": project_id,
-                    "slide_index": slide_index,
-                    "slide_id": slide_data.get("slide_id", f"slide_{slide_index}"),
-                    "title": slide_data.get("title", f"Slide {slide_index + 1}"),
-                    "content_type": slide_data.get("content_type", "content"),
-                    "html_content": slide_data.get("html_content", ""),
-                    "slide_metadata": slide_data.get("metadata", {}),
-                    "is_user_edited": slide_data.get("is_user_edited", False)
-                }
+            logger.debug(f"📊 准备保存的幻灯片记录: 标题='{slide_record['title']}', 跳过用户编辑={skip_if_user_edited}")
 
-                logger.debug(f"📊 准备保存的幻灯片记录: 标题='{slide_record['title']}', 跳过用户编辑={skip_if_user_edited}")
+            description = f"保存幻灯片 {project_id}#{slide_index}"
+            if database_writer.enabled:
+                success = await self._retry_on_locked(
+                    lambda: database_writer.upsert_slide(slide_record, skip_if_user_edited=skip_if_user_edited),
+                    description
+                )
+                await self._refresh_loaded(DBSlideData, project_id=project_id, slide_index=slide_index)
+            else:
+                success = await self._retry_on_locked(
+                    lambda: self.slide_repo.upsert_slide(project_id, slide_index, slide_record, skip_if_user_edited=skip_if_user_edited),
+                    description,
+                    uses_session=True
+                )
 
-                # Use upsert to insert or update the slide, passing skip_if_user_edited
-                result_slide = await self.slide_repo.upsert_slide(project_id, slide_index, slide_record, skip_if_user_edited=skip_if_user_edited)
+            if success:
+                logger.debug(f"✅ 幻灯片保存成功: 项目ID={project_id}, 索引={slide_index}")
+            else:
+                logger.error(f"❌ 幻灯片保存失败: 项目ID={project_id}, 索引={slide_index}")
+            return success
 
-                if result_slide:
-                    logger.debug(f"✅ 幻灯片保存成功: 项目ID={project_id}, 索引={slide_index}, 数据库ID={result_slide.id}")
-                    return True
-                else:
-                    logger.error(f"❌ 幻灯片保存失败: upsert_slide返回None")
-                    return False
-                    
-            except Exception as e:
-                error_str = str(e).lower()
-                # Check if it's a database locked error - retry with backoff
-                if "database is locked" in error_str or "locked" in error_str:
-                    if attempt < max_retries - 1:
-                        delay = base_delay * (2 ** attempt)  # Exponential backoff
-                        logger.warning(f"⏳ 数据库锁定，{delay:.2f}秒后重试... (尝试 {attempt + 1}/{max_retries})")
-                        await asyncio.sleep(delay)
-                        continue
-                
-                logger.error(f"❌ 保存单个幻灯片失败: 项目ID={project_id}, 索引={slide_index}, 错误={str(e)}")
-                import traceback
-                logger.error(f"❌ 错误堆栈: {traceback.format_exc()}")
-                return False
-        
-        logger.error(f"❌ 保存单个幻灯片失败: 重试次数用尽, 项目ID={project_id}, 索引={slide_index}")
-        return False
+        except Exception as e:
+            logger.error(f"❌ 保存单个幻灯片失败: 项目ID={project_id}, 索引={slide_index}, 错误={str(e)}")
+            import traceback
+            logger.error(f"❌ 错误堆栈: {traceback.format_exc()}")
+            return False
 
     async def update_project(self, project_id: str, update_data: Dict[str, Any]) -> bool:
         """Update project data"""
         try:
-            result = await self.project_repo.update(project_id, update_data)
+            description = f"更新项目 {project_id}"
+            if database_writer.enabled:
+                success = await self._retry_on_locked(
+                    lambda: database_writer.update_project(project_id, update_data), description
+                )
+                await self._refresh_loaded(DBProject, project_id=project_id)
+                return success
+            result = await self._retry_on_locked(
+                lambda: self.project_repo.update(project_id, update_data), description, uses_session=True
+            )
             return result is not None
         except Exception as e:
             logger.error(f"Failed to update project {project_id}: {e}")
@@ -448,7 +490,11 @@ class DatabaseService:
         """Update the user edited status for a specific slide"""
         try:
             # Update the slide in slide_data table
-            await self.slide_repo.update_slide_user_edited_status(project_id, slide_index, is_user_edited)
+            await self._retry_on_locked(
+                lambda: self.slide_repo.update_slide_user_edited_status(project_id, slide_index, is_user_edited),
+                f"更新幻灯片编辑状态 {project_id}#{slide_index}",
+                uses_session=True
+            )
 
             # Also update the slides_data in the project
             project = await self.project_repo.get_by_id(project_id)
@@ -463,23 +509,34 @@ class DatabaseService:
 
     async def save_project_version(self, project_id: str, version_data: Dict[str, Any]) -> bool:
         """Save a project version"""
-        project = await self.project_repo.get_by_id(project_id)
-        if not project:
+        result = await self.session.execute(
+            select(DBProject.version).where(DBProject.project_id == project_id)
+        )
+        current_version = result.scalar_one_or_none()
+        if current_version is None:
             return False
-        
+
         version_info = {
             "project_id": project_id,
-            "version": project.version,
+            "version": current_version,
             "timestamp": time.time(),
             "data": version_data,
-            "description": f"Version {project.version} - {time.strftime('%Y-%m-%d %H:%M:%S')}"
+            "description": f"Version {current_version} - {time.strftime('%Y-%m-%d %H:%M:%S')}"
         }
-        
+
         await self.version_repo.create(version_info)
-        await self.project_repo.update(project_id, {"version": project.version + 1})
-        
+        await self.project_repo.update(project_id, {"version": current_version + 1})
+
         return True
 
+    async def get_project_versions(self, project_id: str, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """List project versions (metadata only, newest first)"""
+        return await self.version_repo.list_versions(project_id, limit=limit, offset=offset)
+
+    async def get_project_version_data(self, project_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """Rebuild the snapshot stored for a project version"""
+        return await self.version_repo.get_version_data(project_id, version)
+
     # PPT Template methods
     async def create_template(self, template_data: Dict[str, Any]) -> DBPPTTemplate:
         """Create a new PPT template"""
@@ -538,12 +595,12 @@ class DatabaseService:
         return await template_repo.get_template_by_name(template_name)
 
     async def get_all_global_master_templates(self, active_only: bool = True) -> List[DBGlobalMasterTemplate]:
-        """Get all global master templates"""
+        """Get all global master templates (list projection rows, without html_template)"""
         template_repo = GlobalMasterTemplateRepository(self.session)
         return await template_repo.get_all_templates(active_only)
 
     async def get_global_master_templates_by_tags(self, tags: List[str], active_only: bool = True) -> List[DBGlobalMasterTemplate]:
-        """Get global master templates by tags"""
+        """Get global master templates by tags (list projection rows, without html_template)"""
         template_repo = GlobalMasterTemplateRepository(self.session)
         return await template_repo.get_templates_by_tags(tags, active_only)
 
@@ -554,7 +611,7 @@ class DatabaseService:
         limit: int = 6,
         search: Optional[str] = None
     ) -> Tuple[List[DBGlobalMasterTemplate], int]:
-        """Get global master templates with pagination"""
+        """Get global master templates with pagination (list projection rows, without html_template)"""
         template_repo = GlobalMasterTemplateRepository(self.session)
         return await template_repo.get_templates_paginated(active_only, offset, limit, search)
 
@@ -566,7 +623,7 @@ class DatabaseService:
         limit: int = 6,
         search: Optional[str] = None
     ) -> Tuple[List[DBGlobalMasterTemplate], int]:
-        """Get global master templates by tags with pagination"""
+        """Get global master templates by tags with pagination (list projection rows, without html_template)"""
         template_repo = GlobalMasterTemplateRepository(self.session)
         return await template_repo.get_templates_by_tags_paginated(tags, active_only, offset, limit, search)
 
@@ -575,6 +632,21 @@ class DatabaseService:
         template_repo = GlobalMasterTemplateRepository(self.session)
         return await template_repo.update_template(template_id, update_data)
 
+    async def get_global_master_template_by_preview(self, preview_image: str) -> Optional[DBGlobalMasterTemplate]:
+        """Get the global master template that points at a preview image"""
+        template_repo = GlobalMasterTemplateRepository(self.session)
+        return await template_repo.get_template_by_preview_image(preview_image)
+
+    async def set_global_master_template_preview(self, template_id: int, preview_image: str) -> bool:
+        """Set a global master template's rendered preview image"""
+        template_repo = GlobalMasterTemplateRepository(self.session)
+        return await template_repo.set_preview_image(template_id, preview_image)
+
+    async def replace_global_master_template_preview(self, old_preview_image: str, new_preview_image: str) -> int:
+        """Point every global master template using an old preview image at a new one"""
+        template_repo = GlobalMasterTemplateRepository(self.session)
+        return await template_repo.replace_preview_image(old_preview_image, new_preview_image)
+
     async def delete_global_master_template(self, template_id: int) -> bool:
         """Delete a global master template"""
         template_repo = GlobalMasterTemplateRepository(self.session)
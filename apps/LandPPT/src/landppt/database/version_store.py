@@ -0,0 +1,174 @@
+"""
+Project version storage encoding
+
+版本快照拆分为内容寻址的压缩 blob（按 sha256 去重）和一个小的 manifest：
+- 顶层字段各自序列化为一个 blob，过小的值直接内联到 manifest
+- ``slides_data`` 中的每张幻灯片单独成 blob，未修改的幻灯片在各版本间只存一份
+- 每隔 KEYFRAME_INTERVAL 个版本保存一次完整 manifest（关键帧），其余版本只保存
+  相对上一版本的 manifest 差异，恢复任意版本最多回放 KEYFRAME_INTERVAL 个差异
+"""
+
+import hashlib
+import json
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+# storage_format 取值
+LEGACY_FORMAT = 1  # data 列保存完整 JSON 快照
+MANIFEST_FORMAT = 2  # manifest + 内容寻址 blob
+
+KEYFRAME_INTERVAL = 10
+INLINE_MAX_BYTES = 256
+SLIDES_FIELD = "slides_data"
+
+# 每个 blob: hash -> (codec, raw_size, compressed_bytes)
+BlobMap = Dict[str, Tuple[str, int, bytes]]
+
+
+def _encode_json(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def compress(raw: bytes) -> Tuple[str, bytes]:
+    """压缩 blob，优先使用 zstd，未安装时回退到 zlib"""
+    if ZSTD_AVAILABLE:
+        return "zstd", zstandard.ZstdCompressor(level=9).compress(raw)
+    return "zlib", zlib.compress(raw, 9)
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard is required to read this project version")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown version blob codec: {codec}")
+
+
+def _make_ref(value: Any, blobs: BlobMap) -> Any:
+    """值过小则内联为 {"v": value}，否则写入 blob 并返回其哈希"""
+    raw = _encode_json(value)
+    if len(raw) <= INLINE_MAX_BYTES:
+        return {"v": value}
+    digest = hashlib.sha256(raw).hexdigest()
+    if digest not in blobs:
+        codec, compressed = compress(raw)
+        blobs[digest] = (codec, len(raw), compressed)
+    return digest
+
+
+def build_manifest(data: Dict[str, Any]) -> Tuple[Dict[str, Any], BlobMap]:
+    """将版本快照拆分为完整 manifest 和需要写入的 blob"""
+    blobs: BlobMap = {}
+    manifest: Dict[str, Any] = {"fields": {}}
+    for key, value in data.items():
+        if key == SLIDES_FIELD and isinstance(value, list):
+            manifest["slides"] = [_make_ref(slide, blobs) for slide in value]
+        else:
+            manifest["fields"][key] = _make_ref(value, blobs)
+    return manifest, blobs
+
+
+def diff_manifest(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """计算 current 相对 previous 的 manifest 差异"""
+    prev_fields = previous.get("fields", {})
+    cur_fields = current.get("fields", {})
+    delta: Dict[str, Any] = {
+        "fields": {key: ref for key, ref in cur_fields.items() if prev_fields.get(key) != ref},
+        "removed": [key for key in prev_fields if key not in cur_fields],
+    }
+
+    prev_slides = previous.get("slides")
+    cur_slides = current.get("slides")
+    if cur_slides is None:
+        if prev_slides is not None:
+            delta["slides"] = None
+    else:
+        prev_slides = prev_slides or []
+        delta["slides"] = {
+            "length": len(cur_slides),
+            "changed": {
+                str(index): ref for index, ref in enumerate(cur_slides)
+                if index >= len(prev_slides) or prev_slides[index] != ref
+            },
+        }
+    return delta
+
+
+def apply_delta(base: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """在完整 manifest 上回放一个差异，返回新的完整 manifest"""
+    fields = dict(base.get("fields", {}))
+    for key in delta.get("removed", []):
+        fields.pop(key, None)
+    fields.update(delta.get("fields", {}))
+    manifest: Dict[str, Any] = {"fields": fields}
+
+    if "slides" in delta:
+        slides_delta = delta["slides"]
+        if slides_delta is not None:
+            slides = list(base.get("slides") or [])[:slides_delta["length"]]
+            slides.extend([None] * (slides_delta["length"] - len(slides)))
+            for index, ref in slides_delta["changed"].items():
+                slides[int(index)] = ref
+            manifest["slides"] = slides
+    elif "slides" in base:
+        manifest["slides"] = list(base["slides"])
+    return manifest
+
+
+def manifest_blob_hashes(manifest: Dict[str, Any]) -> List[str]:
+    """manifest 引用的全部 blob 哈希"""
+    refs: Iterable[Any] = list(manifest.get("fields", {}).values()) + list(manifest.get("slides") or [])
+    return sorted({ref for ref in refs if isinstance(ref, str)})
+
+
+def stored_blob_hashes(stored: Dict[str, Any]) -> List[str]:
+    """版本行中保存的 manifest（完整 manifest 或差异）直接引用的 blob 哈希
+
+    回放出的任意完整 manifest 中的哈希都由链上某一行引入，因此全部版本行的并集
+    就是仍被引用的 blob 集合。
+    """
+    refs: List[Any] = list((stored or {}).get("fields", {}).values())
+    slides = (stored or {}).get("slides")
+    if isinstance(slides, dict):
+        refs.extend(slides.get("changed", {}).values())
+    elif slides:
+        refs.extend(slides)
+    return sorted({ref for ref in refs if isinstance(ref, str)})
+
+
+def _resolve_ref(ref: Any, blob_values: Dict[str, Any]) -> Any:
+    if isinstance(ref, dict):
+        return ref.get("v")
+    return blob_values[ref]
+
+
+def materialize(manifest: Dict[str, Any], blob_rows: Iterable[Tuple[str, str, bytes]]) -> Dict[str, Any]:
+    """根据完整 manifest 和 (hash, codec, data) 行重建版本快照"""
+    blob_values = {
+        digest: json.loads(decompress(codec, data).decode("utf-8"))
+        for digest, codec, data in blob_rows
+    }
+    data = {key: _resolve_ref(ref, blob_values) for key, ref in manifest.get("fields", {}).items()}
+    if manifest.get("slides") is not None:
+        data[SLIDES_FIELD] = [_resolve_ref(ref, blob_values) for ref in manifest["slides"]]
+    return data
+
+
+def rebuild_manifest(chain: List[Tuple[bool, Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """从关键帧开始按顺序回放 (is_keyframe, manifest) 链，返回最终完整 manifest"""
+    manifest: Optional[Dict[str, Any]] = None
+    for is_keyframe, stored in chain:
+        if is_keyframe or manifest is None:
+            manifest = stored
+        else:
+            manifest = apply_delta(manifest, stored)
+    return manifest
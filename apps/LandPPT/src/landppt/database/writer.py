@@ -0,0 +1,215 @@
+"""
+Single-writer persistence layer for SQLite
+
+SQLite allows one writer at a time; concurrent sessions committing slides in
+parallel used to collide on "database is locked". DatabaseWriter owns the only
+write connection (writer_engine) and drains a queue of slide upserts and
+project updates, merging everything queued at that moment into one transaction.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import update
+
+from .database import writer_engine
+from .models import Project, SlideData
+from .repositories import SlideDataRepository
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _WriteOp:
+    """A queued write and the future its caller is waiting on"""
+    kind: str  # 'slide' | 'project'
+    payload: Dict[str, Any]
+    skip_if_user_edited: bool = False
+    future: Optional[asyncio.Future] = field(default=None, repr=False)
+
+
+class DatabaseWriter:
+    """Dedicated writer task owning the SQLite write connection"""
+
+    def __init__(self, engine=writer_engine, max_batch: int = 256, batch_window: float = 0.005,
+                 rows_per_statement: int = 50):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        # 每行约 10 个绑定参数，控制在 SQLite 变量上限以内
+        self.rows_per_statement = rows_per_statement
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self._stats = {
+            'ops': 0,
+            'batches': 0,
+            'statements': 0,
+            'merged': 0,
+            'max_batch_size': 0,
+            'fallbacks': 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.engine is not None
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._task = loop.create_task(self._run(self._queue))
+
+    async def _submit(self, op: _WriteOp):
+        self._ensure_started()
+        op.future = asyncio.get_running_loop().create_future()
+        await self._queue.put(op)
+        return await op.future
+
+    async def upsert_slide(self, slide_record: Dict[str, Any], skip_if_user_edited: bool = False) -> bool:
+        """Queue a slide upsert; resolves after the transaction containing it commits"""
+        current_time = time.time()
+        row = {key: value for key, value in slide_record.items() if key in SlideData.__table__.columns}
+        row.setdefault('created_at', current_time)
+        row['updated_at'] = current_time
+        return await self._submit(_WriteOp('slide', row, skip_if_user_edited))
+
+    async def update_project(self, project_id: str, update_data: Dict[str, Any]) -> bool:
+        """Queue a project column update; returns False if the project does not exist"""
+        values = {key: value for key, value in update_data.items() if key in Project.__table__.columns}
+        values['project_id'] = project_id
+        return await self._submit(_WriteOp('project', values))
+
+    async def _run(self, queue: asyncio.Queue):
+        while True:
+            op = await queue.get()
+            if op is None:
+                break
+
+            batch = [op]
+            stop_after = False
+            # 短暂等待，合并同一时刻并发提交的写入
+            if self.batch_window > 0:
+                await asyncio.sleep(self.batch_window)
+            while len(batch) < self.max_batch:
+                try:
+                    next_op = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if next_op is None:
+                    stop_after = True
+                    break
+                batch.append(next_op)
+
+            await self._process_batch(batch)
+            if stop_after:
+                break
+
+    async def _process_batch(self, batch: List[_WriteOp]):
+        self._stats['ops'] += len(batch)
+        self._stats['batches'] += 1
+        self._stats['max_batch_size'] = max(self._stats['max_batch_size'], len(batch))
+
+        try:
+            results = await self._apply(batch)
+        except Exception as e:
+            # 合并事务失败时逐条重试，只让出错的写入失败
+            logger.warning(f"Batched write of {len(batch)} operations failed, retrying individually: {e}")
+            self._stats['fallbacks'] += 1
+            for op in batch:
+                try:
+                    result = (await self._apply([op]))[0]
+                    self._resolve(op, result)
+                except Exception as op_error:
+                    if not op.future.done():
+                        op.future.set_exception(op_error)
+            return
+
+        for op, result in zip(batch, results):
+            self._resolve(op, result)
+
+    @staticmethod
+    def _resolve(op: _WriteOp, result: bool):
+        if not op.future.done():
+            op.future.set_result(result)
+
+    def _group(self, batch: List[_WriteOp]) -> List[Tuple[Tuple, List[int]]]:
+        """Group consecutive compatible operations, preserving submission order"""
+        groups: List[Tuple[Tuple, List[int]]] = []
+        for index, op in enumerate(batch):
+            if op.kind == 'slide':
+                key = ('slide', op.skip_if_user_edited, tuple(sorted(op.payload.keys())))
+            else:
+                key = ('project', op.payload['project_id'])
+            if groups and groups[-1][0] == key:
+                groups[-1][1].append(index)
+            else:
+                groups.append((key, [index]))
+        return groups
+
+    async def _apply(self, batch: List[_WriteOp]) -> List[bool]:
+        results = [True] * len(batch)
+
+        async with self.engine.begin() as conn:
+            for key, indexes in self._group(batch):
+                if key[0] == 'slide':
+                    # 同一幻灯片的多次写入只保留最后一次
+                    rows: Dict[Tuple[str, int], Dict[str, Any]] = {}
+                    for index in indexes:
+                        payload = batch[index].payload
+                        rows[(payload['project_id'], payload['slide_index'])] = payload
+                    self._stats['merged'] += len(indexes) - len(rows)
+
+                    row_list = list(rows.values())
+                    for start in range(0, len(row_list), self.rows_per_statement):
+                        stmt = SlideDataRepository.build_upsert_statement(
+                            row_list[start:start + self.rows_per_statement],
+                            skip_if_user_edited=key[1]
+                        )
+                        await conn.execute(stmt)
+                        self._stats['statements'] += 1
+                else:
+                    values: Dict[str, Any] = {}
+                    for index in indexes:
+                        values.update(batch[index].payload)
+                    project_id = values.pop('project_id')
+                    values['updated_at'] = time.time()
+                    self._stats['merged'] += len(indexes) - 1
+
+                    result = await conn.execute(
+                        update(Project).where(Project.project_id == project_id).values(**values)
+                    )
+                    self._stats['statements'] += 1
+                    if result.rowcount == 0:
+                        logger.warning(f"No project found with ID {project_id} for update")
+                        for index in indexes:
+                            results[index] = False
+
+        return results
+
+    async def stop(self):
+        """Flush pending writes and stop the writer task"""
+        if self._task is None or self._task.done():
+            return
+        await self._queue.put(None)
+        try:
+            await self._task
+        finally:
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats['enabled'] = self.enabled
+        stats['pending'] = self._queue.qsize() if self._queue is not None else 0
+        stats['statements_per_op'] = stats['statements'] / stats['ops'] if stats['ops'] else 0.0
+        return stats
+
+
+database_writer = DatabaseWriter()
@@ -21,7 +21,7 @@ from .api.usage_api import router as usage_router
 
 from .web import router as web_router
 from .auth import auth_router, create_auth_middleware
-from .database.database import init_db
+from .database.database import init_db, close_db
 from .database.create_default_template import ensure_default_templates_exist_first_time
 
 # Configure logging
@@ -72,6 +72,10 @@ async def startup_event():
         else:
             logger.info("Database already exists - skipping template import")
 
+        # Resume background tasks interrupted by the previous shutdown or crash
+        from .services.background_tasks import start_task_manager
+        await start_task_manager()
+
     except Exception as e:
         logger.error(f"Failed to initialize application: {e}")
         raise
@@ -82,6 +86,11 @@ async def shutdown_event():
     """Clean up database connections on shutdown"""
     try:
         logger.info("Shutting down application...")
+        from .services.background_tasks import shutdown_task_manager
+        await shutdown_task_manager()
+        from .services.research.content_extractor import close_http_session
+        await close_http_session()
+        await close_db()
         logger.info("Application shutdown complete")
     except Exception as e:
         logger.error(f"Error during shutdown: {e}")
@@ -1,17 +1,35 @@
 """
 后台任务管理器
 用于处理耗时的异步任务，如PDF转PPTX转换
+
+任务状态保存在SQLite任务表中（见 task_store），服务重启后仍可查询。两种提交方式：
+- ``enqueue_task``: 按任务类型分发到已注册的处理器，payload可持久化，执行中的任务持有租约并定期心跳，
+  进程崩溃后租约过期，任务会被重新领取执行（带重试次数上限和退避）
+- ``submit_task``: 直接执行进程内的函数/闭包，状态同样持久化，但闭包无法跨进程恢复，
+  中断后会被标记为失败
+
+事件循环中的任务表读写都交给管理器专用的单线程执行器：SQLite写锁被其他进程占用时
+不会阻塞事件循环，且同一任务的进度和终态按提交顺序写入。
 """
 
 import asyncio
+import functools
 import logging
+import os
+import socket
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from enum import Enum
-from typing import Dict, Optional, Any, Callable
+from typing import Awaitable, Dict, List, Optional, Any, Callable
 from dataclasses import dataclass, field
 import traceback
 
+from .task_events import progress_channel
+from .task_store import TaskStore, get_task_store
+from ..utils.process_pool import run_cpu_bound
+
 logger = logging.getLogger(__name__)
 
 
@@ -36,15 +54,118 @@ class BackgroundTask:
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
     metadata: Dict[str, Any] = field(default_factory=dict)
+    attempts: int = 0
+    max_attempts: int = 1
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "BackgroundTask":
+        return cls(
+            task_id=record["task_id"],
+            task_type=record["task_type"],
+            status=TaskStatus(record["status"]),
+            progress=record["progress"] or 0.0,
+            result=record["result"],
+            error=record["error"],
+            created_at=datetime.fromtimestamp(record["created_at"]),
+            updated_at=datetime.fromtimestamp(record["updated_at"]),
+            metadata=record["metadata"] or {},
+            attempts=record["attempts"],
+            max_attempts=record["max_attempts"]
+        )
+
+
+@dataclass
+class TaskHandler:
+    """已注册的任务类型处理器
+
+    cpu_bound为False时 ``func(ctx, payload)`` 是协程函数，在事件循环中执行；
+    为True时 ``func(payload)`` 是模块级同步函数，整体在进程池中执行。
+    """
+    task_type: str
+    func: Callable
+    cpu_bound: bool = False
+    max_attempts: Optional[int] = None
+    on_failure: Optional[Callable[[Dict[str, Any]], None]] = None
+
+
+class TaskContext:
+    """传给处理器的执行上下文"""
+
+    def __init__(self, manager: "BackgroundTaskManager", record: Dict[str, Any]):
+        self.manager = manager
+        self.task_id = record["task_id"]
+        self.attempt = record["attempts"]
+        self.metadata = record["metadata"] or {}
+
+    def report_progress(self, progress: float):
+        """上报进度（0-100）；立即返回，写入在存储线程中按顺序完成"""
+        self.manager.report_progress(self.task_id, progress)
+
+    async def run_cpu_bound(self, func: Callable, *args, **kwargs) -> Any:
+        """在进程池中执行CPU密集型步骤"""
+        return await run_cpu_bound(func, *args, **kwargs)
 
 
 class BackgroundTaskManager:
     """后台任务管理器"""
 
-    def __init__(self):
-        self.tasks: Dict[str, BackgroundTask] = {}
+    def __init__(self, store: Optional[TaskStore] = None):
+        self._store = store
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.handlers: Dict[str, TaskHandler] = {}
         self.running_tasks: Dict[str, asyncio.Task] = {}
 
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+        self._claimed: set = set()
+        self._lost_leases: set = set()
+        self._last_recovery = 0.0
+        self._last_cleanup = 0.0
+        # 单线程：任务表写入保持提交顺序，也不会与彼此争用SQLite写锁
+        self._store_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task_store")
+
+    @property
+    def store(self) -> TaskStore:
+        if self._store is None:
+            self._store = get_task_store()
+        return self._store
+
+    def _store_call(self, func: Callable, *args, **kwargs) -> Awaitable:
+        """在存储线程中执行任务表操作，避免SQLite锁等待阻塞事件循环"""
+        return asyncio.get_running_loop().run_in_executor(
+            self._store_executor, functools.partial(func, *args, **kwargs)
+        )
+
+    @staticmethod
+    def _config():
+        from ..core.config import app_config
+        return app_config
+
+    @property
+    def lease_seconds(self) -> float:
+        return max(5.0, float(self._config().background_task_lease_seconds))
+
+    def register_handler(
+        self,
+        task_type: str,
+        func: Callable,
+        cpu_bound: bool = False,
+        max_attempts: Optional[int] = None,
+        on_failure: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        """注册任务类型处理器
+
+        Args:
+            task_type: 任务类型
+            func: 处理器，见 TaskHandler
+            cpu_bound: 是否整体在进程池中执行
+            max_attempts: 最大执行次数，默认取配置
+            on_failure: 最终失败时以payload调用的清理函数
+        """
+        self.handlers[task_type] = TaskHandler(task_type, func, cpu_bound, max_attempts, on_failure)
+
     def create_task(self, task_type: str, metadata: Optional[Dict[str, Any]] = None) -> str:
         """创建新任务
 
@@ -56,18 +177,24 @@ class BackgroundTaskManager:
             任务ID
         """
         task_id = str(uuid.uuid4())
-        task = BackgroundTask(
-            task_id=task_id,
-            task_type=task_type,
-            metadata=metadata or {}
-        )
-        self.tasks[task_id] = task
+        self.store.insert_task(task_id, task_type, TaskStatus.PENDING.value, metadata=metadata)
         logger.info(f"创建后台任务: {task_id} (类型: {task_type})")
         return task_id
 
     def get_task(self, task_id: str) -> Optional[BackgroundTask]:
         """获取任务信息"""
-        return self.tasks.get(task_id)
+        record = self.store.get_task(task_id)
+        return BackgroundTask.from_record(record) if record else None
+
+    async def get_task_async(self, task_id: str) -> Optional[BackgroundTask]:
+        """获取任务信息（在存储线程中查询，供请求处理等协程使用）"""
+        record = await self._store_call(self.store.get_task, task_id)
+        return BackgroundTask.from_record(record) if record else None
+
+    def _publish(self, task_id: str, status: TaskStatus, **fields):
+        event = {"type": "background_task", "status": status.value}
+        event.update({key: value for key, value in fields.items() if value is not None})
+        progress_channel.publish(task_id, event)
 
     def update_task_status(
         self,
@@ -78,22 +205,36 @@ class BackgroundTaskManager:
         error: Optional[str] = None
     ):
         """更新任务状态"""
-        if task_id not in self.tasks:
+        fields: Dict[str, Any] = {"status": status.value}
+        if progress is not None:
+            fields["progress"] = progress
+        if result is not None:
+            fields["result"] = result
+        if error is not None:
+            fields["error"] = error
+
+        if not self.store.update_task(task_id, **fields):
             logger.warning(f"任务不存在: {task_id}")
             return
 
-        task = self.tasks[task_id]
-        task.status = status
-        task.updated_at = datetime.now()
+        self._publish(task_id, status, progress=progress, error=error)
+        logger.info(f"任务状态更新: {task_id} -> {status} (进度: {progress}%)")
 
-        if progress is not None:
-            task.progress = progress
-        if result is not None:
-            task.result = result
-        if error is not None:
-            task.error = error
+    def report_progress(self, task_id: str, progress: float):
+        """上报执行中任务的进度，不等待写入完成（须在事件循环中调用）"""
+        future = self._store_call(
+            self.store.update_task, task_id, owner=self.worker_id,
+            status=TaskStatus.RUNNING.value, progress=progress
+        )
+        future.add_done_callback(self._log_store_error)
+        self._publish(task_id, TaskStatus.RUNNING, progress=progress)
+
+    @staticmethod
+    def _log_store_error(future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(f"任务状态写入失败: {future.exception()}")
 
-        logger.info(f"任务状态更新: {task_id} -> {status} (进度: {task.progress}%)")
+    # ---- 进程内函数任务 ----
 
     async def execute_task(
         self,
@@ -110,8 +251,20 @@ class BackgroundTaskManager:
             *args: 函数参数
             **kwargs: 函数关键字参数
         """
+        heartbeat = None
         try:
-            self.update_task_status(task_id, TaskStatus.RUNNING, progress=0.0)
+            await self._store_call(
+                self.store.update_task,
+                task_id,
+                status=TaskStatus.RUNNING.value,
+                progress=0.0,
+                attempts=1,
+                lease_owner=self.worker_id,
+                lease_expires_at=time.time() + self.lease_seconds,
+                heartbeat_at=time.time()
+            )
+            self._publish(task_id, TaskStatus.RUNNING, progress=0.0)
+            heartbeat = asyncio.create_task(self._heartbeat_loop(task_id, asyncio.current_task()))
 
             # 检查函数是否是协程
             if asyncio.iscoroutinefunction(func):
@@ -121,34 +274,22 @@ class BackgroundTaskManager:
                 from ..utils.thread_pool import run_blocking_io
                 result = await run_blocking_io(func, *args, **kwargs)
 
-            self.update_task_status(
-                task_id,
-                TaskStatus.COMPLETED,
-                progress=100.0,
-                result=result
-            )
+            await self._finish(task_id, TaskStatus.COMPLETED, progress=100.0, result=result)
 
         except asyncio.CancelledError:
-            self.update_task_status(
-                task_id,
-                TaskStatus.CANCELLED,
-                error="任务被取消"
-            )
+            await self._finish(task_id, TaskStatus.CANCELLED, error="任务被取消")
             logger.info(f"任务被取消: {task_id}")
 
         except Exception as e:
             error_msg = f"{str(e)}\n{traceback.format_exc()}"
-            self.update_task_status(
-                task_id,
-                TaskStatus.FAILED,
-                error=error_msg
-            )
+            await self._finish(task_id, TaskStatus.FAILED, error=error_msg)
             logger.error(f"任务执行失败: {task_id}\n{error_msg}")
 
         finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
             # 清理运行中的任务引用
-            if task_id in self.running_tasks:
-                del self.running_tasks[task_id]
+            self.running_tasks.pop(task_id, None)
 
     def submit_task(
         self,
@@ -160,6 +301,9 @@ class BackgroundTaskManager:
     ) -> str:
         """提交任务到后台执行
 
+        进程内函数无法持久化，服务重启后此类任务会被标记为失败；
+        需要可恢复执行时请注册处理器并使用 enqueue_task。
+
         Args:
             task_type: 任务类型
             func: 要执行的函数
@@ -182,6 +326,223 @@ class BackgroundTaskManager:
         logger.info(f"提交后台任务: {task_id}")
         return task_id
 
+    # ---- 持久化队列任务 ----
+
+    def enqueue_task(
+        self,
+        task_type: str,
+        payload: Dict[str, Any],
+        metadata: Optional[Dict[str, Any]] = None,
+        max_attempts: Optional[int] = None
+    ) -> str:
+        """把任务写入持久化队列，由调度器分发给已注册的处理器
+
+        Args:
+            task_type: 任务类型（必须已注册处理器）
+            payload: 处理器参数，必须可JSON序列化
+            metadata: 任务元数据
+            max_attempts: 最大执行次数
+
+        Returns:
+            任务ID
+        """
+        task_id, insert = self._prepare_enqueue(task_type, payload, metadata, max_attempts)
+        insert()
+        self._after_enqueue(task_id, task_type)
+        return task_id
+
+    async def enqueue_task_async(
+        self,
+        task_type: str,
+        payload: Dict[str, Any],
+        metadata: Optional[Dict[str, Any]] = None,
+        max_attempts: Optional[int] = None
+    ) -> str:
+        """同 enqueue_task，任务表写入在存储线程中完成"""
+        task_id, insert = self._prepare_enqueue(task_type, payload, metadata, max_attempts)
+        await self._store_call(insert)
+        self._after_enqueue(task_id, task_type)
+        return task_id
+
+    def _prepare_enqueue(self, task_type: str, payload: Dict[str, Any],
+                         metadata: Optional[Dict[str, Any]], max_attempts: Optional[int]):
+        handler = self.handlers.get(task_type)
+        if handler is None:
+            raise ValueError(f"No handler registered for task type: {task_type}")
+
+        attempts = max_attempts or handler.max_attempts or self._config().background_task_max_attempts
+        task_id = str(uuid.uuid4())
+        insert = functools.partial(
+            self.store.insert_task, task_id, task_type, TaskStatus.PENDING.value,
+            payload=payload, metadata=metadata, max_attempts=max(1, int(attempts))
+        )
+        return task_id, insert
+
+    def _after_enqueue(self, task_id: str, task_type: str):
+        self._publish(task_id, TaskStatus.PENDING, progress=0.0)
+        logger.info(f"任务入队: {task_id} (类型: {task_type})")
+
+        self.start()
+        self._wakeup.set()
+
+    def start(self):
+        """启动调度器（需在事件循环中调用，重复调用无副作用）"""
+        loop = asyncio.get_running_loop()
+        if self._dispatcher is not None and not self._dispatcher.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._dispatcher = loop.create_task(self._dispatch_loop())
+        logger.info(f"后台任务调度器已启动: {self.worker_id}")
+
+    async def _housekeeping(self):
+        now = time.time()
+        if now - self._last_recovery >= self.lease_seconds / 2:
+            self._last_recovery = now
+            recovered = await self._store_call(self.store.recover_expired, list(self.handlers))
+            if recovered["requeued"] or recovered["failed"]:
+                logger.info(
+                    f"回收过期租约: 重新入队 {recovered['requeued']} 个, 标记失败 {recovered['failed']} 个"
+                )
+        if now - self._last_cleanup >= 3600:
+            self._last_cleanup = now
+            removed = await self._store_call(self.store.delete_finished_before, now - 24 * 3600)
+            self._forget_removed(removed)
+
+    async def _dispatch_loop(self):
+        while True:
+            try:
+                await self._housekeeping()
+
+                max_concurrent = max(1, int(self._config().background_task_max_concurrent))
+                task_types = list(self.handlers)
+                while len(self._claimed) < max_concurrent:
+                    # BEGIN IMMEDIATE 可能等待其他进程的写锁
+                    record = await self._store_call(
+                        self.store.claim_next, self.worker_id, task_types, self.lease_seconds
+                    )
+                    if record is None:
+                        break
+                    self._start_claimed(record)
+
+                timeout = self.lease_seconds / 2
+                next_at = await self._store_call(self.store.next_available_at, task_types)
+                if next_at is not None:
+                    timeout = min(timeout, max(0.05, next_at - time.time()))
+
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"后台任务调度异常: {e}")
+                await asyncio.sleep(1)
+
+    def _start_claimed(self, record: Dict[str, Any]):
+        task_id = record["task_id"]
+        self._claimed.add(task_id)
+        self._publish(task_id, TaskStatus.RUNNING, progress=record["progress"])
+        logger.info(f"开始执行任务: {task_id} (类型: {record['task_type']}, 第 {record['attempts']} 次)")
+        self.running_tasks[task_id] = asyncio.create_task(self._run_claimed(record))
+
+    async def _heartbeat_loop(self, task_id: str, owner_task: asyncio.Task):
+        interval = self.lease_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                alive = await self._store_call(self.store.heartbeat, task_id, self.worker_id, self.lease_seconds)
+            except Exception as e:
+                logger.warning(f"任务心跳失败: {task_id}: {e}")
+                continue
+            if not alive:
+                logger.warning(f"任务租约已丢失，停止执行: {task_id}")
+                self._lost_leases.add(task_id)
+                owner_task.cancel()
+                return
+
+    async def _run_claimed(self, record: Dict[str, Any]):
+        task_id = record["task_id"]
+        handler = self.handlers[record["task_type"]]
+        heartbeat = asyncio.create_task(self._heartbeat_loop(task_id, asyncio.current_task()))
+        try:
+            if handler.cpu_bound:
+                result = await run_cpu_bound(handler.func, record["payload"])
+            else:
+                result = await handler.func(TaskContext(self, record), record["payload"])
+            await self._finish(task_id, TaskStatus.COMPLETED, progress=100.0, result=result)
+
+        except asyncio.CancelledError:
+            if task_id in self._lost_leases:
+                pass
+            elif self._stopping:
+                # 服务关闭：释放租约且不计入重试次数，下次启动时立即恢复
+                await self._store_call(
+                    self.store.update_task, task_id, owner=self.worker_id,
+                    status=TaskStatus.PENDING.value, attempts=max(0, record["attempts"] - 1),
+                    lease_owner=None, lease_expires_at=None, available_at=time.time()
+                )
+            else:
+                await self._finish(task_id, TaskStatus.CANCELLED, error="任务被取消")
+                logger.info(f"任务被取消: {task_id}")
+
+        except Exception as e:
+            await self._handle_failure(record, handler, e)
+
+        finally:
+            heartbeat.cancel()
+            self._lost_leases.discard(task_id)
+            self._claimed.discard(task_id)
+            self.running_tasks.pop(task_id, None)
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    async def _handle_failure(self, record: Dict[str, Any], handler: TaskHandler, error: Exception):
+        task_id = record["task_id"]
+        attempts = record["attempts"]
+        if attempts < record["max_attempts"]:
+            delay = min(300.0, 5.0 * 2 ** (attempts - 1))
+            if await self._store_call(
+                self.store.update_task, task_id, owner=self.worker_id,
+                status=TaskStatus.PENDING.value, error=str(error),
+                lease_owner=None, lease_expires_at=None, available_at=time.time() + delay
+            ):
+                self._publish(task_id, TaskStatus.PENDING, error=str(error))
+            logger.warning(f"任务执行失败，{delay:.0f}秒后重试 ({attempts}/{record['max_attempts']}): {task_id}: {error}")
+            return
+
+        logger.error(f"任务执行失败: {task_id}\n{traceback.format_exc()}")
+        await self._finish(task_id, TaskStatus.FAILED, error=str(error))
+        if handler.on_failure is not None:
+            from ..utils.thread_pool import run_blocking_io
+            try:
+                await run_blocking_io(handler.on_failure, record["payload"])
+            except Exception as cleanup_error:
+                logger.warning(f"任务失败清理出错: {task_id}: {cleanup_error}")
+
+    async def _finish(self, task_id: str, status: TaskStatus, progress: Optional[float] = None,
+                result: Optional[Any] = None, error: Optional[str] = None):
+        """写入终态并释放租约；租约已被回收时不覆盖新执行者的状态"""
+        fields: Dict[str, Any] = {"status": status.value, "lease_expires_at": None}
+        if status == TaskStatus.COMPLETED:
+            # 清除之前失败重试留下的错误信息
+            fields["error"] = None
+        if progress is not None:
+            fields["progress"] = progress
+        if result is not None:
+            fields["result"] = result
+        if error is not None:
+            fields["error"] = error
+
+        if await self._store_call(self.store.update_task, task_id, owner=self.worker_id, **fields):
+            self._publish(task_id, status, progress=progress, error=error)
+            logger.info(f"任务状态更新: {task_id} -> {status}")
+
+    # ---- 管理 ----
+
     def cancel_task(self, task_id: str) -> bool:
         """取消任务
 
@@ -195,6 +556,12 @@ class BackgroundTaskManager:
             self.running_tasks[task_id].cancel()
             logger.info(f"取消任务: {task_id}")
             return True
+
+        record = self.store.get_task(task_id)
+        if record and record["status"] == TaskStatus.PENDING.value:
+            self.update_task_status(task_id, TaskStatus.CANCELLED, error="任务被取消")
+            logger.info(f"取消排队任务: {task_id}")
+            return True
         return False
 
     def cleanup_old_tasks(self, max_age_hours: int = 24):
@@ -203,26 +570,20 @@ class BackgroundTaskManager:
         Args:
             max_age_hours: 任务保留时间（小时）
         """
-        from datetime import timedelta
-        cutoff_time = datetime.now() - timedelta(hours=max_age_hours)
-
-        tasks_to_remove = [
-            task_id for task_id, task in self.tasks.items()
-            if task.updated_at < cutoff_time and task.status in [
-                TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED
-            ]
-        ]
+        cutoff_time = time.time() - max_age_hours * 3600
+        self._forget_removed(self.store.delete_finished_before(cutoff_time))
 
-        for task_id in tasks_to_remove:
-            del self.tasks[task_id]
+    def _forget_removed(self, removed: List[Dict[str, Any]]):
+        for record in removed:
+            progress_channel.forget(record["task_id"])
 
-        if tasks_to_remove:
-            logger.info(f"清理了 {len(tasks_to_remove)} 个过期任务")
+        if removed:
+            logger.info(f"清理了 {len(removed)} 个过期任务")
 
     def get_task_stats(self) -> Dict[str, int]:
         """获取任务统计信息"""
         stats = {
-            "total": len(self.tasks),
+            "total": 0,
             "pending": 0,
             "running": 0,
             "completed": 0,
@@ -230,11 +591,29 @@ class BackgroundTaskManager:
             "cancelled": 0
         }
 
-        for task in self.tasks.values():
-            stats[task.status.value] += 1
+        for status, count in self.store.count_by_status().items():
+            stats[status] = count
+            stats["total"] += count
 
         return stats
 
+    async def stop(self):
+        """停止调度器；执行中的队列任务释放租约，下次启动时恢复执行"""
+        self._stopping = True
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+
+        pending = [self.running_tasks[task_id] for task_id in list(self._claimed) if task_id in self.running_tasks]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
 
 # 全局任务管理器实例
 _task_manager = None
@@ -244,4 +623,22 @@ def get_task_manager() -> BackgroundTaskManager:
     global _task_manager
     if _task_manager is None:
         _task_manager = BackgroundTaskManager()
+        from .export_tasks import register_export_handlers
+        register_export_handlers(_task_manager)
+        from .template_preview_service import register_template_preview_handler
+        register_template_preview_handler(_task_manager)
     return _task_manager
+
+
+async def start_task_manager():
+    """服务启动时调用：恢复上次中断的任务并启动调度器"""
+    get_task_manager().start()
+
+
+async def shutdown_task_manager():
+    """服务关闭时调用：停止调度器并关闭进程池"""
+    from ..utils.process_pool import process_pool
+
+    if _task_manager is not None:
+        await _task_manager.stop()
+    process_pool.shutdown(wait=False)
@@ -110,6 +110,8 @@ class ConfigService:
             # Parallel Generation Configuration
             "enable_parallel_generation": {"type": "boolean", "category": "generation_params", "default": "false"},
             "parallel_slides_count": {"type": "number", "category": "generation_params", "default": "3"},
+            "speech_script_concurrency": {"type": "number", "category": "generation_params", "default": "4"},
+            "speech_script_batch_size": {"type": "number", "category": "generation_params", "default": "0"},
             
             "tavily_api_key": {"type": "password", "category": "generation_params"},
             "tavily_max_results": {"type": "number", "category": "generation_params", "default": "10"},
@@ -126,6 +128,15 @@ class ConfigService:
             "research_enable_content_extraction": {"type": "boolean", "category": "generation_params", "default": "true"},
             "research_max_content_length": {"type": "number", "category": "generation_params", "default": "5000"},
             "research_extraction_timeout": {"type": "number", "category": "generation_params", "default": "30"},
+            "research_max_concurrent_steps": {"type": "number", "category": "generation_params", "default": "3"},
+            "research_search_concurrency": {"type": "number", "category": "generation_params", "default": "2"},
+            "research_search_requests_per_minute": {"type": "number", "category": "generation_params", "default": "30"},
+            "research_llm_concurrency": {"type": "number", "category": "generation_params", "default": "3"},
+            "research_llm_requests_per_minute": {"type": "number", "category": "generation_params", "default": "60"},
+            "research_max_response_mb": {"type": "number", "category": "generation_params", "default": "5"},
+            "research_connections_per_host": {"type": "number", "category": "generation_params", "default": "4"},
+            "research_page_cache_enabled": {"type": "boolean", "category": "generation_params", "default": "true"},
+            "research_page_cache_ttl": {"type": "number", "category": "generation_params", "default": "3600"},
 
             # MinerU API Configuration (for high-quality PDF parsing)
             "mineru_api_key": {"type": "password", "category": "generation_params"},
@@ -138,6 +149,20 @@ class ConfigService:
             "enable_local_models": {"type": "boolean", "category": "feature_flags", "default": "false"},
             "enable_streaming": {"type": "boolean", "category": "feature_flags", "default": "true"},
             "enable_auto_layout_repair": {"type": "boolean", "category": "generation_params", "default": "false"},
+            "llm_cache_enabled": {"type": "boolean", "category": "generation_params", "default": "false"},
+            "llm_cache_ttl_seconds": {"type": "number", "category": "generation_params", "default": "86400"},
+            "llm_cache_max_mb": {"type": "number", "category": "generation_params", "default": "256"},
+            "ai_max_concurrent_requests": {"type": "number", "category": "generation_params", "default": "8"},
+            "ai_requests_per_minute": {"type": "number", "category": "generation_params", "default": "0"},
+            "ai_tokens_per_minute": {"type": "number", "category": "generation_params", "default": "0"},
+            "ai_rate_limit_overrides": {"type": "text", "category": "generation_params"},
+            "ai_max_retries": {"type": "number", "category": "generation_params", "default": "3"},
+            "ai_circuit_failure_threshold": {"type": "number", "category": "generation_params", "default": "5"},
+            "ai_circuit_reset_seconds": {"type": "number", "category": "generation_params", "default": "30"},
+            "ai_fallback_provider": {"type": "text", "category": "generation_params"},
+            "ai_fallback_model": {"type": "text", "category": "generation_params"},
+            "ai_hedge_enabled": {"type": "boolean", "category": "generation_params", "default": "false"},
+            "ai_hedge_delay_ms": {"type": "number", "category": "generation_params", "default": "0"},
             "log_level": {"type": "select", "category": "feature_flags", "default": "INFO"},
             "log_ai_requests": {"type": "boolean", "category": "feature_flags", "default": "false"},
             "debug": {"type": "boolean", "category": "feature_flags", "default": "true"},
@@ -153,6 +178,14 @@ class ConfigService:
             "upload_dir": {"type": "text", "category": "app_config", "default": "uploads"},
             "cache_ttl": {"type": "number", "category": "app_config", "default": "3600"},
             "database_url": {"type": "text", "category": "app_config", "default": "sqlite:///./landppt.db"},
+            "background_task_max_concurrent": {"type": "number", "category": "app_config", "default": "3"},
+            "background_task_process_workers": {"type": "number", "category": "app_config", "default": "2"},
+            "background_task_lease_seconds": {"type": "number", "category": "app_config", "default": "60"},
+            "background_task_max_attempts": {"type": "number", "category": "app_config", "default": "3"},
+            "screenshot_page_pool_size": {"type": "number", "category": "app_config", "default": "4"},
+            "template_preview_width": {"type": "number", "category": "app_config", "default": "480"},
+            "share_cache_max_entries": {"type": "number", "category": "app_config", "default": "256"},
+            "share_cache_revalidate_seconds": {"type": "number", "category": "app_config", "default": "5"},
 
             # Image Service Configuration
             "enable_image_service": {"type": "boolean", "category": "image_service", "default": "false"},
@@ -15,11 +15,17 @@ from ..api.models import (
 )
 from ..database.service import DatabaseService
 from ..database.database import get_async_db
+from .share_service import share_payload_cache
 
 # Configure logger for this module
 logger = logging.getLogger(__name__)
 
 
+def _invalidate_shared_views(project_id: str):
+    """项目内容变化后立即丢弃其公开分享页面的缓存"""
+    share_payload_cache.invalidate_project(project_id)
+
+
 class DatabaseProjectManager:
     """Database-aware project manager with persistent storage"""
 
@@ -150,6 +156,7 @@ class DatabaseProjectManager:
 
             if success:
                 logger.info(f"Saved slides for project {project_id}")
+                _invalidate_shared_views(project_id)
 
             return success
         finally:
@@ -179,6 +186,7 @@ class DatabaseProjectManager:
 
             if success:
                 logger.info(f"Batch saved {len(slides_data)} slides for project {project_id}")
+                _invalidate_shared_views(project_id)
 
             return success
         finally:
@@ -193,6 +201,7 @@ class DatabaseProjectManager:
 
             if success:
                 logger.info(f"Replaced all slides for project {project_id}")
+                _invalidate_shared_views(project_id)
 
             return success
         finally:
@@ -204,6 +213,7 @@ class DatabaseProjectManager:
         try:
             deleted_count = await db_service.cleanup_excess_slides(project_id, current_slide_count)
             logger.info(f"Cleaned up {deleted_count} excess slides for project {project_id}")
+            _invalidate_shared_views(project_id)
             return deleted_count
         finally:
             await db_service.session.close()
@@ -221,6 +231,7 @@ class DatabaseProjectManager:
 
             if success:
                 logger.info(f"Saved slide {slide_index + 1} for project {project_id}")
+                _invalidate_shared_views(project_id)
 
             return success
         finally:
@@ -253,6 +264,7 @@ class DatabaseProjectManager:
 
             if success:
                 logger.info(f"Updated project data for project {project_id}")
+                _invalidate_shared_views(project_id)
 
             return success
         finally:
@@ -275,16 +287,39 @@ class DatabaseProjectManager:
         finally:
             await db_service.session.close()
     
-    async def get_project_versions(self, project_id: str) -> List[Dict[str, Any]]:
-        """Get all versions of a project"""
+    async def get_project_versions(self, project_id: str, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """Get versions of a project (metadata only, newest first)"""
         db_service = await self._get_db_service()
         try:
-            project = await db_service.get_project(project_id)
+            return await db_service.get_project_versions(project_id, limit=limit, offset=offset)
+        finally:
+            await db_service.session.close()
 
-            if not project:
-                return []
+    async def restore_project_version(self, project_id: str, version: int) -> bool:
+        """Restore project to a specific version"""
+        db_service = await self._get_db_service()
+        try:
+            version_data = await db_service.get_project_version_data(project_id, version)
+            if version_data is None:
+                return False
+
+            if version_data.get("slides_data"):
+                success = await db_service.replace_all_project_slides(
+                    project_id, version_data.get("slides_html", ""), version_data["slides_data"]
+                )
+            else:
+                update_data = {}
+                if "slides_html" in version_data:
+                    update_data["slides_html"] = version_data["slides_html"]
+                success = await db_service.update_project(project_id, update_data) if update_data else True
 
-            return project.versions
+            if success and "outline" in version_data:
+                success = await db_service.update_project(project_id, {"outline": version_data["outline"]})
+
+            if success:
+                logger.info(f"Restored project {project_id} to version {version}")
+                _invalidate_shared_views(project_id)
+            return success
         finally:
             await db_service.session.close()
     
@@ -315,7 +350,10 @@ class DatabaseProjectManager:
             success = await db_service.project_repo.delete(project_id)
 
             if success:
+                # 版本历史和只被它引用的 blob 一并删除
+                await db_service.version_repo.delete_by_project_id(project_id)
                 logger.info(f"Deleted project {project_id}")
+                _invalidate_shared_views(project_id)
 
             return success
         finally:
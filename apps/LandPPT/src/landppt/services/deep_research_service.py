@@ -53,6 +53,10 @@ class DEEPResearchService:
         self.tavily_client = None
         self._initialize_tavily_client()
 
+        # Imported here: the research package imports this module at load time
+        from .research.rate_limiter import get_research_rate_limiter
+        self.rate_limiter = get_research_rate_limiter()
+
     def _initialize_tavily_client(self):
         """Initialize Tavily client"""
         try:
@@ -102,15 +106,17 @@ class DEEPResearchService:
             # Step 1: Define research objectives and generate research plan with context
             research_plan = await self._define_research_objectives(topic, language, context)
 
-            # Step 2: Execute research steps
-            research_steps = []
-            for i, step_plan in enumerate(research_plan, 1):
-                step = await self._execute_research_step(i, step_plan, topic, language)
-                research_steps.append(step)
+            # Step 2: Execute independent research steps concurrently; provider
+            # rate limits are enforced by the shared token buckets
+            step_semaphore = asyncio.Semaphore(max(1, ai_config.research_max_concurrent_steps))
+
+            async def run_step(i: int, step_plan: Dict[str, str]) -> ResearchStep:
+                async with step_semaphore:
+                    return await self._execute_research_step(i, step_plan, topic, language)
 
-                # Add delay between requests to respect rate limits
-                if i < len(research_plan):
-                    await asyncio.sleep(1)
+            research_steps = list(await asyncio.gather(*[
+                run_step(i, step_plan) for i, step_plan in enumerate(research_plan, 1)
+            ]))
 
             # Step 3: Synthesize findings and generate report
             report = await self._generate_comprehensive_report(
@@ -282,8 +288,11 @@ class DEEPResearchService:
             if ai_config.tavily_exclude_domains:
                 search_params["exclude_domains"] = ai_config.tavily_exclude_domains.split(',')
 
-            # Execute search
-            response = self.tavily_client.search(**search_params)
+            # Execute search (the Tavily client is synchronous, keep it off the event loop)
+            async with self.rate_limiter.slot('tavily'):
+                response = await asyncio.get_event_loop().run_in_executor(
+                    None, lambda: self.tavily_client.search(**search_params)
+                )
 
             # Process results
             results = []
@@ -341,11 +350,12 @@ class DEEPResearchService:
 """
 
         try:
-            response = await self.ai_provider.text_completion(
-                prompt=prompt,
-                max_tokens=min(ai_config.max_tokens, 1000),
-                temperature=0.4
-            )
+            async with self.rate_limiter.slot('llm'):
+                response = await self.ai_provider.text_completion(
+                    prompt=prompt,
+                    max_tokens=min(ai_config.max_tokens, 1000),
+                    temperature=0.4
+                )
 
             return response.content.strip()
 
@@ -372,15 +382,14 @@ class DEEPResearchService:
                     if result.get('url'):
                         all_sources.add(result['url'])
 
-            # Generate executive summary and recommendations
-            summary_analysis = await self._generate_executive_summary(
-                topic, language, all_findings
+            # Executive summary, key findings and recommendations only depend
+            # on the collected findings, so generate them concurrently
+            summary_analysis, key_findings, recommendations = await asyncio.gather(
+                self._generate_executive_summary(topic, language, all_findings),
+                self._extract_key_findings(topic, language, all_findings),
+                self._generate_recommendations(topic, language, all_findings)
             )
 
-            # Extract key findings and recommendations
-            key_findings = await self._extract_key_findings(topic, language, all_findings)
-            recommendations = await self._generate_recommendations(topic, language, all_findings)
-
             report = ResearchReport(
                 topic=topic,
                 language=language,
@@ -425,11 +434,12 @@ class DEEPResearchService:
 """
 
         try:
-            response = await self.ai_provider.text_completion(
-                prompt=prompt,
-                max_tokens=min(ai_config.max_tokens, 800),
-                temperature=0.3
-            )
+            async with self.rate_limiter.slot('llm'):
+                response = await self.ai_provider.text_completion(
+                    prompt=prompt,
+                    max_tokens=min(ai_config.max_tokens, 800),
+                    temperature=0.3
+                )
             return response.content.strip()
         except Exception as e:
             logger.error(f"Failed to generate executive summary: {e}")
@@ -463,11 +473,12 @@ class DEEPResearchService:
 """
 
         try:
-            response = await self.ai_provider.text_completion(
-                prompt=prompt,
-                max_tokens=min(ai_config.max_tokens, 600),
-                temperature=0.3
-            )
+            async with self.rate_limiter.slot('llm'):
+                response = await self.ai_provider.text_completion(
+                    prompt=prompt,
+                    max_tokens=min(ai_config.max_tokens, 600),
+                    temperature=0.3
+                )
 
             # Parse numbered list
             content = response.content.strip()
@@ -515,11 +526,12 @@ class DEEPResearchService:
 """
 
         try:
-            response = await self.ai_provider.text_completion(
-                prompt=prompt,
-                max_tokens=min(ai_config.max_tokens, 600),
-                temperature=0.4
-            )
+            async with self.rate_limiter.slot('llm'):
+                response = await self.ai_provider.text_completion(
+                    prompt=prompt,
+                    max_tokens=min(ai_config.max_tokens, 600),
+                    temperature=0.4
+                )
 
             # Parse numbered list
             content = response.content.strip()
@@ -22,6 +22,7 @@ from ..api.models import (
 )
 from ..ai import get_ai_provider, get_role_provider, AIMessage, MessageRole
 from ..ai.base import TextContent, ImageContent
+from ..ai.response_cache import CachedAIProvider
 from ..core.config import ai_config
 from .ppt_service import PPTService
 from .db_project_manager import DatabaseProjectManager
@@ -149,6 +150,10 @@ class EnhancedPPTService(PPTService):
             # 更新缓存目录配置
             if self.cache_dirs:
                 image_config['cache']['base_dir'] = str(self.cache_dirs['ai_responses'] / 'images_cache')
+                if image_config['search_cache'].get('persist_path'):
+                    image_config['search_cache']['persist_path'] = str(
+                        self.cache_dirs['ai_responses'] / 'images_cache' / 'search_cache.db'
+                    )
 
             # 验证配置
             config_errors = config_manager.validate_config()
@@ -222,14 +227,22 @@ class EnhancedPPTService(PPTService):
         other_chars = len(text) - chinese_chars
         return int(chinese_chars / 1.5 + other_chars / 4)
 
+    @staticmethod
+    def _is_cached_response(response) -> bool:
+        """响应是否来自 LLM 缓存（命中或与并发的相同请求合并）"""
+        metadata = getattr(response, "metadata", None) or {}
+        return bool(metadata.get("cache_hit") or metadata.get("coalesced"))
+
     def _log_ai_usage(self, role: str, provider_name: Optional[str], model: Optional[str], usage: Dict[str, int],
                       success: bool = True, error_message: Optional[str] = None,
                       duration_ms: Optional[int] = None,
                       user_id: Optional[int] = None, project_id: Optional[str] = None,
                       action: Optional[str] = None,
-                      input_text: Optional[str] = None, output_text: Optional[str] = None):
+                      input_text: Optional[str] = None, output_text: Optional[str] = None,
+                      cache_hit: bool = False):
         """记录 AI 调用的 token 使用量到数据库（同步，后台执行不阻塞主流程）。
-        当 API 不返回 token 信息时，根据 input_text/output_text 估算。"""
+        当 API 不返回 token 信息时，根据 input_text/output_text 估算。
+        响应来自 LLM 缓存时不计入消耗，改为记录节省的 token 数。"""
         try:
             from ..database.database import SessionLocal
             from ..database.models import AIUsageLog
@@ -246,6 +259,11 @@ class EnhancedPPTService(PPTService):
                     output_tokens = self._estimate_tokens(output_text)
                 total_tokens = input_tokens + output_tokens
 
+            tokens_saved = 0
+            if cache_hit:
+                tokens_saved = total_tokens
+                input_tokens = output_tokens = total_tokens = 0
+
             log_entry = AIUsageLog(
                 user_id=user_id or self._current_user_id or 0,
                 project_id=project_id,
@@ -258,6 +276,8 @@ class EnhancedPPTService(PPTService):
                 success=success,
                 error_message=error_message,
                 duration_ms=duration_ms,
+                cache_hit=cache_hit,
+                tokens_saved=tokens_saved,
                 created_at=time.time()
             )
             db = SessionLocal()
@@ -288,6 +308,10 @@ class EnhancedPPTService(PPTService):
         if role == "outline" and settings.get("provider") == "anthropic":
             # Use streaming and collect the result
             full_response = ""
+            cache_info: Dict[str, Any] = {}
+            if isinstance(provider, CachedAIProvider):
+                # 由缓存回放的流按缓存命中记录
+                kwargs["_cache_info"] = cache_info
             async for chunk in provider.stream_text_completion(prompt=prompt, **kwargs):
                 full_response += chunk
 
@@ -299,7 +323,8 @@ class EnhancedPPTService(PPTService):
                 role=role, provider_name=provider_name, model=model_name,
                 usage=usage, duration_ms=duration_ms,
                 user_id=log_user_id, project_id=log_project_id, action=log_action,
-                input_text=prompt, output_text=full_response
+                input_text=prompt, output_text=full_response,
+                cache_hit=bool(cache_info.get("cache_hit"))
             )
 
             # Return a mock AIResponse-like object with the collected content
@@ -309,7 +334,7 @@ class EnhancedPPTService(PPTService):
                 model=settings.get("model", "anthropic"),
                 usage=usage,
                 finish_reason="stop",
-                metadata={"provider": "anthropic", "streamed": True}
+                metadata={"provider": "anthropic", "streamed": True, "cache_hit": bool(cache_info.get("cache_hit"))}
             )
 
         response = await provider.text_completion(prompt=prompt, **kwargs)
@@ -320,7 +345,8 @@ class EnhancedPPTService(PPTService):
             role=role, provider_name=provider_name, model=response.model or model_name,
             usage=response.usage, duration_ms=duration_ms,
             user_id=log_user_id, project_id=log_project_id, action=log_action,
-            input_text=prompt, output_text=response.content
+            input_text=prompt, output_text=response.content,
+            cache_hit=self._is_cached_response(response)
         )
 
         return response
@@ -352,7 +378,8 @@ class EnhancedPPTService(PPTService):
             role=role, provider_name=provider_name, model=response.model or model_name,
             usage=response.usage, duration_ms=duration_ms,
             user_id=log_user_id, project_id=log_project_id, action=log_action,
-            input_text=input_text, output_text=response.content
+            input_text=input_text, output_text=response.content,
+            cache_hit=self._is_cached_response(response)
         )
 
         return response
@@ -6614,7 +6641,10 @@ Please fully utilize the above research information to enrich the PPT content, e
                 # 从文件生成大纲
                 logger.info(f"正在使用summeryanyfile处理文件: {request.file_path}")
                 shutil.copy(request.file_path, cache_dir)
-                outline = await generator.generate_from_file(
+                generate = (generator.generate_from_file_streaming
+                            if self._should_stream_outline(request, use_magic_pdf)
+                            else generator.generate_from_file)
+                outline = await generate(
                     request.file_path,
                     project_topic=request.topic or "",
                     project_scenario=request.scenario or "general",
@@ -6797,6 +6827,21 @@ Please fully utilize the above research information to enrich the PPT content, e
             # AI决定模式：设置一个宽泛的范围，但主要通过提示词让AI自主决定
             return 5, 30  # 宽泛范围，实际由AI根据内容决定
 
+    def _should_stream_outline(self, request, use_magic_pdf: bool) -> bool:
+        """大文件边转换边生成大纲，避免整份文档驻留内存并让转换与LLM调用重叠"""
+        threshold_mb = ai_config.outline_streaming_min_mb
+        if threshold_mb <= 0 or use_magic_pdf:
+            # Magic-PDF只能整体转换，流式路径没有收益
+            return False
+        try:
+            file_size = os.path.getsize(request.file_path)
+        except OSError:
+            return False
+        if file_size < threshold_mb * 1024 * 1024:
+            return False
+        logger.info(f"文件较大 ({file_size / 1024 / 1024:.1f}MB)，使用流式大纲生成")
+        return True
+
     def _get_chunk_size_from_request(self, request) -> int:
         """根据请求获取分块大小"""
         if request.content_analysis_depth == "fast":
@@ -0,0 +1,186 @@
+"""
+PPTX导出后台任务
+
+导出任务以可持久化的payload（项目ID、临时文件路径）入队，由BackgroundTaskManager
+按任务类型分发到这里的处理器，因此服务重启后可以从任务表中恢复执行。
+python-pptx组装等CPU密集型步骤在进程池中运行，不占用事件循环所在进程。
+"""
+
+import logging
+import os
+import shutil
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+PDF_TO_PPTX_TASK = "pdf_to_pptx_conversion"
+HTML_TO_PPTX_TASK = "html_to_pptx_screenshot"
+
+SCREENSHOT_WIDTH = 1280
+SCREENSHOT_HEIGHT = 720
+
+
+def build_pptx_from_screenshots(screenshot_paths: List[str], output_path: str,
+                                speech_scripts: Dict[int, str]) -> int:
+    """用整页截图组装16:9的PPTX，并把演讲稿写入备注（在工作进程中执行）
+
+    Returns:
+        写入备注的幻灯片数量
+    """
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    prs = Presentation()
+    prs.slide_width = Inches(10)
+    prs.slide_height = Inches(5.625)
+
+    notes_added = 0
+    for i, screenshot_path in enumerate(screenshot_paths):
+        slide = prs.slides.add_slide(prs.slide_layouts[6])
+        slide.shapes.add_picture(screenshot_path, Inches(0), Inches(0),
+                                 width=prs.slide_width, height=prs.slide_height)
+
+        if i in speech_scripts:
+            slide.notes_slide.notes_text_frame.text = speech_scripts[i]
+            notes_added += 1
+
+    prs.save(output_path)
+    return notes_added
+
+
+def add_speech_scripts_to_pptx(pptx_path: str, speech_scripts: Dict[int, str]) -> int:
+    """把演讲稿写入已有PPTX的备注（在工作进程中执行）
+
+    Returns:
+        写入备注的幻灯片数量
+    """
+    from pptx import Presentation
+
+    prs = Presentation(pptx_path)
+    notes_added = 0
+    for i, slide in enumerate(prs.slides):
+        if i in speech_scripts:
+            slide.notes_slide.notes_text_frame.text = speech_scripts[i]
+            notes_added += 1
+
+    prs.save(pptx_path)
+    return notes_added
+
+
+async def _load_speech_scripts(project_id: str) -> Dict[int, str]:
+    """加载项目当前的演讲稿，失败时返回空映射"""
+    try:
+        from .speech_script_repository import SpeechScriptRepository
+
+        repo = SpeechScriptRepository()
+        try:
+            scripts_list = await repo.get_current_speech_scripts_by_project(project_id)
+        finally:
+            repo.close()
+        return {script.slide_index: script.script_content for script in scripts_list}
+    except Exception as e:
+        logger.warning(f"Failed to load speech scripts for project {project_id}: {e}")
+        return {}
+
+
+async def pdf_to_pptx_handler(ctx, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """PDF转PPTX：转换本身在独立子进程中运行，之后在进程池中补充演讲稿备注"""
+    from .pdf_to_pptx_converter import get_pdf_to_pptx_converter
+
+    pdf_path = payload["pdf_path"]
+    pptx_path = payload["pptx_path"]
+
+    converter = get_pdf_to_pptx_converter()
+    success, result = await converter.convert_pdf_to_pptx_async(pdf_path, pptx_path)
+    if not success:
+        raise RuntimeError(result)
+    ctx.report_progress(80.0)
+
+    speech_scripts = await _load_speech_scripts(payload["project_id"])
+    if speech_scripts:
+        try:
+            notes_added = await ctx.run_cpu_bound(add_speech_scripts_to_pptx, pptx_path, speech_scripts)
+            logger.info(f"Added {notes_added} speech scripts to PPTX notes")
+        except Exception as e:
+            # 演讲稿写入失败不影响PPTX本身
+            logger.warning(f"Failed to add speech scripts to PPTX: {e}")
+
+    return {
+        "success": True,
+        "pptx_path": pptx_path,
+        "pdf_path": pdf_path
+    }
+
+
+async def html_to_pptx_handler(ctx, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """HTML截图转PPTX
+
+    幻灯片HTML在入队前已写入 ``temp_dir``；已存在的截图会被复用，
+    因此中断后重新执行只需补齐剩余的截图。
+    """
+    from .pyppeteer_pdf_converter import get_pdf_converter
+
+    temp_dir = payload["temp_dir"]
+    slide_count = int(payload["slide_count"])
+    pptx_path = payload["pptx_path"]
+
+    if not os.path.isdir(temp_dir):
+        raise RuntimeError(f"Slide files are no longer available: {temp_dir}")
+
+    logger.info(f"Starting screenshot-based PPTX export for {slide_count} slides")
+    speech_scripts = await _load_speech_scripts(payload["project_id"])
+
+    pdf_converter = get_pdf_converter()
+    screenshot_paths = []
+    for i in range(slide_count):
+        html_file = os.path.join(temp_dir, f"slide_{i}.html")
+        screenshot_path = os.path.join(temp_dir, f"slide_{i}.png")
+
+        if os.path.exists(screenshot_path) and os.path.getsize(screenshot_path) > 0:
+            screenshot_paths.append(screenshot_path)
+        elif await pdf_converter.screenshot_html(
+            html_file,
+            screenshot_path,
+            width=SCREENSHOT_WIDTH,
+            height=SCREENSHOT_HEIGHT
+        ):
+            screenshot_paths.append(screenshot_path)
+            logger.info(f"Screenshot {i + 1}/{slide_count} completed")
+        else:
+            logger.warning(f"Screenshot {i + 1} failed, skipping")
+
+        ctx.report_progress(90.0 * (i + 1) / slide_count)
+
+    if not screenshot_paths:
+        raise RuntimeError("No screenshots were generated")
+
+    logger.info("Creating PPTX from screenshots...")
+    await ctx.run_cpu_bound(build_pptx_from_screenshots, screenshot_paths, pptx_path, speech_scripts)
+    logger.info(f"PPTX saved to {pptx_path}")
+
+    try:
+        shutil.rmtree(temp_dir)
+    except Exception as cleanup_error:
+        logger.warning(f"Failed to cleanup temp directory: {cleanup_error}")
+
+    return {
+        "success": True,
+        "pptx_path": pptx_path
+    }
+
+
+def _remove_export_files(payload: Dict[str, Any]):
+    """导出最终失败后清理临时文件"""
+    for key in ("pdf_path", "pptx_path"):
+        path = payload.get(key)
+        if path and os.path.exists(path):
+            os.unlink(path)
+    temp_dir = payload.get("temp_dir")
+    if temp_dir and os.path.isdir(temp_dir):
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def register_export_handlers(task_manager):
+    """注册导出任务处理器"""
+    task_manager.register_handler(PDF_TO_PPTX_TASK, pdf_to_pptx_handler, on_failure=_remove_export_files)
+    task_manager.register_handler(HTML_TO_PPTX_TASK, html_to_pptx_handler, on_failure=_remove_export_files)
@@ -14,6 +14,7 @@ from ..ai.base import TextContent, ImageContent, MessageContentType
 from ..core.config import ai_config
 from ..database.service import DatabaseService
 from ..database.database import AsyncSessionLocal
+from .template_preview_service import PREVIEW_URL_PREFIX, get_template_preview_service
 
 # Configure logger for this module
 logger = logging.getLogger(__name__)
@@ -86,8 +87,10 @@ class GlobalMasterTemplateService:
                 if existing:
                     raise ValueError(f"Template name '{template_data['template_name']}' already exists")
 
-            # Generate preview image if not provided
-            if not template_data.get('preview_image'):
+            # Use a cached rendering when one exists, otherwise a placeholder until the
+            # background render finishes
+            render_preview = not template_data.get('preview_image')
+            if render_preview:
                 template_data['preview_image'] = await self._generate_preview_image(template_data['html_template'])
 
             # Extract style config if not provided
@@ -106,6 +109,9 @@ class GlobalMasterTemplateService:
                 db_service = DatabaseService(session)
                 template = await db_service.create_global_master_template(template_data)
 
+                if render_preview and not self._is_rendered_preview(template.preview_image):
+                    await get_template_preview_service().schedule(template.id, template_data['html_template'])
+
                 return {
                     "id": template.id,
                     "template_name": template.template_name,
@@ -124,6 +130,23 @@ class GlobalMasterTemplateService:
             logger.error(f"Failed to create global master template: {e}")
             raise
 
+    @staticmethod
+    def _to_list_item(template) -> Dict[str, Any]:
+        """列表视图字典（仓库返回的列表投影不含 html_template）"""
+        return {
+            "id": template.id,
+            "template_name": template.template_name,
+            "description": template.description,
+            "preview_image": template.preview_image,
+            "tags": template.tags,
+            "is_default": template.is_default,
+            "is_active": template.is_active,
+            "usage_count": template.usage_count,
+            "created_by": template.created_by,
+            "created_at": template.created_at,
+            "updated_at": template.updated_at
+        }
+
     async def get_all_templates(self, active_only: bool = True) -> List[Dict[str, Any]]:
         """Get all global master templates"""
         try:
@@ -132,19 +155,7 @@ class GlobalMasterTemplateService:
                 templates = await db_service.get_all_global_master_templates(active_only)
 
                 return [
-                    {
-                        "id": template.id,
-                        "template_name": template.template_name,
-                        "description": template.description,
-                        "preview_image": template.preview_image,
-                        "tags": template.tags,
-                        "is_default": template.is_default,
-                        "is_active": template.is_active,
-                        "usage_count": template.usage_count,
-                        "created_by": template.created_by,
-                        "created_at": template.created_at,
-                        "updated_at": template.updated_at
-                    }
+                    self._to_list_item(template)
                     for template in templates
                 ]
 
@@ -181,19 +192,7 @@ class GlobalMasterTemplateService:
                 has_prev = page > 1
 
                 template_list = [
-                    {
-                        "id": template.id,
-                        "template_name": template.template_name,
-                        "description": template.description,
-                        "preview_image": template.preview_image,
-                        "tags": template.tags,
-                        "is_default": template.is_default,
-                        "is_active": template.is_active,
-                        "usage_count": template.usage_count,
-                        "created_by": template.created_by,
-                        "created_at": template.created_at,
-                        "updated_at": template.updated_at
-                    }
+                    self._to_list_item(template)
                     for template in templates
                 ]
 
@@ -253,9 +252,16 @@ class GlobalMasterTemplateService:
                     if existing and existing.id != template_id:
                         raise ValueError(f"Template name '{update_data['template_name']}' already exists")
 
-            # Update preview image if HTML template is updated
+            # Point at the cached rendering of the new HTML, or keep the current preview
+            # until the background render replaces it
+            render_preview = False
             if 'html_template' in update_data and 'preview_image' not in update_data:
-                update_data['preview_image'] = await self._generate_preview_image(update_data['html_template'])
+                preview_service = get_template_preview_service()
+                key = preview_service.preview_key(update_data['html_template'])
+                if preview_service.get_cached_path(key) is not None:
+                    update_data['preview_image'] = preview_service.preview_url(key)
+                else:
+                    render_preview = True
 
             # Update style config if HTML template is updated
             if 'html_template' in update_data and 'style_config' not in update_data:
@@ -263,7 +269,11 @@ class GlobalMasterTemplateService:
 
             async with AsyncSessionLocal() as session:
                 db_service = DatabaseService(session)
-                return await db_service.update_global_master_template(template_id, update_data)
+                updated = await db_service.update_global_master_template(template_id, update_data)
+
+            if updated and render_preview:
+                await get_template_preview_service().schedule(template_id, update_data['html_template'])
+            return updated
 
         except Exception as e:
             logger.error(f"Failed to update global master template {template_id}: {e}")
@@ -979,9 +989,67 @@ class GlobalMasterTemplateService:
             logger.error(f"HTML validation failed with exception: {e}")
             return False
 
+    async def rebuild_previews(self) -> int:
+        """Queue preview renders for every template whose current HTML has no cached thumbnail"""
+        preview_service = get_template_preview_service()
+        async with AsyncSessionLocal() as session:
+            db_service = DatabaseService(session)
+            templates = await db_service.get_all_global_master_templates(active_only=False)
+            scheduled = 0
+            for summary in templates:
+                template = await db_service.get_global_master_template_by_id(summary.id)
+                if template is None:
+                    continue
+                key = preview_service.preview_key(template.html_template)
+                if preview_service.get_cached_path(key) is not None:
+                    if template.preview_image != preview_service.preview_url(key):
+                        await db_service.set_global_master_template_preview(
+                            template.id, preview_service.preview_url(key)
+                        )
+                    continue
+                if await preview_service.schedule(template.id, template.html_template):
+                    scheduled += 1
+        return scheduled
+
+    async def render_missing_preview(self, file_name: str) -> Optional[str]:
+        """Re-render a thumbnail that is requested but not on disk
+
+        Happens after the preview width changed or the cache was wiped: the template
+        still points at the old URL. Renders the template at the current width,
+        points it at the new URL and returns that URL; None if no template uses it.
+        """
+        preview_service = get_template_preview_service()
+        parsed = preview_service.parse_file_name(file_name)
+        if parsed is None:
+            return None
+        key, _ = parsed
+        stale_url = f"{PREVIEW_URL_PREFIX}/{file_name}"
+
+        if preview_service.get_cached_path(key) is None:
+            async with AsyncSessionLocal() as session:
+                template = await DatabaseService(session).get_global_master_template_by_preview(stale_url)
+            # Only render HTML a template actually has, never arbitrary keys
+            if template is None or preview_service.preview_key(template.html_template) != key:
+                return None
+            await preview_service.render(template.html_template)
+
+        url = preview_service.preview_url(key)
+        if url != stale_url:
+            async with AsyncSessionLocal() as session:
+                await DatabaseService(session).replace_global_master_template_preview(stale_url, url)
+        return url
+
+    @staticmethod
+    def _is_rendered_preview(preview_image: Optional[str]) -> bool:
+        return bool(preview_image) and not preview_image.startswith("data:image/svg+xml")
+
     async def _generate_preview_image(self, html_template: str) -> str:
-        """Generate preview image for template (placeholder implementation)"""
-        # This is a placeholder implementation
+        """Preview for a template: its cached rendering, or a placeholder until it is rendered"""
+        preview_service = get_template_preview_service()
+        key = preview_service.preview_key(html_template)
+        if preview_service.get_cached_path(key) is not None:
+            return preview_service.preview_url(key)
+
         placeholder_svg = """
         <svg width="320" height="180" xmlns="http://www.w3.org/2000/svg">
             <rect width="320" height="180" fill="#f3f4f6"/>
@@ -1032,19 +1100,7 @@ class GlobalMasterTemplateService:
                 templates = await db_service.get_global_master_templates_by_tags(tags, active_only)
 
                 return [
-                    {
-                        "id": template.id,
-                        "template_name": template.template_name,
-                        "description": template.description,
-                        "preview_image": template.preview_image,
-                        "tags": template.tags,
-                        "is_default": template.is_default,
-                        "is_active": template.is_active,
-                        "usage_count": template.usage_count,
-                        "created_by": template.created_by,
-                        "created_at": template.created_at,
-                        "updated_at": template.updated_at
-                    }
+                    self._to_list_item(template)
                     for template in templates
                 ]
 
@@ -1083,19 +1139,7 @@ class GlobalMasterTemplateService:
                 has_prev = page > 1
 
                 template_list = [
-                    {
-                        "id": template.id,
-                        "template_name": template.template_name,
-                        "description": template.description,
-                        "preview_image": template.preview_image,
-                        "tags": template.tags,
-                        "is_default": template.is_default,
-                        "is_active": template.is_active,
-                        "usage_count": template.usage_count,
-                        "created_by": template.created_by,
-                        "created_at": template.created_at,
-                        "updated_at": template.updated_at
-                    }
+                    self._to_list_item(template)
                     for template in templates
                 ]
 
@@ -0,0 +1,258 @@
+"""
+图片搜索结果缓存 - 跨请求复用提供者搜索结果（TTL + LRU，可选SQLite持久化）
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..models import ImageSearchRequest, ImageSearchResult
+
+logger = logging.getLogger(__name__)
+
+
+class SearchResultCache:
+    """搜索结果缓存管理器
+
+    内存中维护一个按访问顺序排列的LRU表，条目带有过期时间；
+    空结果使用较短的TTL做负缓存，避免对同一无结果查询反复请求提供者。
+    配置了 ``persist_path`` 时，条目同时写入SQLite，服务重启后可继续命中。
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+
+        self.enabled = config.get('enabled', True)
+        self.max_entries = max(1, int(config.get('max_entries', 1000)))
+        self.ttl_seconds = float(config.get('ttl_seconds', 3600))
+        self.negative_ttl_seconds = float(config.get('negative_ttl_seconds', 300))
+        self.persist_path = config.get('persist_path') or None
+
+        # key -> (expires_at, result_payload)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 命中统计
+        self._stats = {
+            'hits': 0,
+            'negative_hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'evictions': 0,
+            'stores': 0,
+            'persistent_hits': 0,
+        }
+
+        self._db: Optional[sqlite3.Connection] = None
+        if self.enabled and self.persist_path:
+            self._init_persistence()
+
+    def _init_persistence(self):
+        """初始化SQLite持久化层"""
+        try:
+            db_path = Path(self.persist_path)
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS image_search_cache ("
+                " cache_key TEXT PRIMARY KEY,"
+                " expires_at REAL NOT NULL,"
+                " payload TEXT NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_image_search_cache_expires"
+                " ON image_search_cache (expires_at)"
+            )
+            self._db.execute("DELETE FROM image_search_cache WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+            logger.debug(f"Image search cache persistence enabled: {db_path}")
+        except Exception as e:
+            logger.warning(f"Failed to initialize image search cache persistence: {e}")
+            self._db = None
+
+    @staticmethod
+    def _normalize_text(value: Optional[str]) -> str:
+        return ' '.join((value or '').lower().split())
+
+    def build_key(self, request: ImageSearchRequest, providers: List[str]) -> str:
+        """根据规范化的查询参数生成缓存键"""
+        normalized = {
+            'query': self._normalize_text(request.query),
+            'providers': sorted(p.lower() for p in providers),
+            'page': request.page,
+            'per_page': request.per_page,
+            'filters': {
+                'keywords': sorted(self._normalize_text(k) for k in request.keywords),
+                'tags': sorted(self._normalize_text(t) for t in request.tags),
+                'orientation': request.orientation,
+                'category': request.category,
+                'color': request.color,
+                'min_width': request.min_width,
+                'min_height': request.min_height,
+                'max_width': request.max_width,
+                'max_height': request.max_height,
+                'license_types': sorted(l.value for l in request.license_types),
+            },
+        }
+        raw = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    async def get(self, key: str) -> Optional[ImageSearchResult]:
+        """获取缓存结果，未命中或已过期返回None"""
+        if not self.enabled:
+            return None
+
+        payload = self._get_from_memory(key)
+        if payload is None and self._db is not None:
+            payload = await asyncio.get_event_loop().run_in_executor(None, self._get_from_db, key)
+
+        if payload is None:
+            with self._lock:
+                self._stats['misses'] += 1
+            return None
+
+        with self._lock:
+            self._stats['hits'] += 1
+            if not payload.get('images'):
+                self._stats['negative_hits'] += 1
+
+        try:
+            return ImageSearchResult(**payload)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable image search cache entry: {e}")
+            await self.invalidate(key)
+            return None
+
+    def _get_from_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, payload = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self._stats['expired'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            return payload
+
+    def _get_from_db(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT expires_at, payload FROM image_search_cache WHERE cache_key = ?",
+                    (key,)
+                ).fetchone()
+            if row is None:
+                return None
+
+            expires_at, raw_payload = row
+            if expires_at <= time.time():
+                with self._lock:
+                    self._db.execute("DELETE FROM image_search_cache WHERE cache_key = ?", (key,))
+                    self._db.commit()
+                    self._stats['expired'] += 1
+                return None
+
+            payload = json.loads(raw_payload)
+            self._put_in_memory(key, expires_at, payload)
+            with self._lock:
+                self._stats['persistent_hits'] += 1
+            return payload
+        except Exception as e:
+            logger.warning(f"Failed to read image search cache entry: {e}")
+            return None
+
+    async def set(self, key: str, result: ImageSearchResult):
+        """写入缓存；空结果按负缓存TTL处理"""
+        if not self.enabled:
+            return
+
+        ttl = self.ttl_seconds if result.images else self.negative_ttl_seconds
+        if ttl <= 0:
+            return
+
+        expires_at = time.time() + ttl
+        payload = result.model_dump(mode='json')
+        self._put_in_memory(key, expires_at, payload)
+
+        with self._lock:
+            self._stats['stores'] += 1
+
+        if self._db is not None:
+            await asyncio.get_event_loop().run_in_executor(
+                None, self._save_to_db, key, expires_at, payload
+            )
+
+    def _put_in_memory(self, key: str, expires_at: float, payload: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = (expires_at, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _save_to_db(self, key: str, expires_at: float, payload: Dict[str, Any]):
+        try:
+            raw_payload = json.dumps(payload, ensure_ascii=False)
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO image_search_cache (cache_key, expires_at, payload)"
+                    " VALUES (?, ?, ?)",
+                    (key, expires_at, raw_payload)
+                )
+                self._db.commit()
+        except Exception as e:
+            logger.warning(f"Failed to persist image search cache entry: {e}")
+
+    async def invalidate(self, key: str):
+        """删除单个缓存条目"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+        if self._db is not None:
+            await asyncio.get_event_loop().run_in_executor(None, self._delete_from_db, key)
+
+    def _delete_from_db(self, key: Optional[str]):
+        """删除持久化条目；key为None时删除全部"""
+        try:
+            with self._lock:
+                if key is None:
+                    self._db.execute("DELETE FROM image_search_cache")
+                else:
+                    self._db.execute("DELETE FROM image_search_cache WHERE cache_key = ?", (key,))
+                self._db.commit()
+        except Exception as e:
+            logger.warning(f"Failed to delete image search cache entries: {e}")
+
+    async def clear(self) -> int:
+        """清空所有搜索结果缓存"""
+        with self._lock:
+            cleared = len(self._entries)
+            self._entries.clear()
+
+        if self._db is not None:
+            await asyncio.get_event_loop().run_in_executor(None, self._delete_from_db, None)
+        return cleared
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取命中统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['enabled'] = self.enabled
+        stats['persistent'] = self._db is not None
+        return stats
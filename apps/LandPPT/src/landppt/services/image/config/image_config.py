@@ -9,6 +9,9 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# 应用数据目录（项目根目录下的temp），与工作目录无关
+APP_DATA_DIR = Path(__file__).resolve().parents[5] / "temp"
+
 class ImageServiceConfig:
     """图片服务配置管理器"""
     
@@ -156,6 +159,15 @@ class ImageServiceConfig:
                 'max_size_gb': 5.0,  # 默认最大缓存大小5GB
                 'cleanup_interval_hours': 24  # 默认24小时清理一次（虽然图片永久有效，但保留配置项）
             },
+
+            # 搜索结果缓存配置 - 跨请求复用网络搜索结果
+            'search_cache': {
+                'enabled': True,
+                'max_entries': 1000,  # 内存中最多保留的查询条目数（LRU淘汰）
+                'ttl_seconds': 3600,  # 有结果的查询缓存1小时
+                'negative_ttl_seconds': 300,  # 无结果的查询缓存5分钟
+                'persist_path': str(APP_DATA_DIR / 'images_cache' / 'search_cache.db')  # 留空则仅使用内存缓存
+            },
             
             # 图片处理配置
             'processing': {
@@ -395,6 +407,9 @@ class ImageServiceConfig:
         # 缓存目录配置
         if os.getenv('IMAGE_CACHE_DIR'):
             self._config['cache']['base_dir'] = os.getenv('IMAGE_CACHE_DIR')
+            self._config['search_cache']['persist_path'] = str(
+                Path(os.getenv('IMAGE_CACHE_DIR')) / 'search_cache.db'
+            )
     
     def get_config(self) -> Dict[str, Any]:
         """获取完整配置"""
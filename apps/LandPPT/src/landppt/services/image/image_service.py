@@ -16,6 +16,7 @@ from .models import (
 from .providers.base import provider_registry, ImageSearchProvider, ImageGenerationProvider, LocalStorageProvider
 from .processors.image_processor import ImageProcessor
 from .cache.image_cache import ImageCacheManager
+from .cache.search_cache import SearchResultCache
 from .matching.image_matcher import ImageMatcher
 from .adapters.ppt_prompt_adapter import PPTPromptAdapter, PPTSlideContext
 
@@ -43,6 +44,7 @@ class ImageService:
         # 初始化组件
         self.processor = ImageProcessor(config.get('processing', {}))
         self.cache_manager = ImageCacheManager(config.get('cache', {}))
+        self.search_cache = SearchResultCache(config.get('search_cache', {}))
         self.matcher = ImageMatcher(config.get('matching', {}))
         self.ppt_adapter = PPTPromptAdapter(config.get('ppt_adapter', {}))
 
@@ -237,8 +239,16 @@ class ImageService:
         if not self.initialized:
             await self.initialize()
 
-        # 生成搜索键用于去重
-        search_key = f"{request.query}_{request.page}_{request.per_page}"
+        # 生成规范化的搜索键，同时用于进行中搜索的去重和跨请求结果缓存
+        search_providers = self._resolve_search_providers(request)
+        search_key = self.search_cache.build_key(
+            request, [p.provider.value for p in search_providers]
+        )
+
+        cached_result = await self.search_cache.get(search_key)
+        if cached_result is not None:
+            logger.debug(f"Image search cache hit for: {request.query}")
+            return cached_result
 
         # 检查是否有相同的搜索正在进行
         async with self._search_lock:
@@ -247,51 +257,61 @@ class ImageService:
                 return await self._active_searches[search_key]
 
             # 创建新的搜索任务
-            search_future = asyncio.create_task(self._perform_search(request))
+            search_future = asyncio.create_task(self._perform_search(request, search_providers))
             self._active_searches[search_key] = search_future
 
         try:
             result = await search_future
+            # 有提供者失败（超时、限流等）时空结果只是暂时的，不能按"无图片"缓存整个TTL
+            if result.images or not (result.error or result.provider_errors):
+                await self.search_cache.set(search_key, result)
             return result
         finally:
             # 清理完成的搜索
             async with self._search_lock:
                 self._active_searches.pop(search_key, None)
 
-    async def _perform_search(self, request: ImageSearchRequest) -> ImageSearchResult:
+    def _resolve_search_providers(self, request: ImageSearchRequest) -> List[ImageSearchProvider]:
+        """获取本次搜索实际使用的提供者"""
+        # 获取启用的搜索提供者
+        search_providers = provider_registry.get_search_providers()
+
+        # 过滤提供者
+        if request.preferred_providers:
+            search_providers = [
+                p for p in search_providers
+                if p.provider in request.preferred_providers
+            ]
+
+        if request.excluded_providers:
+            search_providers = [
+                p for p in search_providers
+                if p.provider not in request.excluded_providers
+            ]
+
+        # 如果没有指定优先提供者，根据默认配置排序
+        if not request.preferred_providers:
+            search_providers = self._sort_providers_by_preference(search_providers)
+
+        return search_providers
+
+    async def _perform_search(self, request: ImageSearchRequest,
+                              search_providers: List[ImageSearchProvider]) -> ImageSearchResult:
         """执行实际的搜索操作"""
         start_time = time.time()
         all_images = []
         provider_results = {}
+        provider_errors = {}
+        result_provider = search_providers[0].provider if search_providers else ImageProvider.SYSTEM_DEFAULT
 
         try:
-            # 获取启用的搜索提供者
-            search_providers = provider_registry.get_search_providers()
-            
             if not search_providers:
                 return ImageSearchResult(
                     images=[], total_count=0, page=request.page,
                     per_page=request.per_page, has_next=False, has_prev=False,
-                    search_time=time.time() - start_time
+                    search_time=time.time() - start_time, provider=result_provider
                 )
-            
-            # 过滤提供者
-            if request.preferred_providers:
-                search_providers = [
-                    p for p in search_providers
-                    if p.provider in request.preferred_providers
-                ]
-
-            if request.excluded_providers:
-                search_providers = [
-                    p for p in search_providers
-                    if p.provider not in request.excluded_providers
-                ]
-
-            # 如果没有指定优先提供者，根据默认配置排序
-            if not request.preferred_providers:
-                search_providers = self._sort_providers_by_preference(search_providers)
-            
+
             # 并行搜索
             search_tasks = []
             for provider in search_providers:
@@ -303,13 +323,17 @@ class ImageService:
             
             # 处理结果
             for i, result in enumerate(results):
+                provider_name = search_providers[i].provider.value
                 if isinstance(result, Exception):
                     logger.error(f"Search failed for provider {search_providers[i].provider}: {result}")
+                    provider_errors[provider_name] = str(result) or type(result).__name__
                     continue
                 
                 if isinstance(result, ImageSearchResult):
+                    if result.error:
+                        provider_errors[provider_name] = result.error
                     all_images.extend(result.images)
-                    provider_results[search_providers[i].provider.value] = len(result.images)
+                    provider_results[provider_name] = len(result.images)
             
             # 使用智能匹配器排序和过滤结果
             if all_images:
@@ -329,7 +353,9 @@ class ImageService:
                 has_next=end_idx < total_count,
                 has_prev=request.page > 1,
                 search_time=time.time() - start_time,
-                provider_results=provider_results
+                provider_results=provider_results,
+                provider=result_provider,
+                provider_errors=provider_errors
             )
             
         except Exception as e:
@@ -337,7 +363,8 @@ class ImageService:
             return ImageSearchResult(
                 images=[], total_count=0, page=request.page,
                 per_page=request.per_page, has_next=False, has_prev=False,
-                search_time=time.time() - start_time
+                search_time=time.time() - start_time, provider=result_provider,
+                error=str(e) or type(e).__name__, provider_errors=provider_errors
             )
     
     async def _search_with_provider(self, provider: ImageSearchProvider, request: ImageSearchRequest) -> ImageSearchResult:
@@ -352,10 +379,12 @@ class ImageService:
 
         except Exception as e:
             logger.error(f"Search failed for provider {provider.provider}: {e}")
+            # 带上错误标记，避免失败被当作"没有图片"而缓存
             return ImageSearchResult(
                 images=[], total_count=0, page=request.page,
                 per_page=request.per_page, has_next=False, has_prev=False,
-                search_time=0.0
+                search_time=0.0, provider=provider.provider,
+                error=str(e) or type(e).__name__
             )
     
     async def _cache_image_from_provider(self, provider: ImageSearchProvider, image_info: ImageInfo):
@@ -593,7 +622,9 @@ class ImageService:
     
     async def get_cache_stats(self) -> Dict[str, Any]:
         """获取缓存统计"""
-        return await self.cache_manager.get_cache_stats()
+        stats = await self.cache_manager.get_cache_stats()
+        stats['search_cache'] = self.search_cache.get_stats()
+        return stats
 
     async def list_cached_images(self,
                                 page: int = 1,
@@ -909,6 +940,7 @@ class ImageService:
         try:
             # 清空所有缓存
             deleted_count = await self.cache_manager.clear_cache()
+            await self.search_cache.clear()
             logger.info(f"Cleared all cache, deleted {deleted_count} images")
             return deleted_count
         except Exception as e:
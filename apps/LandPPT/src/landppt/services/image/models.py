@@ -264,6 +264,8 @@ class ImageSearchResult(BaseModel):
     provider_results: Dict[str, int] = Field(default_factory=dict)
     provider: ImageProvider
     error: Optional[str] = None
+    # 搜索失败的提供者 -> 错误信息；非空时结果不完整，不能当作"无图片"缓存
+    provider_errors: Dict[str, str] = Field(default_factory=dict)
 
 
 class ImageOperationResult(BaseModel):
@@ -1,11 +1,25 @@
 """
 Progress Tracker for Speech Script Generation
+
+Snapshots are published on the shared progress channel and written through to
+the background task store, so progress survives a restart and subscribers get
+pushed updates instead of polling. Store writes run on a single background
+thread in submission order; callers on the event loop never wait for SQLite.
 """
 
+import asyncio
+import logging
+import os
 import time
 import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, fields
+
+from .task_events import progress_channel
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -55,10 +69,93 @@ class ProgressInfo:
 
 class ProgressTracker:
     """Thread-safe progress tracker for speech script generation"""
-    
-    def __init__(self):
+
+    # A running snapshot written by another process that has not been updated
+    # for this long is treated as interrupted (e.g. the process was restarted)
+    STALE_AFTER_SECONDS = 120
+
+    def __init__(self, store=None):
         self._progress_data: Dict[str, ProgressInfo] = {}
         self._lock = threading.Lock()
+        self._owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._store = store
+        self._store_failed = False
+        # One thread, so the snapshots of a task reach the store in order
+        self._store_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="progress_store")
+        self._unsaved: Dict[str, Dict[str, Any]] = {}
+
+    def _get_store(self):
+        if self._store is None and not self._store_failed:
+            try:
+                from .task_store import get_task_store
+                self._store = get_task_store()
+            except Exception as e:
+                logger.warning(f"Progress persistence disabled: {e}")
+                self._store_failed = True
+        return self._store
+
+    def _persist(self, progress: Optional[ProgressInfo]) -> Optional[ProgressInfo]:
+        """Publish the snapshot and queue it for the store"""
+        if progress is None:
+            return None
+
+        with self._lock:
+            data = progress.to_dict()
+            # While the store is busy only the latest snapshot of a task is kept
+            scheduled = progress.task_id in self._unsaved
+            self._unsaved[progress.task_id] = data
+        progress_channel.publish(progress.task_id, {'type': 'speech_script', **data})
+
+        if not scheduled:
+            self._store_executor.submit(self._save, progress.task_id)
+        return progress
+
+    def _save(self, task_id: str):
+        """Write the latest queued snapshot of a task (runs on the store thread)"""
+        with self._lock:
+            data = self._unsaved.pop(task_id, None)
+        store = self._get_store()
+        if data is None or store is None:
+            return
+        try:
+            store.save_progress(task_id, self._owner, data['status'], data)
+        except Exception as e:
+            logger.warning(f"Failed to persist progress for task {task_id}: {e}")
+
+    def flush(self):
+        """Block until every queued snapshot has been written"""
+        self._store_executor.submit(lambda: None).result()
+
+    def _load(self, task_id: str) -> Optional[ProgressInfo]:
+        """Load a snapshot persisted by this or a previous process"""
+        store = self._get_store()
+        if store is None:
+            return None
+        try:
+            snapshot = store.load_progress(task_id)
+        except Exception as e:
+            logger.warning(f"Failed to load progress for task {task_id}: {e}")
+            return None
+        if snapshot is None:
+            return None
+
+        known_fields = {f.name for f in fields(ProgressInfo)}
+        progress = ProgressInfo(**{k: v for k, v in snapshot['data'].items() if k in known_fields})
+        progress.last_update = snapshot['data'].get('last_update', snapshot['updated_at'])
+
+        if snapshot['owner'] == self._owner or progress.status != "running":
+            with self._lock:
+                self._progress_data.setdefault(task_id, progress)
+            return progress
+
+        if time.time() - snapshot['updated_at'] > self.STALE_AFTER_SECONDS:
+            # The process generating this task is gone
+            progress.status = "failed"
+            progress.message = "生成失败: 服务重启，生成已中断"
+            with self._lock:
+                self._progress_data.setdefault(task_id, progress)
+            self._persist(progress)
+        return progress
     
     def create_task(self, task_id: str, project_id: str, total_slides: int) -> ProgressInfo:
         """Create a new progress tracking task"""
@@ -74,7 +171,7 @@ class ProgressTracker:
                 message="开始生成演讲稿..."
             )
             self._progress_data[task_id] = progress
-            return progress
+        return self._persist(progress)
     
     def update_progress(self, task_id: str, **kwargs) -> Optional[ProgressInfo]:
         """Update progress for a task"""
@@ -90,12 +187,25 @@ class ProgressTracker:
                     setattr(progress, key, value)
             
             progress.last_update = time.time()
-            return progress
+        return self._persist(progress)
     
     def get_progress(self, task_id: str) -> Optional[ProgressInfo]:
         """Get progress for a task"""
         with self._lock:
-            return self._progress_data.get(task_id)
+            progress = self._progress_data.get(task_id)
+        if progress is None:
+            progress = self._load(task_id)
+        return progress
+
+    async def get_progress_async(self, task_id: str) -> Optional[ProgressInfo]:
+        """Get progress for a task, loading persisted snapshots on the store thread"""
+        with self._lock:
+            progress = self._progress_data.get(task_id)
+        if progress is None:
+            progress = await asyncio.get_running_loop().run_in_executor(
+                self._store_executor, self._load, task_id
+            )
+        return progress
     
     def complete_task(self, task_id: str, message: str = "生成完成") -> Optional[ProgressInfo]:
         """Mark task as completed"""
@@ -126,7 +236,7 @@ class ProgressTracker:
             progress.message = f"已完成第{slide_index + 1}页: {slide_title}"
             progress.last_update = time.time()
             
-            return progress
+        return self._persist(progress)
     
     def add_slide_failed(self, task_id: str, slide_index: int, slide_title: str, error: str) -> Optional[ProgressInfo]:
         """Mark a slide as failed"""
@@ -146,7 +256,7 @@ class ProgressTracker:
             })
             progress.last_update = time.time()
             
-            return progress
+        return self._persist(progress)
     
     def add_slide_skipped(self, task_id: str, slide_index: int, slide_title: str, reason: str) -> Optional[ProgressInfo]:
         """Mark a slide as skipped"""
@@ -161,7 +271,7 @@ class ProgressTracker:
             progress.message = f"第{slide_index + 1}页已跳过: {slide_title}"
             progress.last_update = time.time()
             
-            return progress
+        return self._persist(progress)
     
     def cleanup_old_tasks(self, max_age_seconds: int = 3600):
         """Clean up old completed/failed tasks"""
@@ -175,13 +285,35 @@ class ProgressTracker:
             
             for task_id in to_remove:
                 del self._progress_data[task_id]
+
+        self._store_executor.submit(self._delete_before, current_time - max_age_seconds)
+
+    def _delete_before(self, cutoff: float):
+        store = self._get_store()
+        if store is not None:
+            try:
+                store.delete_progress(before=cutoff)
+            except Exception as e:
+                logger.warning(f"Failed to clean up persisted progress: {e}")
     
     def remove_task(self, task_id: str) -> bool:
         """Remove a specific task"""
         with self._lock:
-            if task_id in self._progress_data:
-                del self._progress_data[task_id]
-                return True
+            removed = self._progress_data.pop(task_id, None) is not None
+            self._unsaved.pop(task_id, None)
+
+        progress_channel.forget(task_id)
+        # Queued behind pending writes, so a snapshot saved later cannot bring it back
+        return self._store_executor.submit(self._delete, task_id).result() or removed
+
+    def _delete(self, task_id: str) -> bool:
+        store = self._get_store()
+        if store is None:
+            return False
+        try:
+            return store.delete_progress(task_id) > 0
+        except Exception as e:
+            logger.warning(f"Failed to remove persisted progress for task {task_id}: {e}")
             return False
 
 
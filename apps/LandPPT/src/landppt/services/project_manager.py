@@ -235,13 +235,14 @@ class ProjectManager:
         
         return True
     
-    async def get_project_versions(self, project_id: str) -> List[Dict[str, Any]]:
-        """Get all versions of a project"""
+    async def get_project_versions(self, project_id: str, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """Get versions of a project, newest first"""
         project = self.projects.get(project_id)
         if not project:
             return []
         
-        return project.versions
+        versions = list(reversed(project.versions))[max(offset, 0):]
+        return versions if limit is None else versions[:limit]
     
     async def restore_project_version(self, project_id: str, version: int) -> bool:
         """Restore project to a specific version"""
@@ -17,7 +17,8 @@ class SpeechScriptPrompts:
         total_slides: int,
         project_info: Dict[str, Any],
         previous_slide_context: str,
-        customization: Dict[str, Any]
+        customization: Dict[str, Any],
+        next_slide_context: str = ""
     ) -> str:
         """Generate prompt for single slide speech script"""
         
@@ -46,6 +47,9 @@ class SpeechScriptPrompts:
         
         if previous_slide_context:
             context_info += f"\n上一页内容概要：{previous_slide_context}"
+
+        if next_slide_context:
+            context_info += f"\n下一页内容概要：{next_slide_context}"
         
         if customization.get('custom_style_prompt'):
             context_info += f"\n自定义风格要求：{customization['custom_style_prompt']}"
@@ -79,6 +83,85 @@ class SpeechScriptPrompts:
         
         return prompt
     
+    @staticmethod
+    def get_multi_slide_script_prompt(
+        slides: List[Dict[str, Any]],
+        total_slides: int,
+        project_info: Dict[str, Any],
+        previous_slide_context: str,
+        next_slide_context: str,
+        customization: Dict[str, Any]
+    ) -> str:
+        """Generate prompt for several consecutive slides in one structured call
+
+        ``slides`` items carry ``slide_index`` and ``slide_data``; the model must
+        answer with a JSON array so each script can be mapped back to its slide.
+        """
+        import re
+
+        slide_sections = []
+        for item in slides:
+            slide_index = item['slide_index']
+            slide_data = item['slide_data']
+            slide_title = slide_data.get('title', f'第{slide_index + 1}页')
+            text_content = re.sub(r'<[^>]+>', '', slide_data.get('html_content', ''))
+            text_content = re.sub(r'\s+', ' ', text_content).strip()
+            slide_sections.append(
+                f"【第{slide_index + 1}页】\n- 幻灯片标题：{slide_title}\n- 幻灯片内容：{text_content}"
+            )
+
+        context_info = f"""
+项目信息：
+- 演示主题：{project_info.get('topic', '')}
+- 应用场景：{project_info.get('scenario', '')}
+- 目标受众：{customization.get('target_audience', 'general_public')}
+- 语言风格：{customization.get('tone', 'conversational')}
+- 语言复杂度：{customization.get('language_complexity', 'moderate')}
+- 演示总页数：{total_slides}页
+"""
+
+        if previous_slide_context:
+            context_info += f"\n这组幻灯片之前一页的内容概要：{previous_slide_context}"
+
+        if next_slide_context:
+            context_info += f"\n这组幻灯片之后一页的内容概要：{next_slide_context}"
+
+        if customization.get('custom_style_prompt'):
+            context_info += f"\n自定义风格要求：{customization['custom_style_prompt']}"
+
+        tone_desc = SpeechScriptPrompts._get_tone_description(customization.get('tone', 'conversational'))
+        audience_desc = SpeechScriptPrompts._get_audience_description(customization.get('target_audience', 'general_public'))
+        complexity_desc = SpeechScriptPrompts._get_complexity_description(customization.get('language_complexity', 'moderate'))
+        slides_text = "\n\n".join(slide_sections)
+
+        prompt = f"""你是一位专业的演讲稿撰写专家。请为以下连续的{len(slides)}页PPT幻灯片分别生成自然流畅的演讲稿。
+
+{context_info}
+
+幻灯片列表：
+{slides_text}
+
+演讲稿要求：
+1. 语调风格：{tone_desc}
+2. 目标受众：{audience_desc}
+3. 语言复杂度：{complexity_desc}
+4. 包含过渡语句：{'是' if customization.get('include_transitions', True) else '否'}
+5. 演讲节奏：{customization.get('speaking_pace', 'normal')}
+
+生成要求：
+- 每页演讲稿都要与该页内容紧密相关，但不要简单重复
+- 使用自然的口语化表达，适合现场演讲
+- 相邻页面之间要自然衔接，前后连贯
+- 每页控制篇幅，确保演讲时长适中（建议1-3分钟）
+- 语言要符合指定的风格和受众特点
+
+输出格式：
+只输出一个JSON数组，不要输出任何其他内容。数组中每个元素对应一页幻灯片，格式如下：
+[{{"page": 页码, "script": "该页的演讲稿"}}]
+页码使用上面列表中的页码（从1开始），每一页都必须出现且只出现一次。"""
+
+        return prompt
+
     @staticmethod
     def get_opening_remarks_prompt(
         project_info: Dict[str, Any],
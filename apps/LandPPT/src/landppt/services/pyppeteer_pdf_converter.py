@@ -7,6 +7,7 @@ import asyncio
 import logging
 import os
 import tempfile
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import List, Optional, Dict, Any, Tuple
 import time
@@ -27,6 +28,47 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
+def merge_pdf_files(pdf_files: List[str], output_path: str) -> bool:
+    """Merge PDF files; module-level so it can run in a worker process"""
+    try:
+        # Try to use PyPDF2 first
+        try:
+            from PyPDF2 import PdfMerger
+
+            merger = PdfMerger()
+
+            for pdf_file in pdf_files:
+                if os.path.exists(pdf_file):
+                    merger.append(pdf_file)
+
+            with open(output_path, 'wb') as output_file:
+                merger.write(output_file)
+
+            merger.close()
+            return True
+
+        except ImportError:
+            # Fallback to pypdf
+            from pypdf import PdfMerger
+
+            merger = PdfMerger()
+
+            for pdf_file in pdf_files:
+                if os.path.exists(pdf_file):
+                    merger.append(pdf_file)
+
+            with open(output_path, 'wb') as output_file:
+                merger.write(output_file)
+
+            merger.close()
+            return True
+
+    except Exception as error:
+        logger.error(f"❌ Error merging PDFs: {error}")
+        logger.info("💡 Tip: Install PyPDF2 for PDF merging: pip install PyPDF2")
+        return False
+
+
 class PlaywrightPDFConverter:
     """
     PDF converter using Playwright
@@ -38,6 +80,10 @@ class PlaywrightPDFConverter:
         self.context: Optional[BrowserContext] = None
         self.playwright = None
         self._browser_lock = asyncio.Lock()
+        # Warm pages shared by screenshot jobs; the semaphore bounds concurrent renders
+        self._idle_pages: List[Page] = []
+        self._page_semaphore: Optional[asyncio.Semaphore] = None
+        self._page_pool_size = 0
 
     def is_available(self) -> bool:
         """Check if Playwright is available"""
@@ -2056,54 +2102,67 @@ class PlaywrightPDFConverter:
                 await browser.close()
                 logger.debug("🔒 Shared browser closed.")
 
-    def _merge_pdfs_sync(self, pdf_files: List[str], output_path: str) -> bool:
-        """Synchronous PDF merging function to be run in thread pool"""
-        try:
-            # Try to use PyPDF2 first
-            try:
-                from PyPDF2 import PdfMerger
-
-                merger = PdfMerger()
-
-                for pdf_file in pdf_files:
-                    if os.path.exists(pdf_file):
-                        merger.append(pdf_file)
-
-                with open(output_path, 'wb') as output_file:
-                    merger.write(output_file)
-
-                merger.close()
-                return True
-
-            except ImportError:
-                # Fallback to pypdf
-                from pypdf import PdfMerger
-
-                merger = PdfMerger()
-
-                for pdf_file in pdf_files:
-                    if os.path.exists(pdf_file):
-                        merger.append(pdf_file)
-
-                with open(output_path, 'wb') as output_file:
-                    merger.write(output_file)
-
-                merger.close()
-                return True
-
-        except Exception as error:
-            logger.error(f"❌ Error merging PDFs: {error}")
-            logger.info("💡 Tip: Install PyPDF2 for PDF merging: pip install PyPDF2")
-            return False
-
     async def merge_pdfs(self, pdf_files: List[str], output_path: str) -> bool:
-        """Merge multiple PDF files into one using thread pool to avoid blocking"""
-        from ..utils.thread_pool import run_blocking_io
-        return await run_blocking_io(self._merge_pdfs_sync, pdf_files, output_path)
+        """Merge multiple PDF files into one in the process pool to keep the event loop process free"""
+        from ..utils.process_pool import run_cpu_bound
+        return await run_cpu_bound(merge_pdf_files, pdf_files, output_path)
+
+    def _get_page_semaphore(self) -> asyncio.Semaphore:
+        if self._page_semaphore is None:
+            from ..core.config import app_config
+            self._page_pool_size = max(1, int(app_config.screenshot_page_pool_size))
+            self._page_semaphore = asyncio.Semaphore(self._page_pool_size)
+        return self._page_semaphore
+
+    @asynccontextmanager
+    async def _pooled_page(self):
+        """Borrow a warm page from the shared pool
+
+        Pages are reset to about:blank and kept open after a successful job; a page
+        whose job failed is closed so a broken page is never handed out again.
+        """
+        await self._get_or_create_browser()
+        async with self._get_page_semaphore():
+            page = None
+            while self._idle_pages and page is None:
+                candidate = self._idle_pages.pop()
+                if not candidate.is_closed():
+                    page = candidate
+            if page is None:
+                page = await self.context.new_page()
+
+            reusable = False
+            try:
+                yield page
+                reusable = True
+            finally:
+                if reusable and self.context is not None and not page.is_closed():
+                    try:
+                        await page.goto("about:blank")
+                        self._idle_pages.append(page)
+                    except Exception:  # noqa: BLE001
+                        reusable = False
+                if not reusable:
+                    try:
+                        await page.close()
+                    except Exception:  # noqa: BLE001
+                        logger.debug("Page already closed or closing failed, ignoring.")
+
+    async def warm_up_pages(self, count: Optional[int] = None) -> int:
+        """Open pages ahead of a batch of screenshots so the first jobs do not pay for it"""
+        await self._get_or_create_browser()
+        self._get_page_semaphore()
+        target = min(count or self._page_pool_size, self._page_pool_size)
+        async with self._browser_lock:
+            while len(self._idle_pages) < target:
+                self._idle_pages.append(await self.context.new_page())
+        return len(self._idle_pages)
 
     async def close(self):
         """Close the browser if it's still open"""
         async with self._browser_lock:
+            # Pooled pages belong to the context and are closed with it
+            self._idle_pages.clear()
             if self.context:
                 await self.context.close()
                 self.context = None
@@ -2143,58 +2202,54 @@ class PlaywrightPDFConverter:
             logger.error(f"❌ HTML file not found: {html_file_path}")
             return False
 
-        page = None
         try:
-            # Get or create browser
-            browser = await self._get_or_create_browser()
-            page = await self.context.new_page()
-
-            # Set viewport
-            await page.set_viewport_size({'width': width, 'height': height})
-
-            # Navigate to HTML file
-            absolute_html_path = Path(html_file_path).resolve()
-            await page.goto(f"file://{absolute_html_path}",
-                          wait_until='networkidle',
-                          timeout=60000)
-
-            # Wait for content to be ready (similar to PDF generation)
-            await asyncio.sleep(0.75)
-
-            # Wait for fonts and resources
-            await self._wait_for_fonts_and_resources(page, max_wait_time=30000)
-
-            # Force chart initialization
-            await self._force_chart_initialization(page)
-
-            # Wait for charts and dynamic content
-            await self._wait_for_charts_and_dynamic_content(page, max_wait_time=60000)
-
-            if wait_for_stable:
-                last_snapshot = None
-                stable_count = 0
-
-                while stable_count < stability_checks:
-                    layout_snapshot = await page.evaluate(
-                        "document.body ? document.body.innerHTML : ''"
-                    )
-
-                    if last_snapshot is not None and layout_snapshot == last_snapshot:
-                        stable_count += 1
-                    else:
-                        stable_count = 1
-                        last_snapshot = layout_snapshot
-
-                    if stable_count < stability_checks:
-                        await asyncio.sleep(stability_interval)
-
-            # Take screenshot
-            await page.screenshot(
-                path=screenshot_path,
-                type='png',
-                full_page=False,
-                clip={'x': 0, 'y': 0, 'width': width, 'height': height}
-            )
+            async with self._pooled_page() as page:
+                # Set viewport
+                await page.set_viewport_size({'width': width, 'height': height})
+
+                # Navigate to HTML file
+                absolute_html_path = Path(html_file_path).resolve()
+                await page.goto(f"file://{absolute_html_path}",
+                              wait_until='networkidle',
+                              timeout=60000)
+
+                # Wait for content to be ready (similar to PDF generation)
+                await asyncio.sleep(0.75)
+
+                # Wait for fonts and resources
+                await self._wait_for_fonts_and_resources(page, max_wait_time=30000)
+
+                # Force chart initialization
+                await self._force_chart_initialization(page)
+
+                # Wait for charts and dynamic content
+                await self._wait_for_charts_and_dynamic_content(page, max_wait_time=60000)
+
+                if wait_for_stable:
+                    last_snapshot = None
+                    stable_count = 0
+
+                    while stable_count < stability_checks:
+                        layout_snapshot = await page.evaluate(
+                            "document.body ? document.body.innerHTML : ''"
+                        )
+
+                        if last_snapshot is not None and layout_snapshot == last_snapshot:
+                            stable_count += 1
+                        else:
+                            stable_count = 1
+                            last_snapshot = layout_snapshot
+
+                        if stable_count < stability_checks:
+                            await asyncio.sleep(stability_interval)
+
+                # Take screenshot
+                await page.screenshot(
+                    path=screenshot_path,
+                    type='png',
+                    full_page=False,
+                    clip={'x': 0, 'y': 0, 'width': width, 'height': height}
+                )
 
             logger.info(f"✅ Screenshot saved: {screenshot_path}")
             return True
@@ -2204,12 +2259,6 @@ class PlaywrightPDFConverter:
             import traceback
             traceback.print_exc()
             return False
-        finally:
-            if page:
-                try:
-                    await page.close()
-                except Exception:  # noqa: BLE001
-                    logger.debug("Page already closed or closing failed, ignoring.")
 
 
 # Global converter instance
@@ -8,7 +8,7 @@ This module provides comprehensive research functionality including:
 """
 
 from .searxng_provider import SearXNGContentProvider, SearXNGSearchResult, SearXNGSearchResponse
-from .content_extractor import WebContentExtractor, ExtractedContent
+from .content_extractor import WebContentExtractor, ExtractedContent, SharedExtractionCache
 from .enhanced_research_service import (
     EnhancedResearchService, 
     EnhancedResearchStep, 
@@ -21,6 +21,7 @@ __all__ = [
     'SearXNGSearchResponse',
     'WebContentExtractor',
     'ExtractedContent',
+    'SharedExtractionCache',
     'EnhancedResearchService',
     'EnhancedResearchStep',
     'EnhancedResearchReport'
@@ -3,22 +3,172 @@ Web Content Extraction Pipeline for Research Functionality
 
 This module provides robust web content extraction using BeautifulSoup to fetch
 and parse HTML content from web pages, with proper error handling and content cleaning.
+
+Pages are fetched through one pooled aiohttp session with per-host connection
+limits and a streaming cap on the body size. Parsing runs in the process pool
+(with lxml when it is installed) so a large page never blocks the event loop, and
+extracted text is cached on disk together with the page's ETag/Last-Modified
+validators so repeated research on overlapping sources skips or revalidates the fetch.
 """
 
 import asyncio
+import json
 import logging
 import re
+import sqlite3
+import threading
 import time
-from typing import Dict, List, Optional, Any, Set
-from urllib.parse import urljoin, urlparse
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple
+from urllib.parse import urlparse
 import aiohttp
 from bs4 import BeautifulSoup, Comment
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from ...core.config import ai_config
+from ...utils.process_pool import run_cpu_bound
 
 logger = logging.getLogger(__name__)
 
+USER_AGENT = "LandPPT Research Bot 1.0"
+
+# Content selectors for different types of content
+CONTENT_SELECTORS = (
+    'article',
+    'main',
+    '.content',
+    '.post-content',
+    '.entry-content',
+    '.article-content',
+    '.story-body',
+    '.post-body',
+    '#content',
+    '#main-content'
+)
+
+# Tags to remove completely
+REMOVE_TAGS = (
+    'script', 'style', 'nav', 'header', 'footer', 'aside',
+    'advertisement', 'ads', 'sidebar', 'menu', 'popup'
+)
+
+READ_CHUNK_SIZE = 64 * 1024
+
+# Cached pages that have not been revalidated for this long are dropped on startup
+PAGE_CACHE_RETENTION_SECONDS = 30 * 86400
+
+
+def _select_html_parser() -> str:
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+
+HTML_PARSER = _select_html_parser()
+
+
+def _clean_text(text: str) -> str:
+    """Clean and normalize extracted text"""
+    if not text:
+        return ""
+
+    # Remove extra whitespace
+    text = re.sub(r'\s+', ' ', text)
+
+    # Remove common unwanted patterns
+    text = re.sub(r'(Cookie|Privacy) Policy.*?(?=\n|$)', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'Subscribe.*?newsletter.*?(?=\n|$)', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'Follow us on.*?(?=\n|$)', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'Share this.*?(?=\n|$)', '', text, flags=re.IGNORECASE)
+
+    # Remove URLs
+    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
+
+    return text.strip()
+
+
+def _extract_metadata(soup: BeautifulSoup, url: str) -> Dict[str, Any]:
+    """Extract metadata from HTML"""
+    metadata = {}
+
+    # Basic metadata
+    if soup.title:
+        metadata['title'] = soup.title.string.strip() if soup.title.string else ""
+
+    # Meta tags
+    meta_tags = soup.find_all('meta')
+    for tag in meta_tags:
+        name = tag.get('name') or tag.get('property')
+        content = tag.get('content')
+        if name and content:
+            metadata[name] = content
+
+    # Language
+    html_tag = soup.find('html')
+    if html_tag and html_tag.get('lang'):
+        metadata['language'] = html_tag.get('lang')
+
+    # Domain
+    parsed_url = urlparse(url)
+    metadata['domain'] = parsed_url.netloc
+
+    return metadata
+
+
+def _extract_main_content(soup: BeautifulSoup, content_selectors, remove_tags) -> str:
+    """Extract main content from HTML using various strategies"""
+
+    # Remove unwanted tags
+    for tag_name in remove_tags:
+        for tag in soup.find_all(tag_name):
+            tag.decompose()
+
+    # Remove comments
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+
+    # Try content selectors in order of preference
+    for selector in content_selectors:
+        content_element = soup.select_one(selector)
+        if content_element:
+            text = content_element.get_text(separator=' ', strip=True)
+            if len(text) > 100:  # Minimum content length
+                return _clean_text(text)
+
+    # Fallback: extract from body
+    body = soup.find('body')
+    if body:
+        # Remove navigation, sidebar, and footer elements
+        for element in body.find_all(['nav', 'aside', 'footer', 'header']):
+            element.decompose()
+
+        text = body.get_text(separator=' ', strip=True)
+        return _clean_text(text)
+
+    # Last resort: get all text
+    return _clean_text(soup.get_text(separator=' ', strip=True))
+
+
+def parse_html_document(body: bytes, url: str, encoding: Optional[str] = None,
+                        content_selectors=CONTENT_SELECTORS,
+                        remove_tags=REMOVE_TAGS) -> Dict[str, Any]:
+    """Parse a fetched page into title, main text and metadata (runs in a worker process)
+
+    The body is passed as bytes so BeautifulSoup can use the HTTP charset, or
+    sniff the document's own ``<meta charset>`` when the server sent none.
+    """
+    soup = BeautifulSoup(body, HTML_PARSER, from_encoding=encoding)
+
+    # Extract metadata (this also captures the title before any tags are removed)
+    metadata = _extract_metadata(soup, url)
+
+    # Extract main content
+    content = _extract_main_content(soup, content_selectors, remove_tags)
+
+    return {'title': metadata.get('title', ''), 'content': content, 'metadata': metadata}
+
 
 class ExtractedContent:
     """Represents extracted content from a web page"""
@@ -44,34 +194,167 @@ class ExtractedContent:
         }
 
 
+class ResearchPageCache:
+    """SQLite cache of extracted page text keyed by URL, with the page's HTTP validators"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._init_db()
+
+    def _init_db(self):
+        try:
+            db_path = Path(self.path)
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS research_page_cache ("
+                " url TEXT PRIMARY KEY,"
+                " etag TEXT,"
+                " last_modified TEXT,"
+                " title TEXT,"
+                " content TEXT NOT NULL,"
+                " metadata TEXT,"
+                " fetched_at REAL NOT NULL,"
+                " validated_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "DELETE FROM research_page_cache WHERE validated_at < ?",
+                (time.time() - PAGE_CACHE_RETENTION_SECONDS,)
+            )
+            self._db.commit()
+        except Exception as e:
+            logger.warning(f"Failed to initialize research page cache, caching disabled: {e}")
+            self._db = None
+
+    def _read(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, title, content, metadata, fetched_at, validated_at"
+                " FROM research_page_cache WHERE url = ?",
+                (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, title, content, metadata, fetched_at, validated_at = row
+        return {
+            'etag': etag,
+            'last_modified': last_modified,
+            'title': title or "",
+            'content': content,
+            'metadata': json.loads(metadata) if metadata else {},
+            'fetched_at': fetched_at,
+            'validated_at': validated_at
+        }
+
+    def _write(self, url: str, etag: Optional[str], last_modified: Optional[str], extracted: ExtractedContent):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO research_page_cache (url, etag, last_modified, title, content,"
+                " metadata, fetched_at, validated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, extracted.title, extracted.content,
+                 json.dumps(extracted.metadata, ensure_ascii=False, default=str), now, now)
+            )
+            self._db.commit()
+
+    def _touch(self, url: str):
+        with self._lock:
+            self._db.execute(
+                "UPDATE research_page_cache SET validated_at = ? WHERE url = ?", (time.time(), url)
+            )
+            self._db.commit()
+
+    async def get(self, url: str) -> Optional[Dict[str, Any]]:
+        if self._db is None:
+            return None
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, self._read, url)
+        except Exception as e:
+            logger.warning(f"Failed to read research page cache: {e}")
+            return None
+
+    async def put(self, url: str, etag: Optional[str], last_modified: Optional[str], extracted: ExtractedContent):
+        if self._db is None:
+            return
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._write, url, etag, last_modified, extracted
+            )
+        except Exception as e:
+            logger.warning(f"Failed to store research page: {e}")
+
+    async def touch(self, url: str):
+        """Mark a cached page as revalidated (the server answered 304)"""
+        if self._db is None:
+            return
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._touch, url)
+        except Exception as e:
+            logger.warning(f"Failed to update research page cache: {e}")
+
+
+_page_cache: Optional[ResearchPageCache] = None
+_http_session: Optional[aiohttp.ClientSession] = None
+_http_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_research_page_cache() -> Optional[ResearchPageCache]:
+    """Shared on-disk page cache, or None when it is disabled"""
+    global _page_cache
+    if not ai_config.research_page_cache_enabled:
+        return None
+    if _page_cache is None or _page_cache.path != ai_config.research_page_cache_path:
+        _page_cache = ResearchPageCache(ai_config.research_page_cache_path)
+    return _page_cache
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Shared connection-pooled session for page fetches on the running event loop"""
+    global _http_session, _http_session_loop
+    loop = asyncio.get_running_loop()
+    if _http_session is None or _http_session.closed or _http_session_loop is not loop:
+        connector = aiohttp.TCPConnector(
+            limit=max(1, ai_config.research_connections_per_host) * 8,
+            limit_per_host=max(1, ai_config.research_connections_per_host),
+            ttl_dns_cache=300
+        )
+        _http_session = aiohttp.ClientSession(
+            connector=connector,
+            headers={
+                'User-Agent': USER_AGENT,
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                'Accept-Language': 'en-US,en;q=0.5',
+                'Accept-Encoding': 'gzip, deflate',
+            }
+        )
+        _http_session_loop = loop
+    return _http_session
+
+
+async def close_http_session():
+    """Close the shared session (called on application shutdown)"""
+    global _http_session, _http_session_loop
+    session, _http_session, _http_session_loop = _http_session, None, None
+    if session is not None and not session.closed:
+        await session.close()
+
+
 class WebContentExtractor:
     """Web content extraction pipeline using BeautifulSoup"""
-    
+
     def __init__(self):
         self.timeout = ai_config.research_extraction_timeout
         self.max_content_length = ai_config.research_max_content_length
-        self.user_agent = "LandPPT Research Bot 1.0"
-        
-        # Content selectors for different types of content
-        self.content_selectors = [
-            'article',
-            'main',
-            '.content',
-            '.post-content',
-            '.entry-content',
-            '.article-content',
-            '.story-body',
-            '.post-body',
-            '#content',
-            '#main-content'
-        ]
-        
-        # Tags to remove completely
-        self.remove_tags = {
-            'script', 'style', 'nav', 'header', 'footer', 'aside',
-            'advertisement', 'ads', 'sidebar', 'menu', 'popup'
-        }
-        
+        self.max_response_bytes = int(ai_config.research_max_response_mb * 1024 * 1024)
+        self.cache_ttl = ai_config.research_page_cache_ttl
+        self.user_agent = USER_AGENT
+
+        self.content_selectors = list(CONTENT_SELECTORS)
+        self.remove_tags = set(REMOVE_TAGS)
+
         # Text splitter for long content
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=self.max_content_length,
@@ -79,158 +362,136 @@ class WebContentExtractor:
             length_function=len,
             separators=["\n\n", "\n", ". ", " ", ""]
         )
-    
-    def _clean_text(self, text: str) -> str:
-        """Clean and normalize extracted text"""
-        if not text:
-            return ""
-            
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove common unwanted patterns
-        text = re.sub(r'(Cookie|Privacy) Policy.*?(?=\n|$)', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'Subscribe.*?newsletter.*?(?=\n|$)', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'Follow us on.*?(?=\n|$)', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'Share this.*?(?=\n|$)', '', text, flags=re.IGNORECASE)
-        
-        # Remove URLs
-        text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
-        
-        return text.strip()
-    
-    def _extract_metadata(self, soup: BeautifulSoup, url: str) -> Dict[str, Any]:
-        """Extract metadata from HTML"""
-        metadata = {}
-        
-        # Basic metadata
-        if soup.title:
-            metadata['title'] = soup.title.string.strip() if soup.title.string else ""
-        
-        # Meta tags
-        meta_tags = soup.find_all('meta')
-        for tag in meta_tags:
-            name = tag.get('name') or tag.get('property')
-            content = tag.get('content')
-            if name and content:
-                metadata[name] = content
-        
-        # Language
-        html_tag = soup.find('html')
-        if html_tag and html_tag.get('lang'):
-            metadata['language'] = html_tag.get('lang')
-        
-        # Domain
-        parsed_url = urlparse(url)
-        metadata['domain'] = parsed_url.netloc
-        
-        return metadata
-    
-    def _extract_main_content(self, soup: BeautifulSoup) -> str:
-        """Extract main content from HTML using various strategies"""
-        
-        # Remove unwanted tags
-        for tag_name in self.remove_tags:
-            for tag in soup.find_all(tag_name):
-                tag.decompose()
-        
-        # Remove comments
-        for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
-            comment.extract()
-        
-        # Try content selectors in order of preference
-        for selector in self.content_selectors:
-            content_element = soup.select_one(selector)
-            if content_element:
-                text = content_element.get_text(separator=' ', strip=True)
-                if len(text) > 100:  # Minimum content length
-                    return self._clean_text(text)
-        
-        # Fallback: extract from body
-        body = soup.find('body')
-        if body:
-            # Remove navigation, sidebar, and footer elements
-            for element in body.find_all(['nav', 'aside', 'footer', 'header']):
-                element.decompose()
-            
-            text = body.get_text(separator=' ', strip=True)
-            return self._clean_text(text)
-        
-        # Last resort: get all text
-        return self._clean_text(soup.get_text(separator=' ', strip=True))
-    
+
+        self._stats = {
+            'fetched': 0,
+            'cache_hits': 0,
+            'revalidated': 0,
+            'truncated': 0,
+            'bytes_downloaded': 0
+        }
+
+    def _limit_content(self, content: str) -> str:
+        """Trim content to the first splitter chunk"""
+        if len(content) <= self.max_content_length:
+            return content
+        # Only the first chunk is kept, so the splitter never needs more than a window of the text
+        chunks = self.text_splitter.split_text(content[:self.max_content_length * 2])
+        return chunks[0] if chunks else content[:self.max_content_length]
+
+    async def _read_body(self, response: aiohttp.ClientResponse) -> Tuple[bytes, bool]:
+        """Stream the (decompressed) body up to the size cap; returns (body, truncated)"""
+        chunks = []
+        size = 0
+        async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+            remaining = self.max_response_bytes - size
+            if len(chunk) >= remaining:
+                chunks.append(chunk[:remaining])
+                size += remaining
+                return b"".join(chunks), True
+            chunks.append(chunk)
+            size += len(chunk)
+        return b"".join(chunks), False
+
+    @staticmethod
+    def _from_cache(url: str, cached: Dict[str, Any]) -> ExtractedContent:
+        extracted = ExtractedContent(
+            url=url,
+            title=cached['title'],
+            content=cached['content'],
+            metadata={**cached['metadata'], 'from_cache': True}
+        )
+        extracted.extraction_time = cached['fetched_at']
+        return extracted
+
     async def extract_content(self, url: str) -> Optional[ExtractedContent]:
         """
         Extract content from a single URL
-        
+
         Args:
             url: URL to extract content from
-            
+
         Returns:
             ExtractedContent object or None if extraction fails
         """
+        page_cache = get_research_page_cache()
+        cached = await page_cache.get(url) if page_cache else None
+        if cached and time.time() - cached['validated_at'] < self.cache_ttl:
+            self._stats['cache_hits'] += 1
+            logger.debug(f"Serving cached content for {url}")
+            return self._from_cache(url, cached)
+
         try:
-            headers = {
-                'User-Agent': self.user_agent,
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Accept-Encoding': 'gzip, deflate',
-                'Connection': 'keep-alive',
-            }
-            
-            async with aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=self.timeout),
-                headers=headers
-            ) as session:
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        logger.warning(f"Failed to fetch {url}: HTTP {response.status}")
-                        return None
-                    
-                    # Check content type
-                    content_type = response.headers.get('content-type', '').lower()
-                    if 'text/html' not in content_type:
-                        logger.warning(f"Skipping non-HTML content: {url}")
-                        return None
-                    
-                    html_content = await response.text()
-            
-            # Parse HTML
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Extract metadata
-            metadata = self._extract_metadata(soup, url)
-            
-            # Extract main content
-            content = self._extract_main_content(soup)
-            
-            # Limit content length
-            if len(content) > self.max_content_length:
-                chunks = self.text_splitter.split_text(content)
-                content = chunks[0] if chunks else content[:self.max_content_length]
-            
-            # Get title
-            title = metadata.get('title', '')
-            if not title and soup.title:
-                title = soup.title.string.strip() if soup.title.string else ""
-            
+            # Revalidate a stale cache entry instead of downloading the page again
+            headers = {}
+            if cached:
+                if cached['etag']:
+                    headers['If-None-Match'] = cached['etag']
+                if cached['last_modified']:
+                    headers['If-Modified-Since'] = cached['last_modified']
+
+            session = get_http_session()
+            async with session.get(
+                url,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            ) as response:
+                if response.status == 304 and cached:
+                    self._stats['revalidated'] += 1
+                    await page_cache.touch(url)
+                    return self._from_cache(url, cached)
+
+                if response.status != 200:
+                    logger.warning(f"Failed to fetch {url}: HTTP {response.status}")
+                    return None
+
+                # Check content type
+                content_type = response.headers.get('content-type', '').lower()
+                if 'text/html' not in content_type:
+                    logger.warning(f"Skipping non-HTML content: {url}")
+                    return None
+
+                body, truncated = await self._read_body(response)
+                encoding = response.charset
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+
+            self._stats['fetched'] += 1
+            self._stats['bytes_downloaded'] += len(body)
+            if truncated:
+                self._stats['truncated'] += 1
+                logger.info(f"Page body of {url} exceeded {self.max_response_bytes} bytes, parsing the first part only")
+
+            # Parse HTML off the event loop
+            parsed = await run_cpu_bound(
+                parse_html_document, body, url, encoding,
+                tuple(self.content_selectors), tuple(self.remove_tags)
+            )
+
+            metadata = parsed['metadata']
+            if truncated:
+                metadata['truncated'] = True
+
             extracted = ExtractedContent(
                 url=url,
-                title=title,
-                content=content,
+                title=parsed['title'],
+                content=self._limit_content(parsed['content']),
                 metadata=metadata
             )
-            
+
+            if page_cache:
+                await page_cache.put(url, etag, last_modified, extracted)
+
             logger.info(f"Extracted {extracted.word_count} words from {url}")
             return extracted
-            
+
         except asyncio.TimeoutError:
             logger.warning(f"Timeout extracting content from {url}")
             return None
         except Exception as e:
             logger.warning(f"Error extracting content from {url}: {e}")
             return None
-    
+
     async def extract_multiple(self, urls: List[str], 
                              max_concurrent: int = 5,
                              delay_between_requests: float = 0.5) -> List[ExtractedContent]:
@@ -275,7 +536,62 @@ class WebContentExtractor:
         return {
             'timeout': self.timeout,
             'max_content_length': self.max_content_length,
+            'max_response_bytes': self.max_response_bytes,
+            'html_parser': HTML_PARSER,
+            'page_cache_enabled': get_research_page_cache() is not None,
+            'page_cache_ttl': self.cache_ttl,
             'user_agent': self.user_agent,
             'content_selectors': self.content_selectors,
-            'remove_tags': list(self.remove_tags)
+            'remove_tags': list(self.remove_tags),
+            'stats': dict(self._stats)
+        }
+
+
+class SharedExtractionCache:
+    """
+    Per-research-run extraction cache
+
+    Research steps running concurrently often collect the same URLs; each URL
+    is fetched once and every step awaiting it shares the same result.
+    """
+
+    def __init__(self, extractor: WebContentExtractor, max_concurrent: int = 3):
+        self.extractor = extractor
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrent))
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.requested = 0
+        self.fetched = 0
+
+    async def _fetch(self, url: str) -> Optional[ExtractedContent]:
+        async with self._semaphore:
+            self.fetched += 1
+            return await self.extractor.extract_content(url)
+
+    async def extract_multiple(self, urls: List[str]) -> List[ExtractedContent]:
+        """Extract content for ``urls``, reusing fetches already started by other steps"""
+        tasks = []
+        for url in urls:
+            self.requested += 1
+            task = self._tasks.get(url)
+            if task is None:
+                task = asyncio.ensure_future(self._fetch(url))
+                self._tasks[url] = task
+            # shield: a cancelled step must not cancel a fetch other steps are waiting on
+            tasks.append(asyncio.shield(task))
+
+        completed_results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        results = []
+        for result in completed_results:
+            if isinstance(result, ExtractedContent):
+                results.append(result)
+            elif isinstance(result, Exception):
+                logger.warning(f"Content extraction failed: {result}")
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'requested': self.requested,
+            'fetched': self.fetched,
+            'deduplicated': self.requested - self.fetched
         }
@@ -18,7 +18,8 @@ from ...ai import get_ai_provider, AIMessage, MessageRole
 from ...core.config import ai_config
 from ..deep_research_service import DEEPResearchService, ResearchReport, ResearchStep
 from .searxng_provider import SearXNGContentProvider, SearXNGSearchResponse
-from .content_extractor import WebContentExtractor, ExtractedContent
+from .content_extractor import WebContentExtractor, ExtractedContent, SharedExtractionCache
+from .rate_limiter import get_research_rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -60,6 +61,7 @@ class EnhancedResearchService:
         self.deep_research_service = DEEPResearchService()
         self.searxng_provider = SearXNGContentProvider()
         self.content_extractor = WebContentExtractor()
+        self.rate_limiter = get_research_rate_limiter()
         
         # Text processing - 使用基于 max_tokens 的简单快速分块策略
         try:
@@ -216,19 +218,22 @@ class EnhancedResearchService:
             # Step 1: Generate research plan with context
             research_plan = await self._generate_research_plan(topic, language, context)
 
-            # Step 2: Execute research steps with multiple providers
-            research_steps = []
+            # Step 2: Execute independent research steps concurrently; provider
+            # rate limits are enforced by the shared token buckets
             provider_stats = {'tavily': 0, 'searxng': 0, 'content_extraction': 0}
+            extraction_cache = SharedExtractionCache(self.content_extractor, max_concurrent=3)
+            step_semaphore = asyncio.Semaphore(max(1, ai_config.research_max_concurrent_steps))
 
-            for i, step_plan in enumerate(research_plan, 1):
-                step = await self._execute_enhanced_research_step(
-                    i, step_plan, topic, language, provider_stats
-                )
-                research_steps.append(step)
+            async def run_step(i: int, step_plan: Dict[str, str]) -> EnhancedResearchStep:
+                async with step_semaphore:
+                    return await self._execute_enhanced_research_step(
+                        i, step_plan, topic, language, provider_stats, extraction_cache
+                    )
 
-                # Add delay between steps
-                if i < len(research_plan):
-                    await asyncio.sleep(1)
+            research_steps = list(await asyncio.gather(*[
+                run_step(i, step_plan) for i, step_plan in enumerate(research_plan, 1)
+            ]))
+            logger.info(f"Content extraction cache stats: {extraction_cache.get_stats()}")
 
             # Step 3: Analyze all collected content
             content_analysis = await self._analyze_collected_content(research_steps, topic, language)
@@ -332,7 +337,8 @@ class EnhancedResearchService:
     
     async def _execute_enhanced_research_step(self, step_number: int, step_plan: Dict[str, str],
                                             topic: str, language: str, 
-                                            provider_stats: Dict[str, int]) -> EnhancedResearchStep:
+                                            provider_stats: Dict[str, int],
+                                            extraction_cache: Optional[SharedExtractionCache] = None) -> EnhancedResearchStep:
         """Execute a single enhanced research step with multiple providers"""
         step_start_time = time.time()
         logger.info(f"Executing enhanced research step {step_number}: {step_plan['query']}")
@@ -382,9 +388,13 @@ class EnhancedResearchService:
         if ai_config.research_enable_content_extraction:
             urls = self._collect_urls_from_results(tavily_results, searxng_results)
             if urls:
-                step.extracted_content = await self.content_extractor.extract_multiple(
-                    urls[:10], max_concurrent=3  # Limit to top 10 URLs
-                )
+                if extraction_cache is not None:
+                    # URLs already fetched by other steps are served from the shared cache
+                    step.extracted_content = await extraction_cache.extract_multiple(urls[:10])
+                else:
+                    step.extracted_content = await self.content_extractor.extract_multiple(
+                        urls[:10], max_concurrent=3  # Limit to top 10 URLs
+                    )
                 provider_stats['content_extraction'] += len(step.extracted_content or [])
         
         # Analyze collected data
@@ -406,7 +416,8 @@ class EnhancedResearchService:
     async def _search_with_searxng(self, query: str, language: str) -> Optional[SearXNGSearchResponse]:
         """Search using SearXNG provider"""
         try:
-            return await self.searxng_provider.search(query, language)
+            async with self.rate_limiter.slot('searxng'):
+                return await self.searxng_provider.search(query, language)
         except Exception as e:
             logger.warning(f"SearXNG search failed: {e}")
             return None
@@ -491,11 +502,12 @@ class EnhancedResearchService:
 """
 
         try:
-            analysis_response = await self.ai_provider.text_completion(
-                prompt=analysis_prompt,
-                max_tokens=min(ai_config.max_tokens, 1000),
-                temperature=0.3
-            )
+            async with self.rate_limiter.slot('llm'):
+                analysis_response = await self.ai_provider.text_completion(
+                    prompt=analysis_prompt,
+                    max_tokens=min(ai_config.max_tokens, 1000),
+                    temperature=0.3
+                )
             # Extract text content from AIResponse object
             analysis = analysis_response.content if hasattr(analysis_response, 'content') else str(analysis_response)
             return analysis
@@ -672,7 +684,9 @@ class EnhancedResearchService:
                 'research_provider': ai_config.research_provider,
                 'enable_content_extraction': ai_config.research_enable_content_extraction,
                 'max_content_length': ai_config.research_max_content_length,
-                'extraction_timeout': ai_config.research_extraction_timeout
+                'extraction_timeout': ai_config.research_extraction_timeout,
+                'max_concurrent_steps': ai_config.research_max_concurrent_steps
             },
+            'rate_limits': self.rate_limiter.get_stats(),
             'ai_provider': ai_config.default_ai_provider
         }
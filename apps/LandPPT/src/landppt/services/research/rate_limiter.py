@@ -0,0 +1,166 @@
+"""
+Rate limiting primitives for research providers
+
+Token buckets replace the fixed sleeps between research steps: every search
+provider and the LLM get their own bucket (requests per minute) plus a
+concurrency cap, so independent steps can run in parallel without bursting
+past provider limits.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+from ...core.config import ai_config
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Token bucket: ``rate_per_minute`` tokens refilled continuously, up to ``burst``
+
+    Tokens are reserved under a thread lock and the caller sleeps outside of it,
+    so one bucket can be shared by every event loop in the process (the app loop
+    and loops started in worker threads) without binding to any of them.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: Optional[int] = None):
+        self.rate_per_second = max(float(rate_per_minute), 0.0) / 60.0
+        self.capacity = float(burst if burst is not None else max(1, int(rate_per_minute // 10) or 1))
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate_per_second)
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take ``tokens`` now, going into debt if needed; returns how long to wait"""
+        if self.rate_per_second <= 0:
+            return 0.0
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate_per_second
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """Wait until ``tokens`` are available; returns the time spent waiting"""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+
+class ProviderLimiter:
+    """Concurrency cap + token bucket for a single provider
+
+    The token bucket is process-wide. asyncio semaphores bind to the loop that
+    first waits on them, so the concurrency cap keeps one semaphore per event loop.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, requests_per_minute: float):
+        self.name = name
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.requests_per_minute = float(requests_per_minute)
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._semaphores_lock = threading.Lock()
+        self._bucket = TokenBucket(requests_per_minute)
+        self._stats = {'requests': 0, 'throttled': 0, 'wait_seconds': 0.0}
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._semaphores_lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.max_concurrent)
+                self._semaphores[loop] = semaphore
+            return semaphore
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a concurrency slot after taking one token from the bucket"""
+        async with self._semaphore():
+            waited = await self._bucket.acquire()
+            self._stats['requests'] += 1
+            if waited > 0:
+                self._stats['throttled'] += 1
+                self._stats['wait_seconds'] += waited
+            yield
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'max_concurrent': self.max_concurrent,
+            'requests_per_minute': self.requests_per_minute,
+            **self._stats,
+        }
+
+
+class ResearchRateLimiter:
+    """Per-provider limiters shared by every research run in the process"""
+
+    def __init__(self):
+        self._limiters: Dict[str, ProviderLimiter] = {}
+        self._signature = None
+
+    def _config_signature(self):
+        return (
+            ai_config.research_search_concurrency,
+            ai_config.research_search_requests_per_minute,
+            ai_config.research_llm_concurrency,
+            ai_config.research_llm_requests_per_minute,
+        )
+
+    def _ensure_current(self):
+        # Rebuild limiters after a configuration reload
+        signature = self._config_signature()
+        if signature != self._signature:
+            self._limiters.clear()
+            self._signature = signature
+
+    def get(self, name: str) -> ProviderLimiter:
+        """Get limiter by provider name ('tavily', 'searxng', 'llm', ...)"""
+        self._ensure_current()
+        limiter = self._limiters.get(name)
+        if limiter is None:
+            if name == 'llm':
+                limiter = ProviderLimiter(
+                    name,
+                    ai_config.research_llm_concurrency,
+                    ai_config.research_llm_requests_per_minute
+                )
+            else:
+                limiter = ProviderLimiter(
+                    name,
+                    ai_config.research_search_concurrency,
+                    ai_config.research_search_requests_per_minute
+                )
+            self._limiters[name] = limiter
+        return limiter
+
+    def slot(self, name: str):
+        return self.get(name).slot()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {name: limiter.get_stats() for name, limiter in self._limiters.items()}
+
+
+_research_rate_limiter: Optional[ResearchRateLimiter] = None
+
+
+def get_research_rate_limiter() -> ResearchRateLimiter:
+    """Get the process-wide research rate limiter"""
+    global _research_rate_limiter
+    if _research_rate_limiter is None:
+        _research_rate_limiter = ResearchRateLimiter()
+    return _research_rate_limiter
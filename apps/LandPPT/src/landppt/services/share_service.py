@@ -3,15 +3,173 @@ Project Share Service
 Handles generation and validation of public share links for presentations
 """
 
+import asyncio
+import gzip
+import hashlib
 import secrets
 import logging
-from typing import Optional
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
 from sqlalchemy.orm import Session
+from ..core.config import app_config
 from ..database.models import Project
+from ..utils.thread_pool import run_blocking_io
+
+try:
+    import brotli
+except ImportError:  # optional: without it shared pages are served gzip-compressed only
+    brotli = None
 
 logger = logging.getLogger(__name__)
 
 
+class SharedPayload:
+    """A rendered public share response with precompressed bodies"""
+
+    def __init__(self, project_id: str, updated_at: float, body: bytes, media_type: str):
+        self.project_id = project_id
+        self.updated_at = updated_at
+        self.media_type = media_type
+        self.body = body
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        self.gzip_body = gzip.compress(body, compresslevel=6)
+        self.br_body = brotli.compress(body, quality=5) if brotli is not None else None
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzip_body) + len(self.br_body or b"")
+
+    def select_body(self, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+        """Pick the smallest body the client accepts; returns (body, content-encoding)"""
+        accepted = {part.split(";")[0].strip().lower() for part in (accept_encoding or "").split(",")}
+        if self.br_body is not None and "br" in accepted:
+            return self.br_body, "br"
+        if "gzip" in accepted:
+            return self.gzip_body, "gzip"
+        return self.body, None
+
+
+class SharePayloadCache:
+    """Read-through cache of rendered share payloads keyed by (token, kind, project updated_at)
+
+    Token lookups (project_id, updated_at) are remembered for ``revalidate_seconds``
+    so a popular link does not hit the database on every view, and concurrent
+    lookups of one token share a single query; saves and sharing changes in this
+    process invalidate the project immediately.
+    """
+
+    def __init__(self, max_entries: int = 256, revalidate_seconds: float = 5.0):
+        self.max_entries = max_entries
+        self.revalidate_seconds = revalidate_seconds
+        self._payloads: "OrderedDict[Tuple[str, str, float], SharedPayload]" = OrderedDict()
+        self._states: Dict[str, Tuple[str, float, float]] = {}
+        self._inflight: Dict[Tuple[str, str, float], asyncio.Future] = {}
+        self._state_inflight: Dict[str, asyncio.Future] = {}
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "state_queries": 0, "invalidations": 0}
+
+    def get_state(self, share_token: str) -> Optional[Tuple[str, float]]:
+        entry = self._states.get(share_token)
+        if entry is None or time.monotonic() - entry[2] > self.revalidate_seconds:
+            return None
+        return entry[0], entry[1]
+
+    def set_state(self, share_token: str, row: Optional[Tuple[str, float]]):
+        """Remember a token lookup from the database (``row`` is None for invalid tokens)"""
+        self._stats["state_queries"] += 1
+        if row is not None:
+            self._states[share_token] = (row[0], row[1], time.monotonic())
+
+    async def lookup_state(self, share_token: str,
+                           query: Callable[[], Awaitable[Optional[Tuple[str, float]]]]) -> Optional[Tuple[str, float]]:
+        """Remembered token lookup, or run ``query`` once for all concurrent viewers"""
+        state = self.get_state(share_token)
+        if state is not None:
+            return state
+
+        inflight = self._state_inflight.get(share_token)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._state_inflight[share_token] = future
+        try:
+            state = await query()
+            future.set_result(state)
+            return state
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._state_inflight.pop(share_token, None)
+
+    async def get_or_build(self, key: Tuple[str, str, float],
+                           build: Callable[[], Awaitable[Optional[SharedPayload]]]) -> Optional[SharedPayload]:
+        payload = self._payloads.get(key)
+        if payload is not None:
+            self._payloads.move_to_end(key)
+            self._stats["hits"] += 1
+            return payload
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._stats["coalesced"] += 1
+            return await asyncio.shield(inflight)
+
+        self._stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            payload = await build()
+            if payload is not None:
+                self._payloads[key] = payload
+                # Older revisions of the same link are never requested again
+                for stale in [k for k in self._payloads if k[:2] == key[:2] and k != key]:
+                    del self._payloads[stale]
+                while len(self._payloads) > self.max_entries:
+                    self._payloads.popitem(last=False)
+            future.set_result(payload)
+            return payload
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate_project(self, project_id: str):
+        """Drop every cached payload and token lookup of a project"""
+        tokens = {token for token, entry in self._states.items() if entry[0] == project_id}
+        tokens.update(payload_key[0] for payload_key, payload in self._payloads.items()
+                      if payload.project_id == project_id)
+        if not tokens:
+            return
+        for token in tokens:
+            self._states.pop(token, None)
+        for key in [k for k in self._payloads if k[0] in tokens]:
+            del self._payloads[key]
+        self._stats["invalidations"] += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        stats = dict(self._stats)
+        stats["entries"] = len(self._payloads)
+        stats["bytes"] = sum(payload.size for payload in self._payloads.values())
+        return stats
+
+
+share_payload_cache = SharePayloadCache(
+    max_entries=app_config.share_cache_max_entries,
+    revalidate_seconds=app_config.share_cache_revalidate_seconds
+)
+
+
 class ShareService:
     """Service for managing project sharing functionality"""
 
@@ -44,6 +202,7 @@ class ShareService:
                 if not project.share_enabled:
                     project.share_enabled = True
                     self.db.commit()
+                    share_payload_cache.invalidate_project(project_id)
                     logger.info(f"Re-enabled sharing for project {project_id}")
                 else:
                     logger.info(f"Returning existing share token for project {project_id}")
@@ -86,6 +245,7 @@ class ShareService:
 
             project.share_enabled = False
             self.db.commit()
+            share_payload_cache.invalidate_project(project_id)
 
             logger.info(f"Disabled sharing for project {project_id}")
             return True
@@ -121,6 +281,70 @@ class ShareService:
             logger.error(f"Error validating share token: {e}")
             return None
 
+    def get_share_state(self, share_token: str) -> Optional[Tuple[str, float]]:
+        """
+        Resolve a share token to (project_id, updated_at) without loading slide data
+
+        Args:
+            share_token: The share token to validate
+
+        Returns:
+            (project_id, updated_at) if the token is valid, None otherwise
+        """
+        state = share_payload_cache.get_state(share_token)
+        if state is not None:
+            return state
+
+        try:
+            row = self.db.query(Project.project_id, Project.updated_at).filter(
+                Project.share_token == share_token,
+                Project.share_enabled == True
+            ).first()
+        except Exception as e:
+            logger.error(f"Error validating share token: {e}")
+            return None
+
+        state = (row[0], row[1]) if row else None
+        share_payload_cache.set_state(share_token, state)
+        return state
+
+    async def get_shared_payload(self, share_token: str, kind: str,
+                                 render: Callable[[Project], Optional[bytes]],
+                                 media_type: str = "text/html; charset=utf-8") -> Tuple[bool, Optional[SharedPayload]]:
+        """
+        Get the cached rendering of a shared project, rendering it once per project revision
+
+        Args:
+            share_token: The share token
+            kind: Which rendering of the project (e.g. "page", "slides-data")
+            render: Builds the response body from the project; returning None skips caching
+            media_type: Content type of the rendered body
+
+        Returns:
+            (token_valid, payload); payload is None when ``render`` returned None
+        """
+        state = await share_payload_cache.lookup_state(
+            share_token, lambda: run_blocking_io(self.get_share_state, share_token)
+        )
+        if state is None:
+            return False, None
+
+        project_id, updated_at = state
+
+        def build() -> Optional[SharedPayload]:
+            project = self.validate_share_token(share_token)
+            if project is None:
+                return None
+            body = render(project)
+            if body is None:
+                return None
+            return SharedPayload(project.project_id, project.updated_at, body, media_type)
+
+        payload = await share_payload_cache.get_or_build(
+            (share_token, kind, updated_at), lambda: run_blocking_io(build)
+        )
+        return True, payload
+
     def get_share_info(self, project_id: str) -> dict:
         """
         Get sharing information for a project
@@ -3,7 +3,10 @@ Speech Script Generation Service
 Provides AI-powered speech script generation for PPT presentations
 """
 
+import asyncio
+import json
 import logging
+import re
 import time
 import uuid
 from typing import Dict, Any, List, Optional, Tuple
@@ -260,9 +263,14 @@ class SpeechScriptService:
         project: PPTProject,
         customization: SpeechScriptCustomization,
         progress_callback=None,
-        task_id: str = None
+        task_id: str = None,
+        include_bookends: bool = False
     ) -> SpeechScriptResult:
-        """Generate speech scripts for the entire presentation with retry mechanism"""
+        """Generate speech scripts for the entire presentation with retry mechanism
+
+        With ``include_bookends`` the opening and closing remarks are generated
+        concurrently with the slide scripts.
+        """
         try:
             if not project.slides_data:
                 return SpeechScriptResult(
@@ -273,13 +281,20 @@ class SpeechScriptService:
 
             # Generate scripts for all slides with retry mechanism
             slide_indices = list(range(len(project.slides_data)))
-            result = await self.generate_multi_slide_scripts_with_retry(
+            body = self.generate_multi_slide_scripts_with_retry(
                 project, slide_indices, customization, progress_callback, task_id=task_id
             )
 
-            # 不再自动添加开场白和结束语，完全按照选择的页面生成演讲稿
-            # Opening and closing remarks are no longer automatically added
+            # 默认不添加开场白和结束语，完全按照选择的页面生成演讲稿
+            # Opening and closing remarks are only added when explicitly requested
+            if not include_bookends:
+                return await body
 
+            result, (opening_slide, closing_slide) = await asyncio.gather(
+                body, self._generate_bookends(project, customization)
+            )
+            if result.success:
+                result.scripts = self._attach_bookends(result.scripts, opening_slide, closing_slide)
             return result
 
         except Exception as e:
@@ -299,7 +314,16 @@ class SpeechScriptService:
         max_retries: int = 5,
         task_id: str = None
     ) -> SpeechScriptResult:
-        """Generate speech scripts for multiple slides with retry mechanism"""
+        """Generate speech scripts for multiple slides with retry mechanism
+
+        Slides are generated concurrently (bounded by ``speech_script_concurrency``);
+        each prompt gets outline-level context (neighbouring slide summaries) instead
+        of the previous slide's generated script, so slides do not depend on each
+        other. With ``speech_script_batch_size`` > 1, consecutive slides are packed
+        into one structured call and any slide missing from the answer falls back to
+        a single-slide call. Results are reported to the progress tracker in slide
+        order regardless of completion order.
+        """
         try:
             if not project.slides_data:
                 return SpeechScriptResult(
@@ -326,18 +350,19 @@ class SpeechScriptService:
             # Track progress
             completed_count = 0
 
-            for i, slide_index in enumerate(slide_indices):
-                if slide_index >= len(project.slides_data):
-                    failed_slides.append({
-                        'slide_index': slide_index,
-                        'error': 'Slide index out of range'
-                    })
-                    continue
+            # position in slide_indices -> (status, payload), reported strictly in order
+            outcomes: Dict[int, Tuple[str, Any]] = {}
+            next_position = 0
 
-                slide = project.slides_data[slide_index]
-                slide_title = slide.get('title', f'第{slide_index + 1}页')
+            def report_current():
+                """Announce the first slide that has not been reported yet"""
+                if next_position >= total_slides:
+                    return
+                slide_index = slide_indices[next_position]
+                if slide_index >= len(project.slides_data):
+                    return
+                slide_title = project.slides_data[slide_index].get('title', f'第{slide_index + 1}页')
 
-                # Update progress
                 progress_tracker.update_progress(
                     task_id,
                     current_slide=slide_index,
@@ -356,43 +381,26 @@ class SpeechScriptService:
                         'message': f'正在生成第{slide_index + 1}页演讲稿...'
                     })
 
-                # Try to generate script with retries
-                script_generated = False
-                last_error = None
-
-                for retry_count in range(max_retries):
-                    try:
-                        # Get previous slide context for better coherence
-                        previous_slide_context = ""
-                        if slide_index > 0 and successful_scripts:
-                            # Find the most recent successful script before this slide
-                            for prev_script in reversed(successful_scripts):
-                                if prev_script.slide_index < slide_index:
-                                    prev_content = prev_script.script_content
-                                    if len(prev_content) > 200:
-                                        previous_slide_context = prev_content[-200:]
-                                    else:
-                                        previous_slide_context = prev_content
-                                    break
-
-                        # Generate script
-                        script_content = await self._generate_script_for_slide(
-                            slide, slide_index, len(project.slides_data),
-                            project, previous_slide_context, customization
-                        )
-
-                        # Estimate duration
-                        estimated_duration = self._estimate_speaking_duration(script_content)
-
-                        slide_script = SlideScriptData(
-                            slide_index=slide_index,
-                            slide_title=slide_title,
-                            script_content=script_content,
-                            estimated_duration=estimated_duration
-                        )
+            def flush_outcomes():
+                """Report every finished slide whose predecessors are reported too"""
+                nonlocal next_position, completed_count
+                reported = False
+                while next_position in outcomes:
+                    status, payload = outcomes.pop(next_position)
+                    slide_index = slide_indices[next_position]
+                    next_position += 1
+                    reported = True
+
+                    if status == 'invalid':
+                        failed_slides.append({
+                            'slide_index': slide_index,
+                            'error': 'Slide index out of range'
+                        })
+                        continue
 
-                        successful_scripts.append(slide_script)
-                        script_generated = True
+                    slide_title = project.slides_data[slide_index].get('title', f'第{slide_index + 1}页')
+                    if status == 'completed':
+                        successful_scripts.append(payload)
                         completed_count += 1
 
                         # Update progress tracker
@@ -407,38 +415,15 @@ class SpeechScriptService:
                                 'completed': completed_count,
                                 'total_slides': total_slides
                             })
-
-                        break  # Success, exit retry loop
-
-                    except Exception as e:
-                        last_error = str(e)
-                        logger.warning(f"Retry {retry_count + 1}/{max_retries} failed for slide {slide_index + 1}: {e}")
-
-                        # Update progress with retry info
-                        if progress_callback:
-                            progress_callback({
-                                'type': 'retry',
-                                'slide_index': slide_index,
-                                'retry_count': retry_count + 1,
-                                'max_retries': max_retries,
-                                'error': str(e)
-                            })
-
-                        # Wait a bit before retrying
-                        import asyncio
-                        await asyncio.sleep(1)
-
-                # If all retries failed, mark as failed or skipped
-                if not script_generated:
-                    if max_retries > 0:
+                    elif status == 'failed':
                         failed_slides.append({
                             'slide_index': slide_index,
                             'slide_title': slide_title,
-                            'error': last_error or 'Unknown error'
+                            'error': payload or 'Unknown error'
                         })
 
                         # Update progress tracker
-                        progress_tracker.add_slide_failed(task_id, slide_index, slide_title, last_error or 'Unknown error')
+                        progress_tracker.add_slide_failed(task_id, slide_index, slide_title, payload or 'Unknown error')
 
                         # Update progress callback
                         if progress_callback:
@@ -446,7 +431,7 @@ class SpeechScriptService:
                                 'type': 'slide_failed',
                                 'slide_index': slide_index,
                                 'slide_title': slide_title,
-                                'error': last_error
+                                'error': payload
                             })
                     else:
                         skipped_slides.append({
@@ -458,6 +443,76 @@ class SpeechScriptService:
                         # Update progress tracker
                         progress_tracker.add_slide_skipped(task_id, slide_index, slide_title, 'Max retries exceeded')
 
+                if reported:
+                    report_current()
+                return reported
+
+            def finish_slide(position: int, script_content: Optional[str], last_error: Optional[str]):
+                slide_index = slide_indices[position]
+                if script_content is not None:
+                    slide = project.slides_data[slide_index]
+                    outcomes[position] = ('completed', SlideScriptData(
+                        slide_index=slide_index,
+                        slide_title=slide.get('title', f'第{slide_index + 1}页'),
+                        script_content=script_content,
+                        estimated_duration=self._estimate_speaking_duration(script_content)
+                    ))
+                elif max_retries > 0:
+                    outcomes[position] = ('failed', last_error)
+                else:
+                    outcomes[position] = ('skipped', None)
+                flush_outcomes()
+
+            semaphore = asyncio.Semaphore(max(1, ai_config.speech_script_concurrency))
+
+            async def run_slide(position: int):
+                slide_index = slide_indices[position]
+                async with semaphore:
+                    script_content, last_error = await self._generate_script_with_retries(
+                        project, slide_index, customization, max_retries, progress_callback
+                    )
+                finish_slide(position, script_content, last_error)
+
+            async def run_batch(positions: List[int]):
+                async with semaphore:
+                    try:
+                        batch_scripts = await self._generate_scripts_for_batch(
+                            project, [slide_indices[p] for p in positions], customization
+                        )
+                    except Exception as e:
+                        logger.warning(f"Packed speech script generation failed, falling back to single slides: {e}")
+                        batch_scripts = {}
+
+                missing = []
+                for position in positions:
+                    script_content = batch_scripts.get(slide_indices[position])
+                    if script_content:
+                        finish_slide(position, script_content, None)
+                    else:
+                        missing.append(position)
+                if missing:
+                    await asyncio.gather(*(run_slide(position) for position in missing))
+
+            valid_positions = []
+            for position, slide_index in enumerate(slide_indices):
+                if slide_index >= len(project.slides_data):
+                    outcomes[position] = ('invalid', None)
+                else:
+                    valid_positions.append(position)
+
+            if not flush_outcomes():
+                report_current()
+
+            batch_size = ai_config.speech_script_batch_size
+            if batch_size > 1 and max_retries > 0:
+                jobs = [
+                    run_batch(valid_positions[i:i + batch_size])
+                    for i in range(0, len(valid_positions), batch_size)
+                ]
+            else:
+                jobs = [run_slide(position) for position in valid_positions]
+            await asyncio.gather(*jobs)
+
             # Calculate total duration
             total_duration = self._calculate_total_duration([s.estimated_duration for s in successful_scripts])
 
@@ -511,6 +566,122 @@ class SpeechScriptService:
                 error_message=str(e)
             )
 
+    def _get_neighbour_contexts(self, project: PPTProject, slide_index: int) -> Tuple[str, str]:
+        """Outline-level context for a slide: summaries of the slides before and after it"""
+        previous_slide_context = ""
+        next_slide_context = ""
+        if slide_index > 0:
+            previous_slide_context = self._extract_slide_context(project.slides_data[slide_index - 1])
+        if slide_index + 1 < len(project.slides_data):
+            next_slide_context = self._extract_slide_context(project.slides_data[slide_index + 1])
+        return previous_slide_context, next_slide_context
+
+    async def _generate_script_with_retries(
+        self,
+        project: PPTProject,
+        slide_index: int,
+        customization: SpeechScriptCustomization,
+        max_retries: int,
+        progress_callback=None
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Generate one slide's script, retrying on errors
+
+        Returns:
+            (script_content, None) on success, (None, last_error) otherwise
+        """
+        slide = project.slides_data[slide_index]
+        previous_slide_context, next_slide_context = self._get_neighbour_contexts(project, slide_index)
+        last_error = None
+
+        for retry_count in range(max_retries):
+            try:
+                script_content = await self._generate_script_for_slide(
+                    slide, slide_index, len(project.slides_data),
+                    project, previous_slide_context, customization,
+                    next_slide_context=next_slide_context
+                )
+                return script_content, None
+
+            except Exception as e:
+                last_error = str(e)
+                logger.warning(f"Retry {retry_count + 1}/{max_retries} failed for slide {slide_index + 1}: {e}")
+
+                # Update progress with retry info
+                if progress_callback:
+                    progress_callback({
+                        'type': 'retry',
+                        'slide_index': slide_index,
+                        'retry_count': retry_count + 1,
+                        'max_retries': max_retries,
+                        'error': str(e)
+                    })
+
+                # Wait a bit before retrying
+                await asyncio.sleep(1)
+
+        return None, last_error
+
+    async def _generate_scripts_for_batch(
+        self,
+        project: PPTProject,
+        slide_indices: List[int],
+        customization: SpeechScriptCustomization
+    ) -> Dict[int, str]:
+        """Generate scripts for consecutive slides in one structured call
+
+        Returns:
+            slide_index -> script for every slide the model answered for
+        """
+        from .prompts.speech_script_prompts import SpeechScriptPrompts
+
+        previous_slide_context, _ = self._get_neighbour_contexts(project, slide_indices[0])
+        _, next_slide_context = self._get_neighbour_contexts(project, slide_indices[-1])
+
+        prompt = SpeechScriptPrompts.get_multi_slide_script_prompt(
+            [{'slide_index': i, 'slide_data': project.slides_data[i]} for i in slide_indices],
+            len(project.slides_data),
+            {'topic': project.topic, 'scenario': project.scenario},
+            previous_slide_context,
+            next_slide_context,
+            self._build_customization_dict(customization)
+        )
+
+        response = await self.ai_provider.text_completion(
+            prompt=prompt,
+            **self._build_request_kwargs(
+                max_tokens=ai_config.max_tokens,
+                temperature=0.7
+            )
+        )
+
+        return self._parse_batch_scripts(response.content, slide_indices)
+
+    @staticmethod
+    def _parse_batch_scripts(content: str, slide_indices: List[int]) -> Dict[int, str]:
+        """Parse the JSON array answer of a packed call, ignoring pages that were not requested"""
+        text = content.strip()
+        fence = re.search(r'```(?:json)?\s*(.*?)```', text, re.DOTALL)
+        if fence:
+            text = fence.group(1).strip()
+        start, end = text.find('['), text.rfind(']')
+        if start == -1 or end <= start:
+            raise ValueError("Packed speech script response does not contain a JSON array")
+
+        items = json.loads(text[start:end + 1])
+        requested = set(slide_indices)
+        scripts: Dict[int, str] = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                slide_index = int(item.get('page')) - 1
+            except (TypeError, ValueError):
+                continue
+            script = str(item.get('script') or '').strip()
+            if slide_index in requested and script:
+                scripts[slide_index] = script
+        return scripts
+
     async def _generate_script_for_slide(
         self,
         slide: Dict[str, Any],
@@ -518,14 +689,15 @@ class SpeechScriptService:
         total_slides: int,
         project: PPTProject,
         previous_slide_context: str,
-        customization: SpeechScriptCustomization
+        customization: SpeechScriptCustomization,
+        next_slide_context: str = ""
     ) -> str:
         """Generate speech script for a single slide using AI"""
         
         # Create the prompt for speech script generation
         prompt = self._create_speech_script_prompt(
             slide, slide_index, total_slides, project,
-            previous_slide_context, customization
+            previous_slide_context, customization, next_slide_context
         )
         
         # Generate using AI
@@ -546,7 +718,8 @@ class SpeechScriptService:
         total_slides: int,
         project: PPTProject,
         previous_slide_context: str,
-        customization: SpeechScriptCustomization
+        customization: SpeechScriptCustomization,
+        next_slide_context: str = ""
     ) -> str:
         """Create AI prompt for speech script generation"""
 
@@ -557,7 +730,16 @@ class SpeechScriptService:
             'scenario': project.scenario
         }
 
-        customization_dict = {
+        return SpeechScriptPrompts.get_single_slide_script_prompt(
+            slide, slide_index, total_slides, project_info,
+            previous_slide_context, self._build_customization_dict(customization),
+            next_slide_context
+        )
+
+    @staticmethod
+    def _build_customization_dict(customization: SpeechScriptCustomization) -> Dict[str, Any]:
+        """Customization options in the form used by the prompt templates"""
+        return {
             'tone': customization.tone.value,
             'target_audience': customization.target_audience.value,
             'language_complexity': customization.language_complexity.value,
@@ -566,11 +748,6 @@ class SpeechScriptService:
             'speaking_pace': customization.speaking_pace
         }
 
-        return SpeechScriptPrompts.get_single_slide_script_prompt(
-            slide, slide_index, total_slides, project_info,
-            previous_slide_context, customization_dict
-        )
-
     def _get_tone_description(self, tone: SpeechTone) -> str:
         """Get description for speech tone"""
         descriptions = {
@@ -684,16 +861,22 @@ class SpeechScriptService:
             else:
                 return f"{minutes}分钟"
 
-    async def _add_presentation_bookends(
+    async def _generate_bookends(
         self,
-        scripts: List[SlideScriptData],
         project: PPTProject,
         customization: SpeechScriptCustomization
-    ) -> List[SlideScriptData]:
-        """Add opening and closing remarks for full presentation"""
-        try:
-            # Generate opening remarks
-            opening_script = await self._generate_opening_remarks(project, customization)
+    ) -> Tuple[Optional[SlideScriptData], Optional[SlideScriptData]]:
+        """Generate opening and closing remarks concurrently; a failed part is returned as None"""
+        opening_script, closing_script = await asyncio.gather(
+            self._generate_opening_remarks(project, customization),
+            self._generate_closing_remarks(project, customization),
+            return_exceptions=True
+        )
+
+        opening_slide = None
+        if isinstance(opening_script, BaseException):
+            logger.error(f"Error generating opening remarks: {opening_script}")
+        else:
             opening_slide = SlideScriptData(
                 slide_index=-1,  # Special index for opening
                 slide_title="开场白",
@@ -701,21 +884,37 @@ class SpeechScriptService:
                 estimated_duration=self._estimate_speaking_duration(opening_script)
             )
 
-            # Generate closing remarks
-            closing_script = await self._generate_closing_remarks(project, customization)
+        closing_slide = None
+        if isinstance(closing_script, BaseException):
+            logger.error(f"Error generating closing remarks: {closing_script}")
+        else:
             closing_slide = SlideScriptData(
-                slide_index=len(scripts),  # Special index for closing
+                slide_index=len(project.slides_data or []),  # Special index for closing
                 slide_title="结束语",
                 script_content=closing_script,
                 estimated_duration=self._estimate_speaking_duration(closing_script)
             )
 
-            # Insert opening at the beginning and closing at the end
-            return [opening_slide] + scripts + [closing_slide]
+        return opening_slide, closing_slide
 
-        except Exception as e:
-            logger.error(f"Error adding presentation bookends: {e}")
-            return scripts
+    async def _add_presentation_bookends(
+        self,
+        scripts: List[SlideScriptData],
+        project: PPTProject,
+        customization: SpeechScriptCustomization
+    ) -> List[SlideScriptData]:
+        """Add opening and closing remarks for full presentation"""
+        opening_slide, closing_slide = await self._generate_bookends(project, customization)
+        return self._attach_bookends(scripts, opening_slide, closing_slide)
+
+    @staticmethod
+    def _attach_bookends(
+        scripts: List[SlideScriptData],
+        opening_slide: Optional[SlideScriptData],
+        closing_slide: Optional[SlideScriptData]
+    ) -> List[SlideScriptData]:
+        """Insert opening at the beginning and closing at the end"""
+        return ([opening_slide] if opening_slide else []) + scripts + ([closing_slide] if closing_slide else [])
 
     async def _generate_opening_remarks(
         self,
@@ -783,10 +982,10 @@ class SpeechScriptService:
             )
         )
 
+        return response.content.strip()
+
     def _build_request_kwargs(self, **kwargs) -> Dict[str, Any]:
         """Merge base kwargs with role-specific model override if configured."""
         if self.provider_settings and self.provider_settings.get("model"):
             kwargs.setdefault("model", self.provider_settings["model"])
         return kwargs
-
-        return response.content.strip()
@@ -0,0 +1,105 @@
+"""
+任务进度发布/订阅通道
+
+后台任务和演讲稿进度都通过同一个通道发布事件，SSE等推送端订阅后即可拿到最新进度，
+不必轮询任务字典。发布可以来自任意线程，事件会投递到订阅者所在的事件循环。
+"""
+
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressChannel:
+    """进程内的进度事件通道
+
+    每个订阅者持有一个有界队列；进度事件是完整快照，消费者跟不上时丢弃最旧的事件即可。
+    通道同时保留每个任务的最后一个事件，新订阅者会先收到它。
+    """
+
+    def __init__(self, max_queue_size: int = 100, max_retained: int = 1000):
+        self.max_queue_size = max_queue_size
+        self.max_retained = max_retained
+        self._lock = threading.Lock()
+        # (task_id 过滤条件, 队列, 队列所属事件循环)
+        self._subscribers: List[Tuple[Optional[str], asyncio.Queue, asyncio.AbstractEventLoop]] = []
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._stats = {'published': 0, 'delivered': 0, 'dropped': 0}
+
+    def publish(self, task_id: str, event: Dict[str, Any]):
+        """发布一个进度事件（线程安全）"""
+        event = {'task_id': task_id, **event}
+        with self._lock:
+            self._latest.pop(task_id, None)
+            self._latest[task_id] = event
+            while len(self._latest) > self.max_retained:
+                self._latest.pop(next(iter(self._latest)))
+            self._stats['published'] += 1
+            targets = [
+                (queue, loop) for topic, queue, loop in self._subscribers
+                if topic is None or topic == task_id
+            ]
+
+        for queue, loop in targets:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # 订阅者的事件循环已关闭
+                pass
+
+    def _deliver(self, queue: asyncio.Queue, event: Dict[str, Any]):
+        if queue.full():
+            try:
+                queue.get_nowait()
+                self._stats['dropped'] += 1
+            except asyncio.QueueEmpty:
+                pass
+        queue.put_nowait(event)
+        self._stats['delivered'] += 1
+
+    def latest(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务最近一次发布的事件"""
+        with self._lock:
+            return self._latest.get(task_id)
+
+    @asynccontextmanager
+    async def subscribe(self, task_id: Optional[str] = None):
+        """订阅事件，task_id为None时接收所有任务的事件
+
+        用法:
+            async with progress_channel.subscribe(task_id) as queue:
+                event = await queue.get()
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue_size)
+        entry = (task_id, queue, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.append(entry)
+            latest = self._latest.get(task_id) if task_id is not None else None
+        if latest is not None:
+            queue.put_nowait(latest)
+
+        try:
+            yield queue
+        finally:
+            with self._lock:
+                self._subscribers.remove(entry)
+
+    def forget(self, task_id: str):
+        """丢弃任务保留的最后事件"""
+        with self._lock:
+            self._latest.pop(task_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['subscribers'] = len(self._subscribers)
+            stats['retained'] = len(self._latest)
+        return stats
+
+
+# 全局进度通道实例
+progress_channel = ProgressChannel()
@@ -0,0 +1,308 @@
+"""
+后台任务持久化存储
+
+任务和进度快照写入独立的SQLite文件（WAL模式），服务重启后仍可查询。
+运行中的任务持有一个带过期时间的租约（lease），执行者定期续约（心跳）；
+进程崩溃后租约自然过期，任务会被重新放回队列或标记为中断。
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+_TASK_COLUMNS = (
+    "task_id", "task_type", "status", "progress", "payload", "result", "error", "metadata",
+    "attempts", "max_attempts", "lease_owner", "lease_expires_at", "heartbeat_at",
+    "available_at", "created_at", "updated_at"
+)
+_JSON_COLUMNS = ("payload", "result", "metadata")
+
+
+def _dumps(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def _loads(raw: Optional[str]) -> Any:
+    if raw is None:
+        return None
+    try:
+        return json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+
+
+class TaskStore:
+    """SQLite任务表：任务状态、租约、重试次数和进度快照"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        path = Path(db_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=30000")
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._lock:
+            self._db.executescript(
+                "CREATE TABLE IF NOT EXISTS background_tasks ("
+                " task_id TEXT PRIMARY KEY,"
+                " task_type TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " progress REAL NOT NULL DEFAULT 0,"
+                " payload TEXT,"
+                " result TEXT,"
+                " error TEXT,"
+                " metadata TEXT,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " max_attempts INTEGER NOT NULL DEFAULT 1,"
+                " lease_owner TEXT,"
+                " lease_expires_at REAL,"
+                " heartbeat_at REAL,"
+                " available_at REAL NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS idx_background_tasks_claim"
+                " ON background_tasks (status, available_at);"
+                "CREATE INDEX IF NOT EXISTS idx_background_tasks_updated"
+                " ON background_tasks (updated_at);"
+                "CREATE TABLE IF NOT EXISTS task_progress ("
+                " task_id TEXT PRIMARY KEY,"
+                " owner TEXT,"
+                " status TEXT,"
+                " data TEXT NOT NULL,"
+                " updated_at REAL NOT NULL);"
+            )
+
+    @staticmethod
+    def _row_to_dict(row: Optional[tuple]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        record = dict(zip(_TASK_COLUMNS, row))
+        for column in _JSON_COLUMNS:
+            record[column] = _loads(record[column])
+        return record
+
+    def _select(self, where: str, params: Iterable[Any] = ()) -> List[Dict[str, Any]]:
+        rows = self._db.execute(
+            f"SELECT {', '.join(_TASK_COLUMNS)} FROM background_tasks WHERE {where}",
+            tuple(params)
+        ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def insert_task(self, task_id: str, task_type: str, status: str, payload: Any = None,
+                    metadata: Optional[Dict[str, Any]] = None, max_attempts: int = 1,
+                    lease_owner: Optional[str] = None, lease_seconds: float = 0):
+        """新建任务；直接以running状态插入时同时获得租约"""
+        now = time.time()
+        lease_expires_at = now + lease_seconds if lease_owner else None
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO background_tasks (task_id, task_type, status, progress, payload, metadata,"
+                " attempts, max_attempts, lease_owner, lease_expires_at, heartbeat_at, available_at,"
+                " created_at, updated_at) VALUES (?, ?, ?, 0, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (task_id, task_type, status, _dumps(payload), _dumps(metadata or {}),
+                 1 if lease_owner else 0, max_attempts, lease_owner, lease_expires_at,
+                 now if lease_owner else None, now, now, now)
+            )
+
+    def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            rows = self._select("task_id = ?", (task_id,))
+        return rows[0] if rows else None
+
+    def update_task(self, task_id: str, owner: Optional[str] = None, **fields) -> bool:
+        """更新任务字段；指定owner时仅在该执行者仍持有租约时更新"""
+        if not fields:
+            return False
+        fields["updated_at"] = time.time()
+        assignments = []
+        params: List[Any] = []
+        for column, value in fields.items():
+            assignments.append(f"{column} = ?")
+            params.append(_dumps(value) if column in _JSON_COLUMNS else value)
+
+        where = "task_id = ?"
+        params.append(task_id)
+        if owner is not None:
+            where += " AND lease_owner = ?"
+            params.append(owner)
+
+        with self._lock:
+            cursor = self._db.execute(
+                f"UPDATE background_tasks SET {', '.join(assignments)} WHERE {where}", params
+            )
+        return cursor.rowcount > 0
+
+    def claim_next(self, owner: str, task_types: List[str], lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """原子地领取一个到期的pending任务，返回领取后的任务记录"""
+        if not task_types:
+            return None
+
+        now = time.time()
+        placeholders = ", ".join("?" for _ in task_types)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT task_id FROM background_tasks"
+                    f" WHERE status = 'pending' AND available_at <= ? AND task_type IN ({placeholders})"
+                    " ORDER BY available_at, created_at LIMIT 1",
+                    (now, *task_types)
+                ).fetchone()
+                if row is None:
+                    self._db.execute("COMMIT")
+                    return None
+
+                self._db.execute(
+                    "UPDATE background_tasks SET status = 'running', attempts = attempts + 1,"
+                    " lease_owner = ?, lease_expires_at = ?, heartbeat_at = ?, updated_at = ?"
+                    " WHERE task_id = ?",
+                    (owner, now + lease_seconds, now, now, row[0])
+                )
+                claimed = self._select("task_id = ?", (row[0],))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return claimed[0] if claimed else None
+
+    def heartbeat(self, task_id: str, owner: str, lease_seconds: float) -> bool:
+        """续约；返回False表示租约已丢失（已被回收或任务已结束）"""
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE background_tasks SET lease_expires_at = ?, heartbeat_at = ?"
+                " WHERE task_id = ? AND lease_owner = ? AND status = 'running'",
+                (now + lease_seconds, now, task_id, owner)
+            )
+        return cursor.rowcount > 0
+
+    def recover_expired(self, resumable_types: List[str]) -> Dict[str, int]:
+        """回收租约过期的running任务
+
+        有注册处理器且未用尽重试次数的任务放回队列，其余（例如进程内闭包任务）
+        标记为失败。
+        """
+        now = time.time()
+        placeholders = ", ".join("?" for _ in resumable_types) or "NULL"
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                requeued = self._db.execute(
+                    "UPDATE background_tasks SET status = 'pending', lease_owner = NULL,"
+                    " lease_expires_at = NULL, available_at = ?, updated_at = ?"
+                    " WHERE status = 'running' AND lease_expires_at < ?"
+                    f" AND task_type IN ({placeholders}) AND attempts < max_attempts",
+                    (now, now, now, *resumable_types)
+                ).rowcount
+                failed = self._db.execute(
+                    "UPDATE background_tasks SET status = 'failed', lease_owner = NULL,"
+                    " lease_expires_at = NULL, error = COALESCE(error, '任务因服务重启中断'),"
+                    " updated_at = ? WHERE status = 'running' AND lease_expires_at < ?",
+                    (now, now)
+                ).rowcount
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return {"requeued": requeued, "failed": failed}
+
+    def next_available_at(self, task_types: List[str]) -> Optional[float]:
+        """最早可领取的pending任务时间，用于调度器休眠"""
+        if not task_types:
+            return None
+        placeholders = ", ".join("?" for _ in task_types)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MIN(available_at) FROM background_tasks"
+                f" WHERE status = 'pending' AND task_type IN ({placeholders})",
+                tuple(task_types)
+            ).fetchone()
+        return row[0] if row else None
+
+    def count_by_status(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT status, COUNT(*) FROM background_tasks GROUP BY status"
+            ).fetchall()
+        return {status: count for status, count in rows}
+
+    def delete_finished_before(self, cutoff: float) -> List[Dict[str, Any]]:
+        """删除早于cutoff的已结束任务，返回被删除的记录"""
+        placeholders = ", ".join("?" for _ in TERMINAL_STATUSES)
+        with self._lock:
+            rows = self._select(
+                f"status IN ({placeholders}) AND updated_at < ?", (*TERMINAL_STATUSES, cutoff)
+            )
+            if rows:
+                self._db.execute(
+                    f"DELETE FROM background_tasks WHERE status IN ({placeholders}) AND updated_at < ?",
+                    (*TERMINAL_STATUSES, cutoff)
+                )
+        return rows
+
+    # ---- 进度快照 ----
+
+    def save_progress(self, task_id: str, owner: str, status: str, data: Dict[str, Any]):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO task_progress (task_id, owner, status, data, updated_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (task_id, owner, status, _dumps(data), time.time())
+            )
+
+    def load_progress(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT owner, status, data, updated_at FROM task_progress WHERE task_id = ?",
+                (task_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        owner, status, data, updated_at = row
+        return {"owner": owner, "status": status, "data": _loads(data) or {}, "updated_at": updated_at}
+
+    def delete_progress(self, task_id: Optional[str] = None, before: Optional[float] = None) -> int:
+        with self._lock:
+            if task_id is not None:
+                cursor = self._db.execute("DELETE FROM task_progress WHERE task_id = ?", (task_id,))
+            else:
+                cursor = self._db.execute(
+                    "DELETE FROM task_progress WHERE status IN ('completed', 'failed') AND updated_at < ?",
+                    (before or 0,)
+                )
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_task_store: Optional[TaskStore] = None
+_task_store_lock = threading.Lock()
+
+
+def get_task_store() -> TaskStore:
+    """获取进程内共享的任务存储"""
+    global _task_store
+    with _task_store_lock:
+        if _task_store is None:
+            from ..core.config import app_config
+            _task_store = TaskStore(app_config.background_task_db)
+            logger.info(f"后台任务存储已初始化: {app_config.background_task_db}")
+        return _task_store
@@ -0,0 +1,262 @@
+"""
+Rendered preview thumbnails for global master templates
+
+Previews are screenshots of ``html_template`` taken through the shared Playwright
+page pool, downscaled to WebP in the process pool and cached on disk under a
+content hash of the HTML, so identical templates share one file and an unchanged
+template is never rendered twice. The thumbnail width is part of the file name
+and the URL, so changing ``TEMPLATE_PREVIEW_WIDTH`` yields new URLs; a request for
+a thumbnail that is not on disk (an old width, or a wiped cache) re-renders it.
+Rendering after create/update runs as a persistent background task.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from ..core.config import app_config
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_PREVIEW_TASK = "template_preview"
+
+RENDER_WIDTH = 1280
+RENDER_HEIGHT = 720
+THUMBNAIL_QUALITY = 80
+
+PREVIEW_URL_PREFIX = "/api/global-master-templates/previews"
+
+_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+# "<key>_<width>.webp"; URLs from before the width was added are plain "<key>.webp"
+_FILE_NAME_PATTERN = re.compile(r"^([0-9a-f]{64})(?:_(\d{1,5}))?\.webp$")
+
+
+def make_webp_thumbnail(src_path: str, dst_path: str, width: int, quality: int = THUMBNAIL_QUALITY) -> int:
+    """Downscale a full-size screenshot to a WebP thumbnail (runs in a worker process)
+
+    Returns:
+        Size of the written thumbnail in bytes
+    """
+    from PIL import Image
+
+    with Image.open(src_path) as image:
+        image = image.convert("RGB")
+        height = max(1, round(image.height * width / image.width))
+        image = image.resize((width, height), Image.LANCZOS)
+        image.save(dst_path, "WEBP", quality=quality, method=4)
+    return os.path.getsize(dst_path)
+
+
+class TemplatePreviewService:
+    """Content-addressed on-disk cache of rendered template thumbnails"""
+
+    def __init__(self, cache_dir: str, width: int = 480):
+        self.cache_dir = Path(cache_dir)
+        self.width = width
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stats = {"hits": 0, "renders": 0, "coalesced": 0, "failures": 0, "render_seconds": 0.0}
+
+    @staticmethod
+    def preview_key(html_template: str) -> str:
+        """Cache key of a template: SHA-256 of its HTML"""
+        return hashlib.sha256(html_template.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def is_valid_key(key: str) -> bool:
+        return bool(_KEY_PATTERN.match(key or ""))
+
+    @staticmethod
+    def parse_file_name(file_name: str) -> Optional[Tuple[str, Optional[int]]]:
+        """(key, width) of a thumbnail file name, width None for legacy names; None if invalid"""
+        match = _FILE_NAME_PATTERN.match(file_name or "")
+        if match is None:
+            return None
+        return match.group(1), int(match.group(2)) if match.group(2) else None
+
+    def thumbnail_path(self, key: str, width: Optional[int] = None) -> Path:
+        # The width is part of the file name so changing it re-renders instead of serving stale sizes
+        return self.cache_dir / key[:2] / f"{key}_{width or self.width}.webp"
+
+    def get_cached_path(self, key: str, width: Optional[int] = None) -> Optional[Path]:
+        path = self.thumbnail_path(key, width)
+        return path if path.exists() else None
+
+    def preview_url(self, key: str) -> str:
+        """Immutable URL of a thumbnail; a new HTML hash or width always yields a new URL"""
+        return f"{PREVIEW_URL_PREFIX}/{key}_{self.width}.webp"
+
+    async def render(self, html_template: str) -> Path:
+        """Return the thumbnail for ``html_template``, rendering it once for all concurrent callers"""
+        key = self.preview_key(html_template)
+        cached = self.get_cached_path(key)
+        if cached is not None:
+            self._stats["hits"] += 1
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                return await self.render(html_template)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            path = await self._render_uncached(key, html_template)
+            future.set_result(path)
+            return path
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self._stats["failures"] += 1
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _render_uncached(self, key: str, html_template: str) -> Path:
+        from ..utils.process_pool import run_cpu_bound
+        from .pyppeteer_pdf_converter import get_pdf_converter
+
+        started = time.perf_counter()
+        target = self.thumbnail_path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+
+        with tempfile.TemporaryDirectory(prefix="template_preview_") as work_dir:
+            html_path = os.path.join(work_dir, "template.html")
+            png_path = os.path.join(work_dir, "template.png")
+            with open(html_path, "w", encoding="utf-8") as f:
+                f.write(html_template)
+
+            ok = await get_pdf_converter().screenshot_html(
+                html_path, png_path, width=RENDER_WIDTH, height=RENDER_HEIGHT, wait_for_stable=False
+            )
+            if not ok or not os.path.exists(png_path):
+                raise RuntimeError("Template screenshot failed")
+
+            # Write next to the final path and rename so readers never see a partial file
+            partial = target.with_suffix(f".{os.getpid()}.tmp")
+            await run_cpu_bound(make_webp_thumbnail, png_path, str(partial), self.width)
+            os.replace(partial, target)
+
+        elapsed = time.perf_counter() - started
+        self._stats["renders"] += 1
+        self._stats["render_seconds"] += elapsed
+        logger.debug(f"Rendered template preview {key[:12]} in {elapsed:.2f}s")
+        return target
+
+    async def schedule(self, template_id: int, html_template: str) -> Optional[str]:
+        """Queue a background render of a template's preview; returns the task id"""
+        from .background_tasks import get_task_manager
+
+        try:
+            return await get_task_manager().enqueue_task_async(
+                TEMPLATE_PREVIEW_TASK,
+                {"template_id": template_id, "preview_key": self.preview_key(html_template)},
+                metadata={"template_id": template_id}
+            )
+        except Exception as e:
+            logger.warning(f"Failed to schedule preview for template {template_id}: {e}")
+            return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["inflight"] = len(self._inflight)
+        if stats["renders"]:
+            stats["avg_render_seconds"] = round(stats["render_seconds"] / stats["renders"], 3)
+        return stats
+
+
+_preview_service: Optional[TemplatePreviewService] = None
+
+
+def get_template_preview_service() -> TemplatePreviewService:
+    """Get the process-wide template preview service, rebuilt when its configuration changes"""
+    global _preview_service
+    cache_dir = app_config.template_preview_cache_dir
+    width = int(app_config.template_preview_width)
+    if (_preview_service is None or _preview_service.width != width
+            or _preview_service.cache_dir != Path(cache_dir)):
+        _preview_service = TemplatePreviewService(cache_dir, width)
+    return _preview_service
+
+
+async def template_preview_handler(ctx, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Render a template's preview and point its ``preview_image`` at the thumbnail"""
+    from ..database.database import AsyncSessionLocal
+    from ..database.service import DatabaseService
+
+    template_id = int(payload["template_id"])
+    service = get_template_preview_service()
+
+    async with AsyncSessionLocal() as session:
+        template = await DatabaseService(session).get_global_master_template_by_id(template_id)
+    if template is None:
+        return {"skipped": "template deleted"}
+
+    key = service.preview_key(template.html_template)
+    if key != payload.get("preview_key"):
+        # The template changed again after this task was queued; the newer task renders it
+        return {"skipped": "superseded"}
+
+    await service.render(template.html_template)
+    ctx.report_progress(90.0)
+
+    url = service.preview_url(key)
+    async with AsyncSessionLocal() as session:
+        await DatabaseService(session).set_global_master_template_preview(template_id, url)
+    return {"template_id": template_id, "preview_image": url}
+
+
+def register_template_preview_handler(task_manager):
+    """Register the preview renderer with the background task manager"""
+    task_manager.register_handler(TEMPLATE_PREVIEW_TASK, template_preview_handler, max_attempts=2)
+
+
+async def _benchmark(count: int = 50):
+    """Render ``count`` previews from the bundled template examples into a scratch cache"""
+    import json
+
+    from .pyppeteer_pdf_converter import get_pdf_converter
+
+    examples_dir = Path(__file__).resolve().parents[3] / "template_examples"
+    templates = []
+    for example in sorted(examples_dir.glob("*.json")):
+        with open(example, encoding="utf-8") as f:
+            html = json.load(f).get("html_template")
+        if html:
+            templates.append(html)
+    if not templates:
+        print(f"No templates found in {examples_dir}")
+        return
+
+    # Vary each copy slightly so every preview is a real render rather than a cache hit
+    batch = [f"{templates[i % len(templates)]}<!-- preview benchmark {i} -->" for i in range(count)]
+
+    converter = get_pdf_converter()
+    with tempfile.TemporaryDirectory(prefix="template_preview_bench_") as cache_dir:
+        service = TemplatePreviewService(cache_dir, app_config.template_preview_width)
+        warmed = await converter.warm_up_pages()
+        started = time.perf_counter()
+        results = await asyncio.gather(*(service.render(html) for html in batch), return_exceptions=True)
+        elapsed = time.perf_counter() - started
+        failures = sum(isinstance(r, Exception) for r in results)
+        print(f"Rendered {count - failures}/{count} previews in {elapsed:.2f}s "
+              f"({elapsed / count * 1000:.0f} ms/preview, {warmed} warm pages)")
+    await converter.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_benchmark())
@@ -0,0 +1,145 @@
+"""
+进程池工具类，用于将CPU密集型操作（python-pptx组装、PDF合并等）移出事件循环所在进程
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import multiprocessing
+import threading
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from .thread_pool import run_blocking_io
+
+T = TypeVar('T')
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessPoolManager:
+    """进程池管理器
+
+    进程池在第一次提交任务时才创建，并使用 spawn 启动方式，避免在持有事件循环和
+    线程的进程中 fork。提交的函数及参数必须可以被 pickle（模块级函数）。
+    ``max_workers`` 为 0 时退化为线程池执行。
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self._max_workers = max_workers
+        self._executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        self.stats = {
+            "total_tasks": 0,
+            "completed_tasks": 0,
+            "failed_tasks": 0,
+            "active_tasks": 0,
+            "pool_restarts": 0
+        }
+
+    @property
+    def max_workers(self) -> int:
+        if self._max_workers is not None:
+            return max(0, int(self._max_workers))
+        from ..core.config import app_config
+        return max(0, int(app_config.background_task_process_workers))
+
+    def _get_executor(self) -> Optional[concurrent.futures.ProcessPoolExecutor]:
+        workers = self.max_workers
+        if workers == 0:
+            return None
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                logger.info(f"进程池初始化完成，最大工作进程数: {workers}")
+            return self._executor
+
+    def _reset_broken_pool(self, executor: concurrent.futures.ProcessPoolExecutor):
+        """工作进程异常退出后进程池不可再用，丢弃并在下次提交时重建"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self.stats["pool_restarts"] += 1
+        executor.shutdown(wait=False)
+
+    async def run_in_process(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """在进程池中运行CPU密集型同步函数
+
+        Args:
+            func: 要运行的模块级函数
+            *args: 传递给函数的位置参数
+            **kwargs: 传递给函数的关键字参数
+
+        Returns:
+            函数的返回值
+        """
+        self.stats["total_tasks"] += 1
+        self.stats["active_tasks"] += 1
+
+        try:
+            executor = self._get_executor()
+            if executor is None:
+                result = await run_blocking_io(func, *args, **kwargs)
+            else:
+                loop = asyncio.get_running_loop()
+                try:
+                    result = await loop.run_in_executor(
+                        executor,
+                        functools.partial(func, *args, **kwargs)
+                    )
+                except concurrent.futures.process.BrokenProcessPool:
+                    self._reset_broken_pool(executor)
+                    raise
+
+            self.stats["completed_tasks"] += 1
+            return result
+        except Exception as e:
+            self.stats["failed_tasks"] += 1
+            logger.error(f"进程池任务执行失败: {e}")
+            raise
+        finally:
+            self.stats["active_tasks"] -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取进程池统计信息"""
+        stats = self.stats.copy()
+        stats["max_workers"] = self.max_workers
+        stats["started"] = self._executor is not None
+        return stats
+
+    def shutdown(self, wait: bool = True):
+        """关闭进程池
+
+        Args:
+            wait: 是否等待所有进程完成
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+            logger.info("进程池已关闭")
+
+
+# 全局进程池实例
+process_pool = ProcessPoolManager()
+
+
+async def run_cpu_bound(func: Callable[..., T], *args, **kwargs) -> T:
+    """运行CPU密集型操作
+
+    这是一个便捷函数，用于将CPU密集型操作放入进程池中执行
+
+    Args:
+        func: 要运行的模块级函数（必须可被pickle）
+        *args: 传递给函数的位置参数
+        **kwargs: 传递给函数的关键字参数
+
+    Returns:
+        函数的返回值
+    """
+    return await process_pool.run_in_process(func, *args, **kwargs)
@@ -3,7 +3,7 @@ Web interface routes for LandPPT
 """
 
 from fastapi import APIRouter, Request, Form, UploadFile, File, HTTPException, Depends
-from fastapi.responses import HTMLResponse, StreamingResponse, FileResponse, JSONResponse
+from fastapi.responses import HTMLResponse, StreamingResponse, FileResponse, JSONResponse, Response
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 import json
@@ -925,58 +925,85 @@ async def web_project_fullscreen(
             "error": f"加载演示时出错: {str(e)}"
         })
 
+def _shared_payload_response(request: Request, payload) -> Response:
+    """Serve a cached share payload with a strong ETag and a precompressed body"""
+    headers = {
+        "ETag": payload.etag,
+        "Cache-Control": "public, no-cache",
+        "Vary": "Accept-Encoding"
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if payload.etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+
+    body, encoding = payload.select_body(request.headers.get("accept-encoding", ""))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=payload.media_type, headers=headers)
+
+
 @router.get("/share/{share_token}", response_class=HTMLResponse)
 async def web_shared_presentation(
     request: Request,
     share_token: str,
     db: Session = Depends(get_db)
 ):
-    """Public presentation view - no authentication required"""
+    """Public presentation view - no authentication required
+
+    The rendered page is cached per project revision, so repeat viewers cost
+    neither a full project load nor a template render.
+    """
     try:
         from ..services.share_service import ShareService
         share_service = ShareService(db)
 
-        # Validate share token and get project
-        project_model = share_service.validate_share_token(share_token)
+        def render_page(project_model) -> Optional[bytes]:
+            # Check if project has slides
+            if not project_model.slides_data or len(project_model.slides_data) == 0:
+                return None
 
-        if not project_model:
+            # Convert to PPTProject for template compatibility
+            from ..api.models import PPTProject
+            project = PPTProject(
+                project_id=project_model.project_id,
+                title=project_model.title,
+                scenario=project_model.scenario,
+                topic=project_model.topic,
+                requirements=project_model.requirements,
+                status=project_model.status,
+                outline=project_model.outline,
+                slides_html=project_model.slides_html,
+                slides_data=project_model.slides_data,
+                confirmed_requirements=project_model.confirmed_requirements,
+                version=project_model.version,
+                created_at=project_model.created_at,
+                updated_at=project_model.updated_at
+            )
+
+            # Render presentation template
+            return templates.get_template("project_fullscreen_presentation.html").render(
+                request=request,
+                project=project,
+                slides_count=len(project.slides_data),
+                is_shared=True  # Flag to indicate this is a shared view
+            ).encode("utf-8")
+
+        # Validate share token and get the rendered page
+        valid, payload = await share_service.get_shared_payload(share_token, "page", render_page)
+
+        if not valid:
             return templates.TemplateResponse("error.html", {
                 "request": request,
                 "error": "分享链接无效或已失效"
             })
 
-        # Check if project has slides
-        if not project_model.slides_data or len(project_model.slides_data) == 0:
+        if payload is None:
             return templates.TemplateResponse("error.html", {
                 "request": request,
                 "error": "演示文稿尚未生成"
             })
 
-        # Convert to PPTProject for template compatibility
-        from ..api.models import PPTProject
-        project = PPTProject(
-            project_id=project_model.project_id,
-            title=project_model.title,
-            scenario=project_model.scenario,
-            topic=project_model.topic,
-            requirements=project_model.requirements,
-            status=project_model.status,
-            outline=project_model.outline,
-            slides_html=project_model.slides_html,
-            slides_data=project_model.slides_data,
-            confirmed_requirements=project_model.confirmed_requirements,
-            version=project_model.version,
-            created_at=project_model.created_at,
-            updated_at=project_model.updated_at
-        )
-
-        # Render presentation template
-        return templates.TemplateResponse("project_fullscreen_presentation.html", {
-            "request": request,
-            "project": project,
-            "slides_count": len(project.slides_data),
-            "is_shared": True  # Flag to indicate this is a shared view
-        })
+        return _shared_payload_response(request, payload)
 
     except Exception as e:
         logger.error(f"Error displaying shared presentation: {e}")
@@ -988,6 +1015,7 @@ async def web_shared_presentation(
 
 @router.get("/api/share/{share_token}/slides-data")
 async def get_shared_slides_data(
+    request: Request,
     share_token: str,
     db: Session = Depends(get_db)
 ):
@@ -996,13 +1024,26 @@ async def get_shared_slides_data(
         from ..services.share_service import ShareService
         share_service = ShareService(db)
 
-        # Validate share token and get project
-        project = share_service.validate_share_token(share_token)
+        def render_slides_data(project) -> Optional[bytes]:
+            if not project.slides_data or len(project.slides_data) == 0:
+                return None
+            return json.dumps({
+                "status": "success",
+                "slides_data": project.slides_data,
+                "total_slides": len(project.slides_data),
+                "project_title": project.title,
+                "updated_at": project.updated_at
+            }, ensure_ascii=False).encode("utf-8")
 
-        if not project:
+        # Validate share token and get the serialized slides
+        valid, payload = await share_service.get_shared_payload(
+            share_token, "slides-data", render_slides_data, media_type="application/json"
+        )
+
+        if not valid:
             raise HTTPException(status_code=404, detail="分享链接无效或已失效")
 
-        if not project.slides_data or len(project.slides_data) == 0:
+        if payload is None:
             return {
                 "status": "no_slides",
                 "message": "PPT尚未生成",
@@ -1010,13 +1051,7 @@ async def get_shared_slides_data(
                 "total_slides": 0
             }
 
-        return {
-            "status": "success",
-            "slides_data": project.slides_data,
-            "total_slides": len(project.slides_data),
-            "project_title": project.title,
-            "updated_at": project.updated_at
-        }
+        return _shared_payload_response(request, payload)
 
     except HTTPException:
         raise
@@ -4256,7 +4291,8 @@ async def generate_speech_script(
                     )
                 elif request.generation_type == "full":
                     result = await speech_service.generate_full_presentation_scripts(
-                        project, customization, progress_callback=None, task_id=task_id
+                        project, customization, progress_callback=None, task_id=task_id,
+                        include_bookends=bool(customization_data.get('include_bookends', False))
                     )
 
                 # Save scripts to database if successful
@@ -4589,7 +4625,7 @@ async def get_speech_script_result(
             }
 
         # 获取进度信息
-        progress_info = progress_tracker.get_progress(task_id)
+        progress_info = await progress_tracker.get_progress_async(task_id)
 
         if not progress_info:
             return {
@@ -4693,7 +4729,7 @@ async def get_speech_script_progress(
             }
 
         # 获取进度信息
-        progress_info = progress_tracker.get_progress(task_id)
+        progress_info = await progress_tracker.get_progress_async(task_id)
 
         if not progress_info:
             return {
@@ -5731,7 +5767,8 @@ async def export_project_pptx(project_id: str, user: User = Depends(get_current_
         # Step 2: 启动PDF转PPTX后台任务
         logging.info("Step 2: Starting PDF to PPTX conversion task")
 
-        from ..services.background_tasks import get_task_manager, TaskStatus
+        from ..services.background_tasks import get_task_manager
+        from ..services.export_tasks import PDF_TO_PPTX_TASK
 
         task_manager = get_task_manager()
 
@@ -5739,66 +5776,14 @@ async def export_project_pptx(project_id: str, user: User = Depends(get_current_
         with tempfile.NamedTemporaryFile(suffix='.pptx', delete=False) as temp_pptx_file:
             temp_pptx_path = temp_pptx_file.name
 
-        # 定义转换任务函数
-        async def pdf_to_pptx_task():
-            """PDF to PPTX conversion task (runs in subprocess)."""
-            try:
-                success, result = await converter.convert_pdf_to_pptx_async(
-                    temp_pdf_path,
-                    temp_pptx_path
-                )
-                if success:
-                    # 转换成功后，添加演讲稿到备注
-                    try:
-                        from pptx import Presentation
-                        from ..services.speech_script_repository import SpeechScriptRepository
-
-                        # 获取演讲稿数据
-                        repo = SpeechScriptRepository()
-                        scripts_list = await repo.get_current_speech_scripts_by_project(project_id)
-                        speech_scripts = {script.slide_index: script.script_content for script in scripts_list}
-                        repo.close()
-
-                        if len(speech_scripts) > 0:
-                            # 打开生成的PPTX文件
-                            prs = Presentation(temp_pptx_path)
-
-                            # 为每张幻灯片添加演讲稿备注
-                            for i, slide in enumerate(prs.slides):
-                                if i in speech_scripts:
-                                    notes_slide = slide.notes_slide
-                                    text_frame = notes_slide.notes_text_frame
-                                    text_frame.text = speech_scripts[i]
-                                    logging.info(f"Added speech script to slide {i+1} notes")
-
-                            # 保存修改后的PPTX
-                            prs.save(temp_pptx_path)
-                            logging.info(f"Added {len(speech_scripts)} speech scripts to PPTX notes")
-                    except Exception as e:
-                        logging.warning(f"Failed to add speech scripts to PPTX: {e}")
-                        # 继续执行，即使添加演讲稿失败也返回PPTX
-
-                    return {
-                        "success": True,
-                        "pptx_path": temp_pptx_path,
-                        "pdf_path": temp_pdf_path
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": result
-                    }
-            except Exception as e:
-                return {
-                    "success": False,
-                    "error": str(e)
-                }
-
-
-        # 提交后台任务
-        task_id = task_manager.submit_task(
-            task_type="pdf_to_pptx_conversion",
-            func=pdf_to_pptx_task,
+        # 提交持久化后台任务，服务重启后可恢复执行
+        task_id = await task_manager.enqueue_task_async(
+            PDF_TO_PPTX_TASK,
+            payload={
+                "project_id": project_id,
+                "pdf_path": temp_pdf_path,
+                "pptx_path": temp_pptx_path
+            },
             metadata={
                 "project_id": project_id,
                 "project_topic": project.topic,
@@ -5826,9 +5811,6 @@ async def export_project_pptx_from_images(project_id: str, request: ImagePPTXExp
     """Export project as PPTX using high-quality Playwright screenshots"""
     try:
         await _verify_project_owner(project_id, user)
-        from io import BytesIO
-        from pptx import Presentation
-        from pptx.util import Inches
 
         project = await ppt_service.project_manager.get_project(project_id)
         if not project:
@@ -5849,6 +5831,7 @@ async def export_project_pptx_from_images(project_id: str, request: ImagePPTXExp
 
         # 创建后台任务
         from ..services.background_tasks import get_task_manager
+        from ..services.export_tasks import HTML_TO_PPTX_TASK
         task_manager = get_task_manager()
 
         # 创建临时目录和PPTX文件路径
@@ -5856,116 +5839,23 @@ async def export_project_pptx_from_images(project_id: str, request: ImagePPTXExp
         with tempfile.NamedTemporaryFile(suffix='.pptx', delete=False) as temp_pptx_file:
             temp_pptx_path = temp_pptx_file.name
 
-        # 定义HTML到图片到PPTX的任务函数
-        async def html_to_pptx_task():
-            """使用Playwright截图并生成PPTX"""
-            screenshot_paths = []
-            try:
-                logging.info(f"Starting screenshot-based PPTX export for {len(slides)} slides")
-
-                # 第1步：获取演讲稿数据
-                speech_scripts = {}
-                try:
-                    from ..services.speech_script_repository import SpeechScriptRepository
-                    repo = SpeechScriptRepository()
-                    scripts_list = await repo.get_current_speech_scripts_by_project(project_id)
-                    # 构建幻灯片索引到演讲稿的映射
-                    for script in scripts_list:
-                        speech_scripts[script.slide_index] = script.script_content
-                    repo.close()
-                    logging.info(f"Loaded {len(speech_scripts)} speech scripts for slides")
-                except Exception as e:
-                    logging.warning(f"Failed to load speech scripts: {e}")
-                    # 继续执行，即使没有演讲稿也可以生成PPTX
-
-                # 第2步：为每张幻灯片创建临时HTML文件
-                html_files = []
-                for i, slide in enumerate(slides):
-                    html_file = os.path.join(temp_dir, f"slide_{i}.html")
-                    with open(html_file, 'w', encoding='utf-8') as f:
-                        f.write(slide['html_content'])
-                    html_files.append(html_file)
-
-                # 第3步：使用Playwright对每张幻灯片进行截图
-                for i, html_file in enumerate(html_files):
-                    screenshot_path = os.path.join(temp_dir, f"slide_{i}.png")
-
-                    # 使用PDF converter的截图功能
-                    success = await pdf_converter.screenshot_html(
-                        html_file,
-                        screenshot_path,
-                        width=1280,
-                        height=720
-                    )
-
-                    if success:
-                        screenshot_paths.append(screenshot_path)
-                        logging.info(f"Screenshot {i+1}/{len(html_files)} completed")
-                    else:
-                        logging.warning(f"Screenshot {i+1} failed, skipping")
-
-                if len(screenshot_paths) == 0:
-                    raise Exception("No screenshots were generated")
-
-                # 第4步：将截图转换为PPTX
-                logging.info("Creating PPTX from screenshots...")
-                prs = Presentation()
-
-                # 设置幻灯片尺寸为16:9
-                prs.slide_width = Inches(10)
-                prs.slide_height = Inches(5.625)
-
-                for i, screenshot_path in enumerate(screenshot_paths):
-                    # 添加空白幻灯片
-                    blank_slide_layout = prs.slide_layouts[6]
-                    slide = prs.slides.add_slide(blank_slide_layout)
-
-                    # 添加截图，填充整个幻灯片
-                    left = Inches(0)
-                    top = Inches(0)
-                    width = prs.slide_width
-                    height = prs.slide_height
-
-                    slide.shapes.add_picture(screenshot_path, left, top, width=width, height=height)
-
-                    # 如果该幻灯片有演讲稿，添加到备注中
-                    if i in speech_scripts:
-                        notes_slide = slide.notes_slide
-                        text_frame = notes_slide.notes_text_frame
-                        text_frame.text = speech_scripts[i]
-                        logging.info(f"Added speech script to slide {i+1} notes")
+        # 先把幻灯片HTML写入临时目录，任务payload只保存路径，重启后可继续截图
+        def write_slide_files():
+            for i, slide in enumerate(slides):
+                with open(os.path.join(temp_dir, f"slide_{i}.html"), 'w', encoding='utf-8') as f:
+                    f.write(slide['html_content'])
 
-                # 保存PPTX文件
-                prs.save(temp_pptx_path)
-                logging.info(f"PPTX saved to {temp_pptx_path}")
+        await run_blocking_io(write_slide_files)
 
-                return {
-                    "success": True,
-                    "pptx_path": temp_pptx_path
-                }
-
-            except Exception as e:
-                logging.error(f"HTML to PPTX conversion failed: {e}")
-                import traceback
-                traceback.print_exc()
-                return {
-                    "success": False,
-                    "error": str(e)
-                }
-            finally:
-                # 清理临时HTML和截图文件
-                try:
-                    import shutil
-                    if os.path.exists(temp_dir):
-                        shutil.rmtree(temp_dir)
-                        logging.info(f"Cleaned up temp directory: {temp_dir}")
-                except Exception as cleanup_error:
-                    logging.warning(f"Failed to cleanup temp directory: {cleanup_error}")
-
-        # 提交后台任务
-        task_id = task_manager.submit_task(
-            task_type="html_to_pptx_screenshot",
-            func=html_to_pptx_task,
+        # 提交持久化后台任务
+        task_id = await task_manager.enqueue_task_async(
+            HTML_TO_PPTX_TASK,
+            payload={
+                "project_id": project_id,
+                "temp_dir": temp_dir,
+                "slide_count": len(slides),
+                "pptx_path": temp_pptx_path
+            },
             metadata={
                 "project_id": project_id,
                 "project_topic": project.topic,
@@ -5998,7 +5888,7 @@ async def get_task_status(task_id: str):
     from ..services.background_tasks import get_task_manager
 
     task_manager = get_task_manager()
-    task = task_manager.get_task(task_id)
+    task = await task_manager.get_task_async(task_id)
 
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
@@ -6010,7 +5900,9 @@ async def get_task_status(task_id: str):
         "progress": task.progress,
         "created_at": task.created_at.isoformat(),
         "updated_at": task.updated_at.isoformat(),
-        "metadata": task.metadata
+        "metadata": task.metadata,
+        "attempts": task.attempts,
+        "max_attempts": task.max_attempts
     }
 
     # 如果任务完成，添加结果信息
@@ -6027,6 +5919,52 @@ async def get_task_status(task_id: str):
     return JSONResponse(response)
 
 
+@router.get("/api/landppt/tasks/{task_id}/events")
+async def stream_task_events(task_id: str):
+    """通过SSE推送后台任务进度，任务结束后关闭连接"""
+    from ..services.background_tasks import get_task_manager, TaskStatus
+    from ..services.task_events import progress_channel
+
+    task_manager = get_task_manager()
+    task = await task_manager.get_task_async(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    terminal_statuses = {TaskStatus.COMPLETED.value, TaskStatus.FAILED.value, TaskStatus.CANCELLED.value}
+
+    async def event_stream():
+        async with progress_channel.subscribe(task_id) as queue:
+            # 订阅之后再读取一次当前状态，避免漏掉订阅前完成的任务
+            current = await task_manager.get_task_async(task_id)
+            yield f"data: {json.dumps({'type': 'background_task', 'task_id': task_id, 'status': current.status.value, 'progress': current.progress})}\n\n"
+            if current.status.value in terminal_statuses:
+                return
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # 任务可能由其他工作进程执行，超时后从任务表补一次状态
+                    current = await task_manager.get_task_async(task_id)
+                    if current is None:
+                        return
+                    event = {'type': 'background_task', 'task_id': task_id,
+                             'status': current.status.value, 'progress': current.progress}
+
+                yield f"data: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+                if event.get('status') in terminal_statuses:
+                    return
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive"
+        }
+    )
+
+
 @router.get("/api/landppt/tasks/{task_id}/download")
 async def download_task_result(task_id: str):
     """下载任务结果文件"""
@@ -6034,7 +5972,7 @@ async def download_task_result(task_id: str):
     from starlette.background import BackgroundTask
 
     task_manager = get_task_manager()
-    task = task_manager.get_task(task_id)
+    task = await task_manager.get_task_async(task_id)
 
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
@@ -424,6 +424,113 @@ class PromptTemplates:
             """)
         ])
     
+    @staticmethod
+    def get_chunk_outline_prompt() -> ChatPromptTemplate:
+        """分块大纲生成提示（Map阶段）"""
+        return ChatPromptTemplate([
+            ("human", """
+            ## 任务目标
+            基于文档结构元数据和文档中的一个片段，为该片段独立生成局部PPT大纲。其他片段会并行处理，最终统一归并。
+
+            ## 输入参数
+            **项目基本信息：**
+            - 项目主题：{project_topic}
+            - 应用场景：{project_scenario}
+            - 具体要求：{project_requirements}
+
+            **目标受众信息：**
+            - 受众类型：{target_audience}
+            - 自定义受众：{custom_audience}
+
+            **风格要求：**
+            - PPT风格：{ppt_style}
+            - 自定义风格提示：{custom_style_prompt}
+
+            **文档结构元数据：**
+            {structure}
+
+            **当前片段位置：**
+            第 {chunk_index} 部分，共 {total_chunks} 部分
+
+            **片段内容：**
+            {content}
+
+            **目标语言：**
+            {target_language}
+
+            ## 核心约束条件
+            1. **源材料依赖原则**：所有内容必须基于当前片段，可以理解和转化表达，但不得添加片段外信息
+            2. **数据准确原则**：定量数据（数字、百分比、统计值等）必须保持绝对准确，不得修改或估算
+            3. **局部视角原则**：仅为当前片段生成内容页，不要生成整份演示的标题页、目录页或结论页，除非片段本身就是开篇或总结
+            4. **图片链接严格规则**：仅保留片段中实际存在的图片链接，URL必须完全一致，严禁编造
+            5. **目标语言**：所有输出内容必须使用目标语言：{target_language}
+
+            ## 输出格式规范
+            请返回JSON格式的局部大纲，包含以下字段：
+            - **title** (string): 当前片段的主题
+            - **summary** (string): 当前片段核心内容的简要概括（不超过200字）
+            - **slides** (array): 幻灯片对象列表，每个对象包含 page_number、title、content_points、slide_type、description，可选 chart_config
+
+            ## 执行指令
+            请严格基于当前片段生成局部大纲，只输出JSON。
+            """)
+        ])
+
+    @staticmethod
+    def get_merge_outlines_prompt() -> ChatPromptTemplate:
+        """分块大纲归并提示（Reduce阶段）"""
+        return ChatPromptTemplate([
+            ("human", """
+            ## 任务目标
+            将按文档顺序排列的多个局部PPT大纲归并为一个连贯的PPT大纲。
+
+            ## 输入参数
+            **项目基本信息：**
+            - 项目主题：{project_topic}
+            - 应用场景：{project_scenario}
+            - 具体要求：{project_requirements}
+
+            **目标受众信息：**
+            - 受众类型：{target_audience}
+            - 自定义受众：{custom_audience}
+
+            **风格要求：**
+            - PPT风格：{ppt_style}
+            - 自定义风格提示：{custom_style_prompt}
+
+            **文档结构元数据：**
+            {structure}
+
+            **待归并的局部大纲（按文档顺序）：**
+            {partial_outlines}
+
+            **页数约束：**
+            {slides_range}
+
+            **目标语言：**
+            {target_language}
+
+            ## 归并规则
+            1. **顺序保持**：按局部大纲的先后顺序组织内容，保持文档原有的逻辑脉络
+            2. **去重合并**：合并主题重复或高度相近的幻灯片，避免同一内容出现多次
+            3. **信息保真**：不得引入局部大纲之外的信息，定量数据必须保持原值
+            4. **图片链接**：仅保留局部大纲中已存在的图片链接，URL必须完全一致
+            5. **结构完整**：{structure_requirement}
+            6. **目标语言**：所有输出内容必须使用目标语言：{target_language}
+
+            ## 输出格式规范
+            请返回JSON格式的PPT大纲，包含以下字段：
+            - **title** (string): PPT标题
+            - **summary** (string): 归并后内容的简要概括（不超过300字）
+            - **total_pages** (integer): 总页数
+            - **page_count_mode** (string): 固定值"final"
+            - **slides** (array): 完整的幻灯片对象列表，page_number从1开始连续编号
+
+            ## 执行指令
+            请严格按照上述规则执行归并，只输出JSON。
+            """)
+        ])
+
     @staticmethod
     def get_custom_prompt(template: str) -> ChatPromptTemplate:
         """自定义提示模板"""
@@ -541,5 +648,7 @@ class PromptTemplates:
             "structure_analysis": cls.get_structure_analysis_prompt(),
             "initial_outline": cls.get_initial_outline_prompt(),
             "refine_outline": cls.get_refine_outline_prompt(),
+            "chunk_outline": cls.get_chunk_outline_prompt(),
+            "merge_outlines": cls.get_merge_outlines_prompt(),
             "error_recovery": cls.get_error_recovery_prompt(),
         }
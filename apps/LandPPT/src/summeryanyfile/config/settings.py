@@ -10,7 +10,7 @@ import logging
 from dataclasses import dataclass, asdict
 from dotenv import load_dotenv
 
-from ..core.models import ProcessingConfig, ChunkStrategy
+from ..core.models import ProcessingConfig, ChunkStrategy, WorkflowMode
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +30,8 @@ class Settings:
     chunk_size: int = 3000
     chunk_overlap: int = 200
     chunk_strategy: str = "paragraph"
+    workflow_mode: str = "iterative"
+    map_concurrency: int = 4
     
     # API配置
     openai_api_key: Optional[str] = None
@@ -64,6 +66,8 @@ class Settings:
             temperature=self.temperature,
             max_tokens=self.max_tokens,
             target_language=target_language,
+            workflow_mode=WorkflowMode.parse(self.workflow_mode),
+            map_concurrency=self.map_concurrency,
         )
     
     def get_llm_kwargs(self) -> Dict[str, Any]:
@@ -189,6 +193,8 @@ def load_settings(
         "CHUNK_SIZE": "chunk_size",
         "CHUNK_OVERLAP": "chunk_overlap",
         "CHUNK_STRATEGY": "chunk_strategy",
+        "WORKFLOW_MODE": "workflow_mode",
+        "MAP_CONCURRENCY": "map_concurrency",
         "TEMPERATURE": "temperature",
         "MAX_TOKENS": "max_tokens",
         "LOG_LEVEL": "log_level",
@@ -199,7 +205,7 @@ def load_settings(
         env_value = os.getenv(env_key)
         if env_value is not None:
             # 类型转换
-            if attr_name in ["max_slides", "min_slides", "chunk_size", "chunk_overlap", "max_tokens"]:
+            if attr_name in ["max_slides", "min_slides", "chunk_size", "chunk_overlap", "max_tokens", "map_concurrency"]:
                 try:
                     env_value = int(env_value)
                 except ValueError:
@@ -270,6 +276,8 @@ MIN_SLIDES=5
 CHUNK_SIZE=3000
 CHUNK_OVERLAP=200
 CHUNK_STRATEGY=paragraph
+WORKFLOW_MODE=iterative  # iterative 或 map_reduce
+MAP_CONCURRENCY=4
 
 # Logging
 LOG_LEVEL=INFO
@@ -2,7 +2,7 @@
 核心模块 - 包含数据模型、文档处理、LLM管理等核心功能
 """
 
-from .models import SlideInfo, PPTState, ChunkStrategy
+from .models import SlideInfo, PPTState, ChunkStrategy, WorkflowMode
 from .document_processor import DocumentProcessor
 from .llm_manager import LLMManager
 from .json_parser import JSONParser
@@ -12,6 +12,7 @@ __all__ = [
     "SlideInfo",
     "PPTState",
     "ChunkStrategy",
+    "WorkflowMode",
     "DocumentProcessor",
     "LLMManager",
     "JSONParser",
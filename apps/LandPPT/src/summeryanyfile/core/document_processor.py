@@ -4,11 +4,14 @@
 
 import re
 import os
+import asyncio
 import tempfile
+import threading
+import concurrent.futures
 import shutil
 import hashlib
 import json
-from typing import List, Optional, Tuple, Dict, Any
+from typing import List, Optional, Tuple, Dict, Any, Iterable, Iterator, AsyncIterator
 import logging
 from pathlib import Path
 from datetime import datetime
@@ -613,6 +616,279 @@ class DocumentProcessor:
         chunker = self._get_chunker(strategy, chunk_size, chunk_overlap, max_tokens)
         return chunker.chunk_text(text, metadata)
 
+    def iter_document_sections(
+        self,
+        file_path: str,
+        encoding: Optional[str] = None,
+        section_size: int = 20000
+    ) -> Iterator[str]:
+        """
+        按页或按章节流式读取文档内容
+
+        PDF（MarkItDown模式）逐页解析，文本/Markdown文件按标题和长度切分读取，
+        已缓存的文件直接从缓存切分。Magic-PDF等只能整体转换的格式会先完整转换再切分。
+
+        Args:
+            file_path: 文件路径
+            encoding: 指定编码，如果为None则自动检测
+            section_size: 文本文件单个片段的最大字符数
+
+        Yields:
+            文档片段（Markdown文本）
+
+        Raises:
+            FileNotFoundError: 文件不存在
+            ValueError: 不支持的文件格式
+        """
+        path = Path(file_path)
+
+        if not path.exists():
+            raise FileNotFoundError(f"文件不存在: {file_path}")
+
+        file_extension = path.suffix.lower()
+        if file_extension not in self.SUPPORTED_EXTENSIONS:
+            raise ValueError(f"不支持的文件格式: {file_extension}")
+
+        file_type = self.SUPPORTED_EXTENSIONS[file_extension]
+
+        if self.enable_cache and self._cache_manager:
+            is_cached, md5_hash = self._cache_manager.is_cached(file_path)
+            if is_cached and md5_hash:
+                cached_content, _ = self._cache_manager.get_cached_content(md5_hash)
+                if cached_content:
+                    logger.info(f"流式读取使用缓存的文件处理结果: {md5_hash}")
+                    yield from self._split_sections(cached_content.splitlines(keepends=True), section_size)
+                    return
+
+        if file_extension == '.pdf' and not self.use_magic_pdf:
+            logger.info(f"逐页流式解析PDF: {path.name}")
+            page_count = 0
+            for page_text in self._iter_pdf_pages(file_path):
+                page_count += 1
+                page_text = re.sub(r'\n{3,}', '\n\n', page_text).strip()
+                if page_text:
+                    yield page_text
+            logger.info(f"PDF流式解析完成，共 {page_count} 页")
+            return
+
+        if file_type in ['text', 'markdown']:
+            detected_encoding = encoding or self._detect_encoding(file_path)
+            with open(file_path, 'r', encoding=detected_encoding, errors='replace') as f:
+                yield from self._split_sections(f, section_size)
+            return
+
+        # 其余格式无法增量转换，整体转换后按章节切分
+        document_info = self.load_document(file_path, encoding)
+        yield from self._split_sections(document_info.content.splitlines(keepends=True), section_size)
+
+    def stream_chunks(
+        self,
+        file_path: str,
+        encoding: Optional[str] = None,
+        chunk_size: int = 3000,
+        chunk_overlap: int = 200,
+        strategy: ChunkStrategy = ChunkStrategy.PARAGRAPH,
+        max_tokens: Optional[int] = None
+    ) -> Iterator[str]:
+        """
+        流式文档分块，随转换进度逐个产出文本块
+
+        内存中只保留尚未分块的少量片段；每次分块后保留最后一个块与后续内容合并，
+        避免在片段边界处截断段落。
+
+        Args:
+            file_path: 文件路径
+            encoding: 指定编码，如果为None则自动检测
+            chunk_size: 块大小
+            chunk_overlap: 块重叠大小
+            strategy: 分块策略
+            max_tokens: 最大token数（仅用于快速分块器）
+
+        Yields:
+            文本块
+        """
+        chunker = self._get_chunker(strategy, chunk_size, chunk_overlap, max_tokens)
+        flush_threshold = max(chunk_size, 1000) * 4
+
+        buffer: List[str] = []
+        buffered_length = 0
+        chunk_count = 0
+
+        for section in self.iter_document_sections(file_path, encoding):
+            buffer.append(section)
+            buffered_length += len(section)
+
+            if buffered_length < flush_threshold:
+                continue
+
+            chunks = [chunk.content for chunk in chunker.chunk_text("\n\n".join(buffer))]
+            for chunk in chunks[:-1]:
+                chunk_count += 1
+                yield chunk
+
+            buffer = chunks[-1:]
+            buffered_length = sum(len(part) for part in buffer)
+
+        if buffer:
+            for chunk in chunker.chunk_text("\n\n".join(buffer)):
+                chunk_count += 1
+                yield chunk.content
+
+        logger.info(f"📊 流式分块完成: 生成 {chunk_count} 个文档块")
+
+    async def astream_chunks(
+        self,
+        file_path: str,
+        encoding: Optional[str] = None,
+        chunk_size: int = 3000,
+        chunk_overlap: int = 200,
+        strategy: ChunkStrategy = ChunkStrategy.PARAGRAPH,
+        max_tokens: Optional[int] = None,
+        max_pending: int = 8
+    ) -> AsyncIterator[str]:
+        """
+        异步流式文档分块
+
+        转换和分块在线程池中进行，结果经有界队列交给调用方，
+        队列满时转换线程会等待，从而限制内存中积压的文本块数量。
+
+        Args:
+            file_path: 文件路径
+            encoding: 指定编码
+            chunk_size: 块大小
+            chunk_overlap: 块重叠大小
+            strategy: 分块策略
+            max_tokens: 最大token数（仅用于快速分块器）
+            max_pending: 队列中最多积压的文本块数量
+
+        Yields:
+            文本块
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        stop_event = threading.Event()
+        done = object()
+        # 队列满时转换线程按此间隔检查是否已被取消，避免调用方退出后永久阻塞
+        put_timeout = 0.5
+
+        def put(item) -> bool:
+            """把结果交给事件循环；调用方已停止消费时放弃写入并返回False"""
+            try:
+                future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            except RuntimeError:
+                # 事件循环已关闭
+                return False
+            while True:
+                try:
+                    future.result(timeout=put_timeout)
+                    return True
+                except concurrent.futures.TimeoutError:
+                    if stop_event.is_set():
+                        future.cancel()
+                        return False
+
+        def produce() -> None:
+            try:
+                for chunk in self.stream_chunks(
+                    file_path, encoding, chunk_size, chunk_overlap, strategy, max_tokens
+                ):
+                    if stop_event.is_set() or not put(chunk):
+                        return
+            except Exception as e:
+                put(e)
+                return
+            put(done)
+
+        loop.run_in_executor(None, produce)
+
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # 调用方提前结束时，通知转换线程停止并释放其阻塞的写入
+            stop_event.set()
+            while not queue.empty():
+                queue.get_nowait()
+
+    def _iter_pdf_pages(self, file_path: str) -> Iterator[str]:
+        """逐页提取PDF文本，优先使用pdfminer（与MarkItDown一致），回退到pypdf"""
+        try:
+            from pdfminer.high_level import extract_pages
+            from pdfminer.layout import LTTextContainer
+        except ImportError:
+            extract_pages = None
+
+        if extract_pages is not None:
+            for page_layout in extract_pages(file_path):
+                yield "".join(
+                    element.get_text() for element in page_layout
+                    if isinstance(element, LTTextContainer)
+                )
+            return
+
+        try:
+            import pypdf
+        except ImportError:
+            raise ImportError("请安装pdfminer.six或pypdf: pip install pdfminer.six")
+
+        with open(file_path, 'rb') as f:
+            reader = pypdf.PdfReader(f)
+            for page in reader.pages:
+                yield page.extract_text() or ""
+
+    def _detect_encoding(self, file_path: str, sample_size: int = 64 * 1024) -> str:
+        """根据文件开头的样本检测编码"""
+        with open(file_path, 'rb') as f:
+            sample = f.read(sample_size)
+
+        for enc in self.encoding_detectors:
+            try:
+                sample.decode(enc)
+                return enc
+            except UnicodeDecodeError:
+                # 样本末尾可能截断了多字节字符
+                try:
+                    sample[:-4].decode(enc)
+                    return enc
+                except UnicodeDecodeError:
+                    continue
+
+        try:
+            import chardet
+            detected_encoding = chardet.detect(sample).get('encoding')
+            if detected_encoding:
+                return detected_encoding
+        except ImportError:
+            logger.warning("chardet未安装，无法进行高级编码检测")
+
+        raise ValueError(f"无法检测文件编码: {file_path}")
+
+    def _split_sections(self, lines: Iterable[str], section_size: int) -> Iterator[str]:
+        """逐行读取内容，在Markdown标题处或超过长度时切分为片段"""
+        buffer: List[str] = []
+        buffered_length = 0
+
+        for line in lines:
+            if buffer and (line.startswith('#') or buffered_length >= section_size):
+                section = "".join(buffer).strip()
+                if section:
+                    yield section
+                buffer = []
+                buffered_length = 0
+
+            buffer.append(line)
+            buffered_length += len(line)
+
+        if buffer:
+            section = "".join(buffer).strip()
+            if section:
+                yield section
+
     def analyze_document_structure(self, text: str) -> Dict[str, Any]:
         """
         分析文档结构
@@ -1,15 +1,21 @@
 """
 文件缓存管理器 - 基于MD5哈希值缓存文件处理结果
+
+缓存索引保存在SQLite中：文件的stat指纹和采样指纹（大小 + 首尾块）映射到内容哈希，
+两者都未命中时才需要完整计算文件哈希；过期和统计都是索引查询。
 """
 
 import os
 import json
+import time
+import sqlite3
 import hashlib
 import tempfile
 import shutil
 import logging
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Tuple, Dict, Any
+from typing import Optional, Tuple, Dict, Any, Iterator
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
@@ -17,6 +23,11 @@ logger = logging.getLogger(__name__)
 
 class FileCacheManager:
     """文件缓存管理器，用于缓存文件处理结果"""
+
+    # 完整计算哈希时的读取缓冲区大小
+    HASH_BUFFER_SIZE = 1024 * 1024
+    # 采样指纹读取的首尾块大小
+    SAMPLE_BLOCK_SIZE = 64 * 1024
     
     def __init__(self, cache_dir: Optional[str] = None, cache_ttl_hours: int = 24 * 7, processing_mode: Optional[str] = None):
         """
@@ -49,6 +60,10 @@ class FileCacheManager:
         for dir_path in [self.files_cache_dir, self.markdown_cache_dir, self.metadata_cache_dir]:
             dir_path.mkdir(parents=True, exist_ok=True)
 
+        # 初始化缓存索引
+        self.index_path = self.cache_dir / "cache_index.db"
+        self._init_index()
+
         logger.info(f"文件缓存管理器初始化完成，缓存目录: {self.cache_dir}，处理模式: {self.processing_mode}")
     
     def calculate_file_md5(self, file_path: str) -> str:
@@ -66,8 +81,13 @@ class FileCacheManager:
         try:
             with open(file_path, "rb") as f:
                 # 分块读取文件以处理大文件
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
+                buffer = bytearray(self.HASH_BUFFER_SIZE)
+                view = memoryview(buffer)
+                while True:
+                    size = f.readinto(buffer)
+                    if not size:
+                        break
+                    hash_md5.update(view[:size])
             
             md5_hash = hash_md5.hexdigest()
             logger.debug(f"文件 {file_path} 的MD5: {md5_hash}")
@@ -77,6 +97,169 @@ class FileCacheManager:
             logger.error(f"计算文件MD5失败 {file_path}: {e}")
             raise
     
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """打开缓存索引连接（每次操作独立连接，可安全跨线程使用）"""
+        conn = sqlite3.connect(str(self.index_path), timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_index(self):
+        """创建索引表，并导入旧版本的元数据JSON文件"""
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    content_hash TEXT PRIMARY KEY,
+                    cached_at REAL NOT NULL,
+                    file_name TEXT,
+                    file_size INTEGER,
+                    markdown_length INTEGER,
+                    total_bytes INTEGER NOT NULL DEFAULT 0,
+                    has_backup INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS idx_entries_cached_at ON entries (cached_at);
+
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    stat_key TEXT PRIMARY KEY,
+                    sample_key TEXT NOT NULL,
+                    content_hash TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_fingerprints_sample ON fingerprints (sample_key);
+                CREATE INDEX IF NOT EXISTS idx_fingerprints_hash ON fingerprints (content_hash);
+
+                CREATE TABLE IF NOT EXISTS index_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+            """)
+
+            imported = conn.execute(
+                "SELECT value FROM index_meta WHERE key = 'legacy_imported'"
+            ).fetchone()
+            if imported:
+                return
+
+            imported_count = 0
+            for metadata_file in self.metadata_cache_dir.glob("*.json"):
+                try:
+                    with open(metadata_file, 'r', encoding='utf-8') as f:
+                        metadata = json.load(f)
+                    md5_hash = metadata_file.stem
+                    cached_at = datetime.fromisoformat(metadata.get('cached_time', '')).timestamp()
+                    conn.execute(
+                        "INSERT OR IGNORE INTO entries (content_hash, cached_at, file_name, file_size,"
+                        " markdown_length, total_bytes, has_backup) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            md5_hash,
+                            cached_at,
+                            metadata.get('original_file_name'),
+                            metadata.get('original_file_size'),
+                            metadata.get('markdown_length'),
+                            self._entry_disk_size(md5_hash),
+                            int(any(self.files_cache_dir.glob(f"{md5_hash}.*")))
+                        )
+                    )
+                    imported_count += 1
+                except Exception as e:
+                    logger.warning(f"导入旧缓存元数据失败 {metadata_file}: {e}")
+
+            conn.execute("INSERT OR REPLACE INTO index_meta (key, value) VALUES ('legacy_imported', '1')")
+            if imported_count:
+                logger.info(f"已将 {imported_count} 个旧缓存条目导入索引")
+
+    def _entry_disk_size(self, md5_hash: str) -> int:
+        """计算缓存条目在磁盘上占用的字节数"""
+        total_size = 0
+        paths = [
+            self.markdown_cache_dir / f"{md5_hash}.md",
+            self.metadata_cache_dir / f"{md5_hash}.json",
+            *self.files_cache_dir.glob(f"{md5_hash}.*")
+        ]
+        for path in paths:
+            try:
+                total_size += path.stat().st_size
+            except OSError:
+                pass
+        return total_size
+
+    def _stat_fingerprint(self, file_path: str) -> Tuple[str, int]:
+        """
+        计算文件的stat指纹（设备/inode/大小/修改时间），不读取文件内容
+
+        Returns:
+            (stat指纹, 文件大小)
+        """
+        stat = os.stat(file_path)
+        return f"{stat.st_dev}:{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}", stat.st_size
+
+    def _sample_fingerprint(self, file_path: str, file_size: int) -> str:
+        """计算采样指纹：大小 + 首尾块哈希（不超过两个块的文件即为完整内容）"""
+        sample_hash = hashlib.blake2b(digest_size=16)
+        with open(file_path, "rb") as f:
+            sample_hash.update(f.read(self.SAMPLE_BLOCK_SIZE))
+            if file_size > self.SAMPLE_BLOCK_SIZE:
+                f.seek(max(file_size - self.SAMPLE_BLOCK_SIZE, self.SAMPLE_BLOCK_SIZE))
+                sample_hash.update(f.read(self.SAMPLE_BLOCK_SIZE))
+        return f"{file_size}:{sample_hash.hexdigest()}"
+
+    def resolve_content_hash(self, file_path: str, compute_if_unknown: bool = True) -> Optional[str]:
+        """
+        通过指纹索引解析文件的内容哈希
+
+        依次尝试：
+        1. stat指纹命中（同一文件未被修改）：直接返回已知哈希，不读取文件内容；
+        2. 采样指纹（大小 + 首尾块）从未出现过、compute_if_unknown 为False且没有旧版本导入的
+           无指纹条目时，文件不可能命中缓存，直接返回None；
+        3. 完整计算MD5。stat指纹变化后（新路径、新inode或修改时间变化）总是重新计算，
+           采样指纹相同不代表内容相同，只改动中间部分的文件首尾块不变。
+
+        Args:
+            file_path: 文件路径
+            compute_if_unknown: 采样指纹从未出现过时是否仍然计算完整哈希
+
+        Returns:
+            MD5哈希值；指纹未知且不要求计算时返回None
+        """
+        stat_key, file_size = self._stat_fingerprint(file_path)
+
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT content_hash FROM fingerprints WHERE stat_key = ?", (stat_key,)
+            ).fetchone()
+        if row:
+            return row[0]
+
+        sample_key = self._sample_fingerprint(file_path, file_size)
+
+        with self._connect() as conn:
+            sample_known = conn.execute(
+                "SELECT 1 FROM fingerprints WHERE sample_key = ? LIMIT 1", (sample_key,)
+            ).fetchone()
+
+            if not compute_if_unknown and not sample_known:
+                # 从旧版本导入的条目没有指纹，存在这类条目时仍需计算哈希才能判断
+                unfingerprinted_entry = conn.execute(
+                    "SELECT 1 FROM entries WHERE NOT EXISTS ("
+                    " SELECT 1 FROM fingerprints WHERE fingerprints.content_hash = entries.content_hash"
+                    ") LIMIT 1"
+                ).fetchone()
+                if not unfingerprinted_entry:
+                    return None
+
+        md5_hash = self.calculate_file_md5(file_path)
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO fingerprints (stat_key, sample_key, content_hash) VALUES (?, ?, ?)",
+                (stat_key, sample_key, md5_hash)
+            )
+
+        return md5_hash
+    
     def is_cached(self, file_path: str) -> Tuple[bool, Optional[str]]:
         """
         检查文件是否已缓存且未过期
@@ -88,41 +271,35 @@ class FileCacheManager:
             (是否已缓存, MD5哈希值)
         """
         try:
-            md5_hash = self.calculate_file_md5(file_path)
-            
-            # 检查元数据文件是否存在
-            metadata_file = self.metadata_cache_dir / f"{md5_hash}.json"
-            if not metadata_file.exists():
+            # 采样指纹从未出现过的文件不可能命中缓存，无需计算完整哈希
+            md5_hash = self.resolve_content_hash(file_path, compute_if_unknown=False)
+            if md5_hash is None:
+                return False, None
+
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT cached_at FROM entries WHERE content_hash = ?", (md5_hash,)
+                ).fetchone()
+
+            if row is None:
                 return False, md5_hash
-            
+
             # 检查缓存是否过期
-            try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                
-                cached_time = datetime.fromisoformat(metadata.get('cached_time', ''))
-                expiry_time = cached_time + timedelta(hours=self.cache_ttl_hours)
-                
-                if datetime.now() > expiry_time:
-                    logger.info(f"缓存已过期: {md5_hash}")
-                    self._remove_cache_entry(md5_hash)
-                    return False, md5_hash
-                
-                # 检查markdown文件是否存在
-                markdown_file = self.markdown_cache_dir / f"{md5_hash}.md"
-                if not markdown_file.exists():
-                    logger.warning(f"缓存元数据存在但markdown文件缺失: {md5_hash}")
-                    self._remove_cache_entry(md5_hash)
-                    return False, md5_hash
-                
-                logger.info(f"找到有效缓存: {md5_hash}")
-                return True, md5_hash
-                
-            except (json.JSONDecodeError, ValueError, KeyError) as e:
-                logger.warning(f"缓存元数据文件损坏: {metadata_file}, 错误: {e}")
+            if time.time() > row[0] + self.cache_ttl_hours * 3600:
+                logger.info(f"缓存已过期: {md5_hash}")
                 self._remove_cache_entry(md5_hash)
                 return False, md5_hash
-                
+
+            # 检查markdown文件是否存在
+            markdown_file = self.markdown_cache_dir / f"{md5_hash}.md"
+            if not markdown_file.exists():
+                logger.warning(f"缓存索引存在但markdown文件缺失: {md5_hash}")
+                self._remove_cache_entry(md5_hash)
+                return False, md5_hash
+
+            logger.info(f"找到有效缓存: {md5_hash}")
+            return True, md5_hash
+
         except Exception as e:
             logger.error(f"检查缓存状态失败: {e}")
             return False, None
@@ -175,7 +352,7 @@ class FileCacheManager:
             MD5哈希值
         """
         try:
-            md5_hash = self.calculate_file_md5(file_path)
+            md5_hash = self.resolve_content_hash(file_path)
             
             # 保存markdown内容
             markdown_file = self.markdown_cache_dir / f"{md5_hash}.md"
@@ -201,8 +378,25 @@ class FileCacheManager:
                 json.dump(metadata, f, ensure_ascii=False, indent=2)
             
             # 可选：保存原始文件副本（用于调试或备份）
-            if self._should_backup_file(file_path):
+            has_backup = self._should_backup_file(file_path)
+            if has_backup:
                 self._backup_original_file(file_path, md5_hash)
+
+            # 更新缓存索引
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (content_hash, cached_at, file_name, file_size,"
+                    " markdown_length, total_bytes, has_backup) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        md5_hash,
+                        time.time(),
+                        file_info.name,
+                        metadata['original_file_size'],
+                        len(markdown_content),
+                        self._entry_disk_size(md5_hash),
+                        int(has_backup)
+                    )
+                )
             
             logger.info(f"成功缓存文件处理结果: {md5_hash} ({file_info.name})")
             return md5_hash
@@ -267,6 +461,11 @@ class FileCacheManager:
             # 删除备份文件（如果存在）
             for backup_file in self.files_cache_dir.glob(f"{md5_hash}.*"):
                 backup_file.unlink()
+
+            # 删除索引记录
+            with self._connect() as conn:
+                conn.execute("DELETE FROM entries WHERE content_hash = ?", (md5_hash,))
+                conn.execute("DELETE FROM fingerprints WHERE content_hash = ?", (md5_hash,))
             
             logger.debug(f"已删除缓存条目: {md5_hash}")
             
@@ -276,26 +475,19 @@ class FileCacheManager:
     def cleanup_expired_cache(self):
         """清理过期的缓存条目"""
         try:
-            cleaned_count = 0
-            
-            for metadata_file in self.metadata_cache_dir.glob("*.json"):
-                try:
-                    with open(metadata_file, 'r', encoding='utf-8') as f:
-                        metadata = json.load(f)
-                    
-                    cached_time = datetime.fromisoformat(metadata.get('cached_time', ''))
-                    expiry_time = cached_time + timedelta(hours=self.cache_ttl_hours)
-                    
-                    if datetime.now() > expiry_time:
-                        md5_hash = metadata_file.stem
-                        self._remove_cache_entry(md5_hash)
-                        cleaned_count += 1
-                        
-                except Exception as e:
-                    logger.warning(f"清理缓存条目失败 {metadata_file}: {e}")
+            expiry_cutoff = time.time() - self.cache_ttl_hours * 3600
+            with self._connect() as conn:
+                expired_hashes = [
+                    row[0] for row in conn.execute(
+                        "SELECT content_hash FROM entries WHERE cached_at < ?", (expiry_cutoff,)
+                    )
+                ]
+
+            for md5_hash in expired_hashes:
+                self._remove_cache_entry(md5_hash)
             
-            if cleaned_count > 0:
-                logger.info(f"清理了 {cleaned_count} 个过期缓存条目")
+            if expired_hashes:
+                logger.info(f"清理了 {len(expired_hashes)} 个过期缓存条目")
             
         except Exception as e:
             logger.error(f"清理过期缓存失败: {e}")
@@ -308,22 +500,23 @@ class FileCacheManager:
             缓存统计信息
         """
         try:
-            metadata_files = list(self.metadata_cache_dir.glob("*.json"))
-            markdown_files = list(self.markdown_cache_dir.glob("*.md"))
-            backup_files = list(self.files_cache_dir.glob("*"))
-            
-            total_size = 0
-            for file_path in [*metadata_files, *markdown_files, *backup_files]:
-                try:
-                    total_size += file_path.stat().st_size
-                except:
-                    pass
+            with self._connect() as conn:
+                total_entries, total_size, backup_files = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(total_bytes), 0), COALESCE(SUM(has_backup), 0) FROM entries"
+                ).fetchone()
+                expired_entries = conn.execute(
+                    "SELECT COUNT(*) FROM entries WHERE cached_at < ?",
+                    (time.time() - self.cache_ttl_hours * 3600,)
+                ).fetchone()[0]
+                fingerprint_count = conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
             
             return {
                 'cache_dir': str(self.cache_dir),
-                'total_entries': len(metadata_files),
-                'markdown_files': len(markdown_files),
-                'backup_files': len(backup_files),
+                'total_entries': total_entries,
+                'markdown_files': total_entries,
+                'backup_files': backup_files,
+                'expired_entries': expired_entries,
+                'fingerprints': fingerprint_count,
                 'total_size_mb': round(total_size / (1024 * 1024), 2),
                 'cache_ttl_hours': self.cache_ttl_hours
             }
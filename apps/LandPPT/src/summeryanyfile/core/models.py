@@ -3,10 +3,13 @@
 """
 
 import os
+import logging
 from dataclasses import dataclass
 from typing import List, Dict, Any, Literal, TypedDict, Optional
 from enum import Enum
 
+logger = logging.getLogger(__name__)
+
 
 def _get_default_max_tokens() -> int:
     """
@@ -55,6 +58,33 @@ class ChunkStrategy(Enum):
     FAST = "fast"            # 快速分块策略
 
 
+class WorkflowMode(Enum):
+    """大纲生成工作流模式"""
+    ITERATIVE = "iterative"    # 逐块串行细化
+    MAP_REDUCE = "map_reduce"  # 分块并行生成 + 树形归并
+
+    @classmethod
+    def parse(cls, value: Any, default: "WorkflowMode" = None) -> "WorkflowMode":
+        """
+        解析工作流模式，未知值回退到默认模式而不是抛出异常
+
+        Args:
+            value: WorkflowMode实例或其字符串值（来自表单、环境变量等）
+            default: 无法识别时使用的模式，默认为ITERATIVE
+
+        Returns:
+            工作流模式
+        """
+        default = default or cls.ITERATIVE
+        if value is None or value == "":
+            return default
+        try:
+            return cls(value.strip().lower() if isinstance(value, str) else value)
+        except ValueError:
+            logger.warning(f"未知的工作流模式: {value!r}，使用默认模式 {default.value}")
+            return default
+
+
 @dataclass
 class SlideInfo:
     """幻灯片信息数据类"""
@@ -116,6 +146,8 @@ class PPTState(TypedDict):
     min_pages: Optional[int]
     max_pages: Optional[int]
     fixed_pages: Optional[int]
+    # Map-Reduce工作流中间结果
+    partial_outlines: List[Dict[str, Any]]
 
 
 @dataclass
@@ -154,9 +186,14 @@ class ProcessingConfig:
     max_tokens: int = None  # 将在 __post_init__ 中设置默认值
     recursion_limit: Optional[int] = None  # 工作流递归限制，None表示自动计算
     target_language: str = "zh"  # 新增：目标语言，由用户在表单中选择
+    workflow_mode: WorkflowMode = WorkflowMode.ITERATIVE  # 大纲生成工作流模式
+    map_concurrency: int = 4  # Map-Reduce模式下同时进行的LLM调用数
+    reduce_fan_in: int = 4  # Map-Reduce模式下每次归并的分块大纲数量
 
     def __post_init__(self):
         """后处理验证和默认值设置"""
+        self.workflow_mode = WorkflowMode.parse(self.workflow_mode)
+
         # 如果 max_tokens 为 None，从环境变量获取默认值
         if self.max_tokens is None:
             self.max_tokens = _get_default_max_tokens()
@@ -174,6 +211,10 @@ class ProcessingConfig:
             raise ValueError("最大页数不能超过1000")
         if self.recursion_limit is not None and self.recursion_limit < 10:
             raise ValueError("递归限制不能小于10")
+        if self.map_concurrency < 1:
+            raise ValueError("并行度不能小于1")
+        if self.reduce_fan_in < 2:
+            raise ValueError("归并扇入数不能小于2")
 
 
 
@@ -199,6 +240,9 @@ class ProcessingConfig:
             "max_tokens": self.max_tokens,
             "recursion_limit": self.recursion_limit,
             "target_language": self.target_language,
+            "workflow_mode": self.workflow_mode.value,
+            "map_concurrency": self.map_concurrency,
+            "reduce_fan_in": self.reduce_fan_in,
         }
 
 
@@ -48,6 +48,20 @@ class ChainManager(LoggerMixin):
             | StrOutputParser()
         )
         
+        # 分块大纲生成链（Map阶段）
+        self._chains["chunk_outline"] = (
+            self.prompt_templates.get_chunk_outline_prompt()
+            | self.llm
+            | StrOutputParser()
+        )
+
+        # 分块大纲归并链（Reduce阶段）
+        self._chains["merge_outlines"] = (
+            self.prompt_templates.get_merge_outlines_prompt()
+            | self.llm
+            | StrOutputParser()
+        )
+        
         # 错误恢复链
         self._chains["error_recovery"] = (
             self.prompt_templates.get_error_recovery_prompt()
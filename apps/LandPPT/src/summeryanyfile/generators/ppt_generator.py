@@ -2,10 +2,11 @@
 PPT大纲生成器 - 主要的生成器类
 """
 
+from dataclasses import replace
 from typing import Dict, Any, Optional, Callable, List
 import logging
 
-from ..core.models import PPTState, PPTOutline, SlideInfo, ProcessingConfig, ChunkStrategy
+from ..core.models import PPTState, PPTOutline, SlideInfo, ProcessingConfig, ChunkStrategy, WorkflowMode
 from ..core.document_processor import DocumentProcessor
 from ..core.llm_manager import LLMManager
 from ..generators.chains import ChainManager
@@ -19,7 +20,8 @@ class PPTOutlineGenerator(LoggerMixin):
     """基于迭代细化的PPT大纲生成器"""
     
     def __init__(self, config: ProcessingConfig, save_markdown: bool = False, temp_dir: Optional[str] = None,
-                 use_magic_pdf: bool = True, cache_dir: Optional[str] = None):
+                 use_magic_pdf: bool = True, cache_dir: Optional[str] = None,
+                 workflow_mode: Optional[WorkflowMode] = None):
         """
         初始化PPT大纲生成器
 
@@ -29,7 +31,10 @@ class PPTOutlineGenerator(LoggerMixin):
             temp_dir: 自定义temp目录路径
             use_magic_pdf: 是否使用Magic-PDF处理PDF文件（本地处理，优先级高于MarkItDown）
             cache_dir: 缓存目录路径
+            workflow_mode: 大纲生成工作流模式，None表示使用config.workflow_mode
         """
+        if workflow_mode is not None:
+            config = replace(config, workflow_mode=WorkflowMode.parse(workflow_mode))
         self.config = config
         # 根据use_magic_pdf确定处理模式
         processing_mode = "magic_pdf" if use_magic_pdf else "markitdown"
@@ -51,7 +56,8 @@ class PPTOutlineGenerator(LoggerMixin):
         self.workflow_manager = WorkflowManager(self.chain_manager, self.config)
         self.workflow_executor = WorkflowExecutor(self.workflow_manager)
 
-        self.logger.info(f"PPT生成器初始化完成，使用模型: {config.llm_model}，缓存目录: {cache_dir}，处理模式: {processing_mode}")
+        self.logger.info(f"PPT生成器初始化完成，使用模型: {config.llm_model}，缓存目录: {cache_dir}，"
+                         f"处理模式: {processing_mode}，工作流模式: {config.workflow_mode.value}")
     
     def _initialize_llm(self):
         """初始化LLM"""
@@ -135,7 +141,8 @@ class PPTOutlineGenerator(LoggerMixin):
                 # 页数设置参数
                 "min_pages": min_pages,
                 "max_pages": max_pages,
-                "fixed_pages": fixed_pages
+                "fixed_pages": fixed_pages,
+                "partial_outlines": []
             }
             
             # 执行工作流
@@ -222,6 +229,179 @@ class PPTOutlineGenerator(LoggerMixin):
             self.logger.error(f"从文件生成PPT大纲失败: {e}")
             raise
     
+    async def generate_from_file_streaming(
+        self,
+        file_path: str,
+        encoding: Optional[str] = None,
+        progress_callback: Optional[Callable[[str, float], None]] = None,
+        project_topic: str = "",
+        project_scenario: str = "general",
+        project_requirements: str = "",
+        target_audience: str = "普通大众",
+        custom_audience: str = "",
+        ppt_style: str = "general",
+        custom_style_prompt: str = "",
+        page_count_mode: str = "ai_decide",
+        min_pages: Optional[int] = None,
+        max_pages: Optional[int] = None,
+        fixed_pages: Optional[int] = None
+    ) -> PPTOutline:
+        """
+        流式地从文件生成PPT大纲
+
+        文档边转换边分块，首个文档块到达后即开始结构分析，使文档转换与LLM调用重叠进行。
+        工作流模式与非流式路径一致：
+        - ITERATIVE: 首块生成初始框架，之后每个到达的文档块依次细化大纲
+        - MAP_REDUCE: 每个到达的文档块立即提交局部大纲生成，全部完成后树形归并
+
+        内存占用与文档长度无关：处理完的文档块立即释放；MAP_REDUCE 模式下同时在途的
+        局部大纲任务不超过 map_concurrency 的两倍，达到上限时暂停读取文档块，
+        背压经 astream_chunks 的有界队列传回转换线程。
+
+        Args:
+            file_path: 文件路径
+            encoding: 文件编码
+            progress_callback: 进度回调函数
+
+        Returns:
+            PPT大纲对象
+        """
+        import asyncio
+
+        self.logger.info(f"开始流式从文件生成PPT大纲: {file_path} (工作流模式: {self.config.workflow_mode.value})")
+
+        if progress_callback:
+            progress_callback("正在加载文档...", 2)
+
+        nodes = self.workflow_manager.nodes
+        map_reduce = self.config.workflow_mode == WorkflowMode.MAP_REDUCE
+        semaphore = asyncio.Semaphore(self.config.map_concurrency)
+        run_config: Dict[str, Any] = {}
+
+        state: PPTState = {
+            "document_chunks": [],
+            "current_index": 0,
+            "ppt_title": "",
+            "slides": [],
+            "total_pages": 0,
+            "page_count_mode": page_count_mode,
+            "document_structure": {},
+            "accumulated_context": "",
+            # 项目信息参数
+            "project_topic": project_topic,
+            "project_scenario": project_scenario,
+            "project_requirements": project_requirements,
+            "target_audience": target_audience,
+            "custom_audience": custom_audience,
+            "ppt_style": ppt_style,
+            "custom_style_prompt": custom_style_prompt,
+            # 页数设置参数
+            "min_pages": min_pages,
+            "max_pages": max_pages,
+            "fixed_pages": fixed_pages,
+            "partial_outlines": []
+        }
+
+        max_inflight = max(1, self.config.map_concurrency) * 2
+        inflight: Dict["asyncio.Task", int] = {}
+        partial_outlines: Dict[int, Optional[Dict[str, Any]]] = {}
+        first_chunk: Optional[str] = None
+        chunk_count = 0
+
+        def collect(done) -> None:
+            for task in done:
+                partial_outlines[inflight.pop(task)] = task.result()
+
+        async def submit(chunk: str, index: int):
+            # 在途任务已满时先等其中一个完成，期间不再读取新的文档块
+            while len(inflight) >= max_inflight:
+                done, _ = await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+                collect(done)
+            task = asyncio.create_task(nodes.outline_chunk(state, chunk, index, None, run_config, semaphore))
+            inflight[task] = index
+
+        try:
+            async for chunk in self.document_processor.astream_chunks(
+                file_path,
+                encoding,
+                chunk_size=self.config.chunk_size,
+                chunk_overlap=self.config.chunk_overlap,
+                strategy=self.config.chunk_strategy,
+                max_tokens=self.config.max_tokens if self.config.chunk_strategy == ChunkStrategy.FAST else None
+            ):
+                chunk_count += 1
+
+                if chunk_count == 1:
+                    # 首块到达后先分析文档结构，后续局部大纲都依赖该结构
+                    first_chunk = chunk
+                    state["document_chunks"] = [chunk]
+                    state.update(await nodes.analyze_structure(state, run_config))
+                    if progress_callback:
+                        progress_callback("分析文档结构", 10)
+                    if not map_reduce:
+                        state.update(await nodes.generate_initial_outline(state, run_config))
+                        state["document_chunks"][0] = ""
+                        first_chunk = None
+                        if progress_callback:
+                            progress_callback("生成初始PPT框架", 15)
+                    continue
+
+                if not map_reduce:
+                    # 逐块细化依赖上一块的结果，只能串行；转换线程在此期间继续准备后续文档块。
+                    # 已细化的块只保留空占位，序号和日志中的块数保持不变
+                    state["document_chunks"].append(chunk)
+                    state["current_index"] = chunk_count - 1
+                    state.update(await nodes.refine_outline(state, run_config))
+                    state["document_chunks"][chunk_count - 1] = ""
+                    if progress_callback:
+                        progress_callback(f"已细化 {chunk_count} 个文档块", min(15 + chunk_count * 2, 90))
+                    continue
+
+                if chunk_count == 2:
+                    # 确认文档不止一块后再提交首块，单块文档直接生成完整框架。
+                    # state 仍保留首块，所有局部大纲都失败时归并节点要用它回退
+                    await submit(first_chunk, 1)
+                    first_chunk = None
+                await submit(chunk, chunk_count)
+
+                if progress_callback:
+                    progress_callback(f"已提交 {chunk_count} 个文档块", min(10 + chunk_count, 60))
+
+            if chunk_count == 0:
+                raise ValueError("文档内容为空")
+
+            self.logger.info(f"文档流式分块完成，共 {chunk_count} 个块")
+
+            if not map_reduce:
+                final_state = state
+            elif chunk_count == 1:
+                final_state = {**state, **await nodes.generate_initial_outline(state, run_config)}
+            else:
+                if progress_callback:
+                    progress_callback("等待分块大纲生成", 65)
+                if inflight:
+                    done, _ = await asyncio.wait(inflight)
+                    collect(done)
+                results = [partial_outlines[index] for index in sorted(partial_outlines)]
+                state["partial_outlines"] = [result for result in results if result and result.get("slides")]
+
+                if progress_callback:
+                    progress_callback(f"归并分块大纲 ({len(state['partial_outlines'])} 个)", 80)
+                final_state = {**state, **await nodes.reduce_outlines(state, run_config)}
+
+            if progress_callback:
+                progress_callback("处理完成", 100.0)
+
+            outline = self._state_to_outline(final_state)
+            self.logger.info(f"PPT大纲流式生成完成，共 {outline.total_pages} 页")
+            return outline
+
+        except Exception as e:
+            for task in inflight:
+                task.cancel()
+            self.logger.error(f"流式从文件生成PPT大纲失败: {e}")
+            raise
+
     def _state_to_outline(self, state: Dict[str, Any]) -> PPTOutline:
         """将状态转换为PPT大纲对象"""
         slides = []
@@ -257,6 +437,13 @@ class PPTOutlineGenerator(LoggerMixin):
             self.chain_manager.update_llm(self.llm)
             # 重新创建工作流管理器以传递新配置
             self.workflow_manager = WorkflowManager(self.chain_manager, self.config)
+            self.workflow_executor = WorkflowExecutor(self.workflow_manager)
+        elif (config.workflow_mode != self.config.workflow_mode or
+              config.map_concurrency != self.config.map_concurrency or
+              config.reduce_fan_in != self.config.reduce_fan_in):
+            self.config = config
+            self.workflow_manager = WorkflowManager(self.chain_manager, self.config)
+            self.workflow_executor = WorkflowExecutor(self.workflow_manager)
         else:
             self.config = config
     
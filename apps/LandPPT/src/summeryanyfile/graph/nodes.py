@@ -2,8 +2,9 @@
 图节点实现 - 定义LangGraph工作流中的各个节点
 """
 
+import asyncio
 import json
-from typing import Dict, Any, Literal
+from typing import Dict, Any, List, Literal, Optional
 import logging
 from langchain_core.runnables import RunnableConfig
 
@@ -39,6 +40,19 @@ class GraphNodes(LoggerMixin):
             result = "根据内容的复杂度、深度和逻辑结构，自主决定最合适的页数，确保内容充实且逻辑清晰"
 
         return result
+
+    def _get_project_inputs(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """提取各处理链共用的项目信息和目标语言参数"""
+        return {
+            "project_topic": state.get("project_topic", ""),
+            "project_scenario": state.get("project_scenario", "general"),
+            "project_requirements": state.get("project_requirements", ""),
+            "target_audience": state.get("target_audience", "普通大众"),
+            "custom_audience": state.get("custom_audience", ""),
+            "ppt_style": state.get("ppt_style", "general"),
+            "custom_style_prompt": state.get("custom_style_prompt", ""),
+            "target_language": self.config.target_language if self.config else "zh"
+        }
     
     async def analyze_structure(self, state: PPTState, config: RunnableConfig) -> Dict[str, Any]:
         """
@@ -304,3 +318,213 @@ class GraphNodes(LoggerMixin):
         else:
             self.logger.debug(f"继续处理文档块 {current_index + 1}/{total_chunks}")
             return "refine_outline"
+
+    async def map_chunk_outlines(self, state: PPTState, config: RunnableConfig) -> Dict[str, Any]:
+        """
+        并行生成分块大纲节点（Map阶段）
+
+        每个文档块独立生成局部大纲，并发数受 map_concurrency 限制，
+        各块之间不再传递累积的完整大纲。
+
+        Args:
+            state: 当前状态
+            config: 运行配置
+
+        Returns:
+            更新的状态字段
+        """
+        chunks = state["document_chunks"]
+        concurrency = self.config.map_concurrency if self.config else 4
+        semaphore = asyncio.Semaphore(concurrency)
+
+        self.logger.info(f"开始并行生成分块大纲，共 {len(chunks)} 个块，并发数 {concurrency}...")
+
+        results = await asyncio.gather(*(
+            self.outline_chunk(state, chunk, i + 1, len(chunks), config, semaphore)
+            for i, chunk in enumerate(chunks)
+        ))
+        partial_outlines = [result for result in results if result and result.get("slides")]
+
+        self.logger.info(f"分块大纲生成完成: {len(partial_outlines)}/{len(chunks)} 个块成功")
+
+        return {
+            "partial_outlines": partial_outlines
+        }
+
+    async def outline_chunk(
+        self,
+        state: Dict[str, Any],
+        chunk: str,
+        chunk_index: int,
+        total_chunks: Optional[int],
+        config: RunnableConfig,
+        semaphore: asyncio.Semaphore
+    ) -> Optional[Dict[str, Any]]:
+        """
+        为单个文档块生成局部大纲
+
+        Args:
+            state: 当前状态（需包含 document_structure）
+            chunk: 文档块内容
+            chunk_index: 文档块序号（从1开始）
+            total_chunks: 文档块总数，流式处理时未知可传None
+            config: 运行配置
+            semaphore: 限制并发LLM调用的信号量
+
+        Returns:
+            局部大纲，失败或块为空时返回None
+        """
+        if not chunk.strip():
+            return None
+
+        total_text = str(total_chunks) if total_chunks else "未知"
+        chain_inputs = {
+            **self._get_project_inputs(state),
+            "structure": json.dumps(state["document_structure"], ensure_ascii=False),
+            "content": chunk,
+            "chunk_index": chunk_index,
+            "total_chunks": total_text
+        }
+
+        async with semaphore:
+            try:
+                response = await self.chain_executor.execute_with_retry(
+                    "chunk_outline",
+                    chain_inputs,
+                    config
+                )
+            except Exception as e:
+                self.logger.error(f"文档块 {chunk_index}/{total_text} 大纲生成失败: {e}")
+                return None
+
+        partial = self.json_parser.extract_json_from_response(response)
+        if not isinstance(partial, dict):
+            return None
+        partial = self.json_parser.validate_ppt_structure(partial)
+        self.logger.debug(f"文档块 {chunk_index}/{total_text} 生成 {len(partial['slides'])} 页")
+        return partial
+
+    async def reduce_outlines(self, state: PPTState, config: RunnableConfig) -> Dict[str, Any]:
+        """
+        树形归并分块大纲节点（Reduce阶段）
+
+        每层将相邻的 reduce_fan_in 个局部大纲并行归并，直到只剩一个；
+        页数约束仅在最后一次归并时应用。
+
+        Args:
+            state: 当前状态
+            config: 运行配置
+
+        Returns:
+            更新的状态字段
+        """
+        partials: List[Dict[str, Any]] = list(state.get("partial_outlines") or [])
+
+        if not partials:
+            self.logger.warning("没有可归并的分块大纲，回退到基于首块的初始框架生成")
+            return await self.generate_initial_outline(state, config)
+
+        fan_in = self.config.reduce_fan_in if self.config else 4
+        concurrency = self.config.map_concurrency if self.config else 4
+        semaphore = asyncio.Semaphore(concurrency)
+
+        level = 0
+        while True:
+            groups = [partials[i:i + fan_in] for i in range(0, len(partials), fan_in)]
+            is_final = len(groups) == 1
+            level += 1
+            self.logger.info(f"归并分块大纲第 {level} 层: {len(partials)} -> {len(groups)}")
+
+            partials = await asyncio.gather(*(
+                self._merge_outline_group(group, state, config, semaphore, is_final)
+                for group in groups
+            ))
+
+            if is_final:
+                break
+
+        final_outline = partials[0]
+        slides = final_outline.get("slides", [])
+
+        self.logger.info(f"大纲归并完成: {final_outline.get('title', '未知标题')}，共 {len(slides)} 页")
+
+        return {
+            **state,
+            "ppt_title": final_outline.get("title") or state.get("ppt_title") or "学术演示",
+            "total_pages": final_outline.get("total_pages", len(slides)),
+            "slides": slides,
+            "current_index": len(state["document_chunks"]),
+            "partial_outlines": []
+        }
+
+    async def _merge_outline_group(
+        self,
+        group: List[Dict[str, Any]],
+        state: Dict[str, Any],
+        config: RunnableConfig,
+        semaphore: asyncio.Semaphore,
+        is_final: bool
+    ) -> Dict[str, Any]:
+        """归并一组局部大纲，LLM归并失败时按顺序拼接"""
+        if len(group) == 1 and not is_final:
+            return group[0]
+
+        if is_final:
+            slides_range_text = self._get_slides_range_text(state)
+            structure_requirement = "生成完整的演示结构，包含标题页、必要的目录页、内容页和结论页"
+        else:
+            slides_range_text = "这是中间层归并，不受最终页数约束，请尽量保留全部关键信息"
+            structure_requirement = "这是中间层归并，只需合并内容页，不要添加标题页、目录页或结论页"
+
+        chain_inputs = {
+            **self._get_project_inputs(state),
+            "structure": json.dumps(state["document_structure"], ensure_ascii=False),
+            "partial_outlines": json.dumps(group, ensure_ascii=False),
+            "slides_range": slides_range_text,
+            "structure_requirement": structure_requirement
+        }
+
+        async with semaphore:
+            try:
+                response = await self.chain_executor.execute_with_retry(
+                    "merge_outlines",
+                    chain_inputs,
+                    config
+                )
+                merged = self.json_parser.extract_json_from_response(response)
+                if isinstance(merged, dict) and merged.get("slides"):
+                    return self.json_parser.validate_ppt_structure(merged)
+                self.logger.warning("大纲归并结果为空，按顺序拼接局部大纲")
+            except Exception as e:
+                self.logger.error(f"大纲归并失败，按顺序拼接局部大纲: {e}")
+
+        return self._concat_outlines(group)
+
+    def _concat_outlines(self, group: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """按文档顺序拼接多个局部大纲并重新编号"""
+        slides = []
+        for partial in group:
+            for slide in partial.get("slides", []):
+                slides.append({**slide, "page_number": len(slides) + 1})
+
+        return self.json_parser.validate_ppt_structure({
+            "title": group[0].get("title", "PPT大纲"),
+            "summary": " ".join(p.get("summary", "") for p in group if p.get("summary")),
+            "slides": slides
+        })
+
+    def should_map_reduce(self, state: PPTState) -> Literal["map_chunk_outlines", "generate_initial_outline"]:
+        """
+        判断是否需要进入Map-Reduce流程的条件函数
+
+        只有一个文档块时直接生成框架即可，无需归并。
+
+        Args:
+            state: 当前状态
+
+        Returns:
+            下一个节点名称
+        """
+        if len(state["document_chunks"]) <= 1:
+            return "generate_initial_outline"
+        return "map_chunk_outlines"
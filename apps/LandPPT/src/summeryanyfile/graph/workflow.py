@@ -9,7 +9,7 @@ from langgraph.graph import END, START, StateGraph
 if TYPE_CHECKING:
     from langgraph.graph.state import CompiledStateGraph
 
-from ..core.models import PPTState
+from ..core.models import PPTState, WorkflowMode
 from ..generators.chains import ChainManager
 from .nodes import GraphNodes
 from ..utils.logger import LoggerMixin
@@ -20,17 +20,44 @@ logger = logging.getLogger(__name__)
 class WorkflowManager(LoggerMixin):
     """工作流管理器，负责构建和执行LangGraph工作流"""
 
-    def __init__(self, chain_manager: ChainManager, config=None):
+    def __init__(self, chain_manager: ChainManager, config=None, workflow_mode: Optional[WorkflowMode] = None):
         self.chain_manager = chain_manager
         self.config = config
+        if workflow_mode is None:
+            workflow_mode = getattr(config, "workflow_mode", None)
+        self.workflow_mode = WorkflowMode.parse(workflow_mode)
         self.nodes = GraphNodes(chain_manager, config)
         self.app: Optional["CompiledStateGraph"] = None
         self._setup_graph()
     
     def _setup_graph(self):
         """设置LangGraph工作流"""
-        self.logger.info("正在设置LangGraph工作流...")
+        self.logger.info(f"正在设置LangGraph工作流 (模式: {self.workflow_mode.value})...")
         
+        if self.workflow_mode == WorkflowMode.MAP_REDUCE:
+            graph = self._build_map_reduce_graph()
+        else:
+            graph = self._build_iterative_graph()
+        
+        # 编译图
+        self.app = graph.compile()
+
+        # 计算递归限制
+        if self.config and hasattr(self.config, 'recursion_limit') and self.config.recursion_limit is not None:
+            # 使用用户配置的递归限制
+            self.recursion_limit = self.config.recursion_limit
+        elif self.config and hasattr(self.config, 'max_slides'):
+            # 基于最大页数自动计算递归限制
+            # 每个文档块可能需要1-2次递归，加上初始化和最终化步骤
+            self.recursion_limit = max(100, self.config.max_slides * 3 + 50)
+        else:
+            # 默认递归限制
+            self.recursion_limit = 100
+
+        self.logger.info(f"LangGraph工作流设置完成，递归限制: {self.recursion_limit}")
+    
+    def _build_iterative_graph(self) -> StateGraph:
+        """构建逐块串行细化的工作流"""
         # 创建状态图
         graph = StateGraph(PPTState)
         
@@ -58,23 +85,34 @@ class WorkflowManager(LoggerMixin):
                 "end": END
             }
         )
-        
-        # 编译图
-        self.app = graph.compile()
 
-        # 计算递归限制
-        if self.config and hasattr(self.config, 'recursion_limit') and self.config.recursion_limit is not None:
-            # 使用用户配置的递归限制
-            self.recursion_limit = self.config.recursion_limit
-        elif self.config and hasattr(self.config, 'max_slides'):
-            # 基于最大页数自动计算递归限制
-            # 每个文档块可能需要1-2次递归，加上初始化和最终化步骤
-            self.recursion_limit = max(100, self.config.max_slides * 3 + 50)
-        else:
-            # 默认递归限制
-            self.recursion_limit = 100
+        return graph
 
-        self.logger.info(f"LangGraph工作流设置完成，递归限制: {self.recursion_limit}")
+    def _build_map_reduce_graph(self) -> StateGraph:
+        """构建分块并行生成 + 树形归并的工作流"""
+        graph = StateGraph(PPTState)
+
+        # 添加节点
+        graph.add_node("analyze_structure", self.nodes.analyze_structure)
+        graph.add_node("generate_initial_outline", self.nodes.generate_initial_outline)
+        graph.add_node("map_chunk_outlines", self.nodes.map_chunk_outlines)
+        graph.add_node("reduce_outlines", self.nodes.reduce_outlines)
+
+        # 定义边
+        graph.add_edge(START, "analyze_structure")
+        graph.add_conditional_edges(
+            "analyze_structure",
+            self.nodes.should_map_reduce,
+            {
+                "map_chunk_outlines": "map_chunk_outlines",
+                "generate_initial_outline": "generate_initial_outline"
+            }
+        )
+        graph.add_edge("map_chunk_outlines", "reduce_outlines")
+        graph.add_edge("reduce_outlines", END)
+        graph.add_edge("generate_initial_outline", END)
+
+        return graph
     
     async def execute_workflow(
         self,
@@ -101,8 +139,12 @@ class WorkflowManager(LoggerMixin):
             step_count = 0
             total_chunks = len(initial_state["document_chunks"])
             
-            # 估算总步数：结构分析(1) + 初始大纲(1) + 细化(chunks)
-            estimated_steps = 2 + total_chunks
+            if self.workflow_mode == WorkflowMode.MAP_REDUCE:
+                # 估算总步数：初始状态(1) + 结构分析(1) + 分块大纲(1) + 归并(1)
+                estimated_steps = 4
+            else:
+                # 估算总步数：结构分析(1) + 初始大纲(1) + 细化(chunks)
+                estimated_steps = 2 + total_chunks
             
             # 创建运行配置
             run_config = {"recursion_limit": self.recursion_limit}
@@ -136,6 +178,15 @@ class WorkflowManager(LoggerMixin):
     
     def _get_current_step_name(self, state: Dict[str, Any], step_count: int) -> str:
         """根据状态确定当前步骤名称"""
+        if self.workflow_mode == WorkflowMode.MAP_REDUCE and step_count > 1:
+            partial_outlines = state.get("partial_outlines") or []
+            if partial_outlines:
+                return f"归并分块大纲 ({len(partial_outlines)} 个)"
+            elif state.get("slides"):
+                return "大纲归并完成"
+            else:
+                return "并行生成分块大纲"
+
         if "document_structure" in state and step_count == 1:
             return "分析文档结构"
         elif "ppt_title" in state and "slides" in state:
@@ -180,8 +231,17 @@ class WorkflowManager(LoggerMixin):
         if not self.app:
             return {"status": "未初始化"}
         
+        if self.workflow_mode == WorkflowMode.MAP_REDUCE:
+            return {
+                "status": "已初始化",
+                "mode": self.workflow_mode.value,
+                "nodes": ["analyze_structure", "generate_initial_outline", "map_chunk_outlines", "reduce_outlines"],
+                "description": "基于LangGraph的Map-Reduce PPT大纲生成工作流"
+            }
+
         return {
             "status": "已初始化",
+            "mode": self.workflow_mode.value,
             "nodes": ["analyze_structure", "generate_initial_outline", "refine_outline"],
             "description": "基于LangGraph的PPT大纲生成工作流"
         }
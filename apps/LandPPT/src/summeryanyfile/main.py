@@ -55,6 +55,8 @@ def cli(ctx, config, log_level, debug):
 @click.option('--min-slides', type=int, help='最小幻灯片数量')
 @click.option('--chunk-size', type=int, help='文档块大小')
 @click.option('--chunk-strategy', type=click.Choice(['paragraph', 'semantic', 'recursive', 'hybrid', 'fast']), help='分块策略')
+@click.option('--workflow', type=click.Choice(['iterative', 'map_reduce']), help='大纲生成工作流（逐块细化或并行Map-Reduce）')
+@click.option('--map-concurrency', type=int, help='Map-Reduce工作流的并行LLM调用数')
 @click.option('--model', help='LLM模型名称')
 @click.option('--provider', type=click.Choice(['openai', 'anthropic', 'azure']), help='LLM提供商')
 @click.option('--temperature', type=float, help='温度参数 (0.0-2.0)')
@@ -66,7 +68,7 @@ def cli(ctx, config, log_level, debug):
 @click.option('--no-progress', is_flag=True, help='禁用进度条')
 @click.pass_context
 def generate(ctx, input_path, output, encoding, max_slides, min_slides, chunk_size, chunk_strategy,
-             model, provider, temperature, max_tokens, base_url, save_markdown, temp_dir, no_magic_pdf, no_progress):
+             workflow, map_concurrency, model, provider, temperature, max_tokens, base_url, save_markdown, temp_dir, no_magic_pdf, no_progress):
     """生成PPT大纲"""
     settings = ctx.obj['settings']
     
@@ -79,6 +81,10 @@ def generate(ctx, input_path, output, encoding, max_slides, min_slides, chunk_si
         settings.chunk_size = chunk_size
     if chunk_strategy:
         settings.chunk_strategy = chunk_strategy
+    if workflow:
+        settings.workflow_mode = workflow
+    if map_concurrency:
+        settings.map_concurrency = map_concurrency
     if model:
         settings.llm_model = model
     if provider:
@@ -97,6 +97,7 @@ def validate_config(config: Dict[str, Any]) -> List[str]:
         'chunk_size': (100, 9999999),
         'chunk_overlap': (0, 1000),
         'max_tokens': (100, 9999999),
+        'map_concurrency': (1, 64),
     }
     
     for param, (min_val, max_val) in numeric_params.items():
@@ -126,6 +127,12 @@ def validate_config(config: Dict[str, Any]) -> List[str]:
     if chunk_strategy and chunk_strategy not in valid_strategies:
         errors.append(f"chunk_strategy 必须是以下之一: {valid_strategies}")
     
+    # 验证工作流模式
+    workflow_mode = config.get('workflow_mode')
+    valid_modes = ['iterative', 'map_reduce']
+    if workflow_mode and workflow_mode not in valid_modes:
+        errors.append(f"workflow_mode 必须是以下之一: {valid_modes}")
+    
     # 验证日志级别
     log_level = config.get('log_level')
     valid_levels = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
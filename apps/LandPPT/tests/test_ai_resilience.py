@@ -0,0 +1,221 @@
+"""AI请求限流与容错：对本地模拟的OpenAI兼容服务端到端验证"""
+
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+
+from landppt.ai.base import AIMessage, MessageRole
+from landppt.ai.providers import OpenAIProvider
+from landppt.ai.resilience import AIRequestLimiter, ResilientAIProvider
+
+
+class FakeOpenAIServer:
+    """按模型名执行预设脚本的 /v1/chat/completions 服务端
+
+    脚本的每一步是 (状态码, 额外响应头, 延迟秒数)，用完后重复最后一步。
+    ``usage`` 按模型名指定响应中上报的 total_tokens（默认7）。
+    """
+
+    def __init__(self):
+        self.scripts = {}
+        self.usage = {}
+        self.requests = []
+        self._runner = None
+        self.base_url = None
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        model = body["model"]
+        calls = sum(1 for m, _ in self.requests if m == model)
+        self.requests.append((model, time.monotonic()))
+        script = self.scripts.get(model) or [(200, {}, 0.0)]
+        status, headers, delay = script[min(calls, len(script) - 1)]
+        if delay:
+            await asyncio.sleep(delay)
+        if status != 200:
+            return web.json_response(
+                {"error": {"message": f"status {status}", "type": "fake"}}, status=status, headers=headers
+            )
+        return web.json_response({
+            "id": f"chatcmpl-{calls}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": f"{model} answer {calls}"},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 4, "total_tokens": self.usage.get(model, 7)},
+        }, headers=headers)
+
+    def count(self, model):
+        return sum(1 for m, _ in self.requests if m == model)
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.base_url = f"http://127.0.0.1:{port}/v1"
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+@pytest.fixture
+async def server():
+    fake = FakeOpenAIServer()
+    await fake.start()
+    yield fake
+    await fake.stop()
+
+
+def _provider(server, **limits):
+    config = {"max_concurrent": 4, "max_retries": 3, "failure_threshold": 2, "reset_seconds": 30, **limits}
+    openai_provider = OpenAIProvider({"api_key": "test", "base_url": server.base_url, "model": "primary"})
+    return ResilientAIProvider(openai_provider, "openai", AIRequestLimiter(config))
+
+
+MESSAGES = [AIMessage(role=MessageRole.USER, content="你好")]
+
+
+async def test_sdk_retries_are_disabled(server):
+    provider = _provider(server)
+    assert provider.provider.client.max_retries == 0
+
+
+async def test_429_honours_retry_after(server):
+    server.scripts["primary"] = [(429, {"Retry-After": "0.3"}, 0.0), (200, {}, 0.0)]
+    provider = _provider(server)
+
+    response = await provider.chat_completion(MESSAGES)
+
+    assert response.content == "primary answer 1"
+    # 只有包装层重试一次；SDK自身的重试会多发请求并把429藏起来
+    assert server.count("primary") == 2
+    first, second = (t for _, t in server.requests)
+    assert second - first >= 0.3
+    stats = provider.limiter.limiter("openai", "primary").get_stats()
+    assert stats["rate_limited"] == 1
+    assert stats["retries"] == 1
+    assert stats["concurrency_limit"] == 2  # 429后并发上限减半
+
+
+async def test_retry_after_pauses_concurrent_callers(server):
+    server.scripts["primary"] = [(429, {"Retry-After": "0.3"}, 0.0), (200, {}, 0.0)]
+    provider = _provider(server, max_concurrent=1)
+
+    start = time.monotonic()
+    first = asyncio.create_task(provider.chat_completion(MESSAGES))
+    await asyncio.sleep(0.05)
+    await provider.chat_completion(MESSAGES)
+    await first
+
+    # 第二个调用者也要等到Retry-After结束才发请求
+    assert all(t - start >= 0.3 for _, t in server.requests[1:])
+
+
+async def test_breaker_opens_and_routes_to_fallback_model(server):
+    server.scripts["primary"] = [(503, {}, 0.0)]
+    provider = _provider(server, max_retries=0, fallback_model="backup")
+
+    for attempt in range(2):
+        response = await provider.chat_completion(MESSAGES)
+        assert response.metadata["fallback_from"] == "openai:primary"
+    assert server.count("primary") == 2
+    assert provider.limiter.breaker("openai", "primary").state == "open"
+
+    # 熔断后不再请求主模型，直接走备用模型
+    response = await provider.chat_completion(MESSAGES)
+    assert response.content.startswith("backup answer")
+    assert server.count("primary") == 2
+    assert server.count("backup") == 3
+
+
+async def test_breaker_without_fallback_fails_fast(server):
+    server.scripts["primary"] = [(503, {}, 0.0)]
+    provider = _provider(server, max_retries=0)
+
+    for _ in range(2):
+        with pytest.raises(Exception):
+            await provider.chat_completion(MESSAGES)
+    with pytest.raises(RuntimeError, match="temporarily unavailable"):
+        await provider.chat_completion(MESSAGES)
+    assert server.count("primary") == 2
+
+
+async def test_hedged_request_wins_over_slow_attempt(server):
+    server.scripts["primary"] = [(200, {}, 1.0), (200, {}, 0.0)]
+    provider = _provider(server, hedge_enabled=True, hedge_delay_ms=100)
+
+    start = time.monotonic()
+    response = await provider.chat_completion(MESSAGES)
+
+    assert time.monotonic() - start < 0.8
+    assert response.content == "primary answer 1"
+    stats = provider.limiter.limiter("openai", "primary").get_stats()
+    assert stats["hedges"] == 1
+    assert stats["hedge_wins"] == 1
+
+
+def _max_window_excess(times, cost, rate_per_second, burst):
+    """所有时间窗口中，实际用量超出“突发额度 + 速率×窗口长度”的最大值"""
+    times = sorted(times)
+    return max(
+        (j - i + 1) * cost - (burst + rate_per_second * (times[j] - times[i]))
+        for i in range(len(times)) for j in range(i, len(times))
+    )
+
+
+async def test_request_rate_stays_within_rpm(server):
+    # 600 RPM：每秒10个请求，突发额度约1秒（10个）
+    provider = _provider(server, max_concurrent=8, requests_per_minute=600)
+
+    await asyncio.gather(*(provider.chat_completion(MESSAGES) for _ in range(40)))
+
+    times = [t for _, t in server.requests]
+    assert len(times) == 40
+    # 请求到达服务端的时刻相对放行时刻有抖动，允许1个请求和50ms的误差
+    assert _max_window_excess(times, 1, 10.0, burst=10 + 1 + 10.0 * 0.05) <= 0
+    # 没有被过度限流：突发之后接近配置速率
+    assert (len(times) - 10) / (max(times) - min(times)) > 10.0 * 0.8
+    assert provider.limiter.limiter("openai", "primary").get_stats()["throttled"] > 0
+
+
+async def test_token_rate_stays_within_tpm_when_usage_exceeds_estimate(server):
+    # 120000 TPM：每秒2000个token；每个请求预估50（max_tokens），实际上报400
+    server.usage["primary"] = 400
+    provider = _provider(server, max_concurrent=4, tokens_per_minute=120000)
+
+    await asyncio.gather(*(provider.chat_completion(MESSAGES, max_tokens=50) for _ in range(20)))
+
+    times = [t for _, t in server.requests]
+    assert len(times) == 20
+    # 超出预估的部分在请求完成后才补扣，最多有 max_concurrent 个请求按预估放行
+    burst = 2000 + 4 * 400 + 2000 * 0.05
+    assert _max_window_excess(times, 400, 2000.0, burst=burst) <= 0
+    assert (20 * 400 - burst) / (max(times) - min(times)) <= 2000.0
+
+
+async def test_stream_resolves_fallback_only_on_failure():
+    class Upstream:
+        config = {"model": "primary"}
+        model = "primary"
+
+        async def stream_text_completion(self, prompt, **kwargs):
+            yield "ok"
+
+    resolved = []
+    limiter = AIRequestLimiter({"fallback_provider": "other", "fallback_model": "backup"})
+    provider = ResilientAIProvider(Upstream(), "openai", limiter, lambda name: resolved.append(name))
+
+    chunks = [chunk async for chunk in provider.stream_text_completion("hi")]
+
+    assert chunks == ["ok"]
+    assert resolved == []
@@ -0,0 +1,227 @@
+"""后台任务：进程崩溃后恢复执行、SQLite写锁等待时事件循环不被阻塞"""
+
+import asyncio
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from landppt.services.background_tasks import BackgroundTaskManager, TaskStatus
+from landppt.services.task_store import TaskStore
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+
+
+class FastLeaseManager(BackgroundTaskManager):
+    lease_seconds = 1.0
+
+
+WORKER_SCRIPT = textwrap.dedent("""
+    import asyncio
+    import sys
+
+    sys.path.insert(0, {src!r})
+    from landppt.services.background_tasks import BackgroundTaskManager
+    from landppt.services.task_store import TaskStore
+
+
+    class Manager(BackgroundTaskManager):
+        lease_seconds = 1.0
+
+
+    async def slow_export(ctx, payload):
+        ctx.report_progress(40.0)
+        await asyncio.sleep(3600)
+
+
+    async def main():
+        manager = Manager(TaskStore({db!r}))
+        manager.register_handler("export", slow_export, max_attempts=3)
+        manager.start()
+        await asyncio.Event().wait()
+
+
+    asyncio.run(main())
+""")
+
+
+def _wait_for(predicate, timeout=30.0, interval=0.05):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        value = predicate()
+        if value:
+            return value
+        time.sleep(interval)
+    raise AssertionError("condition not reached")
+
+
+async def _await_for(predicate, timeout=30.0, interval=0.05):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        value = predicate()
+        if value:
+            return value
+        await asyncio.sleep(interval)
+    raise AssertionError("condition not reached")
+
+
+async def test_task_killed_mid_run_is_reclaimed_after_restart(tmp_path):
+    db = str(tmp_path / "tasks.db")
+    store = TaskStore(db)
+    store.insert_task("task-1", "export", TaskStatus.PENDING.value, payload={"slides": 3}, max_attempts=3)
+
+    script = tmp_path / "worker.py"
+    script.write_text(WORKER_SCRIPT.format(src=str(SRC_DIR), db=db), encoding="utf-8")
+    worker = subprocess.Popen([sys.executable, str(script)], cwd=str(tmp_path))
+    try:
+        running = _wait_for(lambda: (lambda r: r if r["progress"] == 40.0 else None)(store.get_task("task-1")))
+    finally:
+        os.kill(worker.pid, signal.SIGKILL)
+        worker.wait()
+
+    assert running["status"] == TaskStatus.RUNNING.value
+    assert running["attempts"] == 1
+    crashed_owner = running["lease_owner"]
+
+    # 重启：新的工作进程在租约过期后回收任务并重新执行，进度快照仍在
+    record = store.get_task("task-1")
+    assert (record["status"], record["progress"]) == (TaskStatus.RUNNING.value, 40.0)
+
+    attempts = []
+
+    async def resumed_export(ctx, payload):
+        attempts.append((ctx.attempt, payload))
+        return {"success": True}
+
+    manager = FastLeaseManager(store)
+    manager.register_handler("export", resumed_export, max_attempts=3)
+    manager.start()
+    try:
+        task = await _await_for(
+            lambda: (lambda t: t if t.status == TaskStatus.COMPLETED else None)(manager.get_task("task-1"))
+        )
+    finally:
+        await manager.stop()
+
+    assert attempts == [(2, {"slides": 3})]
+    assert task.attempts == 2 and task.progress == 100.0 and task.result == {"success": True}
+    assert store.get_task("task-1")["lease_owner"] != crashed_owner
+
+
+async def _finished(manager, task_id, timeout=120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        task = await manager.get_task_async(task_id)
+        if task and task.status in (TaskStatus.COMPLETED, TaskStatus.FAILED):
+            return task
+        await asyncio.sleep(0.05)
+    raise AssertionError("task did not finish")
+
+
+class FakeScreenshotConverter:
+    """代替浏览器截图：稍作等待后写一张PNG"""
+
+    async def screenshot_html(self, html_file, screenshot_path, width, height):
+        from PIL import Image
+
+        await asyncio.sleep(0.02)
+        Image.new("RGB", (width // 4, height // 4), (40, 90, 160)).save(screenshot_path)
+        return True
+
+
+async def test_event_loop_stays_responsive_during_three_exports(tmp_path, monkeypatch):
+    pytest.importorskip("pptx")
+    pytest.importorskip("PIL")
+    from landppt.core.config import app_config
+    from landppt.services import export_tasks, pyppeteer_pdf_converter
+    from landppt.services.export_tasks import HTML_TO_PPTX_TASK, register_export_handlers
+    from landppt.services.progress_tracker import ProgressTracker
+    from landppt.utils.process_pool import process_pool
+
+    monkeypatch.setattr(app_config, "background_task_process_workers", 2)  # PPTX组装走进程池
+    monkeypatch.setattr(pyppeteer_pdf_converter, "get_pdf_converter", lambda: FakeScreenshotConverter())
+
+    async def speech_scripts(project_id):
+        return {0: "开场白"}
+
+    monkeypatch.setattr(export_tasks, "_load_speech_scripts", speech_scripts)
+
+    db = str(tmp_path / "tasks.db")
+    store = TaskStore(db)
+    manager = FastLeaseManager(store)
+    register_export_handlers(manager)
+    tracker = ProgressTracker(store=store)
+
+    payloads = []
+    for n in range(3):
+        temp_dir = tmp_path / f"export{n}"
+        temp_dir.mkdir()
+        for i in range(8):
+            (temp_dir / f"slide_{i}.html").write_text(f"<div>{i}</div>", encoding="utf-8")
+        payloads.append({"project_id": f"project-{n}", "temp_dir": str(temp_dir), "slide_count": 8,
+                         "pptx_path": str(tmp_path / f"export{n}.pptx")})
+
+    locked = threading.Event()
+
+    def hold_write_lock(seconds):
+        # 模拟另一个进程长时间持有写锁
+        conn = sqlite3.connect(db, timeout=30, isolation_level=None)
+        conn.execute("BEGIN IMMEDIATE")
+        locked.set()
+        time.sleep(seconds)
+        conn.execute("COMMIT")
+        conn.close()
+
+    lags = []
+    stop = asyncio.Event()
+
+    async def measure_lag(interval=0.005):
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - start - interval)
+
+    async def speech_progress():
+        # 同时进行的演讲稿生成：每页完成都会写进度快照
+        tracker.create_task("speech-1", "project-0", 40)
+        for i in range(40):
+            tracker.add_slide_completed("speech-1", i, f"第{i + 1}页")
+            await asyncio.sleep(0.01)
+        tracker.complete_task("speech-1")
+
+    task_ids = [await manager.enqueue_task_async(HTML_TO_PPTX_TASK, payload) for payload in payloads]
+    holder = threading.Thread(target=hold_write_lock, args=(1.0,))
+    holder.start()
+    locked.wait()
+    sampler = asyncio.create_task(measure_lag())
+    await asyncio.sleep(0.05)
+    try:
+        await speech_progress()
+        tasks = [await _finished(manager, task_id) for task_id in task_ids]
+    finally:
+        stop.set()
+        await sampler
+        await manager.stop()
+        holder.join()
+        process_pool.shutdown()
+
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99) - 1]
+    print(f"\nevent loop lag during 3 exports with the task store locked: "
+          f"p99={p99 * 1000:.1f}ms max={lags[-1] * 1000:.1f}ms over {len(lags)} samples")
+    assert [t.status for t in tasks] == [TaskStatus.COMPLETED] * 3
+    assert all(os.path.getsize(payload["pptx_path"]) > 0 for payload in payloads)
+    assert p99 < 0.1
+    # 一次等锁的阻塞在百分位里只算一个样本，因此同时限制最大延迟
+    assert lags[-1] < 0.5
+
+    tracker.flush()
+    saved = store.load_progress("speech-1")
+    assert saved["data"]["status"] == "completed" and saved["data"]["completed_slides"] == 40
@@ -0,0 +1,152 @@
+"""研究网页抓取：本地夹具服务器验证体积上限、ETag/304复验和解析器回退"""
+
+import gzip
+import sys
+
+import pytest
+from aiohttp import web
+
+from landppt.core.config import ai_config, app_config
+from landppt.services.research import content_extractor
+from landppt.services.research.content_extractor import WebContentExtractor, parse_html_document
+
+ARTICLE = "<p>" + "Research content sentence about solar panels. " * 20 + "</p>"
+PAGE = f"<html lang='en'><head><title>Solar</title></head><body><article>{ARTICLE}</article></body></html>"
+
+
+class FixtureServer:
+    """提供普通页面、带ETag的页面和数MB大页面的本地HTTP服务"""
+
+    def __init__(self, big_page_mb: int = 6):
+        self.requests = []
+        self.big_page = (PAGE[:-len("</body></html>")] + "<p>filler</p>" * (big_page_mb * 1024 * 1024 // 13)
+                         + "</body></html>").encode()
+        self.base_url = None
+        self._runner = None
+
+    async def _etag_page(self, request: web.Request) -> web.Response:
+        self.requests.append(dict(request.headers))
+        etag = '"v1"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(body=PAGE.encode(), content_type="text/html", charset="utf-8",
+                            headers={"ETag": etag, "Last-Modified": "Sat, 17 Oct 2026 08:00:00 GMT"})
+
+    async def _big_page(self, request: web.Request) -> web.StreamResponse:
+        self.requests.append(dict(request.headers))
+        response = web.StreamResponse(headers={"Content-Type": "text/html; charset=utf-8"})
+        await response.prepare(request)
+        chunk = 256 * 1024
+        try:
+            for start in range(0, len(self.big_page), chunk):
+                await response.write(self.big_page[start:start + chunk])
+            await response.write_eof()
+        except (ConnectionResetError, ConnectionError):
+            pass
+        return response
+
+    async def _gzip_page(self, request: web.Request) -> web.Response:
+        self.requests.append(dict(request.headers))
+        return web.Response(body=gzip.compress(self.big_page), headers={
+            "Content-Type": "text/html; charset=utf-8", "Content-Encoding": "gzip"
+        })
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/etag", self._etag_page)
+        app.router.add_get("/big", self._big_page)
+        app.router.add_get("/big.gz", self._gzip_page)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.base_url = f"http://127.0.0.1:{self._runner.addresses[0][1]}"
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+@pytest.fixture
+async def server():
+    fixture = FixtureServer()
+    await fixture.start()
+    yield fixture
+    await fixture.stop()
+
+
+@pytest.fixture
+async def extractor_config(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_config, "background_task_process_workers", 0)  # 解析放在线程里，测试不起进程
+    monkeypatch.setattr(ai_config, "research_max_response_mb", 1)
+    monkeypatch.setattr(ai_config, "research_page_cache_enabled", True)
+    monkeypatch.setattr(ai_config, "research_page_cache_path", str(tmp_path / "pages.db"))
+    monkeypatch.setattr(ai_config, "research_page_cache_ttl", 3600)
+    monkeypatch.setattr(content_extractor, "_page_cache", None)
+    yield
+    await content_extractor.close_http_session()
+
+
+@pytest.mark.parametrize("path", ["/big", "/big.gz"])
+async def test_multi_mb_page_is_capped(server, extractor_config, path):
+    extractor = WebContentExtractor()
+
+    extracted = await extractor.extract_content(server.base_url + path)
+
+    assert extracted is not None
+    assert extracted.title == "Solar"
+    assert extracted.metadata["truncated"] is True
+    stats = extractor.get_status()["stats"]
+    # 解压后的正文同样受上限约束，不会把6MB读进内存
+    assert stats["bytes_downloaded"] == 1024 * 1024
+    assert stats["truncated"] == 1
+    assert len(server.big_page) > 5 * 1024 * 1024
+
+
+async def test_fresh_cache_entry_skips_the_request(server, extractor_config):
+    extractor = WebContentExtractor()
+    url = server.base_url + "/etag"
+
+    first = await extractor.extract_content(url)
+    second = await extractor.extract_content(url)
+
+    assert len(server.requests) == 1
+    assert second.content == first.content
+    assert second.metadata["from_cache"] is True
+    assert extractor.get_status()["stats"]["cache_hits"] == 1
+
+
+async def test_stale_entry_is_revalidated_with_etag(server, extractor_config, monkeypatch):
+    monkeypatch.setattr(ai_config, "research_page_cache_ttl", 0)
+    extractor = WebContentExtractor()
+    url = server.base_url + "/etag"
+
+    first = await extractor.extract_content(url)
+    revalidated = await extractor.extract_content(url)
+
+    assert len(server.requests) == 2
+    assert "If-None-Match" not in server.requests[0]
+    assert server.requests[1]["If-None-Match"] == '"v1"'
+    assert server.requests[1]["If-Modified-Since"] == "Sat, 17 Oct 2026 08:00:00 GMT"
+    assert revalidated.content == first.content
+    assert revalidated.metadata["from_cache"] is True
+    stats = extractor.get_status()["stats"]
+    assert stats["fetched"] == 1 and stats["revalidated"] == 1
+
+
+def test_parser_falls_back_without_lxml(monkeypatch):
+    monkeypatch.setitem(sys.modules, "lxml", None)  # import lxml -> ImportError
+    assert content_extractor._select_html_parser() == "html.parser"
+
+    monkeypatch.setattr(content_extractor, "HTML_PARSER", "html.parser")
+    parsed = parse_html_document(PAGE.encode(), "https://example.com/solar")
+
+    assert parsed["title"] == "Solar"
+    assert parsed["content"].startswith("Research content sentence")
+    assert parsed["metadata"]["language"] == "en"
+
+
+def test_lxml_is_used_when_installed():
+    pytest.importorskip("lxml")
+    assert content_extractor._select_html_parser() == "lxml"
+    assert content_extractor.HTML_PARSER == "lxml"
+    assert parse_html_document(PAGE.encode(), "https://example.com/solar")["title"] == "Solar"
@@ -0,0 +1,137 @@
+"""SQLite单写者：并发保存幻灯片的负载测试、会话处理和迁移008去重"""
+
+import asyncio
+import logging
+import time
+
+import pytest
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from landppt.database import service as service_module
+from landppt.database.database import _set_sqlite_pragmas
+from landppt.database.migrations import DatabaseMigration
+from landppt.database.models import Base, Project, SlideData
+from landppt.database.service import DatabaseService
+from landppt.database.writer import DatabaseWriter
+
+PROJECT_ID = "7f7c1c0e-0000-4000-8000-000000000001"
+SLIDES = 20
+
+
+def _engine(url, **kwargs):
+    engine = create_async_engine(url, connect_args={"timeout": 30}, **kwargs)
+    event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+@pytest.fixture
+async def database(tmp_path, monkeypatch):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'landppt.db'}"
+    engine = _engine(url)
+    writer = DatabaseWriter(engine=_engine(url, pool_size=1, max_overflow=0))
+    monkeypatch.setattr(service_module, "database_writer", writer)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with sessions() as session:
+        session.add(Project(project_id=PROJECT_ID, title="Load test", scenario="general", topic="SQLite"))
+        await session.commit()
+
+    yield sessions, writer
+
+    await writer.stop()
+    await writer.engine.dispose()
+    await engine.dispose()
+
+
+def _slide(index):
+    return {"title": f"Slide {index + 1}", "html_content": f"<div>{index}</div>" * 200, "metadata": {"i": index}}
+
+
+async def _save_in_parallel(sessions, count=SLIDES):
+    async def save(index):
+        # 并行生成时每个幻灯片在各自的请求会话中保存
+        async with sessions() as session:
+            return await DatabaseService(session).save_single_slide(PROJECT_ID, index, _slide(index))
+
+    return await asyncio.gather(*(save(i) for i in range(count)))
+
+
+async def test_parallel_slide_saves_are_batched(database, caplog):
+    sessions, writer = database
+
+    with caplog.at_level(logging.WARNING):
+        start = time.perf_counter()
+        results = await _save_in_parallel(sessions)
+        elapsed = time.perf_counter() - start
+
+    assert all(results)
+    assert "locked" not in caplog.text
+    stats = writer.get_stats()
+    assert stats["ops"] == SLIDES
+    assert stats["batches"] < SLIDES
+    assert stats["statements_per_op"] < 1
+
+    async with sessions() as session:
+        rows = (await session.execute(
+            select(SlideData.slide_index, SlideData.title).where(SlideData.project_id == PROJECT_ID)
+            .order_by(SlideData.slide_index)
+        )).all()
+    assert rows == [(i, f"Slide {i + 1}") for i in range(SLIDES)]
+    print(f"\n{SLIDES} parallel slide saves: {elapsed * 1000:.1f}ms, {stats['batches']} batches")
+
+    # 再次并行保存同一批幻灯片：按 (project_id, slide_index) 更新而不是插入重复行
+    assert all(await _save_in_parallel(sessions))
+    async with sessions() as session:
+        count = (await session.execute(text("SELECT COUNT(*) FROM slide_data"))).scalar_one()
+    assert count == SLIDES
+
+
+async def test_parallel_saves_without_writer_retry_on_lock(database, monkeypatch):
+    sessions, _ = database
+    monkeypatch.setattr(service_module, "database_writer", DatabaseWriter(engine=None))
+
+    assert all(await _save_in_parallel(sessions))
+    async with sessions() as session:
+        count = (await session.execute(text("SELECT COUNT(*) FROM slide_data"))).scalar_one()
+    assert count == SLIDES
+
+
+async def test_write_does_not_commit_callers_session(database):
+    sessions, _ = database
+
+    async with sessions() as session:
+        service = DatabaseService(session)
+        project = (await session.execute(select(Project).where(Project.project_id == PROJECT_ID))).scalar_one()
+        project.topic = "unsaved change"
+
+        assert await service.update_project(PROJECT_ID, {"status": "in_progress"})
+        assert project.topic == "unsaved change"
+        await session.rollback()
+
+    async with sessions() as session:
+        project = (await session.execute(select(Project).where(Project.project_id == PROJECT_ID))).scalar_one()
+        assert (project.status, project.topic) == ("in_progress", "SQLite")
+
+
+async def test_migration_008_keeps_newest_duplicate(database, caplog):
+    sessions, _ = database
+
+    async with sessions() as session:
+        await session.execute(text("DROP INDEX uq_slide_data_project_slide"))
+        # 主键更大的行反而更旧：去重必须按updated_at保留最新的一行
+        for slide_id, updated_at in (("newest", 300.0), ("older", 100.0), ("oldest", 50.0)):
+            await session.execute(text(
+                "INSERT INTO slide_data (project_id, slide_index, slide_id, title, content_type, html_content,"
+                " is_user_edited, created_at, updated_at) VALUES (:p, 0, :s, :s, 'content', '', 0, 0, :u)"
+            ), {"p": PROJECT_ID, "s": slide_id, "u": updated_at})
+        await session.commit()
+
+        with caplog.at_level(logging.WARNING):
+            await DatabaseMigration()._migration_008_up(session)
+
+        remaining = (await session.execute(text("SELECT slide_id FROM slide_data"))).scalars().all()
+    assert remaining == ["newest"]
+    assert "removing ids=" in caplog.text
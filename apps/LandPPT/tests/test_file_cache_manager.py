@@ -0,0 +1,114 @@
+"""文件缓存指纹索引：尽量避免读取文件内容和完整计算哈希"""
+
+import os
+import shutil
+
+import pytest
+
+from summeryanyfile.core.file_cache_manager import FileCacheManager
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FileCacheManager(cache_dir=str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / "upload" / "report.pdf"
+    path.parent.mkdir()
+    path.write_bytes(os.urandom(512 * 1024))
+    return path
+
+
+def _count_calls(monkeypatch, cache, name):
+    calls = []
+    original = getattr(cache, name)
+
+    def wrapper(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(cache, name, wrapper)
+    return calls
+
+
+def test_stat_match_reads_no_content(cache, document, monkeypatch):
+    md5_hash = cache.save_to_cache(str(document), "# report")
+    samples = _count_calls(monkeypatch, cache, "_sample_fingerprint")
+    full_hashes = _count_calls(monkeypatch, cache, "calculate_file_md5")
+
+    assert cache.is_cached(str(document)) == (True, md5_hash)
+    assert samples == [] and full_hashes == []
+
+
+def test_copy_at_new_path_is_hashed_once(cache, document, tmp_path, monkeypatch):
+    md5_hash = cache.save_to_cache(str(document), "# report")
+    copy = tmp_path / "upload" / "tmp_8c1f_report.pdf"
+    shutil.copy(document, copy)
+    full_hashes = _count_calls(monkeypatch, cache, "calculate_file_md5")
+
+    # stat指纹变了，必须完整计算一次哈希才能确认内容相同
+    assert cache.is_cached(str(copy)) == (True, md5_hash)
+    assert len(full_hashes) == 1
+
+    # 新路径的stat指纹已记录，再次检查不再读取文件内容
+    samples = _count_calls(monkeypatch, cache, "_sample_fingerprint")
+    assert cache.is_cached(str(copy)) == (True, md5_hash)
+    assert samples == [] and len(full_hashes) == 1
+
+
+def test_edit_in_the_middle_is_a_cache_miss(cache, document):
+    md5_hash = cache.save_to_cache(str(document), "# report")
+    stat = document.stat()
+
+    # 只改中间一个字节：大小和首尾块都不变，inode也不变
+    with open(document, "r+b") as f:
+        f.seek(stat.st_size // 2)
+        byte = f.read(1)
+        f.seek(stat.st_size // 2)
+        f.write(bytes([byte[0] ^ 0xFF]))
+    os.utime(document, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    cached, edited_hash = cache.is_cached(str(document))
+    assert not cached
+    assert edited_hash == cache.calculate_file_md5(str(document)) != md5_hash
+
+
+def test_edited_copy_at_new_path_is_a_cache_miss(cache, document, tmp_path):
+    cache.save_to_cache(str(document), "# report")
+    data = bytearray(document.read_bytes())
+    data[len(data) // 2] ^= 0xFF
+    edited = tmp_path / "upload" / "tmp_report_v2.pdf"
+    edited.write_bytes(bytes(data))
+
+    assert cache.is_cached(str(edited))[0] is False
+
+
+def test_unknown_file_is_not_hashed(cache, document, tmp_path, monkeypatch):
+    cache.save_to_cache(str(document), "# report")
+    other = tmp_path / "upload" / "other.pdf"
+    other.write_bytes(os.urandom(512 * 1024))
+    full_hashes = _count_calls(monkeypatch, cache, "calculate_file_md5")
+
+    assert cache.is_cached(str(other)) == (False, None)
+    assert full_hashes == []
+
+
+def test_ambiguous_sample_falls_back_to_full_hash(cache, tmp_path, monkeypatch):
+    # 首尾块相同、中间不同的两个文件共享采样指纹，只能靠完整哈希区分
+    head, tail = os.urandom(64 * 1024), os.urandom(64 * 1024)
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"variant_{i}.bin"
+        path.write_bytes(head + bytes([i]) * (256 * 1024) + tail)
+        paths.append(path)
+
+    first = cache.save_to_cache(str(paths[0]), "variant 0")
+    second = cache.save_to_cache(str(paths[1]), "variant 1")
+    assert first != second
+
+    full_hashes = _count_calls(monkeypatch, cache, "calculate_file_md5")
+    cached, md5_hash = cache.is_cached(str(paths[2]))
+    assert not cached and md5_hash == cache.calculate_file_md5(str(paths[2]))
+    assert len(full_hashes) == 2
@@ -0,0 +1,146 @@
+"""图片搜索结果缓存：提供者失败时不缓存空结果、持久化条目的删除"""
+
+from pathlib import Path
+
+import pytest
+
+from landppt.services.image import image_service as image_service_module
+from landppt.services.image.cache.search_cache import SearchResultCache
+from landppt.services.image.config.image_config import ImageServiceConfig
+from landppt.services.image.image_service import ImageService
+from landppt.services.image.models import (
+    ImageInfo, ImageMetadata, ImageFormat, ImageProvider, ImageSearchRequest,
+    ImageSearchResult, ImageSourceType
+)
+
+
+def _image(image_id: str) -> ImageInfo:
+    return ImageInfo(
+        image_id=image_id,
+        source_type=ImageSourceType.WEB_SEARCH,
+        provider=ImageProvider.UNSPLASH,
+        local_path="",
+        filename=f"{image_id}.jpg",
+        title="mountain lake",
+        metadata=ImageMetadata(width=640, height=480, format=ImageFormat.JPEG, file_size=1024),
+    )
+
+
+class FlakyProvider:
+    """前 ``failures`` 次搜索失败（异常或带error的结果），之后正常返回图片"""
+
+    def __init__(self, failures: int, raise_error: bool = True):
+        self.provider = ImageProvider.UNSPLASH
+        self.failures = failures
+        self.raise_error = raise_error
+        self.calls = 0
+
+    async def search(self, request: ImageSearchRequest) -> ImageSearchResult:
+        self.calls += 1
+        if self.calls <= self.failures:
+            if self.raise_error:
+                raise RuntimeError("429 Too Many Requests")
+            return ImageSearchResult(
+                images=[], total_count=0, page=request.page, per_page=request.per_page,
+                has_next=False, has_prev=False, search_time=0.0,
+                provider=self.provider, error="Unsplash API rate limit exceeded"
+            )
+        return ImageSearchResult(
+            images=[_image(f"img_{self.calls}")], total_count=1, page=request.page,
+            per_page=request.per_page, has_next=False, has_prev=False, search_time=0.0,
+            provider=self.provider
+        )
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(ImageService, "_instance", None)
+    monkeypatch.setattr(ImageService, "_class_initialized", False)
+    svc = ImageService({"search_cache": {"ttl_seconds": 3600, "negative_ttl_seconds": 300}})
+    svc.initialized = True
+    return svc
+
+
+def _use_providers(monkeypatch, *providers):
+    monkeypatch.setattr(
+        image_service_module.provider_registry, "get_search_providers", lambda *a, **k: list(providers)
+    )
+
+
+@pytest.mark.parametrize("raise_error", [True, False])
+async def test_failed_provider_is_not_cached_as_empty(service, monkeypatch, raise_error):
+    provider = FlakyProvider(failures=1, raise_error=raise_error)
+    _use_providers(monkeypatch, provider)
+    request = ImageSearchRequest(query="mountain lake", preferred_providers=[ImageProvider.UNSPLASH])
+
+    failed = await service.search_images(request)
+    assert failed.images == []
+    assert "unsplash" in failed.provider_errors
+    assert service.search_cache.get_stats()["stores"] == 0
+
+    # 提供者恢复后，同一查询必须重新请求而不是命中"无图片"缓存
+    healthy = await service.search_images(request)
+    assert [img.image_id for img in healthy.images] == ["img_2"]
+    assert provider.calls == 2
+
+    cached = await service.search_images(request)
+    assert [img.image_id for img in cached.images] == ["img_2"]
+    assert provider.calls == 2
+
+
+async def test_partial_failure_with_images_is_cached(service, monkeypatch):
+    failing = FlakyProvider(failures=10)
+    failing.provider = ImageProvider.PIXABAY
+    healthy = FlakyProvider(failures=0)
+    _use_providers(monkeypatch, healthy, failing)
+    request = ImageSearchRequest(query="city skyline")
+
+    first = await service.search_images(request)
+    assert len(first.images) == 1
+    assert "pixabay" in first.provider_errors
+
+    await service.search_images(request)
+    assert healthy.calls == 1 and failing.calls == 1
+
+
+async def test_genuinely_empty_result_is_negative_cached(service, monkeypatch):
+    class EmptyProvider(FlakyProvider):
+        async def search(self, request):
+            self.calls += 1
+            return ImageSearchResult(
+                images=[], total_count=0, page=request.page, per_page=request.per_page,
+                has_next=False, has_prev=False, search_time=0.0, provider=self.provider
+            )
+
+    provider = EmptyProvider(failures=0)
+    _use_providers(monkeypatch, provider)
+    request = ImageSearchRequest(query="no such thing")
+
+    await service.search_images(request)
+    await service.search_images(request)
+    assert provider.calls == 1
+    assert service.search_cache.get_stats()["negative_hits"] == 1
+
+
+def test_default_persist_path_does_not_depend_on_cwd(tmp_path, monkeypatch):
+    monkeypatch.delenv("IMAGE_CACHE_DIR", raising=False)
+    monkeypatch.chdir(tmp_path)
+    persist_path = Path(ImageServiceConfig()._load_default_config()["search_cache"]["persist_path"])
+    assert persist_path.is_absolute()
+    assert persist_path.parent.parent.name == "temp"
+
+
+async def test_invalidate_and_clear_remove_persisted_entries(tmp_path):
+    config = {"persist_path": str(tmp_path / "search_cache.db")}
+    cache = SearchResultCache(config)
+    result = await FlakyProvider(failures=0).search(ImageSearchRequest(query="lake"))
+    for key in ("a", "b", "c"):
+        await cache.set(key, result)
+
+    await cache.invalidate("a")
+    assert await cache.clear() == 2
+    await cache.set("d", result)
+
+    # 重启后只剩清空之后写入的条目
+    reopened = SearchResultCache(config)
+    assert [await reopened.get(key) is not None for key in ("a", "b", "c", "d")] == [False, False, False, True]
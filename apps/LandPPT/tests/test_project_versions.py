@@ -0,0 +1,214 @@
+"""项目版本存储：关键帧/差异回放、迁移010转换旧版本、分页列表与blob回收"""
+
+import copy
+import json
+import warnings
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import InvalidRequestError, SADeprecationWarning
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from landppt.database import version_store
+from landppt.database.migrations import DatabaseMigration
+from landppt.database.models import Base, Project, ProjectVersion, ProjectVersionBlob
+from landppt.database.repositories import ProjectVersionRepository
+
+PROJECT_ID = "7f7c1c0e-0000-4000-8000-000000000002"
+OTHER_PROJECT_ID = "7f7c1c0e-0000-4000-8000-000000000003"
+
+
+@pytest.fixture
+async def sessions(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'landppt.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        for project_id in (PROJECT_ID, OTHER_PROJECT_ID):
+            session.add(Project(project_id=project_id, title="Versions", scenario="general", topic="history"))
+        await session.commit()
+    yield factory
+    await engine.dispose()
+
+
+def _slide(index, revision=0):
+    return {
+        "page_number": index + 1,
+        "title": f"Slide {index + 1}",
+        "html_content": f"<section><h1>{index}</h1><p>revision {revision}</p></section>" * 20,
+    }
+
+
+def _history(count=23):
+    """一段编辑历史：逐页修改、增删幻灯片、增删顶层字段、清空slides_data"""
+    snapshot = {
+        "outline": {"title": "Deck", "slides": [{"title": f"Slide {i + 1}"} for i in range(6)]},
+        "slides_html": "<html>" + "x" * 1000 + "</html>",
+        "slides_data": [_slide(i) for i in range(6)],
+    }
+    history = []
+    for step in range(count):
+        snapshot = copy.deepcopy(snapshot)
+        if step % 5 == 1:
+            snapshot["slides_data"].append(_slide(len(snapshot["slides_data"]), step))
+        elif step % 5 == 2:
+            snapshot["slides_data"].pop(0)
+            snapshot["notes"] = {"step": step, "text": "n" * 400}
+        elif step % 5 == 3:
+            snapshot.pop("notes", None)
+            snapshot["slides_html"] = "<html>" + str(step) * 500 + "</html>"
+        elif step == 14:
+            snapshot["slides_data"] = None
+        elif snapshot["slides_data"] is None:
+            snapshot["slides_data"] = [_slide(i, step) for i in range(4)]
+        else:
+            index = step % len(snapshot["slides_data"])
+            snapshot["slides_data"][index] = _slide(index, step)
+        history.append(snapshot)
+    return history
+
+
+async def _create_history(session, project_id, history):
+    repo = ProjectVersionRepository(session)
+    for number, snapshot in enumerate(history, start=1):
+        await repo.create({
+            "project_id": project_id, "version": number, "timestamp": float(number),
+            "description": f"Version {number}", "data": snapshot,
+        })
+
+
+async def test_keyframe_and_delta_round_trip(sessions):
+    history = _history()
+    async with sessions() as session:
+        await _create_history(session, PROJECT_ID, history)
+
+    async with sessions() as session:
+        repo = ProjectVersionRepository(session)
+        for number, snapshot in enumerate(history, start=1):
+            assert await repo.get_version_data(PROJECT_ID, number) == snapshot
+
+        keyframes = (await session.execute(
+            select(ProjectVersion.version).where(ProjectVersion.is_keyframe == True).order_by(ProjectVersion.version)
+        )).scalars().all()
+        assert keyframes == [1, 1 + version_store.KEYFRAME_INTERVAL, 1 + 2 * version_store.KEYFRAME_INTERVAL]
+
+        # 未修改的幻灯片在各版本间只存一份
+        blob_count = (await session.execute(select(func.count()).select_from(ProjectVersionBlob))).scalar_one()
+        slide_count = sum(len(snapshot["slides_data"] or []) for snapshot in history)
+        assert blob_count < slide_count / 3
+
+
+async def test_versions_are_not_loaded_with_project(sessions):
+    async with sessions() as session:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", SADeprecationWarning)
+            project = (await session.execute(select(Project).where(Project.project_id == PROJECT_ID))).scalar_one()
+        # 版本历史只能通过仓库分页读取
+        with pytest.raises(InvalidRequestError):
+            project.versions
+
+
+async def test_list_versions_returns_one_page_by_default(sessions, monkeypatch):
+    monkeypatch.setattr(ProjectVersionRepository, "DEFAULT_PAGE_SIZE", 5)
+    async with sessions() as session:
+        await _create_history(session, PROJECT_ID, _history(12))
+        repo = ProjectVersionRepository(session)
+
+        assert [v["version"] for v in await repo.list_versions(PROJECT_ID)] == [12, 11, 10, 9, 8]
+        assert [v["version"] for v in await repo.list_versions(PROJECT_ID, limit=3, offset=8)] == [4, 3, 2]
+        assert [v["version"] for v in await repo.list_versions(PROJECT_ID, offset=10)] == [2, 1]
+        assert (await repo.list_versions(PROJECT_ID, limit=1))[0] == {
+            "version": 12, "timestamp": 12.0, "description": "Version 12"
+        }
+
+
+async def test_deleting_versions_collects_unreferenced_blobs(sessions):
+    history = _history(12)
+    other_history = _history(3)
+    async with sessions() as session:
+        await _create_history(session, PROJECT_ID, history)
+        await _create_history(session, OTHER_PROJECT_ID, other_history)
+
+    async with sessions() as session:
+        repo = ProjectVersionRepository(session)
+        before = (await session.execute(select(func.count()).select_from(ProjectVersionBlob))).scalar_one()
+        assert await repo.delete_unreferenced_blobs() == 0
+
+        assert await repo.delete_by_project_id(PROJECT_ID) == len(history)
+        remaining = set((await session.execute(select(ProjectVersionBlob.hash))).scalars().all())
+        assert 0 < len(remaining) < before
+
+        # 共享的blob保留，剩余项目的每个版本仍可完整重建
+        referenced = set()
+        for number, snapshot in enumerate(other_history, start=1):
+            assert await repo.get_version_data(OTHER_PROJECT_ID, number) == snapshot
+            referenced.update(version_store.manifest_blob_hashes(
+                (await repo._load_manifest_chain(OTHER_PROJECT_ID, number))[1]
+            ))
+        assert remaining == referenced
+
+
+async def _create_legacy_schema(session):
+    """迁移010之前的 project_versions 表：data 列保存完整快照"""
+    await session.execute(text("DROP TABLE project_version_blobs"))
+    await session.execute(text("DROP TABLE project_versions"))
+    await session.execute(text("""
+        CREATE TABLE project_versions (
+            id INTEGER PRIMARY KEY,
+            project_id VARCHAR(36) REFERENCES projects(project_id),
+            version INTEGER NOT NULL,
+            timestamp FLOAT,
+            data JSON NOT NULL,
+            description VARCHAR(500) NOT NULL
+        )
+    """))
+
+
+async def test_migration_010_converts_legacy_versions(sessions):
+    histories = {PROJECT_ID: _history(13), OTHER_PROJECT_ID: _history(4)}
+    async with sessions() as session:
+        await _create_legacy_schema(session)
+        # 两个项目的旧版本交错写入
+        for number in range(1, 14):
+            for project_id, history in histories.items():
+                if number <= len(history):
+                    await session.execute(text(
+                        "INSERT INTO project_versions (project_id, version, timestamp, data, description)"
+                        " VALUES (:p, :v, :t, :d, :desc)"
+                    ), {"p": project_id, "v": number, "t": float(number),
+                        "d": json.dumps(history[number - 1], ensure_ascii=False), "desc": f"Version {number}"})
+        await session.commit()
+
+        migration = DatabaseMigration()
+        await migration._migration_010_up(session)
+
+    async with sessions() as session:
+        repo = ProjectVersionRepository(session)
+        for project_id, history in histories.items():
+            rows = (await session.execute(
+                select(ProjectVersion.version, ProjectVersion.storage_format, ProjectVersion.is_keyframe, ProjectVersion.data)
+                .where(ProjectVersion.project_id == project_id).order_by(ProjectVersion.version)
+            )).all()
+            assert {row.storage_format for row in rows} == {version_store.MANIFEST_FORMAT}
+            assert all(row.data == {} for row in rows)
+            assert [row.version for row in rows if row.is_keyframe] == [
+                v for v in (1, 1 + version_store.KEYFRAME_INTERVAL) if v <= len(history)
+            ]
+            for number, snapshot in enumerate(history, start=1):
+                assert await repo.get_version_data(project_id, number) == snapshot
+
+        # 迁移后新写入的版本接在转换后的差异链之后
+        await repo.create({"project_id": OTHER_PROJECT_ID, "version": 5, "timestamp": 5.0,
+                           "description": "Version 5", "data": histories[PROJECT_ID][4]})
+        assert await repo.get_version_data(OTHER_PROJECT_ID, 5) == histories[PROJECT_ID][4]
+
+        await migration._migration_010_down(session)
+        rows = (await session.execute(text(
+            "SELECT project_id, version, data, storage_format FROM project_versions ORDER BY project_id, version"
+        ))).all()
+    histories[OTHER_PROJECT_ID].append(histories[PROJECT_ID][4])
+    assert len(rows) == 13 + 5
+    for project_id, number, data, storage_format in rows:
+        assert storage_format == version_store.LEGACY_FORMAT
+        assert json.loads(data) == histories[project_id][number - 1]
@@ -0,0 +1,56 @@
+"""研究限流器：跨事件循环复用"""
+
+import asyncio
+import threading
+import time
+
+from landppt.services.research.rate_limiter import ProviderLimiter, TokenBucket
+
+
+async def _contend(limiter: ProviderLimiter, workers: int = 4):
+    active = peak = 0
+
+    async def work():
+        nonlocal active, peak
+        async with limiter.slot():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*(work() for _ in range(workers)))
+    return peak
+
+
+def test_limiter_works_across_event_loops():
+    limiter = ProviderLimiter("tavily", max_concurrent=2, requests_per_minute=0)
+
+    # 每次asyncio.run都是新的事件循环，信号量不能绑定到第一个循环上
+    assert asyncio.run(_contend(limiter)) == 2
+    assert asyncio.run(_contend(limiter)) == 2
+
+    peaks = []
+    threads = [threading.Thread(target=lambda: peaks.append(asyncio.run(_contend(limiter)))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peaks == [2, 2]
+    assert limiter.get_stats()["requests"] == 16
+
+
+def test_token_bucket_is_shared_between_loops():
+    bucket = TokenBucket(rate_per_minute=6000, burst=1)  # 100 tokens/s
+
+    async def take(count):
+        for _ in range(count):
+            await bucket.acquire()
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=asyncio.run, args=(take(5),)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 10个令牌、容量1：两个循环共享同一个桶时至少需要约90ms
+    assert time.monotonic() - start >= 0.08
@@ -0,0 +1,131 @@
+"""LLM响应缓存：只缓存完整回答，流式回放按缓存命中记录"""
+
+import pytest
+
+from landppt.ai.base import AIMessage, AIProvider, AIResponse, MessageRole, stream_finish_reason
+from landppt.ai.response_cache import CachedAIProvider, LLMResponseCache
+
+
+class FakeProvider(AIProvider):
+    """按顺序返回预设响应的提供者"""
+
+    def __init__(self, responses):
+        super().__init__({"model": "fake-model"})
+        self.responses = list(responses)
+        self.calls = 0
+
+    def _next(self) -> AIResponse:
+        self.calls += 1
+        return self.responses.pop(0)
+
+    async def chat_completion(self, messages, **kwargs):
+        return self._next()
+
+    async def text_completion(self, prompt, **kwargs):
+        return self._next()
+
+
+class FakeStreamProvider(FakeProvider):
+    """像OpenAI流那样在结束时上报finish_reason"""
+
+    def __init__(self, streams):
+        super().__init__([])
+        self.streams = list(streams)
+
+    async def stream_text_completion(self, prompt, **kwargs):
+        self.calls += 1
+        chunks, finish_reason = self.streams.pop(0)
+        for chunk in chunks:
+            yield chunk
+        stream_finish_reason.set(finish_reason)
+
+
+def _response(content, finish_reason="stop", **metadata):
+    return AIResponse(
+        content=content, model="fake-model", finish_reason=finish_reason,
+        usage={"prompt_tokens": 3, "completion_tokens": 5, "total_tokens": 8}, metadata=metadata
+    )
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMResponseCache({"enabled": True, "path": str(tmp_path / "cache.db")})
+
+
+@pytest.mark.parametrize("response", [
+    _response("[内容被安全过滤器阻止]", "SAFETY", placeholder=True),
+    _response("[内容因重复而被阻止]", "RECITATION", placeholder=True),
+    _response("部分内容", "MAX_TOKENS", placeholder=True),
+    _response("[响应中没有候选内容]", "stop", placeholder=True),
+    _response("被截断的回答", "length"),
+    _response("   ", "stop"),
+    _response("回答", None),
+])
+async def test_incomplete_responses_are_not_cached(cache, response):
+    provider = FakeProvider([response, _response("完整回答")])
+    cached = CachedAIProvider(provider, "fake", cache)
+
+    first = await cached.text_completion("问题")
+    second = await cached.text_completion("问题")
+
+    assert first.content == response.content
+    assert second.content == "完整回答"
+    assert provider.calls == 2
+    assert cache.get_stats()["not_stored"] == 1
+
+
+@pytest.mark.parametrize("finish_reason", ["stop", "STOP", "end_turn"])
+async def test_complete_responses_are_cached(cache, finish_reason):
+    provider = FakeProvider([_response("完整回答", finish_reason)])
+    cached = CachedAIProvider(provider, "fake", cache)
+    messages = [AIMessage(role=MessageRole.USER, content="问题")]
+
+    await cached.chat_completion(messages)
+    hit = await cached.chat_completion(messages)
+
+    assert hit.content == "完整回答"
+    assert hit.metadata["cache_hit"] is True
+    assert provider.calls == 1
+
+
+async def _collect(provider, prompt, **kwargs):
+    return "".join([chunk async for chunk in provider.stream_text_completion(prompt, **kwargs)])
+
+
+async def test_truncated_stream_is_not_cached(cache):
+    provider = FakeStreamProvider([(["被", "截断"], "length"), (["完整", "回答"], "stop")])
+    cached = CachedAIProvider(provider, "fake", cache)
+
+    assert await _collect(cached, "问题") == "被截断"
+    assert await _collect(cached, "问题") == "完整回答"
+    assert provider.calls == 2
+
+
+async def test_stream_replay_reports_cache_hit(cache):
+    provider = FakeStreamProvider([(["完整", "回答"], "stop")])
+    cached = CachedAIProvider(provider, "fake", cache)
+
+    first_info, replay_info = {}, {}
+    assert await _collect(cached, "问题", _cache_info=first_info) == "完整回答"
+    assert await _collect(cached, "问题", _cache_info=replay_info) == "完整回答"
+
+    assert provider.calls == 1
+    assert first_info["cache_hit"] is False
+    assert replay_info["cache_hit"] is True
+    assert cache.get_stats()["stream_replays"] == 1
+
+
+async def test_default_stream_of_placeholder_is_not_cached(cache):
+    # 未实现流式的提供者（如Gemini）走基类默认实现，占位文本不能被缓存回放
+    provider = FakeProvider([
+        _response("[内容被安全过滤器阻止]", "SAFETY", placeholder=True),
+        _response("[响应中没有候选内容]", "stop", placeholder=True),
+        _response("完整回答", "STOP"),
+    ])
+    cached = CachedAIProvider(provider, "fake", cache)
+
+    assert await _collect(cached, "问题") == "[内容被安全过滤器阻止]"
+    assert await _collect(cached, "问题") == "[响应中没有候选内容]"
+    assert await _collect(cached, "问题") == "完整回答"
+    assert await _collect(cached, "问题") == "完整回答"
+    assert provider.calls == 3
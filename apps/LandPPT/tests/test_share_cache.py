@@ -0,0 +1,158 @@
+"""公开分享页缓存：并发访问的负载测试、ETag/304和保存后失效"""
+
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from landppt.database import database as database_module
+from landppt.database import service as service_module
+from landppt.database.database import _set_sqlite_pragmas, get_db
+from landppt.database.models import Base, Project
+from landppt.database.writer import DatabaseWriter
+from landppt.services import db_project_manager, share_service
+from landppt.services.db_project_manager import DatabaseProjectManager
+from landppt.services.share_service import SharePayloadCache, ShareService
+from landppt.web import routes
+
+PROJECT_ID = "5a1e0000-0000-4000-8000-000000000040"
+TOKEN = "share-token-040"
+VIEWERS = 500
+
+
+def _slides(version):
+    return [{"title": f"Slide {i + 1}", "html_content": f"<div>v{version} slide {i}</div>" * 50} for i in range(10)]
+
+
+@pytest.fixture
+async def share_app(tmp_path, monkeypatch):
+    path = tmp_path / "landppt.db"
+    sync_engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 30})
+    event.listen(sync_engine, "connect", _set_sqlite_pragmas)
+    Base.metadata.create_all(sync_engine)
+    sync_sessions = sessionmaker(bind=sync_engine)
+    with sync_sessions() as session:
+        session.add(Project(
+            project_id=PROJECT_ID, title="Shared deck", scenario="general", topic="Caching",
+            slides_html="", slides_data=_slides(1), share_token=TOKEN, share_enabled=True
+        ))
+        session.commit()
+
+    async_url = f"sqlite+aiosqlite:///{path}"
+    async_engine = create_async_engine(async_url, connect_args={"timeout": 30})
+    writer_engine = create_async_engine(async_url, connect_args={"timeout": 30}, pool_size=1, max_overflow=0)
+    for engine in (async_engine, writer_engine):
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    writer = DatabaseWriter(engine=writer_engine)
+    monkeypatch.setattr(service_module, "database_writer", writer)
+    monkeypatch.setattr(database_module, "AsyncSessionLocal",
+                        async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False))
+
+    cache = SharePayloadCache(max_entries=16, revalidate_seconds=60)
+    monkeypatch.setattr(share_service, "share_payload_cache", cache)
+    monkeypatch.setattr(db_project_manager, "share_payload_cache", cache)
+
+    queries = []
+    event.listen(sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: queries.append(statement))
+
+    def override_db():
+        db = sync_sessions()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(routes.router)
+    app.dependency_overrides[get_db] = override_db
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield client, cache, queries, sync_sessions
+
+    await writer.stop()
+    await writer_engine.dispose()
+    await async_engine.dispose()
+    sync_engine.dispose()
+
+
+def _project_queries(queries):
+    return [q for q in queries if q.lstrip().upper().startswith("SELECT") and "FROM projects" in q]
+
+
+async def test_concurrent_viewers_share_one_lookup_and_render(share_app):
+    client, cache, queries, _ = share_app
+    url = f"/api/share/{TOKEN}/slides-data"
+
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(client.get(url) for _ in range(VIEWERS)))
+    elapsed = time.perf_counter() - start
+
+    assert {r.status_code for r in responses} == {200}
+    assert len({r.content for r in responses}) == 1
+    assert len({r.headers["etag"] for r in responses}) == 1
+    stats = cache.get_stats()
+    # 500个并发首访只查一次令牌、只渲染一次
+    assert stats["misses"] == 1
+    assert stats["state_queries"] == 1
+    assert len(_project_queries(queries)) == 2  # 轻量令牌查询 + 渲染时加载项目
+
+    # 缓存已热：再来一轮不访问数据库
+    queries.clear()
+    await asyncio.gather(*(client.get(url) for _ in range(VIEWERS)))
+    assert _project_queries(queries) == []
+    print(f"\n{VIEWERS} cold concurrent views in {elapsed:.2f}s")
+
+
+async def test_etag_revalidation_returns_304(share_app):
+    client, _, _, _ = share_app
+    url = f"/api/share/{TOKEN}/slides-data"
+
+    first = await client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"
+    assert json.loads(first.content)["total_slides"] == 10
+
+    revalidated = await client.get(url, headers={"If-None-Match": first.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == first.headers["etag"]
+
+
+async def test_save_invalidates_shared_views(share_app):
+    client, cache, _, _ = share_app
+    url = f"/api/share/{TOKEN}/slides-data"
+    page_url = f"/share/{TOKEN}"
+
+    before = await client.get(url)
+    page_before = await client.get(page_url)
+    assert page_before.status_code == 200 and "v1 slide 0" in page_before.text
+
+    saved = await DatabaseProjectManager().save_project_slides(PROJECT_ID, "<html>v2</html>", _slides(2))
+    assert saved
+
+    # 未过期的令牌缓存也必须失效：保存后的第一次访问就拿到新版本
+    after = await client.get(url, headers={"If-None-Match": before.headers["etag"]})
+    assert after.status_code == 200
+    assert after.headers["etag"] != before.headers["etag"]
+    assert "v2 slide 0" in json.loads(after.content)["slides_data"][0]["html_content"]
+
+    page_after = await client.get(page_url, headers={"If-None-Match": page_before.headers["etag"]})
+    assert page_after.status_code == 200 and "v2 slide 0" in page_after.text
+    assert cache.get_stats()["invalidations"] >= 1
+
+
+async def test_disabling_share_takes_effect_immediately(share_app):
+    client, _, _, sync_sessions = share_app
+    url = f"/api/share/{TOKEN}/slides-data"
+    assert (await client.get(url)).status_code == 200
+
+    with sync_sessions() as db:
+        assert ShareService(db).disable_sharing(PROJECT_ID)
+
+    assert (await client.get(url)).status_code == 404
@@ -0,0 +1,165 @@
+"""演讲稿并发生成：乱序完成、按页顺序上报进度、打包调用的拆分与回退"""
+
+import asyncio
+import json
+import re
+
+import pytest
+
+from landppt.ai.base import AIResponse
+from landppt.api.models import PPTProject
+from landppt.core.config import ai_config
+from landppt.services import speech_script_service as service_module
+from landppt.services.progress_tracker import ProgressTracker
+from landppt.services.speech_script_service import SpeechScriptCustomization, SpeechScriptService
+from landppt.services.task_store import TaskStore
+
+NUM_SLIDES = 10
+
+
+class FakeProvider:
+    """按页码回答的假模型：页码越小耗时越长，保证完成顺序与页序相反"""
+
+    def __init__(self, drop_pages=(), broken_batches=(), failing_pages=()):
+        self.drop_pages = set(drop_pages)
+        self.broken_batches = set(broken_batches)
+        self.failing_pages = set(failing_pages)
+        self.calls = []
+        self.completion_order = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def text_completion(self, prompt, **kwargs):
+        packed = [int(p) for p in re.findall(r"【第(\d+)页】", prompt)]
+        pages = packed or [int(re.search(r"幻灯片位置：第(\d+)页", prompt).group(1))]
+        self.calls.append(("packed" if packed else "single", pages))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.005 * (NUM_SLIDES - pages[0] + 1))
+        finally:
+            self.in_flight -= 1
+        self.completion_order.extend(pages)
+
+        if not packed:
+            if pages[0] in self.failing_pages:
+                raise RuntimeError(f"第{pages[0]}页调用失败")
+            return AIResponse(content=f"  第{pages[0]}页单独生成  ", model="fake", usage={})
+        if pages[0] in self.broken_batches:
+            return AIResponse(content="抱歉，我无法按要求输出。", model="fake", usage={})
+        answer = [{"page": page, "script": f"第{page}页打包生成"} for page in pages if page not in self.drop_pages]
+        # 多余的未请求页面应被忽略
+        answer.append({"page": NUM_SLIDES + 5, "script": "不属于本批"})
+        return AIResponse(content=f"```json\n{json.dumps(answer, ensure_ascii=False)}\n```", model="fake", usage={})
+
+
+@pytest.fixture
+def project():
+    return PPTProject(
+        project_id="p1",
+        title="演示",
+        scenario="general",
+        topic="并发测试",
+        slides_data=[{"title": f"标题{i + 1}", "html_content": f"<p>内容{i + 1}</p>"} for i in range(NUM_SLIDES)],
+    )
+
+
+@pytest.fixture
+def tracker(tmp_path, monkeypatch):
+    tracker = ProgressTracker(store=TaskStore(str(tmp_path / "tasks.db")))
+    monkeypatch.setattr(service_module, "progress_tracker", tracker)
+    return tracker
+
+
+def make_service(monkeypatch, provider, concurrency, batch_size):
+    monkeypatch.setattr(service_module, "get_role_provider", lambda role: (provider, {"model": "fake"}))
+    monkeypatch.setattr(ai_config, "speech_script_concurrency", concurrency)
+    monkeypatch.setattr(ai_config, "speech_script_batch_size", batch_size)
+    return SpeechScriptService()
+
+
+async def generate(service, project, tracker, max_retries=2):
+    events = []
+    result = await service.generate_multi_slide_scripts_with_retry(
+        project, list(range(NUM_SLIDES)), SpeechScriptCustomization(), events.append,
+        max_retries=max_retries, task_id="task-1",
+    )
+    tracker.flush()
+    return result, events
+
+
+def reported_slides(events):
+    return [e["slide_index"] for e in events if e["type"] in ("slide_completed", "slide_failed")]
+
+
+async def test_out_of_order_completion_is_reported_in_slide_order(monkeypatch, project, tracker):
+    provider = FakeProvider()
+    service = make_service(monkeypatch, provider, concurrency=4, batch_size=0)
+    result, events = await generate(service, project, tracker)
+
+    # 并发受限且确实并发执行，完成顺序与页序不同
+    assert 1 < provider.max_in_flight <= 4
+    assert provider.completion_order != sorted(provider.completion_order)
+
+    assert result.success and result.error_message is None
+    assert [s.slide_index for s in result.scripts] == list(range(NUM_SLIDES))
+    assert [s.script_content for s in result.scripts] == [f"第{i + 1}页单独生成" for i in range(NUM_SLIDES)]
+
+    assert reported_slides(events) == list(range(NUM_SLIDES))
+    assert [e["completed"] for e in events if e["type"] == "slide_completed"] == list(range(1, NUM_SLIDES + 1))
+    # “正在生成第N页”总是指向第一个尚未上报的页面
+    announced = [e["current_slide"] for e in events if e["type"] == "progress"]
+    assert announced == sorted(announced) and announced[0] == 1
+    assert events[-1] == {"type": "completed", "successful": NUM_SLIDES, "failed": 0, "skipped": 0, "total": NUM_SLIDES}
+
+    progress = tracker.get_progress("task-1")
+    assert (progress.completed_slides, progress.failed_slides, progress.current_slide) == (NUM_SLIDES, 0, NUM_SLIDES - 1)
+    assert tracker._store.load_progress("task-1")["data"]["completed_slides"] == NUM_SLIDES
+
+
+def _fast_sleep(real_sleep):
+    """重试间隔的1秒等待缩短为0，假模型自身的短暂等待不受影响"""
+    async def sleep(delay, *args, **kwargs):
+        return await real_sleep(0 if delay >= 1 else delay, *args, **kwargs)
+    return sleep
+
+
+async def test_failed_slide_keeps_report_order(monkeypatch, project, tracker):
+    monkeypatch.setattr(service_module.asyncio, "sleep", _fast_sleep(asyncio.sleep))
+    provider = FakeProvider(failing_pages={3})
+    service = make_service(monkeypatch, provider, concurrency=3, batch_size=0)
+    result, events = await generate(service, project, tracker, max_retries=2)
+
+    assert [c for c in provider.calls if c[1] == [3]] == [("single", [3])] * 2
+    assert reported_slides(events) == list(range(NUM_SLIDES))
+    assert [e["type"] for e in events if e.get("slide_index") == 2][-1] == "slide_failed"
+    assert [s.slide_index for s in result.scripts] == [i for i in range(NUM_SLIDES) if i != 2]
+    assert result.generation_metadata["failed_slides"] == 1
+    assert tracker.get_progress("task-1").failed_slides == 1
+
+
+async def test_packed_calls_split_answers_and_fall_back(monkeypatch, project, tracker):
+    # 第1批(1-3页)漏答第2页；第2批(4-6页)回答无法解析；其余批次正常
+    provider = FakeProvider(drop_pages={2}, broken_batches={4})
+    service = make_service(monkeypatch, provider, concurrency=2, batch_size=3)
+    result, events = await generate(service, project, tracker)
+
+    packed = [pages for kind, pages in provider.calls if kind == "packed"]
+    single = sorted(pages[0] for kind, pages in provider.calls if kind == "single")
+    assert sorted(packed) == [[1, 2, 3], [4, 5, 6], [7, 8, 9], [10]]
+    assert single == [2, 4, 5, 6]
+    assert provider.max_in_flight <= 2
+
+    expected = {page: f"第{page}页打包生成" for page in range(1, NUM_SLIDES + 1)}
+    expected.update({page: f"第{page}页单独生成" for page in single})
+    assert [s.slide_index for s in result.scripts] == list(range(NUM_SLIDES))
+    assert [s.script_content for s in result.scripts] == [expected[i + 1] for i in range(NUM_SLIDES)]
+    assert reported_slides(events) == list(range(NUM_SLIDES))
+    assert tracker.get_progress("task-1").completed_slides == NUM_SLIDES
+
+
+def test_parse_batch_scripts_ignores_unrequested_and_empty_pages():
+    content = '前言 [{"page": 1, "script": " 一 "}, {"page": "2", "script": ""}, {"page": 9, "script": "九"}, "x"] 结尾'
+    assert SpeechScriptService._parse_batch_scripts(content, [0, 1]) == {0: "一"}
+    with pytest.raises(ValueError):
+        SpeechScriptService._parse_batch_scripts("没有数组", [0])
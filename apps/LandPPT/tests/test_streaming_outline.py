@@ -0,0 +1,182 @@
+"""流式文档分块与流式大纲生成"""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from summeryanyfile.core.document_processor import DocumentProcessor
+from summeryanyfile.core.models import ProcessingConfig, WorkflowMode
+from summeryanyfile.generators.ppt_generator import PPTOutlineGenerator
+
+
+async def test_abandoned_stream_releases_producer(tmp_path, monkeypatch):
+    processor = DocumentProcessor(use_magic_pdf=False, enable_cache=False, temp_dir=str(tmp_path))
+    producer_finished = threading.Event()
+
+    def endless_chunks(*args, **kwargs):
+        try:
+            i = 0
+            while True:
+                i += 1
+                yield f"chunk {i}"
+        finally:
+            producer_finished.set()
+
+    monkeypatch.setattr(processor, "stream_chunks", endless_chunks)
+
+    stream = processor.astream_chunks("unused.txt", max_pending=1)
+    assert await stream.__anext__() == "chunk 1"
+    await stream.aclose()
+
+    # 队列已满时生产线程阻塞在写入上，调用方退出后必须在有限时间内结束
+    deadline = time.monotonic() + 5
+    while not producer_finished.is_set() and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    assert producer_finished.is_set()
+
+
+class RecordingNodes:
+    def __init__(self):
+        self.calls = []
+
+    async def analyze_structure(self, state, config):
+        self.calls.append("analyze")
+        return {"document_structure": {"title": "doc"}}
+
+    async def generate_initial_outline(self, state, config):
+        self.calls.append(("initial", state["document_chunks"][0]))
+        return {"ppt_title": "doc", "total_pages": 1, "current_index": 1,
+                "slides": [{"page_number": 1, "title": "c1", "content_points": [],
+                            "slide_type": "title", "description": ""}]}
+
+    async def refine_outline(self, state, config):
+        chunk = state["document_chunks"][state["current_index"]]
+        self.calls.append(("refine", chunk))
+        slides = state["slides"] + [{"page_number": len(state["slides"]) + 1, "title": chunk,
+                                     "content_points": [], "slide_type": "content", "description": ""}]
+        return {**state, "slides": slides, "total_pages": len(slides),
+                "current_index": state["current_index"] + 1}
+
+    async def outline_chunk(self, state, chunk, index, total, config, semaphore):
+        self.calls.append(("map", chunk))
+        return {"slides": [{"page_number": index, "title": chunk, "content_points": [],
+                            "slide_type": "content", "description": ""}]}
+
+    async def reduce_outlines(self, state, config):
+        self.calls.append(("reduce", len(state["partial_outlines"])))
+        slides = [s for outline in state["partial_outlines"] for s in outline["slides"]]
+        return {"ppt_title": "doc", "slides": slides, "total_pages": len(slides)}
+
+
+def _generator(mode):
+    nodes = RecordingNodes()
+    generator = PPTOutlineGenerator.__new__(PPTOutlineGenerator)
+    generator.config = ProcessingConfig(workflow_mode=mode)
+
+    async def chunks(*args, **kwargs):
+        for chunk in ("c1", "c2", "c3"):
+            yield chunk
+
+    generator.document_processor = SimpleNamespace(astream_chunks=chunks)
+    generator.workflow_manager = SimpleNamespace(nodes=nodes)
+    return generator, nodes
+
+
+async def test_streaming_honours_iterative_mode():
+    generator, nodes = _generator(WorkflowMode.ITERATIVE)
+    outline = await generator.generate_from_file_streaming("doc.txt")
+
+    assert nodes.calls == ["analyze", ("initial", "c1"), ("refine", "c2"), ("refine", "c3")]
+    assert [slide.title for slide in outline.slides] == ["c1", "c2", "c3"]
+
+
+async def test_streaming_map_reduce_mode():
+    generator, nodes = _generator(WorkflowMode.MAP_REDUCE)
+    outline = await generator.generate_from_file_streaming("doc.txt")
+
+    assert nodes.calls[0] == "analyze"
+    assert sorted(call for call in nodes.calls[1:-1]) == [("map", "c1"), ("map", "c2"), ("map", "c3")]
+    assert nodes.calls[-1] == ("reduce", 3)
+    assert outline.total_pages == 3
+
+
+class BoundedNodes(RecordingNodes):
+    """记录在途局部大纲任务数和已生产未处理完的文档块数"""
+
+    def __init__(self, produced):
+        super().__init__()
+        self.produced = produced
+        self.processed = 0
+        self.inflight = 0
+        self.peak_inflight = 0
+        self.peak_backlog = 0
+        self.peak_retained = 0
+
+    def _track(self, state):
+        self.peak_backlog = max(self.peak_backlog, self.produced[0] - self.processed)
+        self.peak_retained = max(self.peak_retained, sum(1 for c in state["document_chunks"] if c))
+
+    async def refine_outline(self, state, config):
+        self._track(state)
+        await asyncio.sleep(0)
+        self.processed += 1
+        return {"current_index": state["current_index"] + 1}
+
+    async def outline_chunk(self, state, chunk, index, total, config, semaphore):
+        self.inflight += 1
+        self.peak_inflight = max(self.peak_inflight, self.inflight)
+        self._track(state)
+        try:
+            async with semaphore:
+                await asyncio.sleep(0.001)
+            return {"slides": [{"page_number": index, "title": f"p{index}", "content_points": [],
+                                "slide_type": "content", "description": ""}]}
+        finally:
+            self.inflight -= 1
+            self.processed += 1
+
+    async def reduce_outlines(self, state, config):
+        slides = [s for outline in state["partial_outlines"] for s in outline["slides"]]
+        return {"ppt_title": "doc", "slides": slides, "total_pages": len(slides)}
+
+
+def _large_document_generator(tmp_path, monkeypatch, mode, num_chunks):
+    processor = DocumentProcessor(use_magic_pdf=False, enable_cache=False, temp_dir=str(tmp_path))
+    produced = [0]
+
+    def many_chunks(*args, **kwargs):
+        for i in range(num_chunks):
+            produced[0] += 1
+            yield f"chunk {i} " + "x" * 4000
+
+    monkeypatch.setattr(processor, "stream_chunks", many_chunks)
+    nodes = BoundedNodes(produced)
+    generator = PPTOutlineGenerator.__new__(PPTOutlineGenerator)
+    generator.config = ProcessingConfig(workflow_mode=mode, map_concurrency=4)
+    generator.document_processor = processor
+    generator.workflow_manager = SimpleNamespace(nodes=nodes)
+    return generator, nodes
+
+
+async def test_map_reduce_bounds_inflight_tasks_on_large_input(tmp_path, monkeypatch):
+    generator, nodes = _large_document_generator(tmp_path, monkeypatch, WorkflowMode.MAP_REDUCE, 2000)
+
+    outline = await generator.generate_from_file_streaming("big.txt")
+
+    assert outline.total_pages == 2000
+    assert [slide.title for slide in outline.slides[:3]] == ["p1", "p2", "p3"]  # 按文档块顺序归并
+    # 在途任务不超过 map_concurrency 的两倍；读取受其限制，积压的块 = 队列(8) + 在途(8) + 少量交接
+    assert nodes.peak_inflight <= 8
+    assert nodes.peak_backlog <= 20
+    assert nodes.peak_retained <= 1  # state 里只留首块
+
+
+async def test_iterative_drops_refined_chunks_on_large_input(tmp_path, monkeypatch):
+    generator, nodes = _large_document_generator(tmp_path, monkeypatch, WorkflowMode.ITERATIVE, 2000)
+
+    await generator.generate_from_file_streaming("big.txt")
+
+    assert nodes.processed == 1999
+    assert nodes.peak_retained == 1  # 只有正在细化的块
+    assert nodes.peak_backlog <= 12
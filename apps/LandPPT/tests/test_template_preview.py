@@ -0,0 +1,148 @@
+"""模板预览缩略图：宽度进入URL，旧宽度/缓存丢失时按需重新渲染"""
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from landppt.api import global_master_template_api
+from landppt.core.config import app_config
+from landppt.database.models import Base, GlobalMasterTemplate
+from landppt.services import global_master_template_service, template_preview_service
+from landppt.services.template_preview_service import (
+    PREVIEW_URL_PREFIX, TemplatePreviewService, get_template_preview_service
+)
+
+HTML = "<div class='slide'>预览</div>"
+
+
+@pytest.fixture
+def renders(tmp_path, monkeypatch):
+    """不启动浏览器：渲染直接写入带宽度标记的文件"""
+    rendered = []
+
+    async def fake_render(self, key, html_template):
+        target = self.thumbnail_path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(f"webp {self.width}".encode())
+        rendered.append(self.width)
+        return target
+
+    monkeypatch.setattr(TemplatePreviewService, "_render_uncached", fake_render)
+    monkeypatch.setattr(template_preview_service, "_preview_service", None)
+    monkeypatch.setattr(app_config, "template_preview_cache_dir", str(tmp_path / "previews"))
+    monkeypatch.setattr(app_config, "template_preview_width", 480)
+    return rendered
+
+
+@pytest.fixture
+async def sessions(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'templates.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(global_master_template_service, "AsyncSessionLocal", factory)
+    yield factory
+    await engine.dispose()
+
+
+@pytest.fixture
+async def client():
+    app = FastAPI()
+    app.include_router(global_master_template_api.router)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as http:
+        yield http
+
+
+async def _add_template(sessions, preview_image):
+    async with sessions() as session:
+        template = GlobalMasterTemplate(template_name="蓝色商务", html_template=HTML, preview_image=preview_image)
+        session.add(template)
+        await session.commit()
+        return template.id
+
+
+async def _preview_of(sessions, template_id):
+    async with sessions() as session:
+        return (await session.get(GlobalMasterTemplate, template_id)).preview_image
+
+
+def test_width_is_part_of_the_url(renders):
+    service = get_template_preview_service()
+    key = service.preview_key(HTML)
+
+    assert service.preview_url(key) == f"{PREVIEW_URL_PREFIX}/{key}_480.webp"
+    assert service.parse_file_name(f"{key}_480.webp") == (key, 480)
+    assert service.parse_file_name(f"{key}.webp") == (key, None)
+    assert service.parse_file_name("../etc/passwd.webp") is None
+
+    app_config.template_preview_width = 320
+    assert get_template_preview_service().preview_url(key) == f"{PREVIEW_URL_PREFIX}/{key}_320.webp"
+
+
+async def test_cached_thumbnail_is_immutable(renders, sessions, client):
+    service = get_template_preview_service()
+    await service.render(HTML)
+    file_name = f"{service.preview_key(HTML)}_480.webp"
+
+    response = await client.get(f"{PREVIEW_URL_PREFIX}/{file_name}")
+    assert response.status_code == 200
+    assert response.content == b"webp 480"
+    assert "immutable" in response.headers["cache-control"]
+
+    revalidated = await client.get(
+        f"{PREVIEW_URL_PREFIX}/{file_name}", headers={"If-None-Match": response.headers["etag"]}
+    )
+    assert revalidated.status_code == 304
+
+
+async def test_old_width_still_on_disk_is_served(renders, sessions, client):
+    service = get_template_preview_service()
+    await service.render(HTML)
+    old_url = service.preview_url(service.preview_key(HTML))
+
+    app_config.template_preview_width = 320
+    response = await client.get(old_url)
+
+    assert response.status_code == 200 and response.content == b"webp 480"
+
+
+@pytest.mark.parametrize("old_name", ["{key}_480.webp", "{key}.webp"])
+async def test_width_change_rerenders_stale_url(renders, sessions, client, old_name):
+    service = get_template_preview_service()
+    key = service.preview_key(HTML)
+    (await service.render(HTML)).unlink()  # 旧宽度的文件已被清理
+    stale_url = f"{PREVIEW_URL_PREFIX}/{old_name.format(key=key)}"
+    template_id = await _add_template(sessions, stale_url)
+
+    app_config.template_preview_width = 320
+    response = await client.get(stale_url, follow_redirects=False)
+
+    new_url = f"{PREVIEW_URL_PREFIX}/{key}_320.webp"
+    assert response.status_code in (302, 307)
+    assert response.headers["location"] == new_url
+    assert renders == [480, 320]
+    assert await _preview_of(sessions, template_id) == new_url
+
+    followed = await client.get(new_url)
+    assert followed.status_code == 200 and followed.content == b"webp 320"
+
+
+async def test_wiped_cache_rerenders_current_url(renders, sessions, client):
+    service = get_template_preview_service()
+    key = service.preview_key(HTML)
+    url = service.preview_url(key)
+    await _add_template(sessions, url)
+
+    response = await client.get(url)
+
+    assert response.status_code == 200
+    assert response.content == b"webp 480"
+    assert renders == [480]
+
+
+async def test_unknown_preview_is_not_rendered(renders, sessions, client):
+    response = await client.get(f"{PREVIEW_URL_PREFIX}/{'0' * 64}_480.webp")
+
+    assert response.status_code == 404
+    assert renders == []
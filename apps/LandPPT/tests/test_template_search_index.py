@@ -0,0 +1,42 @@
+"""模板搜索：FTS5索引在进程运行期间由迁移创建时应被检测到"""
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from landppt.database.migrations import DatabaseMigration
+from landppt.database.models import Base, GlobalMasterTemplate
+from landppt.database.repositories import GlobalMasterTemplateRepository
+
+
+@pytest.fixture
+async def session(tmp_path, monkeypatch):
+    monkeypatch.setattr(GlobalMasterTemplateRepository, "_fts_tokenizer", None)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'templates.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        session.add(GlobalMasterTemplate(template_name="Business Blue", description="quarterly report",
+                                         html_template="<div></div>", tags=["business"]))
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+async def test_search_index_created_after_first_search_is_used(session):
+    repo = GlobalMasterTemplateRepository(session)
+
+    rows, total = await repo.get_templates_paginated(search="quarterly")
+    assert total == 1
+    # 索引不存在时回退到LIKE，但不把"不可用"缓存到进程结束
+    assert GlobalMasterTemplateRepository._fts_tokenizer is None
+
+    await DatabaseMigration()._migration_009_up(session)
+
+    rows, total = await repo.get_templates_paginated(search="quarterly")
+    assert total == 1 and rows[0].template_name == "Business Blue"
+    assert GlobalMasterTemplateRepository._fts_tokenizer in ("trigram", "unicode61")
+
+    await DatabaseMigration()._migration_009_down(session)
+    assert GlobalMasterTemplateRepository._fts_tokenizer is None
+    rows, total = await repo.get_templates_paginated(search="quarterly")
+    assert total == 1
@@ -0,0 +1,21 @@
+"""工作流模式解析：未知值回退到默认模式"""
+
+import logging
+
+from summeryanyfile.core.models import ProcessingConfig, WorkflowMode
+
+
+def test_parse_known_values():
+    assert WorkflowMode.parse("map_reduce") is WorkflowMode.MAP_REDUCE
+    assert WorkflowMode.parse(" Map_Reduce ") is WorkflowMode.MAP_REDUCE
+    assert WorkflowMode.parse(WorkflowMode.ITERATIVE) is WorkflowMode.ITERATIVE
+    assert WorkflowMode.parse(None) is WorkflowMode.ITERATIVE
+
+
+def test_unknown_value_falls_back_with_warning(caplog):
+    with caplog.at_level(logging.WARNING):
+        assert WorkflowMode.parse("mapreduce") is WorkflowMode.ITERATIVE
+    assert "mapreduce" in caplog.text
+
+    config = ProcessingConfig(workflow_mode="parallel")
+    assert config.workflow_mode is WorkflowMode.ITERATIVE
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ASR推理后端
+
+默认使用 PyTorch（eager, fp32）。设置 ASR_BACKEND=onnx 后，SenseVoiceSmall 的
+编码器 + CTC 头改由导出的 int8 量化 ONNX 图在 ONNX Runtime 会话池中执行；
+特征提取(fbank/LFR/CMVN)、VAD 编排、CTC 贪心解码和分词器仍复用 AutoModel 中
+已加载的组件，因此两条路径的输入输出格式完全一致。
+
+环境变量:
+  ASR_BACKEND                 pytorch | onnx（默认 pytorch）
+  ASR_ONNX_QUANTIZE           是否使用 int8 量化图（默认 true）
+  ASR_ONNX_DIR                ONNX 模型目录（默认与模型权重同目录，缺失时自动导出）
+  ASR_ONNX_SESSIONS           会话池大小（默认 2）
+  ASR_ONNX_INTRA_OP_THREADS   每个会话的算子内线程数（默认 CPU核数/会话数）
+  ASR_ONNX_INTER_OP_THREADS   每个会话的算子间线程数（默认 1）
+
+基准测试（同一批本地 WAV 对比 PyTorch fp32 与 ORT int8 的 RTF、p95 延迟和输出一致性）:
+  python asr_backends.py --wav-dir ./wavs
+"""
+
+import logging
+import os
+import queue
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+BACKEND_PYTORCH = "pytorch"
+BACKEND_ONNX = "onnx"
+
+# SenseVoice 导出图的输入输出（见 export_utils._onnx / 模型的 export_input_names）
+ONNX_INPUT_NAMES = ("speech", "speech_lengths", "language", "textnorm")
+
+
+def get_backend_name() -> str:
+    """当前配置的推理后端"""
+    backend = os.getenv("ASR_BACKEND", BACKEND_PYTORCH).strip().lower()
+    if backend not in (BACKEND_PYTORCH, BACKEND_ONNX):
+        logger.warning(f"未知的 ASR_BACKEND={backend}，使用 {BACKEND_PYTORCH}")
+        return BACKEND_PYTORCH
+    return backend
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes")
+
+
+class OrtSessionPool:
+    """ONNX Runtime 会话池
+
+    单个会话虽然可以并发 run，但所有请求会争用同一组算子内线程；每个并发请求
+    借用独立会话，线程数按 CPU 核数在会话间均分，避免线程超额订阅。
+    """
+
+    def __init__(self, model_path: str, size: int = 2,
+                 intra_op_threads: Optional[int] = None, inter_op_threads: int = 1):
+        import onnxruntime as ort
+
+        self.model_path = model_path
+        self.size = max(1, size)
+        cpu_count = os.cpu_count() or 1
+        self.intra_op_threads = intra_op_threads or max(1, cpu_count // self.size)
+        self.inter_op_threads = max(1, inter_op_threads)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.intra_op_threads
+        options.inter_op_num_threads = self.inter_op_threads
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self._sessions: "queue.Queue" = queue.Queue()
+        for _ in range(self.size):
+            self._sessions.put(
+                ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+            )
+
+        session = self._sessions.queue[0]
+        input_names = tuple(i.name for i in session.get_inputs())
+        missing = [name for name in ONNX_INPUT_NAMES if name not in input_names]
+        if missing:
+            raise ValueError(f"ONNX 模型缺少输入 {missing}: {model_path}")
+
+    @contextmanager
+    def acquire(self):
+        session = self._sessions.get()
+        try:
+            yield session
+        finally:
+            self._sessions.put(session)
+
+    def run(self, feeds: Dict[str, np.ndarray]):
+        with self.acquire() as session:
+            return session.run(None, feeds)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "model_path": self.model_path,
+            "sessions": self.size,
+            "intra_op_threads": self.intra_op_threads,
+            "inter_op_threads": self.inter_op_threads,
+        }
+
+
+def _unique_consecutive(yseq: np.ndarray) -> np.ndarray:
+    if yseq.size == 0:
+        return yseq
+    keep = np.ones(yseq.shape[0], dtype=bool)
+    keep[1:] = yseq[1:] != yseq[:-1]
+    return yseq[keep]
+
+
+class OrtSenseVoice(torch.nn.Module):
+    """用 ONNX Runtime 执行编码器和 CTC 头的 SenseVoiceSmall
+
+    包装 AutoModel 中已加载的 PyTorch 模型：语言/文本正则 id、blank id 等仍取自
+    原模型，ORT 不支持的选项（如 output_timestamp）回退到 PyTorch 推理。
+    """
+
+    def __init__(self, torch_model: torch.nn.Module, sessions: OrtSessionPool):
+        super().__init__()
+        self.model = torch_model
+        self.sessions = sessions
+
+    def inference(self, data_in, data_lengths=None, key: list = None,
+                  tokenizer=None, frontend=None, **kwargs):
+        from funasr.utils.load_utils import extract_fbank, load_audio_text_image_video
+
+        if kwargs.get("output_timestamp", False):
+            return self.model.inference(data_in, data_lengths=data_lengths, key=key,
+                                        tokenizer=tokenizer, frontend=frontend, **kwargs)
+
+        key = key or ["wav_file_tmp_name"]
+        meta_data = {}
+        if isinstance(data_in, torch.Tensor) and kwargs.get("data_type", "sound") == "fbank":  # fbank
+            speech, speech_lengths = data_in, data_lengths
+            if len(speech.shape) < 3:
+                speech = speech[None, :, :]
+            if speech_lengths is None:
+                speech_lengths = torch.tensor([speech.shape[1]])
+        else:
+            # extract fbank feats
+            time1 = time.perf_counter()
+            audio_sample_list = load_audio_text_image_video(
+                data_in,
+                fs=frontend.fs,
+                audio_fs=kwargs.get("fs", 16000),
+                data_type=kwargs.get("data_type", "sound"),
+                tokenizer=tokenizer,
+            )
+            time2 = time.perf_counter()
+            meta_data["load_data"] = f"{time2 - time1:0.3f}"
+            speech, speech_lengths = extract_fbank(
+                audio_sample_list, data_type=kwargs.get("data_type", "sound"), frontend=frontend
+            )
+            time3 = time.perf_counter()
+            meta_data["extract_feat"] = f"{time3 - time2:0.3f}"
+            meta_data["batch_data_time"] = (
+                speech_lengths.sum().item() * frontend.frame_shift * frontend.lfr_n / 1000
+            )
+
+        ctc_logits, encoder_out_lens = self.forward_logits(
+            speech, speech_lengths,
+            language=kwargs.get("language", "auto"),
+            use_itn=kwargs.get("use_itn", False),
+            text_norm=kwargs.get("text_norm", None),
+        )
+        if kwargs.get("ban_emo_unk", False):
+            ctc_logits[:, :, self.model.emo_dict["unk"]] = -np.inf
+
+        results = []
+        if isinstance(key[0], (list, tuple)):
+            key = key[0]
+        if len(key) < ctc_logits.shape[0]:
+            key = key * ctc_logits.shape[0]
+        for i in range(ctc_logits.shape[0]):
+            # CTC 贪心解码：argmax 与 log_softmax 后的 argmax 相同，无需归一化
+            yseq = _unique_consecutive(ctc_logits[i, : int(encoder_out_lens[i])].argmax(axis=-1))
+            token_int = yseq[yseq != self.model.blank_id].tolist()
+            results.append({"key": key[i], "text": tokenizer.decode(token_int)})
+        return results, meta_data
+
+    def forward_logits(self, speech: torch.Tensor, speech_lengths: torch.Tensor,
+                       language: str = "auto", use_itn: bool = False, text_norm: Optional[str] = None):
+        """执行导出图，返回 (ctc_logits, encoder_out_lens) 的 numpy 数组"""
+        if text_norm is None:
+            text_norm = "withitn" if use_itn else "woitn"
+        batch_size = speech.shape[0]
+        feeds = {
+            "speech": speech.detach().cpu().numpy().astype(np.float32, copy=False),
+            "speech_lengths": speech_lengths.detach().cpu().numpy().astype(np.int32),
+            "language": np.full([batch_size], self.model.lid_dict.get(language, 0), dtype=np.int32),
+            "textnorm": np.full([batch_size], self.model.textnorm_dict[text_norm], dtype=np.int32),
+        }
+        ctc_logits, encoder_out_lens = self.sessions.run(feeds)
+        return ctc_logits, encoder_out_lens
+
+
+def ensure_onnx_export(model_name: str, model_dir: str, quantize: bool = True,
+                       output_dir: Optional[str] = None) -> str:
+    """返回导出的 ONNX 模型路径，不存在时导出一次
+
+    导出使用独立的 AutoModel 实例（export 会修改实例的 kwargs），不影响线上模型。
+    """
+    output_dir = output_dir or model_dir
+    model_file = "model_quant.onnx" if quantize else "model.onnx"
+    model_path = os.path.join(output_dir, model_file)
+    if os.path.exists(model_path):
+        return model_path
+
+    from funasr import AutoModel
+
+    logger.info(f"🔄 正在导出 ONNX 模型: {model_name} -> {output_dir} (quantize={quantize})")
+    exporter = AutoModel(model=model_name, device="cpu", disable_update=True)
+    exporter.export(type="onnx", quantize=quantize, output_dir=output_dir)
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"ONNX 导出后未找到 {model_path}")
+    return model_path
+
+
+def enable_onnx_backend(auto_model, model_name: str) -> OrtSenseVoice:
+    """把 AutoModel 的 ASR 模型替换为 ONNX Runtime 实现（VAD 等子模型不变）"""
+    quantize = _env_flag("ASR_ONNX_QUANTIZE", True)
+    model_dir = auto_model.model_path or os.path.dirname(auto_model.kwargs.get("init_param", ""))
+    model_path = ensure_onnx_export(model_name, model_dir, quantize=quantize,
+                                    output_dir=os.getenv("ASR_ONNX_DIR") or None)
+
+    intra_op = os.getenv("ASR_ONNX_INTRA_OP_THREADS")
+    sessions = OrtSessionPool(
+        model_path,
+        size=int(os.getenv("ASR_ONNX_SESSIONS", "2")),
+        intra_op_threads=int(intra_op) if intra_op else None,
+        inter_op_threads=int(os.getenv("ASR_ONNX_INTER_OP_THREADS", "1")),
+    )
+    ort_model = OrtSenseVoice(auto_model.model, sessions)
+    auto_model.model = ort_model
+    logger.info(f"✅ ONNX Runtime 后端已启用: {sessions.describe()}")
+    return ort_model
+
+
+def describe_backend(auto_model) -> Dict[str, Any]:
+    """健康检查用的后端信息"""
+    if auto_model is not None and isinstance(auto_model.model, OrtSenseVoice):
+        return {"backend": BACKEND_ONNX, **auto_model.model.sessions.describe()}
+    return {"backend": BACKEND_PYTORCH}
+
+
+# ========================================
+# 基准测试
+# ========================================
+
+def _char_error_rate(ref: str, hyp: str) -> float:
+    """字符级编辑距离 / 参考长度"""
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1] / len(ref)
+
+
+def _run_backend(auto_model, wavs: List[str], language: str, repeats: int):
+    import soundfile as sf
+
+    latencies, durations, texts = [], [], []
+    for path in wavs:
+        audio, sr = sf.read(path, dtype="float32")
+        if audio.ndim > 1:
+            audio = audio[:, 0]
+        duration = len(audio) / sr
+        # 第一次调用预热（线程池、内存分配），不计入统计
+        auto_model.generate(input=audio, cache={}, language=language, use_itn=True, batch_size_s=60)
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = auto_model.generate(input=audio, cache={}, language=language, use_itn=True, batch_size_s=60)
+            latencies.append(time.perf_counter() - start)
+            durations.append(duration)
+        texts.append(result[0].get("text", "") if result else "")
+    latencies_arr = np.array(latencies)
+    return {
+        "rtf": float(latencies_arr.sum() / sum(durations)),
+        "p50_ms": float(np.percentile(latencies_arr, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies_arr, 95) * 1000),
+    }, texts
+
+
+def _benchmark(args):
+    from funasr import AutoModel
+
+    wavs = sorted(
+        os.path.join(args.wav_dir, name) for name in os.listdir(args.wav_dir) if name.lower().endswith(".wav")
+    )
+    if not wavs:
+        raise SystemExit(f"{args.wav_dir} 中没有 WAV 文件")
+
+    def build():
+        return AutoModel(model=args.model, vad_model="fsmn-vad",
+                         vad_kwargs={"max_single_segment_time": 30000},
+                         device="cpu", disable_update=True, disable_pbar=True)
+
+    torch_model = build()
+    torch_stats, torch_texts = _run_backend(torch_model, wavs, args.language, args.repeats)
+
+    ort_model = build()
+    enable_onnx_backend(ort_model, args.model)
+    ort_stats, ort_texts = _run_backend(ort_model, wavs, args.language, args.repeats)
+
+    cers = [_char_error_rate(ref, hyp) for ref, hyp in zip(torch_texts, ort_texts)]
+    exact = sum(ref == hyp for ref, hyp in zip(torch_texts, ort_texts))
+    print(f"文件数: {len(wavs)}, 每个文件重复 {args.repeats} 次")
+    print(f"PyTorch fp32 : RTF={torch_stats['rtf']:.4f}  p50={torch_stats['p50_ms']:.1f}ms  p95={torch_stats['p95_ms']:.1f}ms")
+    print(f"ORT int8     : RTF={ort_stats['rtf']:.4f}  p50={ort_stats['p50_ms']:.1f}ms  p95={ort_stats['p95_ms']:.1f}ms")
+    print(f"输出一致性   : 完全一致 {exact}/{len(wavs)}, 平均CER(以PyTorch为参考)={np.mean(cers):.4f}, 最大={max(cers):.4f}")
+    if max(cers) > args.tolerance:
+        raise SystemExit(f"❌ ORT 输出与 PyTorch 差异超过容差 {args.tolerance}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    os.environ.setdefault("MODELSCOPE_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models"))
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="PyTorch fp32 与 ONNX Runtime int8 推理后端对比")
+    parser.add_argument("--wav-dir", required=True, help="本地 WAV 文件目录")
+    parser.add_argument("--model", default="iic/SenseVoiceSmall")
+    parser.add_argument("--language", default="auto")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.05, help="允许的最大单文件CER差异")
+    _benchmark(parser.parse_args())
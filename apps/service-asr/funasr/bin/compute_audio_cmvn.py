@@ -1,9 +1,12 @@
 import os
 import json
+import time
 import numpy as np
 import torch
 import hydra
 import logging
+import concurrent.futures
+import multiprocessing
 from omegaconf import DictConfig, OmegaConf
 
 from funasr.register import tables
@@ -26,24 +29,69 @@ def main_hydra(kwargs: DictConfig):
     main(**kwargs)
 
 
-def main(**kwargs):
-    print(kwargs)
-    # set random seed
-    # tables.print()
-    set_all_random_seed(kwargs.get("seed", 0))
-    torch.backends.cudnn.enabled = kwargs.get("cudnn_enabled", torch.backends.cudnn.enabled)
-    torch.backends.cudnn.benchmark = kwargs.get("cudnn_benchmark", torch.backends.cudnn.benchmark)
-    torch.backends.cudnn.deterministic = kwargs.get("cudnn_deterministic", True)
+class CmvnStats:
+    """Per-dimension frame statistics kept as (count, mean, M2).
+
+    Updating with a whole utterance and merging two partials both use the
+    pairwise formula of Chan et al., so partials computed on any split of the
+    corpus merge to the same result as one pass, without the cancellation of
+    accumulating raw sums of squares.
+    """
+
+    def __init__(self, count=0, mean=None, m2=None):
+        self.count = int(count)
+        self.mean = None if mean is None else np.asarray(mean, dtype=np.float64)
+        self.m2 = None if m2 is None else np.asarray(m2, dtype=np.float64)
 
-    tokenizer = kwargs.get("tokenizer", None)
+    def update(self, frames):
+        frames = np.asarray(frames, dtype=np.float64)
+        if frames.shape[0] == 0:
+            return self
+        mean = frames.mean(axis=0)
+        m2 = np.square(frames - mean).sum(axis=0)
+        return self.merge(CmvnStats(frames.shape[0], mean, m2))
 
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean.copy(), other.m2.copy()
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.count / count)
+        self.m2 = self.m2 + other.m2 + np.square(delta) * (self.count * other.count / count)
+        self.count = count
+        return self
+
+    @property
+    def var(self):
+        return self.m2 / self.count
+
+    def save(self, path, **extra):
+        # write then rename so an interrupted checkpoint never replaces a good one
+        tmp_path = f"{path}.tmp.npz"
+        empty = np.zeros(0)
+        mean = empty if self.mean is None else self.mean
+        m2 = empty if self.m2 is None else self.m2
+        np.savez(tmp_path, count=self.count, mean=mean, m2=m2, **extra)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            mean = data["mean"] if data["mean"].size else None
+            m2 = data["m2"] if data["m2"].size else None
+            extra = {k: data[k].item() for k in data.files if k not in ("count", "mean", "m2")}
+            return cls(data["count"].item(), mean, m2), extra
+
+
+def build_dataset(kwargs):
     # build frontend if frontend is none None
     frontend = kwargs.get("frontend", None)
     if frontend is not None:
         frontend_class = tables.frontend_classes.get(frontend)
         frontend = frontend_class(**kwargs["frontend_conf"])
-        kwargs["frontend"] = frontend
-        kwargs["input_size"] = frontend.output_size()
 
     # dataset
     dataset_class = tables.dataset_classes.get(kwargs.get("dataset", "AudioDataset"))
@@ -54,51 +102,143 @@ def main(**kwargs):
         is_training=False,
         **kwargs.get("dataset_conf"),
     )
+    return dataset_train
 
-    # dataloader
-    batch_sampler = kwargs["dataset_conf"].get("batch_sampler", "BatchSampler")
-    batch_sampler_class = tables.batch_sampler_classes.get(batch_sampler)
-    dataset_conf = kwargs.get("dataset_conf")
-    dataset_conf["batch_type"] = "example"
-    dataset_conf["batch_size"] = 1
-    dataset_conf["num_workers"] = os.cpu_count() or 32
-    batch_sampler_train = batch_sampler_class(dataset_train, is_training=False, **dataset_conf)
-
-    dataloader_train = torch.utils.data.DataLoader(
-        dataset_train, collate_fn=dataset_train.collator, **batch_sampler_train
+
+def partial_fingerprint(kwargs, num_samples, num_workers):
+    """Describe the inputs a partial was computed from, so a rerun only resumes matching ones."""
+    manifest = kwargs.get("train_data_set_list")
+    manifest_stat = None
+    if isinstance(manifest, str) and os.path.isfile(manifest):
+        st = os.stat(manifest)
+        manifest, manifest_stat = os.path.abspath(manifest), [st.st_size, st.st_mtime_ns]
+    frontend_conf = kwargs.get("frontend_conf")
+    if isinstance(frontend_conf, DictConfig):
+        frontend_conf = OmegaConf.to_container(frontend_conf, resolve=True)
+    return json.dumps(
+        {
+            "manifest": str(manifest),
+            "manifest_stat": manifest_stat,
+            "num_samples": num_samples,
+            "num_workers": num_workers,
+            "frontend": kwargs.get("frontend"),
+            "frontend_conf": frontend_conf,
+            "dataset_conf": kwargs.get("dataset_conf"),
+        },
+        sort_keys=True,
+        default=str,
     )
 
-    total_frames = 0
-    for batch_idx, batch in enumerate(dataloader_train):
-        iter_stop = int(kwargs.get("scale", -1.0) * len(dataloader_train))
-        log_step = iter_stop // 100
-        if batch_idx % log_step == 0:
-            logging.info(f"prcessed: {batch_idx}/{iter_stop}")
-        if batch_idx >= iter_stop and iter_stop > 0.0:
-            logging.info(f"prcessed: {iter_stop}/{iter_stop}")
-            break
-
-        fbank = batch["speech"].numpy()[0, :, :]
-        if total_frames == 0:
-            mean_stats = np.sum(fbank, axis=0)
-            var_stats = np.sum(np.square(fbank), axis=0)
+
+def compute_shard(kwargs, shard_id, indices, partial_file, checkpoint_interval=1000, fingerprint=""):
+    """Accumulate the statistics of ``indices``, resuming from ``partial_file`` if present.
+
+    A partial whose fingerprint differs from ``fingerprint`` was computed from another
+    manifest, split or frontend; it is discarded and the shard starts over.
+    """
+    torch.set_num_threads(1)
+    stats, position = CmvnStats(), 0
+    if os.path.exists(partial_file):
+        partial, extra = CmvnStats.load(partial_file)
+        if extra.get("fingerprint") == fingerprint:
+            stats, position = partial, int(extra["position"])
+            logging.info(f"shard {shard_id}: resume from {position}/{len(indices)}")
         else:
-            mean_stats += np.sum(fbank, axis=0)
-            var_stats += np.sum(np.square(fbank), axis=0)
-        total_frames += fbank.shape[0]
+            logging.warning(f"shard {shard_id}: {partial_file} was computed from other inputs, discarded")
+            os.remove(partial_file)
+    if position >= len(indices):
+        return stats
+
+    dataset = build_dataset(kwargs)
+    log_step = max(len(indices) // 100, 1)
+    for position in range(position, len(indices)):
+        fbank = dataset[int(indices[position])]["speech"].numpy()
+        stats.update(fbank)
+        if (position + 1) % checkpoint_interval == 0:
+            stats.save(partial_file, position=position + 1, fingerprint=fingerprint)
+        if position % log_step == 0:
+            logging.info(f"shard {shard_id}: prcessed: {position}/{len(indices)}")
+    stats.save(partial_file, position=len(indices), fingerprint=fingerprint)
+    return stats
+
 
+def main(**kwargs):
+    print(kwargs)
+    # set random seed
+    # tables.print()
+    set_all_random_seed(kwargs.get("seed", 0))
+    torch.backends.cudnn.enabled = kwargs.get("cudnn_enabled", torch.backends.cudnn.enabled)
+    torch.backends.cudnn.benchmark = kwargs.get("cudnn_benchmark", torch.backends.cudnn.benchmark)
+    torch.backends.cudnn.deterministic = kwargs.get("cudnn_deterministic", True)
+
+    if isinstance(kwargs.get("dataset_conf"), DictConfig):
+        kwargs["dataset_conf"] = OmegaConf.to_container(kwargs["dataset_conf"], resolve=True)
+    kwargs["dataset_conf"] = dict(kwargs.get("dataset_conf") or {})
+
+    num_samples = len(build_dataset(kwargs))
+    scale = kwargs.get("scale", -1.0)
+    if scale > 0:
+        num_samples = min(num_samples, int(scale * num_samples))
+
+    num_workers = max(1, min(int(kwargs.get("num_workers", os.cpu_count() or 1)), num_samples))
+    cmvn_file = kwargs.get("cmvn_file", "cmvn.json")
+    partial_dir = kwargs.get("partial_dir", f"{cmvn_file}.partials")
+    os.makedirs(partial_dir, exist_ok=True)
+    checkpoint_interval = int(kwargs.get("checkpoint_interval", 1000))
+
+    # contiguous slices keep each worker's reads local; the file names and the
+    # fingerprint pin the split, so a resumed job must use the same num_workers
+    shards = np.array_split(np.arange(num_samples), num_workers)
+    fingerprint = partial_fingerprint(kwargs, num_samples, num_workers)
+    jobs = [
+        (
+            kwargs,
+            shard_id,
+            indices,
+            os.path.join(partial_dir, f"shard_{shard_id:04d}_of_{num_workers:04d}.npz"),
+            checkpoint_interval,
+            fingerprint,
+        )
+        for shard_id, indices in enumerate(shards)
+    ]
+    logging.info(f"computing cmvn of {num_samples} samples with {num_workers} workers")
+
+    beg = time.perf_counter()
+    if num_workers == 1:
+        partials = [compute_shard(*jobs[0])]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=num_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            partials = list(executor.map(compute_shard, *zip(*jobs)))
+
+    stats = CmvnStats()
+    for partial in partials:
+        stats.merge(partial)
+    logging.info(f"total_frames: {stats.count}, time: {time.perf_counter() - beg:.2f}s")
+
+    write_cmvn(stats, cmvn_file)
+    for job in jobs:
+        os.remove(job[3])
+    if not os.listdir(partial_dir):
+        os.rmdir(partial_dir)
+
+
+def write_cmvn(stats, cmvn_file):
+    total_frames = stats.count
+    mean_stats = stats.mean * total_frames
+    var_stats = stats.m2 + np.square(stats.mean) * total_frames
     cmvn_info = {
         "mean_stats": mean_stats.tolist(),
         "var_stats": var_stats.tolist(),
         "total_frames": total_frames,
     }
-    cmvn_file = kwargs.get("cmvn_file", "cmvn.json")
     # import pdb;pdb.set_trace()
     with open(cmvn_file, "w") as fout:
         fout.write(json.dumps(cmvn_info))
 
-    mean = -1.0 * mean_stats / total_frames
-    var = 1.0 / np.sqrt(var_stats / total_frames - mean * mean)
+    mean = -1.0 * stats.mean
+    var = 1.0 / np.sqrt(stats.var)
     dims = mean.shape[0]
     am_mvn = os.path.dirname(cmvn_file) + "/am.mvn"
     with open(am_mvn, "w") as fout:
@@ -130,7 +270,7 @@ python funasr/bin/compute_audio_cmvn.py \
 --config-name "train_asr_paraformer_conformer_12e_6d_2048_256.yaml" \
 ++train_data_set_list="/Users/zhifu/funasr1.0/data/list/audio_datasets.jsonl" \
 ++cmvn_file="/Users/zhifu/funasr1.0/data/list/cmvn.json" \
-++dataset_conf.num_workers=0
+++num_workers=8
 """
 if __name__ == "__main__":
     main_hydra()
@@ -256,6 +256,7 @@ def main(**kwargs):
         trainer.train_loss_avg = 0.0
 
     if trainer.rank == 0:
+        trainer.wait_checkpoints()
         average_checkpoints(trainer.output_dir, trainer.avg_nbest_model)
 
     trainer.close()
@@ -1,8 +1,10 @@
 import torch
 import random
+import logging
 
 
 from funasr.register import tables
+from funasr.datasets.audio_datasets.feature_cache import FeatureCache
 from funasr.utils.load_utils import extract_fbank, load_audio_text_image_video
 
 
@@ -52,11 +54,45 @@ class AudioDataset(torch.utils.data.Dataset):
         self.int_pad_value = int_pad_value
         self.float_pad_value = float_pad_value
 
+        self.feature_cache = None
+        feature_cache_dir = kwargs.get("feature_cache_dir", None)
+        if feature_cache_dir:
+            if self.preprocessor_speech is not None:
+                logging.warning("feature cache is disabled, preprocessor_speech augments every epoch")
+            else:
+                self.feature_cache = FeatureCache(feature_cache_dir, frontend)
+
+    def load_speech(self, source):
+        """Features of ``source``, served from the feature cache when enabled."""
+        key = None
+        if self.feature_cache is not None:
+            key = self.feature_cache.make_key(source)
+            cached = self.feature_cache.get(key)
+            if cached is not None:
+                return cached
+
+        data_src = load_audio_text_image_video(source, fs=self.fs)
+        if self.preprocessor_speech:
+            data_src = self.preprocessor_speech(data_src, fs=self.fs)
+
+        speech, speech_lengths = extract_fbank(
+            data_src, data_type=self.data_type, frontend=self.frontend, is_final=True
+        )  # speech: [b, T, d]
+        speech = speech[0, :, :]
+
+        if key is not None:
+            self.feature_cache.put(key, speech, speech_lengths)
+        return speech, speech_lengths
+
     def get_source_len(self, index):
+        if getattr(self.index_ds, "source_lens", None) is not None:
+            return int(self.index_ds.source_lens[index])
         item = self.index_ds[index]
         return self.index_ds.get_source_len(item)
 
     def get_target_len(self, index):
+        if getattr(self.index_ds, "target_lens", None) is not None:
+            return int(self.index_ds.target_lens[index])
         item = self.index_ds[index]
         return self.index_ds.get_target_len(item)
 
@@ -68,13 +104,7 @@ class AudioDataset(torch.utils.data.Dataset):
         # import pdb;
         # pdb.set_trace()
         source = item["source"]
-        data_src = load_audio_text_image_video(source, fs=self.fs)
-        if self.preprocessor_speech:
-            data_src = self.preprocessor_speech(data_src, fs=self.fs)
-
-        speech, speech_lengths = extract_fbank(
-            data_src, data_type=self.data_type, frontend=self.frontend, is_final=True
-        )  # speech: [b, T, d]
+        speech, speech_lengths = self.load_speech(source)  # speech: [T, d]
 
         target = item["target"]
         if self.preprocessor_text:
@@ -90,7 +120,7 @@ class AudioDataset(torch.utils.data.Dataset):
         text_lengths = torch.tensor([ids_lengths], dtype=torch.int32)
 
         return {
-            "speech": speech[0, :, :],
+            "speech": speech,
             "speech_lengths": speech_lengths,
             "text": text,
             "text_lengths": text_lengths,
@@ -135,12 +165,7 @@ class AudioDatasetHotword(AudioDataset):
         # import pdb;
         # pdb.set_trace()
         source = item["source"]
-        data_src = load_audio_text_image_video(source, fs=self.fs)
-        if self.preprocessor_speech:
-            data_src = self.preprocessor_speech(data_src, fs=self.fs)
-        speech, speech_lengths = extract_fbank(
-            data_src, data_type=self.data_type, frontend=self.frontend, is_final=True
-        )  # speech: [b, T, d]
+        speech, speech_lengths = self.load_speech(source)  # speech: [T, d]
 
         target = item["target"]
         if self.preprocessor_text:
@@ -201,7 +226,7 @@ class AudioDatasetHotword(AudioDataset):
 
         hotword_indx = generate_index(text_lengths[0])
         return {
-            "speech": speech[0, :, :],
+            "speech": speech,
             "speech_lengths": speech_lengths,
             "text": text,
             "text_lengths": text_lengths,
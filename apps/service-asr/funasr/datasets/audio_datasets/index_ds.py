@@ -8,6 +8,7 @@ import random
 import torch.distributed as dist
 
 from funasr.register import tables
+from funasr.datasets.audio_datasets.jsonl_index import KIND_TEXT, JsonlIndex
 
 
 @tables.register("index_ds_classes", "IndexDSJsonl")
@@ -75,6 +76,23 @@ class IndexDSJsonlRankFull(torch.utils.data.Dataset):
         # logging.info(
         #     f"is_training: {is_training}, file_list_rank: {file_list_rank}")
 
+        self.index = None
+        if kwargs.get("jsonl_index", True):
+            # columnar memory-mapped index, samples are parsed lazily on access
+            self.index = JsonlIndex(
+                [f.strip() for f in file_list],
+                min_source_length=self.min_source_length,
+                max_source_length=self.max_source_length,
+                min_target_length=self.min_target_length,
+                max_target_length=self.max_target_length,
+                max_token_length=self.max_token_length,
+                cache_dir=kwargs.get("index_cache_dir", None),
+            )
+            self.source_lens = self.index.source_len
+            self.target_lens = self.index.target_len
+            logging.info("total_num of samplers: {}, {}".format(len(self.index), path))
+            return
+
         # contents = []
         # for file_json in file_list_rank:
         contents = []
@@ -85,15 +103,8 @@ class IndexDSJsonlRankFull(torch.utils.data.Dataset):
                     if "text" in data:  # for sft
                         contents.append(data["text"])
                     if "source" in data:  # for speech lab pretrain
-                        prompt = data.get("prompt", "<ASR>")
-                        source = data["source"].replace(
-                            "/cpfs01", "/cpfs_speech/data"
-                        )  # only use in alibaba gpu group: .replace("/cpfs01", "/cpfs_speech/data")
-                        target = data["target"]
                         source_len = data.get("source_len", 1)
                         target_len = data.get("target_len", 0)
-                        if "aishell" in source:
-                            target = target.replace(" ", "")
                         if (
                             source_len < self.min_source_length
                             or source_len > self.max_source_length
@@ -108,35 +119,53 @@ class IndexDSJsonlRankFull(torch.utils.data.Dataset):
                         if (source_len + target_len) > self.max_token_length:
                             continue
 
-                        contents_i = {
-                            "source": source,
-                            "prompt": prompt,
-                            "target": target,
-                            "source_len": source_len,
-                            "target_len": target_len,
-                        }
-                        text_language = data.get("text_language", None)
-                        if text_language is not None:
-                            contents_i["text_language"] = text_language
-                        if "emo_target" in data:
-                            contents_i["emo_target"] = data["emo_target"]
-                        if "event_target" in data:
-                            contents_i["event_target"] = data["event_target"]
-                        if "with_or_wo_itn" in data:
-                            contents_i["with_or_wo_itn"] = data["with_or_wo_itn"]
-                        # audio_language = data.get("audio_language", None)
-                        # if audio_language is not None:
-                        #     contents_i["audio_language"] = audio_language
-                        contents.append(contents_i)
+                        contents.append(self._make_item(data, data.get("prompt", "<ASR>")))
 
         self.contents = contents
 
         logging.info("total_num of samplers: {}, {}".format(len(self.contents), path))
 
+    @staticmethod
+    def _make_item(data, prompt):
+        source = data["source"].replace(
+            "/cpfs01", "/cpfs_speech/data"
+        )  # only use in alibaba gpu group: .replace("/cpfs01", "/cpfs_speech/data")
+        target = data["target"]
+        if "aishell" in source:
+            target = target.replace(" ", "")
+
+        contents_i = {
+            "source": source,
+            "prompt": prompt,
+            "target": target,
+            "source_len": data.get("source_len", 1),
+            "target_len": data.get("target_len", 0),
+        }
+        text_language = data.get("text_language", None)
+        if text_language is not None:
+            contents_i["text_language"] = text_language
+        if "emo_target" in data:
+            contents_i["emo_target"] = data["emo_target"]
+        if "event_target" in data:
+            contents_i["event_target"] = data["event_target"]
+        if "with_or_wo_itn" in data:
+            contents_i["with_or_wo_itn"] = data["with_or_wo_itn"]
+        # audio_language = data.get("audio_language", None)
+        # if audio_language is not None:
+        #     contents_i["audio_language"] = audio_language
+        return contents_i
+
     def __len__(self):
+        if self.index is not None:
+            return len(self.index)
         return len(self.contents)
 
     def __getitem__(self, index):
+        if self.index is not None:
+            data = self.index.read(index)
+            if self.index.kind[index] == KIND_TEXT:
+                return data["text"]
+            return self._make_item(data, self.index.prompt(index))
 
         data = self.contents[index]
 
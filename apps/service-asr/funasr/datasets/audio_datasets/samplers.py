@@ -240,7 +240,34 @@ class CustomDistributedBufferBatchSampler(Sampler):
         self.epoch = epoch
 
 
+def load_source_lengths(dataset):
+    """Source lengths of all samples as an int64 array, read once.
+
+    Uses the length column of a memory-mapped jsonl index when the dataset has
+    one, otherwise asks the dataset sample by sample.
+    """
+    source_lens = getattr(getattr(dataset, "index_ds", None), "source_lens", None)
+    if source_lens is not None and len(source_lens) == len(dataset):
+        return np.asarray(source_lens, dtype=np.int64)
+    return np.fromiter(
+        (dataset.get_source_len(idx) for idx in range(len(dataset))),
+        dtype=np.int64,
+        count=len(dataset),
+    )
+
+
 class CustomDistributedDynamicBatchSampler(DistributedSampler):
+    """Token-budget batches packed from length-sorted buckets.
+
+    Every epoch the samples are shuffled with (seed, epoch), dealt to ranks and
+    cut into buckets of ``bucket_size``; each bucket is sorted by length and
+    packed greedily so that ``max_len * num_samples <= batch_size``, and the
+    batch order is shuffled again. Batches of all ranks are planned from the
+    same length array, so every rank reports and yields the same number of
+    batches (short ranks repeat some of their own batches, a rank with none
+    repeats batches of the other ranks).
+    """
+
     def __init__(
         self,
         dataset,
@@ -270,54 +297,80 @@ class CustomDistributedDynamicBatchSampler(DistributedSampler):
         self.total_size = len(self.dataset)
         # self.num_samples = int(math.ceil(self.total_size / self.num_replicas))
         self.epoch = 0
+        self.seed = kwargs.get("seed", 0)
         self.max_token_length = kwargs.get("max_token_length", 2048)
         self.length_scale_source = kwargs.get("length_scale_source", 1.0)
+        self.bucket_size = kwargs.get("bucket_size", 1024)
+        self.lengths = load_source_lengths(dataset)
+        self._batches = None
 
-    def __iter__(self):
-        if self.shuffle:
-            g = torch.Generator()
-            g.manual_seed(self.epoch)
-            indices = torch.randperm(len(self.dataset), generator=g).tolist()
-        else:
-            indices = list(range(len(self.dataset)))
-
-        indices = indices[self.rank : self.total_size : self.num_replicas]
-
+    def _pack(self, indices):
         batches = []
         batch = []
         max_len_in_batch = 0
-        current_batch_length = 0
-
-        for idx in indices:
-            sample_length = self.dataset.get_source_len(idx)
-            if sample_length > self.max_token_length:
-                continue
-            potential_batch_length = (
-                max_len_in_batch if sample_length < max_len_in_batch else sample_length
-            ) * (len(batch) + 1)
-
-            if potential_batch_length <= self.batch_size:
-                batch.append(idx)
-                if sample_length > max_len_in_batch:
-                    max_len_in_batch = sample_length
-                    # current_batch_length = max_len_in_batch * len(batch)
-            else:
+        for idx, sample_length in zip(indices.tolist(), self.lengths[indices].tolist()):
+            # ascending within a bucket, so the new sample sets the batch max length
+            if batch and max(max_len_in_batch, sample_length) * (len(batch) + 1) > self.batch_size:
                 batches.append(batch)
-                batch = [idx]
-                max_len_in_batch = sample_length
-                # current_batch_length = max_len_in_batch
-
-        # Add the last batch if it's not empty and we're not dropping it
-        if batch and (not self.drop_last or len(batch) * max_len_in_batch == self.batch_size):
+                batch = []
+                max_len_in_batch = 0
+            batch.append(idx)
+            max_len_in_batch = max(max_len_in_batch, sample_length)
+        if batch:
             batches.append(batch)
+        return batches
 
-        return iter(batches)
+    def _rank_batches(self, rank):
+        indices = self._indices[rank : self.total_size : self.num_replicas]
+        indices = indices[self.lengths[indices] <= self.max_token_length]
 
-    def __len__(self):
+        batches = []
+        for beg in range(0, len(indices), self.bucket_size):
+            bucket = indices[beg : beg + self.bucket_size]
+            bucket = bucket[np.argsort(self.lengths[bucket], kind="stable")]
+            batches.extend(self._pack(bucket))
+
+        if (
+            batches
+            and self.drop_last
+            and len(batches[-1]) * int(self.lengths[batches[-1]].max()) != self.batch_size
+        ):
+            batches.pop()
+        if self.shuffle:
+            rng = np.random.default_rng([self.seed, self.epoch, rank])
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        return batches
+
+    def _plan(self):
+        if self._batches is not None:
+            return self._batches
+        if self.shuffle:
+            self._indices = np.random.default_rng([self.seed, self.epoch]).permutation(self.total_size)
+        else:
+            self._indices = np.arange(self.total_size)
+
+        # plan every rank so they all agree on the number of batches
+        all_batches = [self._rank_batches(rank) for rank in range(self.num_replicas)]
+        num_batches = max(len(batches) for batches in all_batches)
+        batches = all_batches[self.rank]
+        if len(batches) < num_batches:
+            # a rank left without batches of its own borrows other ranks' batches,
+            # otherwise it would yield nothing and the others hang in all-reduce
+            pool = batches or [batch for rank_batches in all_batches for batch in rank_batches]
+            offset = 0 if batches else self.rank
+            batches = batches + [pool[(offset + i) % len(pool)] for i in range(num_batches - len(batches))]
+        self._batches = batches
+        return batches
 
-        return 1
+    def __iter__(self):
+        return iter(self._plan())
+
+    def __len__(self):
+        return len(self._plan())
 
     def set_epoch(self, epoch):
+        if epoch != self.epoch:
+            self._batches = None
         self.epoch = epoch
 
 
@@ -82,10 +82,14 @@ class FunASR(torch.utils.data.Dataset):
         self.min_output_non_mask_token_len = kwargs.get("min_non_mask_token_len", 6)  # [eos]
 
     def get_source_len(self, index):
+        if getattr(self.index_ds, "source_lens", None) is not None:
+            return int(self.index_ds.source_lens[index])
         item = self.index_ds[index]
         return self.index_ds.get_source_len(item)
 
     def get_target_len(self, index):
+        if getattr(self.index_ds, "target_lens", None) is not None:
+            return int(self.index_ds.target_lens[index])
         item = self.index_ds[index]
         return self.index_ds.get_target_len(item)
 
@@ -52,10 +52,14 @@ class AudioLLMNARDataset(torch.utils.data.Dataset):
         self.int_pad_value = self.IGNORE_INDEX
 
     def get_source_len(self, index):
+        if getattr(self.index_ds, "source_lens", None) is not None:
+            return int(self.index_ds.source_lens[index])
         item = self.index_ds[index]
         return self.index_ds.get_source_len(item)
 
     def get_target_len(self, index):
+        if getattr(self.index_ds, "target_lens", None) is not None:
+            return int(self.index_ds.target_lens[index])
         item = self.index_ds[index]
         return self.index_ds.get_target_len(item)
 
@@ -211,10 +215,14 @@ class AudioLLMDataset(torch.utils.data.Dataset):
         self.int_pad_value = self.IGNORE_INDEX
 
     def get_source_len(self, index):
+        if getattr(self.index_ds, "source_lens", None) is not None:
+            return int(self.index_ds.source_lens[index])
         item = self.index_ds[index]
         return self.index_ds.get_source_len(item)
 
     def get_target_len(self, index):
+        if getattr(self.index_ds, "target_lens", None) is not None:
+            return int(self.index_ds.target_lens[index])
         item = self.index_ds[index]
         return self.index_ds.get_target_len(item)
 
@@ -346,10 +354,14 @@ class AudioLLMARDataset(torch.utils.data.Dataset):
         self.int_pad_value = self.IGNORE_INDEX
 
     def get_source_len(self, index):
+        if getattr(self.index_ds, "source_lens", None) is not None:
+            return int(self.index_ds.source_lens[index])
         item = self.index_ds[index]
         return self.index_ds.get_source_len(item)
 
     def get_target_len(self, index):
+        if getattr(self.index_ds, "target_lens", None) is not None:
+            return int(self.index_ds.target_lens[index])
         item = self.index_ds[index]
         return self.index_ds.get_target_len(item)
 
@@ -54,10 +54,14 @@ class AudioLLMQwenAudioDataset(torch.utils.data.Dataset):
         self.answer_template = "{}"
 
     def get_source_len(self, index):
+        if getattr(self.index_ds, "source_lens", None) is not None:
+            return int(self.index_ds.source_lens[index])
         item = self.index_ds[index]
         return self.index_ds.get_source_len(item)
 
     def get_target_len(self, index):
+        if getattr(self.index_ds, "target_lens", None) is not None:
+            return int(self.index_ds.target_lens[index])
         item = self.index_ds[index]
         return self.index_ds.get_target_len(item)
 
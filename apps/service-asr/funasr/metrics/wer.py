@@ -2,14 +2,30 @@ import os
 import numpy as np
 import sys
 import hydra
+import multiprocessing
 from omegaconf import DictConfig, OmegaConf, ListConfig
 
 
+def read_trans(trans_file, cn_postprocess=False):
+    trans_dict = {}
+    with open(trans_file, "r") as trans_reader:
+        for line in trans_reader:
+            fields = line.strip().split()
+            key = fields[0]
+            value = fields[1:]
+            if cn_postprocess:
+                value = [x for x in "".join(value)]
+            trans_dict[key] = value
+    return trans_dict
+
+
 def compute_wer(
     ref_file,
     hyp_file,
     cer_file,
     cn_postprocess=False,
+    ncpu=1,
+    chunk_size=1000,
 ):
     rst = {
         "Wrd": 0,
@@ -24,166 +40,217 @@ def compute_wer(
         "wrong_sentences": 0,
     }
 
-    hyp_dict = {}
-    ref_dict = {}
-    with open(hyp_file, "r") as hyp_reader:
-        for line in hyp_reader:
-            key = line.strip().split()[0]
-            value = line.strip().split()[1:]
-            if cn_postprocess:
-                value = " ".join(value)
-                value = value.replace(" ", "")
-                # if value[0] == "请":
-                #     value = value[1:]
-                value = [x for x in value]
-            hyp_dict[key] = value
-    with open(ref_file, "r") as ref_reader:
-        for line in ref_reader:
-            key = line.strip().split()[0]
-            value = line.strip().split()[1:]
-            if cn_postprocess:
-                value = " ".join(value)
-                value = value.replace(" ", "")
-                value = [x for x in value]
-            ref_dict[key] = value
-
-    cer_detail_writer = open(cer_file, "w")
-    for hyp_key in hyp_dict:
-        if hyp_key in ref_dict:
-            out_item = compute_wer_by_line(hyp_dict[hyp_key], ref_dict[hyp_key])
-            rst["Wrd"] += out_item["nwords"]
-            rst["Corr"] += out_item["cor"]
-            rst["wrong_words"] += out_item["wrong"]
-            rst["Ins"] += out_item["ins"]
-            rst["Del"] += out_item["del"]
-            rst["Sub"] += out_item["sub"]
-            rst["Snt"] += 1
-            if out_item["wrong"] > 0:
-                rst["wrong_sentences"] += 1
-            cer_detail_writer.write(hyp_key + print_cer_detail(out_item) + "\n")
-            cer_detail_writer.write(
-                "ref:" + "\t" + " ".join(list(map(lambda x: x.lower(), ref_dict[hyp_key]))) + "\n"
-            )
-            cer_detail_writer.write(
-                "hyp:" + "\t" + " ".join(list(map(lambda x: x.lower(), hyp_dict[hyp_key]))) + "\n"
-            )
-            cer_detail_writer.flush()
-
-    if rst["Wrd"] > 0:
-        rst["Err"] = round(rst["wrong_words"] * 100 / rst["Wrd"], 2)
-    if rst["Snt"] > 0:
-        rst["S.Err"] = round(rst["wrong_sentences"] * 100 / rst["Snt"], 2)
-
-    cer_detail_writer.write("\n")
-    cer_detail_writer.write(
-        "%WER "
-        + str(rst["Err"])
-        + " [ "
-        + str(rst["wrong_words"])
-        + " / "
-        + str(rst["Wrd"])
-        + ", "
-        + str(rst["Ins"])
-        + " ins, "
-        + str(rst["Del"])
-        + " del, "
-        + str(rst["Sub"])
-        + " sub ]"
-        + "\n"
-    )
-    cer_detail_writer.write(
-        "%SER "
-        + str(rst["S.Err"])
-        + " [ "
-        + str(rst["wrong_sentences"])
-        + " / "
-        + str(rst["Snt"])
-        + " ]"
-        + "\n"
-    )
-    cer_detail_writer.write(
-        "Scored "
-        + str(len(hyp_dict))
-        + " sentences, "
-        + str(len(hyp_dict) - rst["Snt"])
-        + " not present in hyp."
-        + "\n"
-    )
+    hyp_dict = read_trans(hyp_file, cn_postprocess)
+    ref_dict = read_trans(ref_file, cn_postprocess)
+
+    pairs = [(key, hyp_dict[key], ref_dict[key]) for key in hyp_dict if key in ref_dict]
+    chunks = [pairs[i : i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+
+    # utterances are scored in shards but written back in input order, so the
+    # detail file does not depend on ncpu
+    with open(cer_file, "w", buffering=1 << 20) as cer_detail_writer:
+        if ncpu > 1 and len(chunks) > 1:
+            with multiprocessing.Pool(ncpu) as pool:
+                results = pool.imap(score_chunk, chunks)
+                _write_chunks(results, rst, cer_detail_writer)
+        else:
+            _write_chunks(map(score_chunk, chunks), rst, cer_detail_writer)
+
+        if rst["Wrd"] > 0:
+            rst["Err"] = round(rst["wrong_words"] * 100 / rst["Wrd"], 2)
+        if rst["Snt"] > 0:
+            rst["S.Err"] = round(rst["wrong_sentences"] * 100 / rst["Snt"], 2)
+
+        cer_detail_writer.write("\n")
+        cer_detail_writer.write(
+            "%WER "
+            + str(rst["Err"])
+            + " [ "
+            + str(rst["wrong_words"])
+            + " / "
+            + str(rst["Wrd"])
+            + ", "
+            + str(rst["Ins"])
+            + " ins, "
+            + str(rst["Del"])
+            + " del, "
+            + str(rst["Sub"])
+            + " sub ]"
+            + "\n"
+        )
+        cer_detail_writer.write(
+            "%SER "
+            + str(rst["S.Err"])
+            + " [ "
+            + str(rst["wrong_sentences"])
+            + " / "
+            + str(rst["Snt"])
+            + " ]"
+            + "\n"
+        )
+        cer_detail_writer.write(
+            "Scored "
+            + str(len(hyp_dict))
+            + " sentences, "
+            + str(len(hyp_dict) - rst["Snt"])
+            + " not present in hyp."
+            + "\n"
+        )
 
-    cer_detail_writer.close()
+
+def _write_chunks(results, rst, cer_detail_writer):
+    for detail, counts in results:
+        cer_detail_writer.write(detail)
+        for name, value in counts.items():
+            rst[name] += value
+
+
+def score_chunk(pairs, max_cells=1 << 22):
+    """Score a shard of (key, hyp, ref) and render its part of the detail file."""
+    hyps = [list(map(lambda x: x.lower(), hyp)) for _, hyp, _ in pairs]
+    refs = [list(map(lambda x: x.lower(), ref)) for _, _, ref in pairs]
+
+    # align length-sorted batches so padding stays small and memory is bounded
+    out_items = [None] * len(pairs)
+    order = sorted(range(len(pairs)), key=lambda n: (len(hyps[n]), len(refs[n])))
+    beg = 0
+    while beg < len(order):
+        end = beg + 1
+        max_ref = len(refs[order[beg]])
+        while end < len(order):
+            last = order[end]
+            max_ref = max(max_ref, len(refs[last]))
+            if (end - beg + 1) * (len(hyps[last]) + 1) * (max_ref + 1) > max_cells:
+                break
+            end += 1
+        batch = order[beg:end]
+        for n, out_item in zip(batch, align_batch([hyps[n] for n in batch], [refs[n] for n in batch])):
+            out_items[n] = out_item
+        beg = end
+
+    counts = {"Wrd": 0, "Corr": 0, "Ins": 0, "Del": 0, "Sub": 0, "Snt": 0, "wrong_words": 0, "wrong_sentences": 0}
+    lines = []
+    for (key, _, _), hyp, ref, out_item in zip(pairs, hyps, refs, out_items):
+        counts["Wrd"] += out_item["nwords"]
+        counts["Corr"] += out_item["cor"]
+        counts["wrong_words"] += out_item["wrong"]
+        counts["Ins"] += out_item["ins"]
+        counts["Del"] += out_item["del"]
+        counts["Sub"] += out_item["sub"]
+        counts["Snt"] += 1
+        if out_item["wrong"] > 0:
+            counts["wrong_sentences"] += 1
+        lines.append(key + print_cer_detail(out_item) + "\n")
+        lines.append("ref:" + "\t" + " ".join(ref) + "\n")
+        lines.append("hyp:" + "\t" + " ".join(hyp) + "\n")
+    return "".join(lines), counts
+
+
+def align_ops(hyps, refs):
+    """Edit-distance cost and operation matrices of a batch of token lists.
+
+    All pairs advance one hypothesis row at a time: a row is first computed from
+    the previous row only (match/substitution and insertion), then the in-row
+    deletion chain is resolved with a running minimum. Shorter pairs are padded
+    with ids that never match; padding cells never feed back into a pair's own
+    cells. Operations use the same tie-break as the scalar recurrence:
+    0 correct, 1 substitution, 2 insertion, 3 deletion.
+
+    Returns:
+        (cost_matrix, ops_matrix) of shape [batch, max_hyp + 1, max_ref + 1]
+    """
+    batch = len(hyps)
+    max_hyp = max((len(hyp) for hyp in hyps), default=0)
+    max_ref = max((len(ref) for ref in refs), default=0)
+
+    vocab = {}
+    hyp_ids = np.full((batch, max_hyp), -1, dtype=np.int64)
+    ref_ids = np.full((batch, max_ref), -2, dtype=np.int64)
+    for b, (hyp, ref) in enumerate(zip(hyps, refs)):
+        hyp_ids[b, : len(hyp)] = [vocab.setdefault(x, len(vocab)) for x in hyp]
+        ref_ids[b, : len(ref)] = [vocab.setdefault(x, len(vocab)) for x in ref]
+
+    cost_matrix = np.zeros((batch, max_hyp + 1, max_ref + 1), dtype=np.int32)
+    ops_matrix = np.zeros((batch, max_hyp + 1, max_ref + 1), dtype=np.int8)
+    steps = np.arange(max_ref + 1, dtype=np.int32)
+    cost_matrix[:, 0, :] = steps
+    cost_matrix[:, :, 0] = np.arange(max_hyp + 1, dtype=np.int32)
+    if max_ref == 0:
+        return cost_matrix, ops_matrix
+
+    for i in range(1, max_hyp + 1):
+        prev = cost_matrix[:, i - 1]
+        match = hyp_ids[:, i - 1, None] == ref_ids
+        substitution = prev[:, :-1] + 1
+        insertion = prev[:, 1:] + 1
+        row = np.empty_like(prev)
+        row[:, 0] = i
+        row[:, 1:] = np.minimum(np.where(match, prev[:, :-1], substitution), insertion)
+        # deletion: row[j] = min(row[j], row[j - 1] + 1), resolved for the whole row at once
+        row = np.minimum.accumulate(row - steps, axis=1) + steps
+        cost_matrix[:, i] = row
+
+        ops = np.where(row[:, 1:] == substitution, 1, np.where(row[:, 1:] == insertion, 2, 3))
+        ops_matrix[:, i, 1:] = np.where(match, 0, ops)
+    return cost_matrix, ops_matrix
+
+
+def align_batch(hyps, refs):
+    """Counts of :func:`compute_wer_by_line` for a batch of lower-cased token lists.
+
+    The backtrace walks every pair at once from (len_hyp, len_ref), following
+    the same steps (including the boundary handling) as the scalar walk.
+    """
+    cost_matrix, ops_matrix = align_ops(hyps, refs)
+    batch = len(hyps)
+    len_hyp = np.array([len(hyp) for hyp in hyps], dtype=np.int64)
+    len_ref = np.array([len(ref) for ref in refs], dtype=np.int64)
+    pair = np.arange(batch)
+
+    cor = np.zeros(batch, dtype=np.int64)
+    ins = np.zeros(batch, dtype=np.int64)
+    dele = np.zeros(batch, dtype=np.int64)
+    sub = np.zeros(batch, dtype=np.int64)
+    i = len_hyp.copy()
+    j = len_ref.copy()
+    active = (i >= 0) | (j >= 0)
+    while active.any():
+        op = ops_matrix[pair, np.maximum(0, i), np.maximum(0, j)]
+        correct = active & (op == 0)
+        insert = active & (op == 2)
+        delete = active & (op == 3)
+        substitute = active & (op == 1)
+
+        cor += correct & (i - 1 >= 0) & (j - 1 >= 0)
+        ins += insert
+        dele += delete
+        sub += substitute
+        i -= correct | insert | substitute
+        j -= correct | delete | substitute
+
+        dele += active & (i < 0) & (j >= 0)
+        ins += active & (j < 0) & (i >= 0)
+        active = (i >= 0) | (j >= 0)
+
+    wrong = cost_matrix[pair, len_hyp, len_ref]
+    return [
+        {
+            "nwords": int(len_ref[b]),
+            "cor": int(cor[b]),
+            "wrong": int(wrong[b]),
+            "ins": int(ins[b]),
+            "del": int(dele[b]),
+            "sub": int(sub[b]),
+        }
+        for b in range(batch)
+    ]
 
 
 def compute_wer_by_line(hyp, ref):
     hyp = list(map(lambda x: x.lower(), hyp))
     ref = list(map(lambda x: x.lower(), ref))
 
-    len_hyp = len(hyp)
-    len_ref = len(ref)
-
-    cost_matrix = np.zeros((len_hyp + 1, len_ref + 1), dtype=np.int16)
-
-    ops_matrix = np.zeros((len_hyp + 1, len_ref + 1), dtype=np.int8)
-
-    for i in range(len_hyp + 1):
-        cost_matrix[i][0] = i
-    for j in range(len_ref + 1):
-        cost_matrix[0][j] = j
-
-    for i in range(1, len_hyp + 1):
-        for j in range(1, len_ref + 1):
-            if hyp[i - 1] == ref[j - 1]:
-                cost_matrix[i][j] = cost_matrix[i - 1][j - 1]
-            else:
-                substitution = cost_matrix[i - 1][j - 1] + 1
-                insertion = cost_matrix[i - 1][j] + 1
-                deletion = cost_matrix[i][j - 1] + 1
-
-                compare_val = [substitution, insertion, deletion]
-
-                min_val = min(compare_val)
-                operation_idx = compare_val.index(min_val) + 1
-                cost_matrix[i][j] = min_val
-                ops_matrix[i][j] = operation_idx
-
-    match_idx = []
-    i = len_hyp
-    j = len_ref
-    rst = {"nwords": len_ref, "cor": 0, "wrong": 0, "ins": 0, "del": 0, "sub": 0}
-    while i >= 0 or j >= 0:
-        i_idx = max(0, i)
-        j_idx = max(0, j)
-
-        if ops_matrix[i_idx][j_idx] == 0:  # correct
-            if i - 1 >= 0 and j - 1 >= 0:
-                match_idx.append((j - 1, i - 1))
-                rst["cor"] += 1
-
-            i -= 1
-            j -= 1
-
-        elif ops_matrix[i_idx][j_idx] == 2:  # insert
-            i -= 1
-            rst["ins"] += 1
-
-        elif ops_matrix[i_idx][j_idx] == 3:  # delete
-            j -= 1
-            rst["del"] += 1
-
-        elif ops_matrix[i_idx][j_idx] == 1:  # substitute
-            i -= 1
-            j -= 1
-            rst["sub"] += 1
-
-        if i < 0 and j >= 0:
-            rst["del"] += 1
-        elif j < 0 and i >= 0:
-            rst["ins"] += 1
-
-    match_idx.reverse()
-    wrong_cnt = cost_matrix[len_hyp][len_ref]
-    rst["wrong"] = wrong_cnt
-
-    return rst
+    return align_batch([hyp], [ref])[0]
 
 
 def print_cer_detail(rst):
@@ -206,19 +273,49 @@ def print_cer_detail(rst):
     )
 
 
+def _benchmark(num_utts=100000, ncpu=1, work_dir="."):
+    """Score a synthetic corpus of ``num_utts`` utterances and report the wall time."""
+    import time
+
+    rng = np.random.default_rng(0)
+    vocab = [chr(0x4E00 + i) for i in range(3000)]
+    ref_file = os.path.join(work_dir, "bench.ref")
+    hyp_file = os.path.join(work_dir, "bench.hyp")
+    with open(ref_file, "w") as ref_writer, open(hyp_file, "w") as hyp_writer:
+        for n in range(num_utts):
+            ref = list(rng.choice(vocab, rng.integers(5, 40)))
+            hyp = [w for w in ref if rng.random() > 0.05]
+            for k in range(len(hyp)):
+                if rng.random() < 0.05:
+                    hyp[k] = vocab[rng.integers(len(vocab))]
+            if rng.random() < 0.1:
+                hyp.insert(rng.integers(len(hyp) + 1), vocab[rng.integers(len(vocab))])
+            ref_writer.write(f"utt{n} " + " ".join(ref) + "\n")
+            hyp_writer.write(f"utt{n} " + " ".join(hyp) + "\n")
+
+    beg = time.perf_counter()
+    compute_wer(ref_file, hyp_file, os.path.join(work_dir, "bench.wer"), ncpu=ncpu)
+    print(f"scored {num_utts} utterances with ncpu={ncpu} in {time.perf_counter() - beg:.2f}s")
+
+
 @hydra.main(config_name=None, version_base=None)
 def main_hydra(cfg: DictConfig):
+    if cfg.get("benchmark", 0):
+        _benchmark(cfg.get("benchmark"), cfg.get("ncpu", 1), cfg.get("work_dir", "."))
+        sys.exit(0)
+
     ref_file = cfg.get("ref_file", None)
     hyp_file = cfg.get("hyp_file", None)
     cer_file = cfg.get("cer_file", None)
     cn_postprocess = cfg.get("cn_postprocess", False)
+    ncpu = cfg.get("ncpu", 1)
     if ref_file is None or hyp_file is None or cer_file is None:
         print(
-            "usage : python -m  funasr.metrics.wer ++ref_file=test.ref ++hyp_file=test.hyp ++cer_file=test.wer ++cn_postprocess=false"
+            "usage : python -m  funasr.metrics.wer ++ref_file=test.ref ++hyp_file=test.hyp ++cer_file=test.wer ++cn_postprocess=false ++ncpu=1"
         )
         sys.exit(0)
 
-    compute_wer(ref_file, hyp_file, cer_file, cn_postprocess)
+    compute_wer(ref_file, hyp_file, cer_file, cn_postprocess, ncpu)
 
 
 if __name__ == "__main__":
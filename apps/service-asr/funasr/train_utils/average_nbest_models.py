@@ -16,6 +16,18 @@ from collections import OrderedDict
 from functools import cmp_to_key
 
 
+def _load_checkpoint(path):
+    """
+    Load a checkpoint memory-mapped, so tensors that are never touched (e.g. the
+    optimizer state) are never read into RAM. Falls back to a regular load for
+    checkpoints in the legacy (non-zipfile) format.
+    """
+    try:
+        return torch.load(path, map_location="cpu", mmap=True)
+    except (RuntimeError, TypeError):
+        return torch.load(path, map_location="cpu")
+
+
 def _get_checkpoint_paths(output_dir: str, last_n: int = 5, use_deepspeed=False, **kwargs):
     """
     Get the paths of the last 'last_n' checkpoints by parsing filenames
@@ -23,11 +35,10 @@ def _get_checkpoint_paths(output_dir: str, last_n: int = 5, use_deepspeed=False,
     """
     try:
         if not use_deepspeed:
-            checkpoint = torch.load(os.path.join(output_dir, "model.pt"), map_location="cpu")
+            checkpoint = _load_checkpoint(os.path.join(output_dir, "model.pt"))
         else:
-            checkpoint = torch.load(
-                os.path.join(output_dir, "model.pt", "mp_rank_00_model_states.pt"),
-                map_location="cpu",
+            checkpoint = _load_checkpoint(
+                os.path.join(output_dir, "model.pt", "mp_rank_00_model_states.pt")
             )
         avg_keep_nbest_models_type = checkpoint["avg_keep_nbest_models_type"]
         val_step_or_epoch = checkpoint[f"val_{avg_keep_nbest_models_type}_step_or_epoch"]
@@ -44,7 +55,7 @@ def _get_checkpoint_paths(output_dir: str, last_n: int = 5, use_deepspeed=False,
             checkpoint_paths.append(ckpt)
 
     except:
-        print(f"{checkpoint} does not exist, avg the lastet checkpoint.")
+        print(f"{os.path.join(output_dir, 'model.pt')} does not exist, avg the lastet checkpoint.")
         # List all files in the output directory
         files = os.listdir(output_dir)
         # Filter out checkpoint files and extract epoch numbers
@@ -62,36 +73,53 @@ def average_checkpoints(output_dir: str, last_n: int = 5, **kwargs):
     """
     Average the last 'last_n' checkpoints' model state_dicts.
     If a tensor is of type torch.int, perform sum instead of average.
+
+    Checkpoints are streamed one at a time into a running sum, so peak memory is
+    about one model (plus the accumulator) no matter how many are averaged.
     """
     checkpoint_paths = _get_checkpoint_paths(output_dir, last_n, **kwargs)
     print(f"average_checkpoints: {checkpoint_paths}")
-    state_dicts = []
 
-    # Load state_dicts from checkpoints
+    # Sum state_dicts checkpoint by checkpoint into one running accumulator
+    sum_state_dict = None
+    dtypes = {}
+    num_loaded = 0
     for path in checkpoint_paths:
-        if os.path.isfile(path):
-            state_dicts.append(torch.load(path, map_location="cpu")["state_dict"])
-        else:
+        if not os.path.isfile(path):
             print(f"Checkpoint file {path} not found.")
+            continue
+        state_dict = _load_checkpoint(path)["state_dict"]
+        if sum_state_dict is None:
+            sum_state_dict = OrderedDict()
+            for key, tensor in state_dict.items():
+                dtypes[key] = tensor.dtype
+                acc_dtype = (
+                    torch.promote_types(tensor.dtype, torch.float32)
+                    if tensor.is_floating_point()
+                    else tensor.dtype
+                )
+                sum_state_dict[key] = tensor.to(acc_dtype, copy=True)
+        else:
+            for key, acc in sum_state_dict.items():
+                acc.add_(state_dict[key].to(acc.dtype))
+        num_loaded += 1
+        del state_dict
 
     # Check if we have any state_dicts to average
-    if len(state_dicts) < 1:
+    if num_loaded < 1:
         print("No checkpoints found for averaging.")
         return
 
-    # Average or sum weights
+    # Average or sum weights, releasing each accumulator as soon as it is converted
     avg_state_dict = OrderedDict()
-    for key in state_dicts[0].keys():
-        tensors = [state_dict[key].cpu() for state_dict in state_dicts]
-        # Check the type of the tensor
-        if str(tensors[0].dtype).startswith("torch.int"):
+    while sum_state_dict:
+        key, acc = sum_state_dict.popitem(last=False)
+        if str(dtypes[key]).startswith("torch.int"):
             # Perform sum for integer tensors
-            summed_tensor = sum(tensors)
-            avg_state_dict[key] = summed_tensor
+            avg_state_dict[key] = acc
         else:
             # Perform average for other types of tensors
-            stacked_tensors = torch.stack(tensors)
-            avg_state_dict[key] = torch.mean(stacked_tensors, dim=0)
+            avg_state_dict[key] = acc.div_(num_loaded).to(dtypes[key])
     checkpoint_outpath = os.path.join(output_dir, f"model.pt.avg{last_n}")
     torch.save({"state_dict": avg_state_dict}, checkpoint_outpath)
     return checkpoint_outpath
@@ -0,0 +1,179 @@
+"""Background checkpoint writing for the trainer.
+
+``save`` snapshots the state to CPU memory (pinned for CUDA tensors, so the
+device-to-host copies run asynchronously) and hands the snapshot to a writer thread,
+so training only stalls for the copy instead of for serialization and disk I/O.
+Each checkpoint is serialized once to a temporary file, fsynced and renamed into
+place; aliases such as ``model.pt`` and ``model.pt.best`` are hard links to it that
+are swapped in atomically, so a crash never leaves a truncated checkpoint behind.
+"""
+
+import os
+import copy
+import shutil
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+
+def snapshot_state(state, pin_memory=True):
+    """Copy of ``state`` that is independent of the live model and trainer.
+
+    Tensors are copied to CPU (into pinned memory when they live on a GPU), tensors
+    sharing a storage view stay shared, and other leaves are deep-copied so later
+    updates of e.g. ``saved_ckpts`` do not leak into a pending checkpoint.
+    """
+    memo = {}
+    synchronize = False
+
+    def copy_tensor(tensor):
+        nonlocal synchronize
+        key = (tensor.device, tensor.data_ptr(), tensor.dtype, tuple(tensor.shape), tensor.stride())
+        if key in memo:
+            return memo[key]
+        tensor = tensor.detach()
+        if tensor.is_cuda:
+            out = torch.empty_like(tensor, device="cpu", pin_memory=pin_memory)
+            out.copy_(tensor, non_blocking=pin_memory)
+            synchronize = synchronize or pin_memory
+        else:
+            out = tensor.clone()
+        memo[key] = out
+        return out
+
+    def visit(value):
+        if isinstance(value, torch.Tensor):
+            return copy_tensor(value)
+        if isinstance(value, dict):
+            return type(value)((k, visit(v)) for k, v in value.items())
+        if isinstance(value, (list, tuple)) and not hasattr(value, "_fields"):
+            return type(value)(visit(v) for v in value)
+        return copy.deepcopy(value)
+
+    snapshot = visit(state)
+    if synchronize:
+        torch.cuda.synchronize()
+    return snapshot
+
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _tmp_name(path):
+    # hidden, so a crash mid-write never leaves a file matching the model.pt.* globs
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.tmp.{os.getpid()}")
+
+
+def remove_stale_tmp(directory):
+    """Delete partial checkpoints left behind by a writer that was killed."""
+    for name in os.listdir(directory):
+        if name.startswith(".model.pt") and ".tmp." in name:
+            logging.info(f"Delete partial checkpoint: {name}")
+            os.remove(os.path.join(directory, name))
+
+
+def atomic_save(state, filename, aliases=()):
+    """Write ``state`` to ``filename`` once and point every alias at it atomically."""
+    directory = os.path.dirname(os.path.abspath(filename))
+    tmp = _tmp_name(filename)
+    try:
+        with open(tmp, "wb") as fout:
+            torch.save(state, fout)
+            fout.flush()
+            os.fsync(fout.fileno())
+        os.replace(tmp, filename)
+        for alias in aliases:
+            alias_tmp = _tmp_name(alias)
+            if os.path.lexists(alias_tmp):
+                os.remove(alias_tmp)
+            try:
+                os.link(filename, alias_tmp)
+            except OSError:
+                # filesystems without hard links get a full copy
+                shutil.copyfile(filename, alias_tmp)
+            os.replace(alias_tmp, alias)
+    finally:
+        for path in (tmp, *(_tmp_name(alias) for alias in aliases)):
+            if os.path.lexists(path):
+                os.remove(path)
+    _fsync_dir(directory)
+
+
+class CheckpointWriter:
+    """Serializes checkpoints in order on a background thread.
+
+    Args:
+        async_save: write on the background thread, otherwise ``save`` blocks until
+            the checkpoint is on disk
+        max_pending: checkpoints allowed in flight; ``save`` waits for the oldest one
+            beyond that, bounding the host memory held by snapshots
+        pin_memory: snapshot CUDA tensors into pinned host memory
+    """
+
+    def __init__(self, async_save=True, max_pending=1, pin_memory=True):
+        self.async_save = async_save
+        self.max_pending = max(1, int(max_pending))
+        self.pin_memory = pin_memory and torch.cuda.is_available()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ckpt_writer")
+        self._pending = []
+
+    def _submit(self, fn, *args):
+        if not self.async_save:
+            fn(*args)
+            return
+        # a single worker runs jobs in submission order, so removals never race writes
+        self._pending.append(self._executor.submit(fn, *args))
+
+    def _reap(self, keep):
+        """Wait until at most ``keep`` writes are in flight, re-raising their errors."""
+        while True:
+            done = [f for f in self._pending if f.done()]
+            self._pending = [f for f in self._pending if not f.done()]
+            for future in done:
+                future.result()
+            if len(self._pending) <= keep:
+                return
+            self._pending[0].result()
+
+    def save(self, state, filename, aliases=()):
+        """Snapshot ``state`` now and write it to ``filename`` and ``aliases``."""
+        if self.async_save:
+            # make room first so at most max_pending snapshots are held in memory
+            self._reap(self.max_pending - 1)
+            state = snapshot_state(state, pin_memory=self.pin_memory)
+        self._submit(self._write, state, filename, tuple(aliases))
+
+    def remove(self, filename):
+        """Delete ``filename`` after every write queued before it has finished."""
+        self._submit(self._remove, filename)
+
+    def wait(self):
+        """Block until every queued write is on disk."""
+        self._reap(0)
+
+    def close(self):
+        self.wait()
+        self._executor.shutdown(wait=True)
+
+    @staticmethod
+    def _write(state, filename, aliases):
+        atomic_save(state, filename, aliases)
+        logging.info(f"Checkpoint saved to {filename}" + "".join(f", {a}" for a in aliases))
+
+    @staticmethod
+    def _remove(filename):
+        logging.info(f"Delete: {filename}")
+        if os.path.exists(filename):
+            os.remove(filename)
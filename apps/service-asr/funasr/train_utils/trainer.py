@@ -13,6 +13,7 @@ from pathlib import Path
 from funasr.train_utils.device_funcs import to_device
 from funasr.train_utils.recursive_op import recursive_average
 from funasr.train_utils.average_nbest_models import average_checkpoints
+from funasr.train_utils.checkpoint_writer import CheckpointWriter, remove_stale_tmp
 from torch.distributed.fsdp.sharded_grad_scaler import ShardedGradScaler
 
 try:
@@ -97,6 +98,10 @@ class Trainer:
         self.accum_grad = kwargs.get("accum_grad", 1)
         self.grad_clip = kwargs.get("grad_clip", 10.0)
         self.grad_clip_type = kwargs.get("grad_clip_type", 2.0)
+        self.checkpoint_writer = CheckpointWriter(
+            async_save=kwargs.get("async_checkpoint", True),
+            max_pending=kwargs.get("max_pending_checkpoints", 1),
+        )
 
         try:
             rank = dist.get_rank()
@@ -107,6 +112,8 @@ class Trainer:
             logging.warning("distributed is not initialized, only single shard")
         self.rank = rank
         self.world_size = world_size
+        if self.rank == 0:
+            remove_stale_tmp(self.output_dir)
         self.train_acc_avg = 0.0
         self.train_loss_avg = 0.0
         self.val_acc_avg = 0.0
@@ -192,11 +199,8 @@ class Trainer:
             else:
                 ckpt_name = f"model.pt.ep{epoch}.{step}"
             filename = os.path.join(self.output_dir, ckpt_name)
-            torch.save(state, filename)
-            logging.info(f"Checkpoint saved to {filename}")
-
-            latest = Path(os.path.join(self.output_dir, f"model.pt"))
-            torch.save(state, latest)
+            # written once in the background, model.pt and model.pt.best are links to it
+            aliases = [os.path.join(self.output_dir, f"model.pt")]
 
             if self.best_step_or_epoch == "":
                 self.best_step_or_epoch = ckpt_name
@@ -208,7 +212,7 @@ class Trainer:
                 ):
                     self.best_step_or_epoch = ckpt_name
                     best_ckpt = Path(os.path.join(self.output_dir, f"model.pt.best"))
-                    torch.save(state, best_ckpt)
+                    aliases.append(str(best_ckpt))
                     logging.info(
                         f"Update best acc: {self.val_acc_step_or_epoch[self.best_step_or_epoch]:.4f}, {best_ckpt}"
                     )
@@ -223,7 +227,7 @@ class Trainer:
                 ):
                     self.best_step_or_epoch = ckpt_name
                     best_ckpt = Path(os.path.join(self.output_dir, f"model.pt.best"))
-                    torch.save(state, best_ckpt)
+                    aliases.append(str(best_ckpt))
                     logging.info(
                         f"Update best loss: {self.val_loss_step_or_epoch[self.best_step_or_epoch]:.4f}, {best_ckpt}"
                     )
@@ -233,6 +237,13 @@ class Trainer:
                     )
             else:
                 print("Undo")
+
+            save_start = time.perf_counter()
+            self.checkpoint_writer.save(state, filename, aliases)
+            logging.info(
+                f"Checkpoint {ckpt_name} queued, training stalled {time.perf_counter() - save_start:.3f}s"
+            )
+
             self.saved_ckpts[ckpt_name] = getattr(
                 self, f"val_{self.avg_keep_nbest_models_type}_step_or_epoch"
             )[ckpt_name]
@@ -244,10 +255,7 @@ class Trainer:
                         key = max(self.saved_ckpts, key=self.saved_ckpts.get)
                     if key in self.saved_ckpts:
                         del self.saved_ckpts[key]
-                    filename = os.path.join(self.output_dir, key)
-                    logging.info(f"Delete: {filename}")
-                    if os.path.exists(filename):
-                        os.remove(filename)
+                    self.checkpoint_writer.remove(os.path.join(self.output_dir, key))
 
         if self.use_ddp or self.use_fsdp:
             dist.barrier()
@@ -718,7 +726,12 @@ class Trainer:
                     step=self.batch_total,
                 )
 
+    def wait_checkpoints(self):
+        """Block until every checkpoint queued by ``save_checkpoint`` is on disk."""
+        self.checkpoint_writer.wait()
+
     def close(self, writer=None):
+        self.checkpoint_writer.close()
 
         if self.use_ddp or self.use_fsdp:
             dist.barrier()
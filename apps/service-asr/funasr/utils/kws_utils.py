@@ -6,7 +6,6 @@ import math
 from collections import defaultdict
 from typing import List, Optional, Tuple
 
-
 symbol_str = '[’!"#$%&\'()*+,-./:;<>=?@，。?★、…【】《》？“”‘’！[\\]^_`{|}~\s]+'
 
 
@@ -216,6 +215,249 @@ class KwsCtcPrefixDecoder():
         hyps = [(y[0], y[1][0] + y[1][1], y[1][2]) for y in cur_hyps]
         return hyps
 
+    def beam_search_batch(
+        self,
+        logits: torch.Tensor,
+        logits_lengths: torch.Tensor,
+        keywords_tokenset: set = None,
+        score_beam_size: int = 3,
+        path_beam_size: int = 20,
+    ) -> List[List[Tuple[tuple, float, List[dict]]]]:
+        """ Batched CTC prefix beam search, same results as beam_search per utterance
+
+        Prefix scores (pb, pnb) are float64 log-space tensors of shape
+        (batch, path_beam_size), pruned with one stable sort per frame. Prefixes
+        are interned in a trie keyed by (parent prefix id, token), so two
+        hypotheses share an id exactly when they share a prefix, and an extension
+        equal to a surviving prefix is merged into it like the dict keys of
+        beam_search. Token nodes (token, frame, prob) live in a growable
+        pool linked to the node of the previous token; hypotheses share nodes as
+        beam_search shares node dicts, so a max-prob update of a node is seen by
+        every hypothesis holding it. Utterances are processed longest first and
+        each frame only touches the ones that are still running.
+
+        Args:
+            logits (torch.Tensor): (batch, max_len, vocab_size) token posteriors
+            logits_lengths (torch.Tensor): (batch, )
+            keywords_tokenset (set): token set for filtering score
+            score_beam_size (int): beam size for score
+            path_beam_size (int): beam size for path
+
+        Returns:
+            List[List[Tuple[tuple, float, List[dict]]]]: nbest (prefix, score, nodes) of each utterance
+        """
+        batch_size, maxlen, vocab_size = logits.shape
+        lengths = logits_lengths.detach().cpu().long().clamp(max=maxlen)
+        sort_order = lengths.argsort(descending=True)
+        lengths = lengths[sort_order]
+        logits = logits.detach().cpu()[sort_order]
+        if keywords_tokenset is not None:
+            allowed = torch.zeros(vocab_size, dtype=torch.bool)
+            allowed[[i for i in keywords_tokenset if 0 <= i < vocab_size]] = True
+        else:
+            allowed = torch.ones(vocab_size, dtype=torch.bool)
+
+        beam = path_beam_size
+        neg_inf = float("-inf")
+        min_log_prob = math.log(0.000001)
+        hyp_range = torch.arange(beam)
+        no_event = 2 * beam * vocab_size + 2
+
+        # hypotheses, slot 0 starts as the empty prefix with pb = 1
+        log_pb = torch.full((batch_size, beam), neg_inf, dtype=torch.float64)
+        log_pb[:, 0] = 0.0
+        log_pnb = torch.full_like(log_pb, neg_inf)
+        valid = torch.zeros((batch_size, beam), dtype=torch.bool)
+        valid[:, 0] = True
+        last = torch.full((batch_size, beam), -1, dtype=torch.long)
+        prefix_id = torch.zeros((batch_size, beam), dtype=torch.long)
+        parent_id = torch.full((batch_size, beam), -1, dtype=torch.long)
+        last_node = torch.full((batch_size, beam), -1, dtype=torch.long)
+
+        # node pool, each node links to the node of the previous prefix token
+        node_parent = torch.zeros(1024, dtype=torch.long)
+        node_token = torch.zeros(1024, dtype=torch.long)
+        node_frame = torch.zeros(1024, dtype=torch.long)
+        node_prob = torch.zeros(1024, dtype=torch.float64)
+        num_nodes = 0
+
+        # prefix trie, id 0 is the empty prefix
+        prefix_ids = {}
+
+        for t in range(0, maxlen):
+            n = int((lengths > t).sum())
+            if n == 0:
+                break
+
+            # 2.1 First beam prune: select topk best, filter prob score that is too small
+            top_k_probs, top_k_index = logits[:n, t].topk(score_beam_size, dim=-1)
+            ps = top_k_probs.to(torch.float64)
+            cand = (ps > 0.05) & allowed[top_k_index]
+            frame_on = cand.any(-1)
+            all_on = bool(frame_on.all())
+            if not all_on and not frame_on.any():
+                continue
+            num_cand = top_k_index.size(1)
+            lps = ps.log()
+
+            cur_pb, cur_pnb, cur_valid = log_pb[:n], log_pnb[:n], valid[:n]
+            cur_last, cur_id, cur_parent = last[:n], prefix_id[:n], parent_id[:n]
+            cur_node = last_node[:n]
+            log_p = torch.logaddexp(cur_pb, cur_pnb)
+
+            # blank: *s -> *s, *s- -> *s
+            is_blank = cand & (top_k_index == 0)
+            has_blank = is_blank.any(-1)
+            blank_pos = is_blank.to(torch.uint8).argmax(-1)
+            stay_pb = torch.where(
+                cur_valid & has_blank[:, None], log_p + lps.gather(1, blank_pos[:, None]), neg_inf
+            )
+
+            # repeated last token: *ss -> *s (rep_a) and *s-s -> *ss (rep_b)
+            rep = cand[:, None, :] & (top_k_index[:, None, :] == cur_last[:, :, None]) & cur_valid[:, :, None]
+            has_rep = rep.any(-1)
+            rep_pos = rep.to(torch.uint8).argmax(-1)
+            rep_ps = ps.gather(1, rep_pos)
+            rep_a = has_rep & (cur_pnb > min_log_prob)
+            rep_b = rep & (cur_pb > min_log_prob)[:, :, None]
+            stay_pnb = torch.where(rep_a, cur_pnb + lps.gather(1, rep_pos), neg_inf)
+            stay_ok = cur_valid & (has_blank[:, None] | rep_a)
+
+            # extensions *s -> *sx, shape (n, beam, num_cand)
+            nonblank = cand & (top_k_index != 0)
+            ext_ok = cur_valid[:, :, None] & nonblank[:, None, :] & (~rep | rep_b)
+            ext_pnb = torch.where(rep, cur_pb[:, :, None], log_p[:, :, None]) + lps[:, None, :]
+            ext_pnb = torch.where(ext_ok, ext_pnb, neg_inf).view(n, -1)
+            ext_ok = ext_ok.view(n, -1)
+
+            # an extension equal to a current prefix merges into that prefix: the
+            # extension of its parent prefix by its last token
+            is_parent = (cur_parent[:, :, None] == cur_id[:, None, :]) & cur_valid[:, None, :]
+            in_hyp = is_parent.to(torch.uint8).argmax(-1)
+            in_pos = rep_pos
+            in_src = in_hyp * num_cand + in_pos
+            incoming = has_rep & is_parent.any(-1) & ext_ok.gather(1, in_src)
+            stay_pnb = torch.where(incoming, torch.logaddexp(stay_pnb, ext_pnb.gather(1, in_src)), stay_pnb)
+            stay_ok = stay_ok | incoming
+            merged_b, merged_k = incoming.nonzero(as_tuple=True)
+            ext_ok[merged_b, in_src[merged_b, merged_k]] = False
+
+            # creation order of every entry (candidate-major, then hypothesis), used to
+            # break score ties like the stable sort over the insertion-ordered dict
+            blank_key = torch.where(has_blank[:, None], blank_pos[:, None] * beam + hyp_range, no_event)
+            rep_key = torch.where(rep_a, rep_pos * beam + hyp_range, no_event)
+            merge_key = torch.where(incoming, in_pos * beam + in_hyp, no_event)
+            stay_key = 2 * torch.minimum(torch.minimum(blank_key, rep_key), merge_key)
+            ext_key = (2 * (torch.arange(num_cand)[None, :] * beam + hyp_range[:, None]) + 1).view(1, -1)
+
+            # node list of a merged prefix: the extension's new node wins only if it
+            # is assigned after the prefix's own blank/repeat events
+            first_stay_key = torch.minimum(blank_key, rep_key)
+            last_stay_key = torch.maximum(
+                torch.where(has_blank[:, None], blank_key, -1), torch.where(rep_a, rep_key, -1)
+            )
+            merge_is_rep = rep.view(n, -1).gather(1, in_src)
+            merge_new_list = incoming & torch.where(
+                merge_is_rep, merge_key > last_stay_key, first_stay_key == no_event
+            )
+            merge_updates_last = incoming & ~merge_is_rep & (first_stay_key < merge_key)
+
+            # max-prob update of the last node of prefixes repeating their last token
+            mutate = rep_a | merge_updates_last
+            if mutate.any():
+                mut_ids = cur_node[mutate]
+                mut_ps = rep_ps[mutate]
+                better = mut_ps > node_prob[mut_ids]
+                node_prob[mut_ids[better]] = mut_ps[better]
+                node_frame[mut_ids[better]] = t
+
+            # 2.2 Second beam prune
+            scores = torch.cat([torch.logaddexp(stay_pb, stay_pnb), ext_pnb], dim=1)
+            entry_ok = torch.cat([stay_ok, ext_ok], dim=1)
+            keys = torch.cat([stay_key, ext_key.expand(n, -1)], dim=1)
+            scores = torch.where(entry_ok, scores, neg_inf)
+            order = keys.argsort(dim=1)
+            _, rank = scores.gather(1, order).sort(dim=1, descending=True, stable=True)
+            sel = order.gather(1, rank[:, :beam])
+            sel_ok = entry_ok.gather(1, sel)
+
+            sel_stay = sel < beam
+            stay_hyp = sel.clamp(max=beam - 1)
+            ext_flat = (sel - beam).clamp(min=0)
+            ext_hyp = ext_flat // num_cand
+            stay_new_list = merge_new_list.gather(1, stay_hyp)
+            new_list = torch.where(sel_stay, stay_new_list, True) & sel_ok & frame_on[:, None]
+            base = torch.where(sel_stay, torch.where(stay_new_list, in_hyp.gather(1, stay_hyp), stay_hyp), ext_hyp)
+            new_pos = torch.where(sel_stay, in_pos.gather(1, stay_hyp), ext_flat % num_cand)
+
+            n_pb = torch.where(sel_stay, stay_pb.gather(1, stay_hyp), neg_inf)
+            n_pnb = torch.where(sel_stay, stay_pnb.gather(1, stay_hyp), ext_pnb.gather(1, ext_flat))
+            n_last = torch.where(sel_stay, cur_last.gather(1, stay_hyp), top_k_index.gather(1, new_pos))
+            n_parent = torch.where(sel_stay, cur_parent.gather(1, stay_hyp), cur_id.gather(1, ext_hyp))
+            n_id = cur_id.gather(1, stay_hyp)
+            n_node = cur_node.gather(1, base)
+
+            # intern the prefixes created by the selected extensions
+            is_ext = ~sel_stay & sel_ok & frame_on[:, None]
+            if is_ext.any():
+                ext_ids = []
+                for key in zip(n_parent[is_ext].tolist(), n_last[is_ext].tolist()):
+                    ext_id = prefix_ids.get(key)
+                    if ext_id is None:
+                        ext_id = prefix_ids[key] = len(prefix_ids) + 1
+                    ext_ids.append(ext_id)
+                n_id[is_ext] = torch.tensor(ext_ids, dtype=torch.long)
+
+            num_new = int(new_list.sum())
+            if num_new:
+                while num_nodes + num_new > node_token.size(0):
+                    node_parent = torch.cat([node_parent, torch.zeros_like(node_parent)])
+                    node_token = torch.cat([node_token, torch.zeros_like(node_token)])
+                    node_frame = torch.cat([node_frame, torch.zeros_like(node_frame)])
+                    node_prob = torch.cat([node_prob, torch.zeros_like(node_prob)])
+                new_ids = torch.arange(num_nodes, num_nodes + num_new)
+                node_parent[new_ids] = n_node[new_list]
+                node_token[new_ids] = top_k_index.gather(1, new_pos)[new_list]
+                node_frame[new_ids] = t
+                node_prob[new_ids] = ps.gather(1, new_pos)[new_list]
+                n_node[new_list] = new_ids
+                num_nodes += num_new
+
+            updates = (
+                (log_pb, n_pb), (log_pnb, n_pnb), (valid, sel_ok), (last, n_last), (prefix_id, n_id),
+                (parent_id, n_parent), (last_node, n_node),
+            )
+            for state, value in updates:
+                if all_on:
+                    state[:n] = value
+                else:
+                    state[:n] = torch.where(frame_on[:, None], value, state[:n])
+
+        node_parent = node_parent[:num_nodes].tolist()
+        node_token = node_token[:num_nodes].tolist()
+        node_frame = node_frame[:num_nodes].tolist()
+        node_prob = node_prob[:num_nodes].tolist()
+        scores = torch.logaddexp(log_pb, log_pnb).exp().tolist()
+        valid = valid.tolist()
+        last_node = last_node.tolist()
+        results = [None] * batch_size
+        for b, utt in enumerate(sort_order.tolist()):
+            hyps = []
+            for k in range(beam):
+                if not valid[b][k]:
+                    continue
+                ids = []
+                node = last_node[b][k]
+                while node >= 0:
+                    ids.append(node)
+                    node = node_parent[node]
+                ids.reverse()
+                prefix = tuple(node_token[i] for i in ids)
+                nodes = [dict(token=node_token[i], frame=node_frame[i], prob=node_prob[i]) for i in ids]
+                hyps.append((prefix, scores[b][k], nodes))
+            results[utt] = hyps
+        return results
+
 
     def is_sublist(self, main_list, check_list):
         if len(main_list) < len(check_list):
@@ -241,7 +483,9 @@ class KwsCtcPrefixDecoder():
         logits_lengths: torch.Tensor,
     ):
         hyps = self.beam_search(logits, logits_lengths, self.keywords_idxset)
+        return self._detect_keyword(hyps)
 
+    def _detect_keyword(self, hyps):
         hit_keyword = None
         hit_score = 1.0
         # start = 0; end = 0
@@ -282,3 +526,19 @@ class KwsCtcPrefixDecoder():
         xlen = torch.tensor([raw_logp.size(1)])
 
         return self._decode_inside(raw_logp, xlen)
+
+    def decode_batch(self, x: torch.Tensor, x_lens: torch.Tensor):
+        """Decode a padded batch of utterances at once.
+
+        Args:
+            x (torch.Tensor): The encoded feature tensor (batch, max_len, dim)
+            x_lens (torch.Tensor): Valid lengths (batch, )
+
+        Returns: list of decode results, one per utterance
+
+        """
+
+        raw_logp = self.ctc.softmax(x).detach().cpu()
+        hyps_list = self.beam_search_batch(raw_logp, x_lens, self.keywords_idxset)
+
+        return [self._detect_keyword(hyps) for hyps in hyps_list]
@@ -9,23 +9,24 @@ from itertools import zip_longest
 
 
 def cif_wo_hidden(alphas, threshold):
-    batch_size, len_time = alphas.size()
-    # loop varss
-    integrate = torch.zeros([batch_size], device=alphas.device)
-    # intermediate vars along time
-    list_fires = []
-    for t in range(len_time):
-        alpha = alphas[:, t]
-        integrate += alpha
-        list_fires.append(integrate)
-        fire_place = integrate >= threshold
-        integrate = torch.where(
-            fire_place,
-            integrate - torch.ones([batch_size], device=alphas.device) * threshold,
-            integrate,
-        )
-    fires = torch.stack(list_fires, 1)
-    return fires
+    """
+    Continuous integrate-and-fire without hidden states, vectorized over time.
+
+    The integrator fires at most once per frame and subtracts ``threshold`` when it
+    does, so with S the cumulative sum of alphas, the number of fires up to frame t is
+    k_t = min(k_{t-1} + 1, floor(S_t / threshold)), i.e.
+    k_t = t + 1 + min(0, cummin_j(floor(S_j / threshold) - j - 1)).
+    The value reported for frame t is the integrator before its reset, S_t - threshold * k_{t-1}.
+    """
+    # float64 keeps the cumulative sum as exact as the frame-by-frame float32 integrator
+    acc_dtype = torch.float32 if alphas.device.type == "mps" else torch.float64
+    csum = torch.cumsum(alphas.to(acc_dtype), dim=1)
+    steps = torch.arange(alphas.size(1), device=alphas.device, dtype=acc_dtype)
+    lag = torch.cummin(torch.floor(csum / threshold) - steps - 1, dim=1).values
+    num_fired = steps + 1 + torch.clamp(lag, max=0)
+    num_fired_before = torch.nn.functional.pad(num_fired[:, :-1], (1, 0))
+    fires = csum - threshold * num_fired_before
+    return fires.to(alphas.dtype)
 
 
 def ts_prediction_lfr6_standard(
@@ -53,55 +54,50 @@ def ts_prediction_lfr6_standard(
             torch.where(peaks >= 1.0 - 1e-4)[0].cpu().numpy() + force_time_shift
         )  # total offset
     num_frames = peaks.shape[0]
-    timestamp_list = []
-    new_char_list = []
     # for bicif model trained with large data, cif2 actually fires when a character starts
     # so treat the frames between two peaks as the duration of the former token
-    # fire_place = torch.where(peaks>=1.0-1e-4)[0].cpu().numpy() + force_time_shift  # total offset
     # assert num_peak == len(char_list) + 1 # number of peaks is supposed to be number of tokens + 1
+    token_start, token_end = fire_place[:-1], fire_place[1:]
+    # cut the duration to token and sil when the 0-weight frames last long
+    too_long = token_end - token_start > MAX_TOKEN_DURATION
+    split = token_start + MAX_TOKEN_DURATION
+    # every token takes one segment, plus one <sil> segment after it when cut
+    token_pos = np.arange(len(token_start)) + np.cumsum(too_long) - too_long
+    sil_pos = token_pos[too_long] + 1
+    num_segments = len(token_start) + len(sil_pos)
+    starts = np.empty(num_segments)
+    ends = np.empty(num_segments)
+    starts[token_pos] = token_start * TIME_RATE
+    ends[token_pos] = np.where(too_long, split, token_end) * TIME_RATE
+    starts[sil_pos] = split[too_long] * TIME_RATE
+    ends[sil_pos] = token_end[too_long] * TIME_RATE
+    new_char_list = np.full(num_segments, "<sil>", dtype=object)
+    new_char_list[token_pos] = [char_list[i] for i in range(len(token_start))]
     # begin silence
     if fire_place[0] > START_END_THRESHOLD:
-        # char_list.insert(0, '<sil>')
-        timestamp_list.append([0.0, fire_place[0] * TIME_RATE])
-        new_char_list.append("<sil>")
-    # tokens timestamp
-    for i in range(len(fire_place) - 1):
-        new_char_list.append(char_list[i])
-        if MAX_TOKEN_DURATION < 0 or fire_place[i + 1] - fire_place[i] <= MAX_TOKEN_DURATION:
-            timestamp_list.append([fire_place[i] * TIME_RATE, fire_place[i + 1] * TIME_RATE])
-        else:
-            # cut the duration to token and sil of the 0-weight frames last long
-            _split = fire_place[i] + MAX_TOKEN_DURATION
-            timestamp_list.append([fire_place[i] * TIME_RATE, _split * TIME_RATE])
-            timestamp_list.append([_split * TIME_RATE, fire_place[i + 1] * TIME_RATE])
-            new_char_list.append("<sil>")
+        starts = np.concatenate([[0.0], starts])
+        ends = np.concatenate([[fire_place[0] * TIME_RATE], ends])
+        new_char_list = np.concatenate([["<sil>"], new_char_list])
     # tail token and end silence
-    # new_char_list.append(char_list[-1])
     if num_frames - fire_place[-1] > START_END_THRESHOLD:
         _end = (num_frames + fire_place[-1]) * 0.5
-        # _end = fire_place[-1]
-        timestamp_list[-1][1] = _end * TIME_RATE
-        timestamp_list.append([_end * TIME_RATE, num_frames * TIME_RATE])
-        new_char_list.append("<sil>")
-    else:
-        if len(timestamp_list)>0:
-            timestamp_list[-1][1] = num_frames * TIME_RATE
+        ends[-1] = _end * TIME_RATE
+        starts = np.append(starts, _end * TIME_RATE)
+        ends = np.append(ends, num_frames * TIME_RATE)
+        new_char_list = np.append(new_char_list, "<sil>")
+    elif len(ends) > 0:
+        ends[-1] = num_frames * TIME_RATE
     if vad_offset:  # add offset time in model with vad
-        for i in range(len(timestamp_list)):
-            timestamp_list[i][0] = timestamp_list[i][0] + vad_offset / 1000.0
-            timestamp_list[i][1] = timestamp_list[i][1] + vad_offset / 1000.0
-    res_txt = ""
-    for char, timestamp in zip(new_char_list, timestamp_list):
-        # if char != '<sil>':
-        if not sil_in_str and char == "<sil>":
-            continue
-        res_txt += "{} {} {};".format(
-            char, str(timestamp[0] + 0.0005)[:5], str(timestamp[1] + 0.0005)[:5]
-        )
-    res = []
-    for char, timestamp in zip(new_char_list, timestamp_list):
-        if char != "<sil>":
-            res.append([int(timestamp[0] * 1000), int(timestamp[1] * 1000)])
+        starts = starts + vad_offset / 1000.0
+        ends = ends + vad_offset / 1000.0
+    is_sil = new_char_list == "<sil>"
+    starts_list, ends_list = starts.tolist(), ends.tolist()
+    res_txt = "".join(
+        "{} {} {};".format(char, str(start + 0.0005)[:5], str(end + 0.0005)[:5])
+        for char, start, end, sil in zip(new_char_list, starts_list, ends_list, is_sil)
+        if sil_in_str or not sil
+    )
+    res = np.stack([starts[~is_sil] * 1000, ends[~is_sil] * 1000], axis=1).astype(np.int64).tolist()
     return res_txt, res
 
 
@@ -276,3 +272,35 @@ def timestamp_sentence_en(
             sentence_text_seg = ""
             ts_list = []
     return res
+
+
+def _benchmark(durations=(10, 60, 300, 1200), repeats=5):
+    """Time CIF firing and timestamp assembly on synthetic alphas of growing audio length."""
+    import time
+
+    threshold = 1.0 - 1e-4
+    for seconds in durations:
+        num_frames = int(seconds * 1000 / 60 * 3)  # lfr6 frames, 3 times upsampled
+        alphas = torch.rand(1, num_frames) * 0.3
+        char_list = [f"tok{i}" for i in range(max(1, int(alphas.sum() // 1.2)))]
+        no_peaks = torch.zeros(1, num_frames)  # forces re-firing through cif_wo_hidden
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            cif_wo_hidden(alphas, threshold)
+        t_cif = (time.perf_counter() - start) / repeats
+        start = time.perf_counter()
+        for _ in range(repeats):
+            ts_prediction_lfr6_standard(alphas.clone(), no_peaks, char_list)
+        t_ts = (time.perf_counter() - start) / repeats
+        print(
+            f"{seconds:5d}s audio, {num_frames:6d} frames, {len(char_list):5d} tokens: "
+            f"cif_wo_hidden {t_cif * 1e3:7.2f} ms, ts_prediction_lfr6_standard {t_ts * 1e3:7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark CIF timestamp prediction")
+    parser.add_argument("--durations", type=int, nargs="+", default=[10, 60, 300, 1200])
+    args = parser.parse_args()
+    _benchmark(args.durations)
@@ -33,6 +33,7 @@ from starlette.concurrency import run_in_threadpool
 import time
 import httpx
 from dotenv import load_dotenv
+from asr_backends import BACKEND_ONNX, describe_backend, enable_onnx_backend, get_backend_name
 
 # 加载 .env 文件
 env_path = Path(__file__).parent / ".env"
@@ -149,6 +150,12 @@ def load_sensevoice_model():
                 disable_update=True  # 禁用自动更新
             )
             logger.info(f"✅ {SENSEVOICE_MODEL_NAME} 模型加载成功！")
+            if get_backend_name() == BACKEND_ONNX:
+                # ONNX导出或会话创建失败时保留PyTorch后端，服务照常可用
+                try:
+                    enable_onnx_backend(sensevoice_model, SENSEVOICE_MODEL_NAME)
+                except Exception as e:
+                    logger.error(f"⚠️ ONNX Runtime后端启用失败，继续使用PyTorch: {e}")
             logger.info("   💡 SenseVoiceSmall特性: 低延迟、多语言(中/英/日/韩/粤)、情感识别")
         except Exception as e:
             logger.error(f"❌ {SENSEVOICE_MODEL_NAME} 模型加载失败: {str(e)}")
@@ -178,7 +185,8 @@ async def root():
             "sensevoice": {
                 "name": SENSEVOICE_MODEL_NAME,
                 "description": "实时流式同传，低延迟，支持多语言和情感识别",
-                "loaded": sensevoice_model is not None
+                "loaded": sensevoice_model is not None,
+                "backend": describe_backend(sensevoice_model)["backend"]
             }
         },
         "endpoints": {
@@ -206,7 +214,8 @@ async def health_check():
             },
             "sensevoice": {
                 "name": SENSEVOICE_MODEL_NAME,
-                "status": sensevoice_status
+                "status": sensevoice_status,
+                "inference": describe_backend(sensevoice_model)
             }
         },
         "device": "cpu",
@@ -0,0 +1,25 @@
+"""测试环境：只加载被测的 funasr 子模块
+
+vendored 的 funasr/__init__.py 会遍历导入全部子包并引用本目录未收录的
+funasr.models，这里预先注册一个不执行 __init__ 的 funasr 包对象，
+子模块照常从 apps/service-asr/funasr 导入。
+"""
+
+import importlib.util
+import os
+import sys
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if SERVICE_DIR not in sys.path:
+    sys.path.insert(0, SERVICE_DIR)
+
+if "funasr" not in sys.modules:
+    _package_dir = os.path.join(SERVICE_DIR, "funasr")
+    _spec = importlib.util.spec_from_file_location(
+        "funasr", os.path.join(_package_dir, "__init__.py"), submodule_search_locations=[_package_dir]
+    )
+    _funasr = importlib.util.module_from_spec(_spec)
+    with open(os.path.join(_package_dir, "version.txt")) as f:
+        _funasr.__version__ = f.read().strip()
+    sys.modules["funasr"] = _funasr
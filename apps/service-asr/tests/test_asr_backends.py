@@ -0,0 +1,179 @@
+"""ONNX Runtime 后端：与 PyTorch 路径在同一段音频上的转写一致性
+
+测试环境中没有 SenseVoiceSmall 权重，这里用一个输入输出与导出图一致的小模型
+（language/textnorm 查询帧 + 线性编码器 + CTC 头），按 export_utils 的设置导出并做
+int8 动态量化，经会话池和贪心解码转写合成音频，与该模型的 PyTorch 推理结果对比。
+"""
+
+import numpy as np
+import pytest
+import torch
+
+pytest.importorskip("onnxruntime")
+onnx = pytest.importorskip("onnx")
+
+from onnxruntime.quantization import QuantType, quantize_dynamic
+
+from asr_backends import ONNX_INPUT_NAMES, OrtSenseVoice, OrtSessionPool, _char_error_rate
+from funasr.frontends.wav_frontend import WavFrontend
+from funasr.utils.load_utils import extract_fbank, load_audio_text_image_video
+
+# int8 量化会改变接近打平的 argmax，单条音频允许的最大 CER（与 asr_backends 基准默认值一致）
+INT8_CER_TOLERANCE = 0.05
+
+VOCAB = ["<blank>"] + [chr(0x4E00 + i) for i in range(47)]
+NUM_TONES = 12
+
+
+class CharTokenizer:
+    def decode(self, token_int):
+        return "".join(VOCAB[i] for i in token_int)
+
+
+class ToySenseVoice(torch.nn.Module):
+    """与 SenseVoiceSmall 导出图输入输出一致的小模型"""
+
+    lid_dict = {"auto": 0, "zh": 3, "en": 4}
+    textnorm_dict = {"withitn": 14, "woitn": 15}
+    emo_dict = {"unk": 25}
+    blank_id = 0
+
+    def __init__(self, feat_dim=560):
+        super().__init__()
+        self.embed = torch.nn.Embedding(16, feat_dim)
+        self.encoder = torch.nn.Sequential(
+            torch.nn.Linear(feat_dim, 256), torch.nn.ReLU(), torch.nn.Linear(256, 256), torch.nn.ReLU()
+        )
+        self.ctc_lo = torch.nn.Linear(256, len(VOCAB))
+
+    def forward(self, speech, speech_lengths, language, textnorm):
+        queries = self.embed(torch.stack([language, textnorm], dim=1).long())
+        encoder_out = self.encoder(torch.cat([queries, speech], dim=1))
+        return self.ctc_lo(encoder_out), speech_lengths + 2
+
+    def inference(self, data_in, data_lengths=None, key=None, tokenizer=None, frontend=None, **kwargs):
+        """PyTorch 路径：与 SenseVoiceSmall.inference 相同的特征提取和 CTC 贪心解码"""
+        audio = load_audio_text_image_video(data_in, fs=frontend.fs, audio_fs=kwargs.get("fs", 16000))
+        speech, speech_lengths = extract_fbank(audio, frontend=frontend)
+        language = torch.full([speech.shape[0]], self.lid_dict[kwargs.get("language", "auto")])
+        textnorm = torch.full([speech.shape[0]], self.textnorm_dict["withitn" if kwargs.get("use_itn") else "woitn"])
+        with torch.no_grad():
+            ctc_logits, encoder_out_lens = self(speech, speech_lengths, language, textnorm)
+        results = []
+        for i in range(ctc_logits.shape[0]):
+            yseq = ctc_logits[i, : encoder_out_lens[i]].log_softmax(-1).argmax(-1).unique_consecutive()
+            result = {"key": key[i], "text": tokenizer.decode(yseq[yseq != self.blank_id].tolist())}
+            if kwargs.get("output_timestamp"):
+                result["timestamp"] = []
+            results.append(result)
+        return results, {}
+
+
+def export(model, path, quantize):
+    """与 export_utils._onnx 相同的导出与量化设置"""
+    dummy = (torch.randn(1, 30, 560), torch.tensor([30], dtype=torch.int32),
+             torch.tensor([0], dtype=torch.int32), torch.tensor([15], dtype=torch.int32))
+    torch.onnx.export(
+        model, dummy, str(path), do_constant_folding=True, opset_version=14, dynamo=False,
+        input_names=list(ONNX_INPUT_NAMES), output_names=["ctc_logits", "encoder_out_lens"],
+        dynamic_axes={"speech": {0: "batch_size", 1: "feats_length"}, "speech_lengths": {0: "batch_size"},
+                      "ctc_logits": {0: "batch_size", 1: "logits_length"}},
+    )
+    if not quantize:
+        return str(path)
+    quant_path = str(path).replace(".onnx", "_quant.onnx")
+    nodes = [n.name for n in onnx.load(str(path)).graph.node]
+    quantize_dynamic(
+        model_input=str(path), model_output=quant_path, op_types_to_quantize=["MatMul"], per_channel=True,
+        reduce_range=False, weight_type=QuantType.QUInt8, nodes_to_exclude=[m for m in nodes if "output" in m],
+    )
+    return quant_path
+
+
+@pytest.fixture(scope="module")
+def frontend():
+    return WavFrontend(fs=16000, n_mels=80, frame_length=25, frame_shift=10, lfr_m=7, lfr_n=6, dither=0.0)
+
+
+@pytest.fixture(scope="module")
+def fixture_audio():
+    """确定性的合成音频：每个 token 是一段固定音高的谐波音，段间有静音
+
+    返回 (音频, 逐采样点的 token 标注) 列表，0 表示静音/blank。
+    """
+    rng = np.random.default_rng(0)
+    clips = []
+    for num_tokens in (4, 12, 25, 40):
+        pieces, labels = [np.zeros(4800)], [np.zeros(4800, dtype=np.int64)]
+        for token in rng.integers(1, NUM_TONES + 1, num_tokens):
+            t = np.arange(int(rng.uniform(0.2, 0.35) * 16000)) / 16000
+            phase = 2 * np.pi * 150 * 1.25 ** (token - 1) * t
+            pieces.append(sum(np.sin(k * phase) / k for k in range(1, 4)) * np.hanning(t.size) ** 0.25)
+            labels.append(np.full(t.size, token))
+            gap = int(rng.uniform(0.1, 0.2) * 16000)
+            pieces.append(np.zeros(gap))
+            labels.append(np.zeros(gap, dtype=np.int64))
+        audio = 0.3 * np.concatenate(pieces) + 0.003 * rng.standard_normal(sum(p.size for p in pieces))
+        clips.append((audio.astype(np.float32), np.concatenate(labels)))
+    return clips
+
+
+@pytest.fixture(scope="module")
+def model(frontend, fixture_audio):
+    """在夹具音频上训练过的小模型
+
+    随机初始化的模型 logits 几乎处处打平，int8 量化误差会翻转大量 argmax，
+    不能代表训练过的模型；这里先按标注训练到能转写夹具音频。
+    """
+    torch.manual_seed(41)
+    model = ToySenseVoice()
+    feats, labels = [], []
+    for audio, sample_labels in fixture_audio:
+        speech = extract_fbank(audio, frontend=frontend)[0][0]
+        # 第 i 个 LFR 帧以第 6i 个 fbank 帧为中心
+        centers = np.arange(speech.shape[0]) * 960 + 200
+        feats.append(speech)
+        labels.append(torch.from_numpy(sample_labels[np.minimum(centers, sample_labels.size - 1)]))
+    # 两个查询帧（language/textnorm）也参与训练，输出 blank
+    speech, labels = torch.cat(feats)[None], torch.cat([torch.zeros(2, dtype=torch.long)] + labels)
+    optimizer = torch.optim.Adam(model.parameters(), lr=3e-3)
+    for _ in range(300):
+        logits, _ = model(speech, torch.tensor([speech.shape[1]]), torch.tensor([0]), torch.tensor([14]))
+        loss = torch.nn.functional.cross_entropy(logits[0], labels)
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+    return model.eval()
+
+
+def transcribe(model, audio, frontend, **kwargs):
+    results, _ = model.inference(audio, key=["utt"], tokenizer=CharTokenizer(), frontend=frontend,
+                                 language="auto", use_itn=True, **kwargs)
+    return results[0]["text"]
+
+
+def reference_text(sample_labels):
+    starts = np.r_[True, sample_labels[1:] != sample_labels[:-1]]
+    return CharTokenizer().decode([int(k) for k in sample_labels[starts] if k])
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_ort_transcripts_match_pytorch(model, frontend, fixture_audio, tmp_path, quantize):
+    sessions = OrtSessionPool(export(model, tmp_path / "model.onnx", quantize), size=2)
+    ort_model = OrtSenseVoice(model, sessions)
+
+    for audio, sample_labels in fixture_audio:
+        expected = transcribe(model, audio, frontend)
+        assert expected == reference_text(sample_labels)
+        text = transcribe(ort_model, audio, frontend)
+        if quantize:
+            assert _char_error_rate(expected, text) <= INT8_CER_TOLERANCE
+        else:
+            assert text == expected
+
+
+def test_timestamp_requests_fall_back_to_pytorch(model, frontend, fixture_audio, tmp_path):
+    ort_model = OrtSenseVoice(model, OrtSessionPool(export(model, tmp_path / "model.onnx", False), size=1))
+    results, _ = ort_model.inference(fixture_audio[0][0], key=["utt"], tokenizer=CharTokenizer(),
+                                     frontend=frontend, output_timestamp=True)
+    assert results[0]["timestamp"] == []
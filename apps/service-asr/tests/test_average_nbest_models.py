@@ -0,0 +1,76 @@
+"""检查点平均：流式累加与逐键堆叠求平均在浮点误差内一致"""
+
+import os
+
+import pytest
+import torch
+
+from funasr.train_utils.average_nbest_models import average_checkpoints
+
+
+def _write_checkpoints(output_dir, num_checkpoints):
+    generator = torch.Generator().manual_seed(0)
+    states = []
+    for epoch in range(1, num_checkpoints + 1):
+        state_dict = {
+            "encoder.weight": torch.randn(64, 80, generator=generator) * 3 + 10,
+            "decoder.weight_fp16": torch.randn(32, 16, generator=generator).half(),
+            "decoder.bias_bf16": torch.randn(16, generator=generator).bfloat16(),
+            "bn.num_batches_tracked": torch.tensor(100 * epoch, dtype=torch.int64),
+        }
+        torch.save(
+            {"state_dict": state_dict, "optimizer": {"exp_avg": torch.randn(64, 80, generator=generator)}},
+            os.path.join(output_dir, f"model.pt.ep{epoch}"),
+        )
+        states.append(state_dict)
+    return states
+
+
+def _reference(states):
+    """逐键把所有检查点堆叠后求平均（整数张量求和），在float64下计算"""
+    reference = {}
+    for key, tensor in states[0].items():
+        stacked = torch.stack([state[key] for state in states])
+        if str(tensor.dtype).startswith("torch.int"):
+            reference[key] = stacked.sum(dim=0)
+        else:
+            reference[key] = stacked.double().mean(dim=0)
+    return reference
+
+
+def _assert_average_close(actual, expected):
+    # 累加顺序不同会有几个ULP的差异（float32下N=5约3e-8，N=8约6e-8），不是逐位相同
+    eps = torch.finfo(actual.dtype).eps
+    torch.testing.assert_close(actual.double(), expected, rtol=4 * eps, atol=4 * eps)
+
+
+@pytest.mark.parametrize("num_checkpoints", [1, 2, 5, 8])
+def test_streamed_average_matches_stacked_average(tmp_path, num_checkpoints):
+    states = _write_checkpoints(tmp_path, num_checkpoints)
+
+    outpath = average_checkpoints(str(tmp_path), last_n=num_checkpoints)
+
+    averaged = torch.load(outpath)["state_dict"]
+    reference = _reference(states)
+    assert list(averaged) == list(states[0])
+    for key, expected in reference.items():
+        assert averaged[key].dtype == states[0][key].dtype
+        if expected.is_floating_point():
+            _assert_average_close(averaged[key], expected)
+        else:
+            assert torch.equal(averaged[key], expected)
+
+
+def test_best_checkpoints_are_selected_from_model_pt(tmp_path):
+    states = _write_checkpoints(tmp_path, 4)
+    val_acc = {"model.pt.ep1": 0.5, "model.pt.ep2": 0.9, "model.pt.ep3": 0.7, "model.pt.ep4": 0.1}
+    torch.save(
+        {"avg_keep_nbest_models_type": "acc", "val_acc_step_or_epoch": val_acc},
+        os.path.join(tmp_path, "model.pt"),
+    )
+
+    averaged = torch.load(average_checkpoints(str(tmp_path), last_n=2))["state_dict"]
+
+    expected = _reference([states[1], states[2]])
+    _assert_average_close(averaged["encoder.weight"], expected["encoder.weight"])
+    assert averaged["bn.num_batches_tracked"].item() == 200 + 300
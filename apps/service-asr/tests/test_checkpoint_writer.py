@@ -0,0 +1,122 @@
+"""检查点后台写入：中断不留半截文件、model.pt始终可加载、删除排在之前的写入之后"""
+
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+import torch
+
+from funasr.train_utils import checkpoint_writer
+from funasr.train_utils.checkpoint_writer import CheckpointWriter, atomic_save, remove_stale_tmp
+
+# 子进程按文件路径加载本模块，只依赖torch
+WRITER_LOOP = """
+import importlib.util, sys, torch
+spec = importlib.util.spec_from_file_location("checkpoint_writer", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+out, writer = sys.argv[2], module.CheckpointWriter()
+state = {"weight": torch.randn(2_000_000)}
+for epoch in range(10**6):
+    state["epoch"] = epoch
+    writer.save(state, f"{out}/model.pt.ep{epoch}", [f"{out}/model.pt"])
+    if epoch >= 2:
+        writer.remove(f"{out}/model.pt.ep{epoch - 2}")
+"""
+
+
+def _state(epoch):
+    return {"epoch": epoch, "weight": torch.full((1000,), float(epoch))}
+
+
+def test_failed_write_leaves_no_partial_and_keeps_previous(tmp_path, monkeypatch):
+    filename, alias = str(tmp_path / "model.pt.ep1"), str(tmp_path / "model.pt")
+    atomic_save(_state(0), str(tmp_path / "model.pt.ep0"), [alias])
+
+    def crash_after_partial_write(state, fout):
+        fout.write(b"half a checkpoint")
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(checkpoint_writer.torch, "save", crash_after_partial_write)
+    with pytest.raises(OSError):
+        atomic_save(_state(1), filename, [alias])
+
+    assert sorted(os.listdir(tmp_path)) == ["model.pt", "model.pt.ep0"]
+    assert torch.load(alias)["epoch"] == 0
+
+
+def test_stale_tmp_files_are_removed(tmp_path):
+    for name in (".model.pt.ep3.tmp.4242", ".model.pt.tmp.4242", "model.pt", "model.pt.ep2", "notes.txt"):
+        (tmp_path / name).write_bytes(b"x")
+
+    remove_stale_tmp(str(tmp_path))
+
+    assert sorted(os.listdir(tmp_path)) == ["model.pt", "model.pt.ep2", "notes.txt"]
+
+
+def test_pending_snapshot_ignores_later_updates(tmp_path):
+    writer = CheckpointWriter(max_pending=2)
+    state = _state(0)
+    writer.save(state, str(tmp_path / "model.pt.ep0"), [str(tmp_path / "model.pt")])
+    state["weight"].add_(1.0)  # 训练继续更新参数
+    state["epoch"] = 1
+    writer.close()
+
+    checkpoint = torch.load(tmp_path / "model.pt")
+    assert checkpoint["epoch"] == 0
+    assert torch.equal(checkpoint["weight"], torch.zeros(1000))
+    assert os.path.samefile(tmp_path / "model.pt", tmp_path / "model.pt.ep0")
+
+
+def test_remove_waits_for_earlier_writes(tmp_path, monkeypatch):
+    release = threading.Event()
+    write = CheckpointWriter._write
+
+    def slow_write(state, filename, aliases):
+        if state["epoch"] == 0:
+            assert release.wait(10)
+        write(state, filename, aliases)
+
+    monkeypatch.setattr(CheckpointWriter, "_write", staticmethod(slow_write))
+    writer = CheckpointWriter(max_pending=2)
+    ep0, ep1 = str(tmp_path / "model.pt.ep0"), str(tmp_path / "model.pt.ep1")
+    writer.save(_state(0), ep0)
+    writer.save(_state(1), ep1)
+    writer.remove(ep0)
+    time.sleep(0.1)
+    assert not os.path.exists(ep1)  # 仍按提交顺序排在被阻塞的写入之后
+
+    release.set()
+    writer.close()
+
+    # 删除若抢在写入前执行，ep0会在之后被写出来并残留
+    assert sorted(os.listdir(tmp_path)) == ["model.pt.ep1"]
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="needs SIGKILL")
+def test_model_pt_is_always_loadable_after_kill(tmp_path):
+    rng = random.Random(0)
+    for trial in range(3):
+        out = tmp_path / f"trial{trial}"
+        out.mkdir()
+        child = subprocess.Popen([sys.executable, "-c", WRITER_LOOP, checkpoint_writer.__file__, str(out)])
+        deadline = time.monotonic() + 60
+        while not (out / "model.pt").exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        time.sleep(rng.uniform(0.2, 1.5))
+        child.send_signal(signal.SIGKILL)
+        child.wait()
+
+        visible = sorted(name for name in os.listdir(out) if not name.startswith("."))
+        assert "model.pt" in visible
+        for name in visible:
+            checkpoint = torch.load(out / name)  # 可见文件都是完整的检查点
+            assert name == "model.pt" or checkpoint["epoch"] == int(name.split(".ep")[1])
+
+        remove_stale_tmp(str(out))
+        assert all(not name.startswith(".") for name in os.listdir(out))
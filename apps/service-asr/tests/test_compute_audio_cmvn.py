@@ -0,0 +1,149 @@
+"""CMVN统计：分片合并与单进程一次遍历等价，断点续算只接受同一输入的中间结果"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+import torch
+
+from funasr.bin import compute_audio_cmvn
+from funasr.bin.compute_audio_cmvn import CmvnStats, compute_shard, partial_fingerprint, write_cmvn
+
+DIM = 80
+
+
+class FbankDataset:
+    """长度不一的合成fbank；均值1000、标准差3，放大float32平方和的抵消误差"""
+
+    def __init__(self, num_samples=60, fail_at=None):
+        rng = np.random.default_rng(0)
+        self.items = [
+            (1000.0 + 3.0 * rng.standard_normal((int(n), DIM))).astype(np.float32)
+            for n in rng.integers(20, 400, num_samples)
+        ]
+        self.fail_at = fail_at
+        self.reads = []
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        if index == self.fail_at:
+            raise RuntimeError("worker killed")
+        self.reads.append(index)
+        return {"speech": torch.from_numpy(self.items[index])}
+
+
+@pytest.fixture
+def dataset(monkeypatch):
+    data = FbankDataset()
+    monkeypatch.setattr(compute_audio_cmvn, "build_dataset", lambda kwargs: data)
+    return data
+
+
+def _reference(dataset):
+    frames = np.concatenate(dataset.items).astype(np.float64)
+    return frames.shape[0], frames.mean(axis=0), frames.var(axis=0)
+
+
+@pytest.mark.parametrize("num_shards", [1, 2, 3, 7])
+def test_sharded_stats_match_single_pass(dataset, tmp_path, num_shards):
+    indices = np.arange(len(dataset))
+    single = compute_shard({}, 0, indices, str(tmp_path / "single.npz"))
+
+    merged = CmvnStats()
+    for shard_id, shard in enumerate(np.array_split(indices, num_shards)):
+        merged.merge(compute_shard({}, shard_id, shard, str(tmp_path / f"shard_{shard_id}.npz")))
+
+    count, mean, var = _reference(dataset)
+    assert merged.count == single.count == count
+    np.testing.assert_allclose(merged.mean, single.mean, rtol=1e-13)
+    np.testing.assert_allclose(merged.var, single.var, rtol=1e-10)
+    np.testing.assert_allclose(merged.mean, mean, rtol=1e-13)
+    np.testing.assert_allclose(merged.var, var, rtol=1e-10)
+
+
+def test_written_cmvn_matches_single_pass(dataset, tmp_path):
+    indices = np.arange(len(dataset))
+    single = compute_shard({}, 0, indices, str(tmp_path / "single.npz"))
+    merged = CmvnStats()
+    for shard_id, shard in enumerate(np.array_split(indices, 4)):
+        merged.merge(compute_shard({}, shard_id, shard, str(tmp_path / f"shard_{shard_id}.npz")))
+
+    outputs = []
+    for name, stats in (("single", single), ("sharded", merged)):
+        os.makedirs(tmp_path / name)
+        write_cmvn(stats, str(tmp_path / name / "cmvn.json"))
+        with open(tmp_path / name / "cmvn.json") as f:
+            outputs.append(json.load(f))
+        assert (tmp_path / name / "am.mvn").exists()
+
+    assert outputs[0]["total_frames"] == outputs[1]["total_frames"]
+    np.testing.assert_allclose(outputs[1]["mean_stats"], outputs[0]["mean_stats"], rtol=1e-12)
+    np.testing.assert_allclose(outputs[1]["var_stats"], outputs[0]["var_stats"], rtol=1e-12)
+
+
+def test_main_writes_cmvn_and_removes_partials(dataset, tmp_path):
+    cmvn_file = tmp_path / "cmvn.json"
+
+    compute_audio_cmvn.main(cmvn_file=str(cmvn_file), num_workers=1, checkpoint_interval=7)
+
+    with open(cmvn_file) as f:
+        cmvn = json.load(f)
+    count, mean, var = _reference(dataset)
+    assert cmvn["total_frames"] == count
+    np.testing.assert_allclose(np.array(cmvn["mean_stats"]) / count, mean, rtol=1e-13)
+    assert not os.path.exists(f"{cmvn_file}.partials")
+
+
+def test_interrupted_shard_resumes_from_matching_partial(monkeypatch, tmp_path):
+    partial_file = str(tmp_path / "shard.npz")
+    indices = np.arange(30)
+    crashed = FbankDataset(num_samples=30, fail_at=17)
+    monkeypatch.setattr(compute_audio_cmvn, "build_dataset", lambda kwargs: crashed)
+    with pytest.raises(RuntimeError):
+        compute_shard({}, 0, indices, partial_file, checkpoint_interval=5, fingerprint="run-a")
+
+    resumed = FbankDataset(num_samples=30)
+    monkeypatch.setattr(compute_audio_cmvn, "build_dataset", lambda kwargs: resumed)
+    stats = compute_shard({}, 0, indices, partial_file, checkpoint_interval=5, fingerprint="run-a")
+
+    assert resumed.reads == list(range(15, 30))  # 从最后一个检查点继续
+    count, mean, var = _reference(resumed)
+    assert stats.count == count
+    np.testing.assert_allclose(stats.var, var, rtol=1e-10)
+
+
+def test_partial_from_other_inputs_is_discarded(dataset, tmp_path):
+    partial_file = str(tmp_path / "shard.npz")
+    indices = np.arange(len(dataset))
+    stale = CmvnStats().update(np.full((100, DIM), -5.0))
+    stale.save(partial_file, position=len(indices) // 2, fingerprint="other-manifest")
+
+    stats = compute_shard({}, 0, indices, partial_file, fingerprint="this-manifest")
+
+    assert dataset.reads == list(indices)
+    count, mean, var = _reference(dataset)
+    assert stats.count == count
+    np.testing.assert_allclose(stats.mean, mean, rtol=1e-13)
+
+    # 旧格式的中间结果没有指纹，同样重新计算
+    stale.save(partial_file, position=len(indices))
+    dataset.reads.clear()
+    compute_shard({}, 0, indices, partial_file, fingerprint="this-manifest")
+    assert dataset.reads == list(indices)
+
+
+def test_fingerprint_tracks_manifest_split_and_frontend(tmp_path):
+    manifest = tmp_path / "train.jsonl"
+    manifest.write_text('{"key": "a"}\n')
+    kwargs = {"train_data_set_list": str(manifest), "frontend": "WavFrontend", "frontend_conf": {"n_mels": 80}}
+    base = partial_fingerprint(kwargs, 100, 4)
+
+    assert partial_fingerprint(dict(kwargs), 100, 4) == base
+    assert partial_fingerprint(kwargs, 100, 8) != base
+    assert partial_fingerprint({**kwargs, "frontend_conf": {"n_mels": 40}}, 100, 4) != base
+
+    manifest.write_text('{"key": "a"}\n{"key": "b"}\n')
+    assert partial_fingerprint(kwargs, 100, 4) != base
@@ -0,0 +1,149 @@
+"""前端特征缓存：命中/未命中、配置或音频变化后失效、残缺条目重新计算"""
+
+import os
+import pickle
+import wave
+
+import numpy as np
+import pytest
+import torch
+
+from funasr.datasets.audio_datasets.feature_cache import INDEX_DTYPE, FeatureCache
+from funasr.frontends.wav_frontend import WavFrontend
+from funasr.utils.load_utils import extract_fbank, load_audio_text_image_video
+
+
+def make_frontend(**overrides):
+    conf = {"fs": 16000, "n_mels": 80, "lfr_m": 7, "lfr_n": 6, "dither": 0.0, **overrides}
+    return WavFrontend(**conf)
+
+
+def write_wav(path, seconds=1.0, seed=0):
+    samples = (np.random.default_rng(seed).standard_normal(int(16000 * seconds)) * 3000).astype("<i2")
+    with wave.open(str(path), "wb") as fout:
+        fout.setnchannels(1)
+        fout.setsampwidth(2)
+        fout.setframerate(16000)
+        fout.writeframes(samples.tobytes())
+    return str(path)
+
+
+def compute(source, frontend):
+    # 直接读取采样点：torchaudio.load 依赖的解码后端在测试环境中不一定可用
+    with wave.open(source, "rb") as fin:
+        samples = np.frombuffer(fin.readframes(fin.getnframes()), dtype="<i2")
+    data_src = load_audio_text_image_video(samples.astype(np.float32) / 32768, fs=16000)
+    speech, speech_lengths = extract_fbank(data_src, frontend=frontend, is_final=True)
+    return speech[0], speech_lengths
+
+
+def load(cache, source, frontend):
+    """与AudioDataset.load_speech相同的读缓存/回填流程，返回(特征, 是否命中)"""
+    key = cache.make_key(source)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached, True
+    speech, speech_lengths = compute(source, frontend)
+    cache.put(key, speech, speech_lengths)
+    return (speech, speech_lengths), False
+
+
+@pytest.fixture
+def frontend():
+    return make_frontend()
+
+
+@pytest.fixture
+def sources(tmp_path):
+    return [write_wav(tmp_path / f"utt_{i}.wav", seconds=0.5 + 0.3 * i, seed=i) for i in range(4)]
+
+
+def test_hit_after_miss_returns_same_features(tmp_path, frontend, sources):
+    cache = FeatureCache(str(tmp_path / "cache"), frontend)
+    first = [load(cache, source, frontend) for source in sources]
+    assert [hit for _, hit in first] == [False] * len(sources)
+
+    # 同一进程和新的worker进程（重新打开分片）都命中
+    for reader in (cache, FeatureCache(str(tmp_path / "cache"), frontend), pickle.loads(pickle.dumps(cache))):
+        for source, ((speech, speech_lengths), _) in zip(sources, first):
+            (cached, cached_lengths), hit = load(reader, source, frontend)
+            assert hit
+            assert torch.equal(cached, speech) and torch.equal(cached_lengths, speech_lengths.to(torch.int32))
+
+
+def test_uncacheable_sources_are_skipped(tmp_path, frontend):
+    cache = FeatureCache(str(tmp_path / "cache"), frontend)
+    assert cache.make_key(np.zeros(16000, dtype=np.float32)) is None
+    assert cache.make_key(str(tmp_path / "missing.wav")) is None
+    assert cache.get(None) is None
+    cache.put(None, torch.zeros(3, 560), torch.tensor([3]))
+    assert not any(name.endswith(".feat") for name in os.listdir(cache.cache_dir))
+
+
+@pytest.mark.parametrize("overrides", [{"n_mels": 40}, {"lfr_m": 5, "lfr_n": 3}, {"dither": 1.0}])
+def test_frontend_config_change_misses(tmp_path, frontend, sources, overrides):
+    load(FeatureCache(str(tmp_path / "cache"), frontend), sources[0], frontend)
+
+    changed = make_frontend(**overrides)
+    cache = FeatureCache(str(tmp_path / "cache"), changed)
+    assert cache.fingerprint != FeatureCache(str(tmp_path / "cache"), frontend).fingerprint
+    assert cache.get(cache.make_key(sources[0])) is None
+
+
+def test_cmvn_change_misses(tmp_path, sources):
+    frontend = make_frontend()
+    frontend.cmvn = torch.stack([torch.zeros(560), torch.ones(560)])
+    load(FeatureCache(str(tmp_path / "cache"), frontend), sources[0], frontend)
+
+    frontend.cmvn = torch.stack([torch.full((560,), 0.5), torch.ones(560)])
+    cache = FeatureCache(str(tmp_path / "cache"), frontend)
+    assert cache.get(cache.make_key(sources[0])) is None
+
+
+def test_rewritten_audio_misses(tmp_path, frontend, sources):
+    cache = FeatureCache(str(tmp_path / "cache"), frontend)
+    load(cache, sources[0], frontend)
+
+    # 重新录制：大小不变，只有mtime变化
+    stat = os.stat(sources[0])
+    write_wav(sources[0], seconds=0.5, seed=99)
+    os.utime(sources[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    (speech, _), hit = load(cache, sources[0], frontend)
+    assert not hit
+    assert torch.equal(speech, compute(sources[0], frontend)[0])
+
+
+def test_torn_index_record_is_ignored(tmp_path, frontend, sources):
+    cache = FeatureCache(str(tmp_path / "cache"), frontend)
+    for source in sources:
+        load(cache, source, frontend)
+    (index_path,) = [os.path.join(cache.cache_dir, n) for n in os.listdir(cache.cache_dir) if n.endswith(".idx")]
+
+    # 写索引时崩溃：最后一条记录只写了一半
+    with open(index_path, "r+b") as fout:
+        fout.truncate(os.path.getsize(index_path) - INDEX_DTYPE.itemsize // 2)
+
+    reader = FeatureCache(str(tmp_path / "cache"), frontend)
+    assert [load(reader, source, frontend)[1] for source in sources] == [True, True, True, False]
+    assert load(FeatureCache(str(tmp_path / "cache"), frontend), sources[-1], frontend)[1]
+
+
+def test_truncated_shard_entry_is_rebuilt(tmp_path, frontend, sources):
+    cache = FeatureCache(str(tmp_path / "cache"), frontend)
+    expected = [load(cache, source, frontend)[0][0] for source in sources]
+    (shard,) = [os.path.join(cache.cache_dir, n) for n in os.listdir(cache.cache_dir) if n.endswith(".feat")]
+
+    # 索引已发布但特征文件被截断（断电后未落盘的数据、拷贝不完整）
+    with open(shard, "r+b") as fout:
+        fout.truncate(os.path.getsize(shard) - 100)
+
+    # 崩溃后重启的进程把被截断的条目当作未命中并重新计算
+    reader = FeatureCache(str(tmp_path / "cache"), frontend)
+    results = [load(reader, source, frontend) for source in sources]
+    assert [hit for _, hit in results] == [True, True, True, False]
+    for ((speech, _), _), want in zip(results, expected):
+        assert torch.equal(speech, want)
+
+    reader = FeatureCache(str(tmp_path / "cache"), frontend)
+    assert all(load(reader, source, frontend)[1] for source in sources)
+    assert torch.equal(load(reader, sources[-1], frontend)[0][0], expected[-1])
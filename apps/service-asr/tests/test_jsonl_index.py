@@ -0,0 +1,182 @@
+"""jsonl列式索引：编译、失效重建，以及与逐行dict加载器的一致性"""
+
+import json
+import os
+import pickle
+import random
+
+import numpy as np
+import pytest
+
+from funasr.datasets.audio_datasets import jsonl_index
+from funasr.datasets.audio_datasets.index_ds import IndexDSJsonlRankFull
+from funasr.datasets.audio_datasets.jsonl_index import (
+    KIND_SOURCE,
+    KIND_TEXT,
+    JsonlIndex,
+    compile_jsonl_index,
+    default_index_dir,
+    load_jsonl_index,
+)
+
+
+def write_manifest(path, num_rows, seed, blank_lines=False):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as fout:
+        for i in range(num_rows):
+            record = {"key": f"{seed}_{i}"}
+            roll = rng.random()
+            if roll < 0.1:
+                record["text"] = f"sft 文本 {i}"
+            if roll > 0.05:
+                record.update(
+                    source=f"/data/aishell/utt_{i}.wav" if i % 7 == 0 else f"/data/utt_{i}.wav",
+                    target=f"转写 文本 {i}",
+                    text_language="<|zh|>",
+                )
+                if rng.random() < 0.8:
+                    record["source_len"] = rng.randint(0, 3000)
+                if rng.random() < 0.8:
+                    record["target_len"] = rng.randint(0, 300)
+                if rng.random() < 0.7:
+                    record["prompt"] = rng.choice(["<ASR>", "<SER>", f"<ASR><{seed}>"])
+                if rng.random() < 0.2:
+                    record["emo_target"] = "<|HAPPY|>"
+            fout.write(json.dumps(record, ensure_ascii=False) + "\n")
+            if blank_lines and rng.random() < 0.05:
+                fout.write("\n")
+
+
+@pytest.fixture
+def manifests(tmp_path):
+    paths = []
+    for seed in range(2):
+        path = tmp_path / f"train_{seed}.jsonl"
+        write_manifest(path, 300, seed)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / "index")
+
+
+def count_compiles(monkeypatch):
+    calls = []
+    original = jsonl_index.compile_jsonl_index
+
+    def wrapper(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(jsonl_index, "compile_jsonl_index", wrapper)
+    return calls
+
+
+def test_compiled_index_points_at_source_lines(tmp_path, cache_dir):
+    # 空行被跳过（逐行dict加载器遇到空行会报错，所以只在这里覆盖）
+    manifest = str(tmp_path / "blank_lines.jsonl")
+    write_manifest(manifest, 300, 5, blank_lines=True)
+    index_dir = compile_jsonl_index(manifest, default_index_dir(manifest, cache_dir))
+    columns = {name: np.load(os.path.join(index_dir, f"{name}.npy")) for name in jsonl_index.COLUMNS}
+    with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as fin:
+        meta = json.load(fin)
+
+    expected = []
+    with open(manifest, "rb") as fin:
+        raw = fin.read()
+    for line in raw.splitlines(keepends=True):
+        if not line.strip():
+            continue
+        data = json.loads(line)
+        if "text" in data:
+            expected.append((line, KIND_TEXT, 0, 0, None))
+        if "source" in data:
+            expected.append(
+                (line, KIND_SOURCE, data.get("source_len", 1), data.get("target_len", 0), data.get("prompt", "<ASR>"))
+            )
+
+    assert meta["num_rows"] == len(expected) == len(columns["offset"])
+    assert meta["path"] == os.path.abspath(manifest) and meta["size"] == len(raw)
+    for n, (line, kind, source_len, target_len, prompt) in enumerate(expected):
+        offset, length = int(columns["offset"][n]), int(columns["length"][n])
+        assert raw[offset : offset + length] == line
+        assert (columns["kind"][n], columns["source_len"][n], columns["target_len"][n]) == (kind, source_len, target_len)
+        prompt_id = int(columns["prompt_id"][n])
+        assert (meta["prompts"][prompt_id] if prompt_id >= 0 else None) == prompt
+
+
+def test_index_is_reused_until_manifest_changes(manifests, cache_dir, monkeypatch):
+    manifest = manifests[0]
+    compiles = count_compiles(monkeypatch)
+    columns, meta = load_jsonl_index(manifest, cache_dir)
+    assert len(compiles) == 1
+    num_rows = meta["num_rows"]
+
+    load_jsonl_index(manifest, cache_dir)
+    assert len(compiles) == 1
+
+    # 追加一行：大小变化
+    with open(manifest, "a", encoding="utf-8") as fout:
+        fout.write(json.dumps({"key": "new", "source": "/data/new.wav", "target": "新", "source_len": 10}) + "\n")
+    columns, meta = load_jsonl_index(manifest, cache_dir)
+    assert len(compiles) == 2 and meta["num_rows"] == num_rows + 1
+
+    # 同样大小的原地修改：只有mtime变化
+    stat = os.stat(manifest)
+    with open(manifest, "r+b") as fout:
+        fout.seek(stat.st_size - 4)
+        fout.write(b"99}\n")
+    os.utime(manifest, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    columns, meta = load_jsonl_index(manifest, cache_dir)
+    assert len(compiles) == 3
+    assert int(columns["source_len"][-1]) == 99
+
+
+def test_stale_index_version_is_rebuilt(manifests, cache_dir, monkeypatch):
+    manifest = manifests[0]
+    load_jsonl_index(manifest, cache_dir)
+    meta_path = os.path.join(default_index_dir(manifest, cache_dir), "meta.json")
+    with open(meta_path, encoding="utf-8") as fin:
+        meta = json.load(fin)
+    meta["version"] = jsonl_index.INDEX_VERSION - 1
+    with open(meta_path, "w", encoding="utf-8") as fout:
+        json.dump(meta, fout)
+
+    compiles = count_compiles(monkeypatch)
+    load_jsonl_index(manifest, cache_dir)
+    assert len(compiles) == 1
+
+
+@pytest.mark.parametrize(
+    "limits",
+    [
+        {},
+        {"min_source_length": 100, "max_source_length": 2000, "max_token_length": 2100},
+        {"min_target_length": 10, "max_target_length": 200, "max_token_length": 500},
+    ],
+)
+def test_matches_dict_loader(manifests, cache_dir, tmp_path, limits):
+    file_list = tmp_path / "train.list"
+    file_list.write_text("".join(f"{path}\n" for path in manifests), encoding="utf-8")
+
+    legacy = IndexDSJsonlRankFull(str(file_list), jsonl_index=False, **limits)
+    indexed = IndexDSJsonlRankFull(str(file_list), index_cache_dir=cache_dir, **limits)
+
+    assert len(indexed) == len(legacy) > 0
+    assert [indexed[i] for i in range(len(indexed))] == legacy.contents
+    sources = [item for item in legacy.contents if isinstance(item, dict)]
+    source_rows = indexed.index.kind == KIND_SOURCE
+    assert indexed.source_lens[source_rows].tolist() == [item["source_len"] for item in sources]
+    assert indexed.target_lens[source_rows].tolist() == [item["target_len"] for item in sources]
+
+
+def test_pickled_index_reopens_manifests(manifests, cache_dir):
+    index = JsonlIndex(manifests, cache_dir=cache_dir)
+    first = index.read(len(index) - 1)
+
+    clone = pickle.loads(pickle.dumps(index))
+    assert clone._mmaps == {}
+    assert clone.read(len(index) - 1) == first
+    assert [clone.prompt(i) for i in range(len(clone))] == [index.prompt(i) for i in range(len(index))]
@@ -0,0 +1,52 @@
+"""KWS批量CTC前缀束搜索：与逐条beam_search结果一致"""
+
+import pytest
+import torch
+
+from funasr.utils.kws_utils import KwsCtcPrefixDecoder
+
+
+@pytest.fixture
+def decoder():
+    token_list = ["<blank>", "a", "b", "c", "d", "e", "f", "g"]
+    return KwsCtcPrefixDecoder(None, "ab,cd", token_list, {})
+
+
+def random_posteriors(generator, batch_size, max_len, vocab_size, sharpness):
+    logits = torch.randn(batch_size, max_len, vocab_size, generator=generator) * sharpness
+    # 偏向blank，产生CTC常见的尖峰
+    logits[:, :, 0] += sharpness * 0.5
+    lengths = torch.randint(1, max_len + 1, (batch_size,), generator=generator)
+    lengths[0] = max_len
+    return logits.softmax(-1), lengths
+
+
+def assert_same_hyps(batched, single):
+    assert [prefix for prefix, _, _ in batched] == [prefix for prefix, _, _ in single]
+    for (_, score, nodes), (_, expected_score, expected_nodes) in zip(batched, single):
+        assert score == pytest.approx(expected_score, rel=1e-9, abs=1e-300)
+        assert [(n["token"], n["frame"]) for n in nodes] == [(n["token"], n["frame"]) for n in expected_nodes]
+        assert [n["prob"] for n in nodes] == pytest.approx([n["prob"] for n in expected_nodes], rel=1e-6)
+
+
+@pytest.mark.parametrize("sharpness", [1.0, 3.0, 6.0])
+@pytest.mark.parametrize("use_keywords", [False, True])
+def test_batch_matches_per_utterance(decoder, sharpness, use_keywords):
+    generator = torch.Generator().manual_seed(45)
+    tokenset = decoder.keywords_idxset if use_keywords else None
+    for _ in range(10):
+        probs, lengths = random_posteriors(generator, 6, 60, len(decoder.token_list), sharpness)
+        batched = decoder.beam_search_batch(probs, lengths, tokenset, score_beam_size=3, path_beam_size=10)
+        for b in range(probs.size(0)):
+            single = decoder.beam_search(probs[b, : lengths[b]], lengths[b : b + 1], tokenset, 3, 10)
+            assert_same_hyps(batched[b], single)
+
+
+def test_batch_matches_with_wide_beams(decoder):
+    # 束宽接近词表，前缀合并（*s-s与*ss）和重复前缀最频繁
+    generator = torch.Generator().manual_seed(7)
+    probs, lengths = random_posteriors(generator, 4, 200, len(decoder.token_list), 2.0)
+    batched = decoder.beam_search_batch(probs, lengths, None, score_beam_size=5, path_beam_size=30)
+    for b in range(probs.size(0)):
+        single = decoder.beam_search(probs[b, : lengths[b]], lengths[b : b + 1], None, 5, 30)
+        assert_same_hyps(batched[b], single)
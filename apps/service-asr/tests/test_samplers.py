@@ -0,0 +1,120 @@
+"""动态批采样：填充率、批次吞吐，以及各rank产出相同数量的批次"""
+
+import time
+
+import numpy as np
+import pytest
+
+from funasr.datasets.audio_datasets import samplers
+from funasr.datasets.audio_datasets.samplers import CustomDistributedDynamicBatchSampler
+
+BATCH_SIZE = 6000
+MAX_TOKEN_LENGTH = 2048
+
+
+class LengthDataset:
+    """只提供样本长度的数据集；带 index_ds 时走索引中的长度列"""
+
+    def __init__(self, lengths, with_index=True):
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        if with_index:
+            self.index_ds = type("Index", (), {"source_lens": self.lengths})()
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def get_source_len(self, index):
+        return int(self.lengths[index])
+
+
+def _lognormal_lengths(num_samples, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.clip(rng.lognormal(6.3, 0.6, num_samples).astype(np.int64), 20, 3000)
+
+
+def _sampler(dataset, rank=0, world_size=1, monkeypatch=None, **kwargs):
+    if monkeypatch is not None:
+        monkeypatch.setattr(samplers.dist, "get_rank", lambda: rank)
+        monkeypatch.setattr(samplers.dist, "get_world_size", lambda: world_size)
+    sampler = CustomDistributedDynamicBatchSampler(
+        dataset, batch_size=BATCH_SIZE, max_token_length=MAX_TOKEN_LENGTH, **kwargs
+    )
+    sampler.set_epoch(1)
+    return sampler
+
+
+def _padding_ratio(lengths, batches):
+    tokens = sum(int(lengths[b].sum()) for b in batches)
+    padded = sum(int(lengths[b].max()) * len(b) for b in batches)
+    return 1 - tokens / padded
+
+
+@pytest.mark.parametrize("with_index", [True, False])
+def test_padding_ratio_and_token_budget(with_index):
+    lengths = _lognormal_lengths(20000)
+    dataset = LengthDataset(lengths, with_index=with_index)
+
+    batches = list(_sampler(dataset))
+
+    # 随机顺序贪心打包约有39%的填充；按长度排序的桶内打包应在2%以内
+    assert _padding_ratio(lengths, batches) < 0.02
+    assert all(int(lengths[b].max()) * len(b) <= BATCH_SIZE for b in batches)
+    used = np.concatenate(batches)
+    assert len(used) == len(set(used.tolist())) == int((lengths <= MAX_TOKEN_LENGTH).sum())
+
+
+def test_batches_per_second():
+    lengths = _lognormal_lengths(200000)
+    sampler = _sampler(LengthDataset(lengths))
+
+    start = time.perf_counter()
+    num_batches = sum(1 for _ in sampler)
+    elapsed = time.perf_counter() - start
+
+    # 本机约12万批/秒；下限留足余量，只拦截退回逐样本Python循环的改动
+    assert num_batches == len(sampler)
+    assert num_batches / elapsed > 20000
+    print(f"\n{num_batches} batches in {elapsed:.2f}s ({num_batches / elapsed:,.0f} batches/s)")
+
+
+def test_plan_is_repeatable_per_epoch():
+    dataset = LengthDataset(_lognormal_lengths(5000))
+    first = list(_sampler(dataset))
+    assert list(_sampler(dataset)) == first
+
+    sampler = _sampler(dataset)
+    sampler.set_epoch(2)
+    assert list(sampler) != first
+
+
+def test_ranks_yield_equal_batch_counts(monkeypatch):
+    lengths = _lognormal_lengths(5000)
+    dataset = LengthDataset(lengths)
+
+    plans = [list(_sampler(dataset, rank, 4, monkeypatch)) for rank in range(4)]
+
+    assert len({len(plan) for plan in plans}) == 1
+    assert all(len(_sampler(dataset, rank, 4, monkeypatch)) == len(plans[0]) for rank in range(4))
+    covered = {i for plan in plans for batch in plan for i in batch}
+    assert covered == set(np.flatnonzero(lengths <= MAX_TOKEN_LENGTH).tolist())
+
+
+@pytest.mark.parametrize(
+    "lengths",
+    [
+        [100, 200, 300],  # 样本数少于rank数
+        [100, 200, 3000, 3000, 150, 250, 2500, 2900],  # rank 2、3 的样本全部超长被过滤
+    ],
+)
+def test_rank_without_batches_borrows_from_other_ranks(monkeypatch, lengths):
+    dataset = LengthDataset(lengths)
+
+    plans = [list(_sampler(dataset, rank, 4, monkeypatch, shuffle=False)) for rank in range(4)]
+
+    # 没有自己批次的rank也要产出同样多的批次，否则其余rank会在all-reduce中挂住
+    assert [len(plan) for plan in plans] == [len(plans[0])] * 4
+    assert len(plans[0]) > 0
+    valid = set(np.flatnonzero(np.asarray(lengths) <= MAX_TOKEN_LENGTH).tolist())
+    borrowers = [rank for rank in range(4) if not valid & set(range(rank, len(lengths), 4))]
+    assert borrowers
+    assert all(i in valid for rank in borrowers for batch in plans[rank] for i in batch)
@@ -0,0 +1,182 @@
+"""CIF时间戳：向量化实现与原逐帧实现的等价性（语料测试，容差见各用例）"""
+
+import numpy as np
+import pytest
+import torch
+
+from funasr.utils.timestamp_tools import cif_wo_hidden, ts_prediction_lfr6_standard
+
+THRESHOLD = 1.0 - 1e-4
+# 原实现用float32逐帧累加，数千帧后积累约1e-5量级的舍入漂移；
+# 精确积分值距阈值不超过该值的帧，两种实现的触发判定可能不同
+TIE_MARGIN = 1e-5
+
+
+def reference_cif_wo_hidden(alphas, threshold):
+    """向量化之前的逐帧实现（原样保留作对照）"""
+    batch_size, len_time = alphas.size()
+    integrate = torch.zeros([batch_size], device=alphas.device)
+    list_fires = []
+    for t in range(len_time):
+        alpha = alphas[:, t]
+        integrate += alpha
+        list_fires.append(integrate)
+        fire_place = integrate >= threshold
+        integrate = torch.where(
+            fire_place,
+            integrate - torch.ones([batch_size], device=alphas.device) * threshold,
+            integrate,
+        )
+    return torch.stack(list_fires, 1)
+
+
+def reference_ts_prediction_lfr6_standard(
+    us_alphas, us_peaks, char_list, vad_offset=0.0, force_time_shift=-1.5, sil_in_str=True, upsample_rate=3,
+):
+    """向量化之前的实现（原样保留作对照）"""
+    if not len(char_list):
+        return "", []
+    START_END_THRESHOLD = 5
+    MAX_TOKEN_DURATION = 12
+    TIME_RATE = 10.0 * 6 / 1000 / upsample_rate
+    if len(us_alphas.shape) == 2:
+        alphas, peaks = us_alphas[0], us_peaks[0]
+    else:
+        alphas, peaks = us_alphas, us_peaks
+    if char_list[-1] == "</s>":
+        char_list = char_list[:-1]
+    fire_place = torch.where(peaks >= 1.0 - 1e-4)[0].cpu().numpy() + force_time_shift
+    if len(fire_place) != len(char_list) + 1:
+        alphas /= alphas.sum() / (len(char_list) + 1)
+        alphas = alphas.unsqueeze(0)
+        peaks = reference_cif_wo_hidden(alphas, threshold=1.0 - 1e-4)[0]
+        fire_place = torch.where(peaks >= 1.0 - 1e-4)[0].cpu().numpy() + force_time_shift
+    num_frames = peaks.shape[0]
+    timestamp_list = []
+    new_char_list = []
+    if fire_place[0] > START_END_THRESHOLD:
+        timestamp_list.append([0.0, fire_place[0] * TIME_RATE])
+        new_char_list.append("<sil>")
+    for i in range(len(fire_place) - 1):
+        new_char_list.append(char_list[i])
+        if MAX_TOKEN_DURATION < 0 or fire_place[i + 1] - fire_place[i] <= MAX_TOKEN_DURATION:
+            timestamp_list.append([fire_place[i] * TIME_RATE, fire_place[i + 1] * TIME_RATE])
+        else:
+            _split = fire_place[i] + MAX_TOKEN_DURATION
+            timestamp_list.append([fire_place[i] * TIME_RATE, _split * TIME_RATE])
+            timestamp_list.append([_split * TIME_RATE, fire_place[i + 1] * TIME_RATE])
+            new_char_list.append("<sil>")
+    if num_frames - fire_place[-1] > START_END_THRESHOLD:
+        _end = (num_frames + fire_place[-1]) * 0.5
+        timestamp_list[-1][1] = _end * TIME_RATE
+        timestamp_list.append([_end * TIME_RATE, num_frames * TIME_RATE])
+        new_char_list.append("<sil>")
+    else:
+        if len(timestamp_list) > 0:
+            timestamp_list[-1][1] = num_frames * TIME_RATE
+    if vad_offset:
+        for i in range(len(timestamp_list)):
+            timestamp_list[i][0] = timestamp_list[i][0] + vad_offset / 1000.0
+            timestamp_list[i][1] = timestamp_list[i][1] + vad_offset / 1000.0
+    res_txt = ""
+    for char, timestamp in zip(new_char_list, timestamp_list):
+        if not sil_in_str and char == "<sil>":
+            continue
+        res_txt += "{} {} {};".format(char, str(timestamp[0] + 0.0005)[:5], str(timestamp[1] + 0.0005)[:5])
+    res = []
+    for char, timestamp in zip(new_char_list, timestamp_list):
+        if char != "<sil>":
+            res.append([int(timestamp[0] * 1000), int(timestamp[1] * 1000)])
+    return res_txt, res
+
+
+def exact_integrator(alphas, threshold):
+    """float64逐帧积分，作为两种实现共同的真值"""
+    alphas = alphas.double()
+    integrate = torch.zeros(alphas.size(0), dtype=torch.float64)
+    fires = []
+    for t in range(alphas.size(1)):
+        integrate = integrate + alphas[:, t]
+        fires.append(integrate)
+        integrate = torch.where(integrate >= threshold, integrate - threshold, integrate)
+    return torch.stack(fires, 1)
+
+
+def random_alphas(rng, kind, batch_size, num_frames):
+    if kind == "uniform":
+        alphas = rng.random((batch_size, num_frames)) * 0.3
+    elif kind == "sigmoid":
+        alphas = 1 / (1 + np.exp(-rng.normal(-2.0, 1.5, (batch_size, num_frames))))
+    elif kind == "above_threshold":
+        alphas = rng.random((batch_size, num_frames)) * 1.6
+    else:  # 稀疏：多数帧为0，整体重新归一化到整数个token
+        alphas = rng.random((batch_size, num_frames)) * (rng.random((batch_size, num_frames)) < 0.2)
+        alphas = alphas / alphas.sum(axis=1, keepdims=True) * rng.integers(5, 60)
+    return torch.from_numpy(alphas.astype(np.float32))
+
+
+@pytest.mark.parametrize("kind", ["uniform", "sigmoid", "above_threshold", "sparse"])
+def test_cif_matches_frame_by_frame_integrator(kind):
+    rng = np.random.default_rng(50)
+    mismatched_frames = total_frames = 0
+    for _ in range(10):
+        alphas = random_alphas(rng, kind, batch_size=4, num_frames=int(rng.integers(20, 2000)))
+        exact = exact_integrator(alphas, THRESHOLD)
+        fires = cif_wo_hidden(alphas, THRESHOLD)
+        old = reference_cif_wo_hidden(alphas, THRESHOLD)
+
+        assert fires.dtype == alphas.dtype and fires.shape == alphas.shape
+        # 向量化结果与float64积分一致（仅差最终转回float32的舍入）
+        torch.testing.assert_close(fires.double(), exact, rtol=0, atol=1e-5)
+        assert torch.equal(fires >= THRESHOLD, exact.float() >= THRESHOLD)
+
+        # 与原float32实现只在精确值贴近阈值的帧上判定不同（及其后一帧的连带差异）
+        differ = (fires >= THRESHOLD) != (old >= THRESHOLD)
+        near_tie = (exact - THRESHOLD).abs() <= TIE_MARGIN
+        near_tie = near_tie | torch.nn.functional.pad(near_tie[:, :-1], (1, 0))
+        assert not (differ & ~near_tie).any()
+        mismatched_frames += int(differ.sum())
+        total_frames += alphas.numel()
+    assert mismatched_frames <= total_frames * 1e-4
+
+
+def _case(rng, given_peaks):
+    num_tokens = int(rng.integers(1, 40))
+    num_frames = int(rng.integers(num_tokens * 3 + 10, num_tokens * 30 + 40))
+    char_list = [f"t{i}" for i in range(num_tokens)] + (["</s>"] if rng.random() < 0.5 else [])
+    alphas = random_alphas(rng, "sparse" if rng.random() < 0.5 else "uniform", 1, num_frames)
+    peaks = torch.zeros(1, num_frames)
+    if given_peaks:
+        places = np.sort(rng.choice(np.arange(2, num_frames), num_tokens + 1, replace=False))
+        peaks[0, places] = 1.0
+    kwargs = {"vad_offset": float(rng.choice([0.0, 1230.0])), "sil_in_str": bool(rng.random() < 0.7)}
+    return alphas, peaks, char_list, kwargs
+
+
+def test_timestamps_with_given_peaks_are_identical():
+    rng = np.random.default_rng(0)
+    for _ in range(500):
+        alphas, peaks, char_list, kwargs = _case(rng, given_peaks=True)
+        expected = reference_ts_prediction_lfr6_standard(alphas.clone(), peaks, char_list, **kwargs)
+        assert ts_prediction_lfr6_standard(alphas.clone(), peaks, char_list, **kwargs) == expected
+
+
+def test_timestamps_through_cif_match_within_one_frame_on_ties():
+    rng = np.random.default_rng(1)
+    identical = 0
+    for _ in range(300):
+        alphas, peaks, char_list, kwargs = _case(rng, given_peaks=False)
+        expected_txt, expected = reference_ts_prediction_lfr6_standard(alphas.clone(), peaks, char_list, **kwargs)
+        txt, result = ts_prediction_lfr6_standard(alphas.clone(), peaks, char_list, **kwargs)
+
+        if (txt, result) == (expected_txt, expected):
+            identical += 1
+            continue
+        # 只允许由阈值贴近导致的差异：某个token提前或推后一帧（20ms）触发
+        tokens = [c for c in char_list if c != "</s>"]
+        normalized = alphas[0] / (alphas[0].sum() / (len(tokens) + 1))
+        exact = exact_integrator(normalized.unsqueeze(0), THRESHOLD)
+        assert ((exact - THRESHOLD).abs() <= TIE_MARGIN).any()
+        assert len(result) == len(expected)
+        assert np.abs(np.array(result) - np.array(expected)).max() <= 20
+    assert identical >= 295
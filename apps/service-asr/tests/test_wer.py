@@ -0,0 +1,221 @@
+"""WER统计：批量对齐与原逐格动态规划实现逐字节一致"""
+
+import random
+
+import numpy as np
+import pytest
+
+from funasr.metrics.wer import align_batch, compute_wer, compute_wer_by_line
+
+
+def reference_compute_wer_by_line(hyp, ref):
+    """向量化之前的逐格实现（原样保留作对照，仅修正wrong的类型）"""
+    hyp = list(map(lambda x: x.lower(), hyp))
+    ref = list(map(lambda x: x.lower(), ref))
+
+    len_hyp = len(hyp)
+    len_ref = len(ref)
+
+    cost_matrix = np.zeros((len_hyp + 1, len_ref + 1), dtype=np.int16)
+
+    ops_matrix = np.zeros((len_hyp + 1, len_ref + 1), dtype=np.int8)
+
+    for i in range(len_hyp + 1):
+        cost_matrix[i][0] = i
+    for j in range(len_ref + 1):
+        cost_matrix[0][j] = j
+
+    for i in range(1, len_hyp + 1):
+        for j in range(1, len_ref + 1):
+            if hyp[i - 1] == ref[j - 1]:
+                cost_matrix[i][j] = cost_matrix[i - 1][j - 1]
+            else:
+                substitution = cost_matrix[i - 1][j - 1] + 1
+                insertion = cost_matrix[i - 1][j] + 1
+                deletion = cost_matrix[i][j - 1] + 1
+
+                compare_val = [substitution, insertion, deletion]
+
+                min_val = min(compare_val)
+                operation_idx = compare_val.index(min_val) + 1
+                cost_matrix[i][j] = min_val
+                ops_matrix[i][j] = operation_idx
+
+    i = len_hyp
+    j = len_ref
+    rst = {"nwords": len_ref, "cor": 0, "wrong": 0, "ins": 0, "del": 0, "sub": 0}
+    while i >= 0 or j >= 0:
+        i_idx = max(0, i)
+        j_idx = max(0, j)
+
+        if ops_matrix[i_idx][j_idx] == 0:  # correct
+            if i - 1 >= 0 and j - 1 >= 0:
+                rst["cor"] += 1
+
+            i -= 1
+            j -= 1
+
+        elif ops_matrix[i_idx][j_idx] == 2:  # insert
+            i -= 1
+            rst["ins"] += 1
+
+        elif ops_matrix[i_idx][j_idx] == 3:  # delete
+            j -= 1
+            rst["del"] += 1
+
+        elif ops_matrix[i_idx][j_idx] == 1:  # substitute
+            i -= 1
+            j -= 1
+            rst["sub"] += 1
+
+        if i < 0 and j >= 0:
+            rst["del"] += 1
+        elif j < 0 and i >= 0:
+            rst["ins"] += 1
+
+    # 原实现直接返回int16标量，NumPy 2下累加到wrong_words仍是int16，
+    # 计算%WER时wrong_words * 100会溢出；新实现返回int，这里同样转换
+    rst["wrong"] = int(cost_matrix[len_hyp][len_ref])
+    return rst
+
+
+def reference_print_cer_detail(rst):
+    return (
+        "("
+        + "nwords="
+        + str(rst["nwords"])
+        + ",cor="
+        + str(rst["cor"])
+        + ",ins="
+        + str(rst["ins"])
+        + ",del="
+        + str(rst["del"])
+        + ",sub="
+        + str(rst["sub"])
+        + ") corr:"
+        + "{:.2%}".format(rst["cor"] / rst["nwords"])
+        + ",cer:"
+        + "{:.2%}".format(rst["wrong"] / rst["nwords"])
+    )
+
+
+def reference_compute_wer(ref_file, hyp_file, cer_file, cn_postprocess=False):
+    """原compute_wer（原样保留作对照，仅去掉注释掉的代码）"""
+    rst = {
+        "Wrd": 0, "Corr": 0, "Ins": 0, "Del": 0, "Sub": 0, "Snt": 0,
+        "Err": 0.0, "S.Err": 0.0, "wrong_words": 0, "wrong_sentences": 0,
+    }
+
+    hyp_dict = {}
+    ref_dict = {}
+    for path, trans_dict in ((hyp_file, hyp_dict), (ref_file, ref_dict)):
+        with open(path, "r") as reader:
+            for line in reader:
+                key = line.strip().split()[0]
+                value = line.strip().split()[1:]
+                if cn_postprocess:
+                    value = " ".join(value)
+                    value = value.replace(" ", "")
+                    value = [x for x in value]
+                trans_dict[key] = value
+
+    cer_detail_writer = open(cer_file, "w")
+    for hyp_key in hyp_dict:
+        if hyp_key in ref_dict:
+            out_item = reference_compute_wer_by_line(hyp_dict[hyp_key], ref_dict[hyp_key])
+            rst["Wrd"] += out_item["nwords"]
+            rst["Corr"] += out_item["cor"]
+            rst["wrong_words"] += out_item["wrong"]
+            rst["Ins"] += out_item["ins"]
+            rst["Del"] += out_item["del"]
+            rst["Sub"] += out_item["sub"]
+            rst["Snt"] += 1
+            if out_item["wrong"] > 0:
+                rst["wrong_sentences"] += 1
+            cer_detail_writer.write(hyp_key + reference_print_cer_detail(out_item) + "\n")
+            cer_detail_writer.write(
+                "ref:" + "\t" + " ".join(list(map(lambda x: x.lower(), ref_dict[hyp_key]))) + "\n"
+            )
+            cer_detail_writer.write(
+                "hyp:" + "\t" + " ".join(list(map(lambda x: x.lower(), hyp_dict[hyp_key]))) + "\n"
+            )
+
+    if rst["Wrd"] > 0:
+        rst["Err"] = round(rst["wrong_words"] * 100 / rst["Wrd"], 2)
+    if rst["Snt"] > 0:
+        rst["S.Err"] = round(rst["wrong_sentences"] * 100 / rst["Snt"], 2)
+
+    cer_detail_writer.write("\n")
+    cer_detail_writer.write(
+        "%WER " + str(rst["Err"]) + " [ " + str(rst["wrong_words"]) + " / " + str(rst["Wrd"]) + ", "
+        + str(rst["Ins"]) + " ins, " + str(rst["Del"]) + " del, " + str(rst["Sub"]) + " sub ]" + "\n"
+    )
+    cer_detail_writer.write(
+        "%SER " + str(rst["S.Err"]) + " [ " + str(rst["wrong_sentences"]) + " / " + str(rst["Snt"]) + " ]" + "\n"
+    )
+    cer_detail_writer.write(
+        "Scored " + str(len(hyp_dict)) + " sentences, " + str(len(hyp_dict) - rst["Snt"])
+        + " not present in hyp." + "\n"
+    )
+    cer_detail_writer.close()
+
+
+def random_pair(rng, vocab, max_len=30):
+    ref = [rng.choice(vocab) for _ in range(rng.randint(0, max_len))]
+    hyp = []
+    for word in ref:
+        roll = rng.random()
+        if roll < 0.1:
+            continue
+        hyp.append(rng.choice(vocab) if roll < 0.25 else word)
+        if rng.random() < 0.1:
+            hyp.append(rng.choice(vocab))
+    if rng.random() < 0.05:
+        hyp = []
+    return hyp, ref
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    """随机语料：大小写混合、空hyp、ref中缺失的key，ref不为空（原实现对空ref除零）"""
+    rng = random.Random(44)
+    vocab = ["a", "B", "c", "the", "The", "你", "好", "世", "界"]
+    ref_file, hyp_file = tmp_path / "test.ref", tmp_path / "test.hyp"
+    with open(ref_file, "w") as ref_writer, open(hyp_file, "w") as hyp_writer:
+        for n in range(400):
+            hyp, ref = random_pair(rng, vocab)
+            ref = ref or [rng.choice(vocab)]
+            if n % 37 != 5:
+                ref_writer.write(" ".join([f"utt{n}"] + ref) + "\n")
+            hyp_writer.write(" ".join([f"utt{n}"] + hyp) + "\n")
+    return ref_file, hyp_file
+
+
+def test_alignment_matches_scalar_recurrence():
+    rng = random.Random(0)
+    pairs = [random_pair(rng, ["a", "b", "c", "D"]) for _ in range(500)]
+    pairs += [([], []), ([], ["a", "b"]), (["a", "b"], []), (["a"], ["A"])]
+    expected = [reference_compute_wer_by_line(hyp, ref) for hyp, ref in pairs]
+
+    assert [compute_wer_by_line(hyp, ref) for hyp, ref in pairs] == expected
+    lowered = [([x.lower() for x in hyp], [x.lower() for x in ref]) for hyp, ref in pairs]
+    assert align_batch([hyp for hyp, _ in lowered], [ref for _, ref in lowered]) == expected
+
+
+@pytest.mark.parametrize("cn_postprocess", [False, True])
+def test_detail_file_is_byte_identical(corpus, tmp_path, cn_postprocess):
+    ref_file, hyp_file = corpus
+    reference_compute_wer(ref_file, hyp_file, tmp_path / "expected.wer", cn_postprocess)
+    compute_wer(ref_file, hyp_file, tmp_path / "actual.wer", cn_postprocess)
+
+    assert (tmp_path / "actual.wer").read_bytes() == (tmp_path / "expected.wer").read_bytes()
+
+
+def test_sharded_totals_match_single_pass(corpus, tmp_path):
+    ref_file, hyp_file = corpus
+    compute_wer(ref_file, hyp_file, tmp_path / "single.wer", chunk_size=10**6)
+    compute_wer(ref_file, hyp_file, tmp_path / "sharded.wer", ncpu=2, chunk_size=17)
+
+    single = (tmp_path / "single.wer").read_text()
+    assert "%WER" in single
+    assert (tmp_path / "sharded.wer").read_text() == single